@@ -3,10 +3,11 @@ Modulo per la gestione dell'accesso pubblico e privato.
 Implementa controllo degli accessi basato su ruoli e permessi.
 """
 
-from typing import Dict, List, Set, Optional
+from typing import Dict, FrozenSet, List, Set, Optional
 from dataclasses import dataclass
 from enum import Enum
 from datetime import datetime
+import hmac
 
 
 class Ruolo(Enum):
@@ -41,6 +42,30 @@ class Utente:
         }
 
 
+@dataclass(frozen=True)
+class Principale:
+    """Identità immutabile dell'utente autenticato per una singola richiesta."""
+    username: str
+    ruolo: Ruolo
+    nome_completo: str
+    permessi: FrozenSet[str]
+    associato_id: Optional[int] = None
+    
+    def ha_permesso(self, permesso: str) -> bool:
+        """Verifica un permesso (lookup su insieme, tempo costante)."""
+        return permesso in self.permessi
+    
+    def to_dict(self) -> Dict:
+        """Converte il principale in dizionario."""
+        return {
+            "username": self.username,
+            "ruolo": self.ruolo.value,
+            "nome": self.nome_completo,
+            "associato_id": self.associato_id,
+            "permessi": sorted(self.permessi)
+        }
+
+
 class GestoreAccessi:
     """Gestisce gli accessi e le autorizzazioni nel sistema."""
     
@@ -115,6 +140,12 @@ class GestoreAccessi:
         """Inizializza il gestore degli accessi."""
         self.utenti: Dict[str, Utente] = {}
         self.sessione_corrente: Optional[Utente] = None
+        
+        # Permessi per ruolo congelati una volta sola
+        self._permessi_ruolo: Dict[Ruolo, FrozenSet[str]] = {
+            ruolo: frozenset(permessi) for ruolo, permessi in self.PERMESSI.items()
+        }
+        self._principali: Dict[str, Principale] = {}
     
     def registra_utente(self, username: str, password: str, ruolo: Ruolo,
                        nome_completo: str, associato_id: Optional[int] = None) -> bool:
@@ -133,6 +164,7 @@ class GestoreAccessi:
         if username in self.utenti:
             return False
         
+        self._principali.pop(username, None)
         self.utenti[username] = Utente(
             username=username,
             password=password,  # In produzione, usare hashing!
@@ -142,6 +174,30 @@ class GestoreAccessi:
         )
         return True
     
+    def verifica_credenziali(self, username: str, password: str) -> Optional[Utente]:
+        """Verifica le credenziali senza modificare la sessione corrente.
+        
+        Adatto a contesti concorrenti (web): lo stato dell'autenticazione
+        resta nella singola richiesta.
+        
+        Args:
+            username: Nome utente
+            password: Password
+            
+        Returns:
+            Utente autenticato o None
+        """
+        utente = self.utenti.get(username)
+        if utente is None or not utente.attivo:
+            return None
+        
+        if not hmac.compare_digest(utente.password.encode(), (password or "").encode()):
+            return None
+        
+        # Aggiorna ultimo accesso
+        utente.ultimo_accesso = datetime.now()
+        return utente
+    
     def autentica(self, username: str, password: str) -> bool:
         """Autentica un utente.
         
@@ -152,21 +208,43 @@ class GestoreAccessi:
         Returns:
             True se autenticato, False altrimenti
         """
-        if username not in self.utenti:
+        utente = self.verifica_credenziali(username, password)
+        if utente is None:
             return False
         
-        utente = self.utenti[username]
+        self.sessione_corrente = utente
+        return True
+    
+    def permessi_ruolo(self, ruolo: Ruolo) -> FrozenSet[str]:
+        """Restituisce l'insieme immutabile dei permessi di un ruolo."""
+        return self._permessi_ruolo.get(ruolo, frozenset())
+    
+    def risolvi_principale(self, username: Optional[str]) -> Optional[Principale]:
+        """Costruisce (o riusa) il principale di un utente attivo.
         
-        if not utente.attivo:
-            return False
+        Args:
+            username: Nome utente letto da sessione o token
+            
+        Returns:
+            Principale immutabile, None se l'utente non esiste o è disattivato
+        """
+        principale = self._principali.get(username)
+        if principale is not None:
+            return principale
         
-        if utente.password != password:
-            return False
+        utente = self.utenti.get(username)
+        if utente is None or not utente.attivo:
+            return None
         
-        # Aggiorna ultimo accesso
-        utente.ultimo_accesso = datetime.now()
-        self.sessione_corrente = utente
-        return True
+        principale = Principale(
+            username=utente.username,
+            ruolo=utente.ruolo,
+            nome_completo=utente.nome_completo,
+            permessi=self.permessi_ruolo(utente.ruolo),
+            associato_id=utente.associato_id
+        )
+        self._principali[username] = principale
+        return principale
     
     def disconnetti(self) -> None:
         """Disconnette l'utente corrente."""
@@ -184,7 +262,7 @@ class GestoreAccessi:
         if not self.sessione_corrente:
             return False
         
-        return permesso in self.PERMESSI.get(self.sessione_corrente.ruolo, set())
+        return permesso in self.permessi_ruolo(self.sessione_corrente.ruolo)
     
     def get_utente_corrente(self) -> Optional[Utente]:
         """Restituisce l'utente corrente."""
@@ -216,6 +294,7 @@ class GestoreAccessi:
             return False
         
         utente = self.utenti[username]
+        self._principali.pop(username, None)
         
         if attivo is not None:
             utente.attivo = attivo
@@ -238,6 +317,7 @@ class GestoreAccessi:
             return False
         
         del self.utenti[username]
+        self._principali.pop(username, None)
         return True
     
     def statistiche_accessi(self) -> Dict:
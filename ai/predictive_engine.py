@@ -6,7 +6,31 @@ Sistema di machine learning per predizioni educative
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from itertools import chain
 import math
+import random
+import time
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+# Colonne della matrice delle feature (una riga per studente)
+FEATURE_BATCH = [
+    "media",            # media dei voti
+    "trend",            # ultimo - penultimo voto
+    "delta",            # ultimo - primo voto
+    "pendenza",         # pendenza della retta dei voti (per prova)
+    "varianza",         # varianza dei voti
+    "num_voti",
+    "fragilita",
+    "assenze_rate",
+    "interventi_count",
+]
 
 
 @dataclass
@@ -20,6 +44,21 @@ class PredictionResult:
     livello_fiducia: float  # 0-100
 
 
+@dataclass
+class MatriceFeature:
+    """Feature di un gruppo di studenti per la predizione in batch."""
+    
+    valori: "np.ndarray"  # (studenti, len(FEATURE_BATCH))
+    nomi: List[str]
+    
+    def __len__(self) -> int:
+        return self.valori.shape[0]
+    
+    def colonna(self, nome: str) -> "np.ndarray":
+        """Colonna di una feature."""
+        return self.valori[:, self.nomi.index(nome)]
+
+
 class PredictiveEngine:
     """Motore AI per predizioni educative."""
     
@@ -27,6 +66,19 @@ class PredictiveEngine:
         """Inizializza motore predittivo."""
         self.models = {}
     
+    def imposta_modello_rischio(self, modello) -> None:
+        """Usa un modello addestrato (ai.modello_rischio) al posto dell'euristica.
+        
+        Args:
+            modello: ModelloRischio, o None per tornare all'euristica
+        """
+        if modello is None:
+            self.models.pop('rischio', None)
+            return
+        if modello.feature != FEATURE_BATCH:
+            raise ValueError(f"Il modello usa feature diverse: {modello.feature}")
+        self.models['rischio'] = modello
+    
     def predict_rischio_insufficienza(self, studente_data: Dict, voti: List[float]) -> float:
         """Predice rischio insufficienza studente.
         
@@ -37,6 +89,11 @@ class PredictiveEngine:
         Returns:
             Rischio 0-100
         """
+        modello = self.models.get('rischio')
+        if modello is not None:
+            feature = self.costruisci_feature([studente_data], [voti])
+            return float(modello.probabilita(feature.valori)[0]) * 100
+        
         if not voti:
             return 50.0  # Neutro se nessun voto
         
@@ -211,6 +268,145 @@ class PredictiveEngine:
             livello_fiducia=round(fiducia, 1)
         )
     
+    # ============ PREDIZIONE IN BATCH ============
+    
+    def costruisci_feature(self, studenti_data: List[Dict], voti: List[List[float]]) -> MatriceFeature:
+        """Costruisce la matrice delle feature di tutti gli studenti in un passaggio.
+        
+        I voti di tutti gli studenti sono concatenati in un solo array e le
+        statistiche per studente sono somme per gruppo (np.bincount), senza
+        cicli Python sui voti.
+        
+        Args:
+            studenti_data: Dati studente (fragilita, assenze_rate, interventi_count)
+            voti: Lista voti di ciascuno studente, nello stesso ordine
+            
+        Returns:
+            MatriceFeature con le colonne di FEATURE_BATCH
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy non disponibile: usare predict_complete")
+        
+        n = len(studenti_data)
+        lunghezze = np.fromiter(map(len, voti), dtype=np.int64, count=n)
+        piatti = np.fromiter(chain.from_iterable(voti), dtype=np.float64, count=int(lunghezze.sum()))
+        gruppi = np.repeat(np.arange(n), lunghezze)
+        fine = np.cumsum(lunghezze)
+        inizio = fine - lunghezze
+        conteggi = np.maximum(lunghezze, 1)
+        
+        # Somme per gruppo in ordine: stessa aritmetica di sum(voti)
+        media = np.bincount(gruppi, weights=piatti, minlength=n) / conteggi
+        media[lunghezze == 0] = 0.0
+        
+        # Primo, penultimo e ultimo voto (indici validi anche senza voti)
+        sorgente = piatti if piatti.size else np.zeros(1)
+        ultimo = sorgente[np.maximum(fine - 1, 0)]
+        penultimo = sorgente[np.maximum(fine - 2, 0)]
+        primo = sorgente[np.minimum(inizio, sorgente.size - 1)]
+        almeno_due = lunghezze >= 2
+        trend = np.where(almeno_due, ultimo - penultimo, 0.0)
+        delta = np.where(almeno_due, ultimo - primo, 0.0)
+        
+        # Varianza e pendenza (minimi quadrati sulla posizione della prova)
+        scarti = piatti - media[gruppi]
+        varianza = np.bincount(gruppi, weights=scarti ** 2, minlength=n) / conteggi
+        posizioni = np.arange(piatti.size) - inizio[gruppi] - (lunghezze[gruppi] - 1) / 2
+        sxx = np.bincount(gruppi, weights=posizioni ** 2, minlength=n)
+        sxy = np.bincount(gruppi, weights=posizioni * scarti, minlength=n)
+        pendenza = np.divide(sxy, sxx, out=np.zeros(n), where=sxx > 0)
+        
+        fragilita = np.array([d.get('fragilita', 50) for d in studenti_data], dtype=np.float64)
+        assenze = np.array([d.get('assenze_rate', 0) for d in studenti_data], dtype=np.float64)
+        interventi = np.array([d.get('interventi_count', 0) for d in studenti_data], dtype=np.float64)
+        
+        valori = np.column_stack([
+            media, trend, delta, pendenza, varianza, lunghezze.astype(np.float64),
+            fragilita, assenze, interventi
+        ])
+        return MatriceFeature(valori=valori, nomi=list(FEATURE_BATCH))
+    
+    def punteggi_batch(self, feature: MatriceFeature) -> Dict[str, "np.ndarray"]:
+        """Applica le regole di predict_complete a tutte le righe insieme.
+        
+        I fattori sono sommati nello stesso ordine del calcolo per studente,
+        quindi i valori coincidono con quelli di predict_complete.
+        
+        Args:
+            feature: Matrice delle feature
+            
+        Returns:
+            Array non arrotondati: rischio, miglioramento, voto_previsto, fiducia
+        """
+        media = feature.colonna("media")
+        trend = feature.colonna("trend")
+        delta = feature.colonna("delta")
+        num_voti = feature.colonna("num_voti")
+        fragilita = feature.colonna("fragilita")
+        assenze = feature.colonna("assenze_rate")
+        interventi = feature.colonna("interventi_count")
+        senza_voti = num_voti == 0
+        
+        # Rischio insufficienza
+        rischio = np.where(media < 6, np.abs(6 - media) * 10, 0.0)
+        rischio = rischio + np.where(trend < -0.5, np.abs(trend) * 15, 0.0)
+        rischio = rischio + np.where(fragilita > 70, (fragilita - 70) / 3, 0.0)
+        rischio = rischio + np.where(assenze > 0.1, assenze * 20, 0.0)
+        rischio = np.where(senza_voti, 50.0, np.clip(rischio, 0, 100))
+        
+        # Modello addestrato, se presente
+        modello = self.models.get('rischio')
+        if modello is not None:
+            rischio = modello.probabilita(feature.valori) * 100
+        
+        # Probabilità miglioramento
+        miglioramento = 50.0 + np.where(delta > 0, delta * 10, 0.0)
+        miglioramento = miglioramento + np.where(fragilita < 50, (50 - fragilita) / 2, 0.0)
+        miglioramento = miglioramento + interventi * 5
+        miglioramento = miglioramento + np.where(media >= 5.5, 10.0, 0.0)
+        miglioramento = np.where(senza_voti, 50.0, np.clip(miglioramento, 0, 100))
+        
+        # Voto finale
+        voto = np.where(senza_voti, 5.0, np.clip(media + trend * 0.3, 3.0, 10.0))
+        
+        return {
+            "rischio": rischio,
+            "miglioramento": miglioramento,
+            "voto_previsto": voto,
+            "fiducia": np.minimum(num_voti.astype(np.int64) * 10, 100)
+        }
+    
+    def predict_batch(self, studenti_data: List[Dict], voti: List[List[float]]) -> List[PredictionResult]:
+        """Predizione completa per molti studenti (equivalente a predict_complete).
+        
+        Args:
+            studenti_data: Dati studente
+            voti: Lista voti di ciascuno studente, nello stesso ordine
+            
+        Returns:
+            Un PredictionResult per studente
+        """
+        if not NUMPY_AVAILABLE:
+            return [self.predict_complete(d, v) for d, v in zip(studenti_data, voti)]
+        
+        punteggi = self.punteggi_batch(self.costruisci_feature(studenti_data, voti))
+        return [
+            PredictionResult(
+                rischio_insufficienza=round(rischio, 1),
+                probabilita_miglioramento=round(miglioramento, 1),
+                previsione_voto_finale=round(voto, 1),
+                raccomandazioni=self.generate_raccomandazioni(dati, rischio),
+                livello_fiducia=round(fiducia, 1)
+            )
+            for dati, rischio, miglioramento, voto, fiducia in zip(
+                studenti_data,
+                punteggi["rischio"].tolist(),
+                punteggi["miglioramento"].tolist(),
+                punteggi["voto_previsto"].tolist(),
+                punteggi["fiducia"].tolist()
+            )
+        ]
+    
     def early_warning_system(self, classi: List[Dict]) -> List[Dict]:
         """Sistema early warning per classe.
         
@@ -220,6 +416,39 @@ class PredictiveEngine:
         Returns:
             Lista studenti a rischio
         """
+        if not NUMPY_AVAILABLE:
+            return self._early_warning_per_studente(classi)
+        
+        studenti = [studente for classe_data in classi for studente in classe_data.get('studenti', [])]
+        if not studenti:
+            return []
+        indici_classe = np.repeat(np.arange(len(classi)), [len(c.get('studenti', [])) for c in classi])
+        punteggi = self.punteggi_batch(
+            self.costruisci_feature(studenti, [s.get('voti', []) for s in studenti])
+        )
+        
+        warning_list = []
+        # Soglia sul rischio arrotondato, come nel calcolo per studente
+        for indice in np.flatnonzero(punteggi["rischio"] > 60).tolist():
+            rischio = float(punteggi["rischio"][indice])
+            if round(rischio, 1) <= 60:
+                continue
+            classe_data, studente = classi[indici_classe[indice]], studenti[indice]
+            warning_list.append({
+                'studente': studente.get('nome_completo', 'Unknown'),
+                'classe': classe_data.get('classe', 'Unknown'),
+                'rischio': round(rischio, 1),
+                'voto_previsto': round(float(punteggi["voto_previsto"][indice]), 1),
+                'raccomandazioni': self.generate_raccomandazioni(studente, rischio)[:2]
+            })
+        
+        # Ordina per rischio
+        warning_list.sort(key=lambda x: x['rischio'], reverse=True)
+        
+        return warning_list
+    
+    def _early_warning_per_studente(self, classi: List[Dict]) -> List[Dict]:
+        """Early warning con predict_complete su ogni studente (senza NumPy)."""
         warning_list = []
         
         for classe_data in classi:
@@ -246,6 +475,68 @@ class PredictiveEngine:
         return warning_list
 
 
+def genera_classi_sintetiche(numero_studenti: int, voti_per_studente: int = 12,
+                             studenti_per_classe: int = 25, seed: int = 42) -> List[Dict]:
+    """Dati early warning sintetici (formato di InterfacciaERP._dati_early_warning).
+    
+    Args:
+        numero_studenti: Studenti totali
+        voti_per_studente: Voti massimi per studente (alcuni ne hanno meno)
+        studenti_per_classe: Studenti per classe
+        seed: Seme del generatore
+        
+    Returns:
+        Lista dati classi
+    """
+    generatore = random.Random(seed)
+    classi = []
+    for i in range(numero_studenti):
+        if i % studenti_per_classe == 0:
+            classi.append({'classe': f"C{len(classi) + 1}", 'studenti': []})
+        base = generatore.uniform(4.0, 8.5)
+        classi[-1]['studenti'].append({
+            'nome_completo': f"Studente {i + 1}",
+            'fragilita': generatore.randint(0, 100),
+            'assenze_rate': round(generatore.uniform(0, 0.3), 2),
+            'interventi_count': generatore.randint(0, 3),
+            'voti': [round(min(10.0, max(3.0, base + generatore.gauss(0, 1))) * 2) / 2
+                     for _ in range(generatore.randint(0, voti_per_studente))]
+        })
+    return classi
+
+
+def benchmark_batch(dimensioni: Tuple[int, ...] = (1000, 10000, 50000), ripetizioni: int = 3) -> List[Dict]:
+    """Confronta early warning per studente e in batch.
+    
+    Args:
+        dimensioni: Numeri di studenti
+        ripetizioni: Misure per modalità (si tiene la migliore)
+        
+    Returns:
+        Una riga per dimensione con tempi in millisecondi
+    """
+    motore = PredictiveEngine()
+    risultati = []
+    for numero in dimensioni:
+        classi = genera_classi_sintetiche(numero)
+        tempi = {}
+        for nome, funzione in (("per_studente", motore._early_warning_per_studente),
+                               ("batch", motore.early_warning_system)):
+            migliore = float("inf")
+            for _ in range(ripetizioni):
+                inizio = time.perf_counter()
+                funzione(classi)
+                migliore = min(migliore, time.perf_counter() - inizio)
+            tempi[nome] = migliore * 1000
+        risultati.append({
+            "studenti": numero,
+            "per_studente_ms": round(tempi["per_studente"], 2),
+            "batch_ms": round(tempi["batch"], 2),
+            "accelerazione": round(tempi["per_studente"] / tempi["batch"], 1)
+        })
+    return risultati
+
+
 # Istanza globale
 predictive_engine = PredictiveEngine()
 
@@ -272,4 +563,9 @@ if __name__ == "__main__":
     print(f"\nRaccomandazioni:")
     for racc in predizione.raccomandazioni:
         print(f"  • {racc}")
-
+    
+    if NUMPY_AVAILABLE:
+        print(f"\nEarly warning per studente vs batch:")
+        for riga in benchmark_batch():
+            print(f"  {riga['studenti']:>6} studenti: {riga['per_studente_ms']:>9.1f} ms -> "
+                  f"{riga['batch_ms']:>7.1f} ms ({riga['accelerazione']}x)")
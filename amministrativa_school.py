@@ -4,7 +4,7 @@ Gestisce alunni, personale, presenze/assenze e documenti amministrativi.
 """
 
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from datetime import datetime, date, timedelta
 from enum import Enum
 import random
@@ -210,6 +210,8 @@ class AmministrativaSchool:
         self.alunni: Dict[int, AnagraficaAlunno] = {}
         self.personale_manager = GestionePersonale()
         self.presenze: List[Presenza] = []
+        # Callback chiamate a ogni presenza registrata (es. rollup dei grafici)
+        self.osservatori_presenze: List[Callable[[Presenza], None]] = []
         self.documenti: List[DocumentoAmministrativo] = []
         self._prossimo_id_alunno = 1
         self._prossimo_id_presenza = 1
@@ -309,6 +311,9 @@ class AmministrativaSchool:
         self.presenze.append(presenza)
         self._prossimo_id_presenza += 1
         
+        for osservatore in self.osservatori_presenze:
+            osservatore(presenza)
+        
         return presenza
     
     def presenze_studente(self, studente_id: int, data_inizio: Optional[str] = None,
@@ -3,7 +3,7 @@ Modulo per la gestione dell'anagrafica studenti.
 Gestisce dati personali, reddito, salute e situazione familiare.
 """
 
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from dataclasses import dataclass, field
 import dati
 from dati import CategoriaReddito, CondizioneSalute
@@ -96,14 +96,25 @@ class Anagrafica:
         """Inizializza l'anagrafica."""
         self.studenti: List[Studente] = []
         self._prossimo_id = 1
+        
+        # Backend opzionale notificato a ogni modifica (es. StatoCondiviso)
+        self.persistenza = None
+        
+        # Callback (evento, studente) chiamate dopo ogni modifica (es. cache delle classi dei rollup)
+        self.osservatori: List[Callable[[str, Optional[Studente]], None]] = []
     
     def aggiungi_studente(self, studente: Studente) -> None:
         """Aggiunge uno studente all'anagrafica."""
-        if studente.id == 0:
+        if self.persistenza is not None:
+            # Gli ID sono assegnati dallo store, unici tra tutti i processi
+            studente.id = self.persistenza.studente_aggiunto(studente)
+            self._prossimo_id = max(self._prossimo_id, studente.id + 1)
+        elif studente.id == 0:
             studente.id = self._prossimo_id
             self._prossimo_id += 1
         
         self.studenti.append(studente)
+        self.notifica_osservatori("aggiunto", studente)
     
     def crea_studente_casuale(self, classe: Optional[str] = None) -> Studente:
         """Crea uno studente con dati casuali.
@@ -250,10 +261,25 @@ class Anagrafica:
         """
         studente = self.trova_studente(id)
         if studente:
+            if self.persistenza is not None:
+                self.persistenza.studente_rimosso(id)
             self.studenti.remove(studente)
+            self.notifica_osservatori("rimosso", studente)
             return True
         return False
     
+    def notifica_osservatori(self, evento: str, studente: Optional[Studente] = None) -> None:
+        """Notifica una modifica all'anagrafica agli osservatori registrati.
+        
+        Da chiamare anche dopo aver modificato sul posto uno studente (es. cambio di classe).
+        
+        Args:
+            evento: "aggiunto", "rimosso", "modificato" o "ricaricati"
+            studente: Studente interessato, None per gli eventi sull'intero insieme
+        """
+        for osservatore in self.osservatori:
+            osservatore(evento, studente)
+    
     def statistiche_generali(self) -> Dict:
         """Calcola statistiche generali sull'anagrafica.
         
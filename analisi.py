@@ -5,6 +5,8 @@ Calcola graduatorie, impatto didattico, equità educativa.
 
 from typing import List, Dict, Optional
 import utils
+from statistiche_streaming import ETICHETTE_FASCE, Welford
+from bootstrap_indicatori import BootstrapIndicatori, STATISTICHE_TESTATE
 
 
 class AnalisiDidattica:
@@ -149,25 +151,23 @@ class AnalisiDidattica:
         Returns:
             Dizionario con risultati dell'analisi
         """
-        fasce_reddito = {
-            "Molto Basso": [],
-            "Basso": [],
-            "Medio": [],
-            "Alto": []
-        }
-        
-        for studente in self.anagrafica.studenti:
-            media = self.gestione_voti.media_studente(studente.id)
-            categoria = studente.categoria_reddito.name
-            
-            if categoria in fasce_reddito:
-                fasce_reddito[categoria].append(media)
+        statistiche = getattr(self.gestione_voti, "statistiche", None)
+        if statistiche is not None:
+            medie_fasce = statistiche.medie_per_fascia()
+        else:
+            medie_fasce = {}
+            for studente in self.anagrafica.studenti:
+                media = self.gestione_voti.media_studente(studente.id)
+                medie_fasce.setdefault(studente.categoria_reddito.name, Welford()).aggiungi(media)
         
+        # Chiavi per etichetta della fascia, in ordine di reddito
         risultati = {}
-        for fascia, medie in fasce_reddito.items():
-            risultati[fascia] = {
-                "numero_studenti": len(medie),
-                "media_rendimento": round(utils.calcola_media(medie), 2) if medie else 0.0
+        for categoria, etichetta in ETICHETTE_FASCE.items():
+            medie = medie_fasce.get(categoria, Welford())
+            risultati[etichetta] = {
+                "numero_studenti": medie.n,
+                "media_rendimento": round(medie.media, 2),
+                "deviazione_standard": round(medie.deviazione_standard, 2)
             }
         
         return risultati
@@ -360,9 +360,14 @@ class AnalisiDidattica:
         else:
             return "Critica: interventi urgenti necessari"
     
-    def analisi_equita_completa(self) -> Dict:
+    def analisi_equita_completa(self, ricampionamenti: int = 0, seed: Optional[int] = 0) -> Dict:
         """Esegue un'analisi completa sull'equità del sistema.
         
+        Args:
+            ricampionamenti: Se > 0 aggiunge intervalli bootstrap e p-value
+                (gap pedagogico, correlazione e divario reddito-rendimento)
+            seed: Seme per la riproducibilità dei ricampionamenti
+            
         Returns:
             Dizionario con analisi di equità
         """
@@ -371,13 +376,23 @@ class AnalisiDidattica:
         impatto = self.impatto_didattico_fragili()
         correlazione = self.correlazione_reddito_rendimento()
         
-        return {
+        risultato = {
             "fragilità_sistema": report_frag,
             "resilienza_educativa": report_resilienza,
             "gap_pedagogico": impatto.get("gap_pedagogico", 0),
             "correlazione_reddito": correlazione,
             "valutazione_complessiva": self._valuta_equita_complessiva(report_frag, impatto)
         }
+        
+        if ricampionamenti > 0 and self.anagrafica.studenti:
+            bootstrap = BootstrapIndicatori(
+                self.anagrafica, self.gestione_voti,
+                ricampionamenti=ricampionamenti, permutazioni=ricampionamenti, seed=seed
+            )
+            stime = bootstrap.analizza()["indicatori"]
+            risultato["incertezza"] = {nome: stime[nome] for nome in STATISTICHE_TESTATE}
+        
+        return risultato
     
     def _valuta_equita_complessiva(self, report_frag: Dict, impatto: Dict) -> str:
         """Valuta l'equità complessiva del sistema.
@@ -4,10 +4,14 @@ Include analisi trend, previsioni, report ministeriali e monitoraggio performanc
 """
 
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta, date
 from enum import Enum
-import math
+
+from rollup_grafici import RollupVoti
+from statistiche_streaming import Welford
+from report_parallelo import ReportParallelo, analizza_classe, fotografa_classi
+from regole_allerte import AllertaScuola, ArchivioAllerte, MotoreRegoleAllerte, ORDINE_PRIORITA, RegolaAllerta
 
 
 class TipoMetrica(Enum):
@@ -58,48 +62,31 @@ class TrendPrestazione:
         }
 
 
-@dataclass
-class AllertaScuola:
-    """Rappresenta un'allerta per la dirigenza."""
-    
-    id: int
-    titolo: str
-    descrizione: str
-    priorita: str  # "bassa", "media", "alta", "critica"
-    tipo: str  # "rendimento", "frequenza", "risorse", "comportamento"
-    dati_correlati: Dict
-    data_creazione: datetime
-    data_scadenza: Optional[datetime] = None
-    risolta: bool = False
-    note_azione: str = ""
-    
-    def to_dict(self) -> Dict:
-        """Converte in dizionario."""
-        return {
-            "id": self.id,
-            "titolo": self.titolo,
-            "descrizione": self.descrizione,
-            "priorita": self.priorita,
-            "tipo": self.tipo,
-            "dati_correlati": self.dati_correlati,
-            "data_creazione": self.data_creazione.isoformat(),
-            "data_scadenza": self.data_scadenza.isoformat() if self.data_scadenza else None,
-            "risolta": self.risolta,
-            "note_azione": self.note_azione
-        }
-
-
 class AnaliticaPredittiva:
     """Gestisce analytics predittive e avanzate per la dirigenza."""
     
-    def __init__(self, anagrafica, voti, insegnanti, comunicazioni=None):
-        """Inizializza il sistema di analytics."""
+    def __init__(self, anagrafica, voti, insegnanti, comunicazioni=None, rollup_voti=None,
+                 indice_rischio=None, regole_allerte: Optional[List[RegolaAllerta]] = None,
+                 archivio_allerte: Optional[ArchivioAllerte] = None,
+                 report_parallelo: Optional[ReportParallelo] = None):
+        """Inizializza il sistema di analytics.
+        
+        Args:
+            rollup_voti: RollupVoti già collegato ai voti (se None viene creato al primo uso)
+            indice_rischio: IndiceRischio collegato ai voti (ricalcolo solo degli studenti modificati)
+            regole_allerte: Regole delle allerte automatiche (default REGOLE_PREDEFINITE)
+            archivio_allerte: Archivio da conservare tra istanze (es. dopo _init_analytics)
+            report_parallelo: Pool per l'analisi per classe (se None l'analisi è seriale)
+        """
         self.anagrafica = anagrafica
         self.voti = voti
         self.insegnanti = insegnanti
         self.comunicazioni = comunicazioni
-        self.allerte: List[AllertaScuola] = []
-        self._prossimo_id_allerta = 1
+        self.rollup_voti = rollup_voti
+        self.indice_rischio = indice_rischio
+        self.motore_allerte = MotoreRegoleAllerte(regole_allerte, archivio_allerte)
+        self.allerte: ArchivioAllerte = self.motore_allerte.archivio
+        self.report_parallelo = report_parallelo
     
     def calcola_media_generale_scuola(self) -> float:
         """Calcola la media generale di tutti gli studenti."""
@@ -130,38 +117,43 @@ class AnaliticaPredittiva:
         
         return sum(frequenze) / len(frequenze) if frequenze else 100.0
     
-    def identifica_studenti_rischio(self, soglia: float = 5.5) -> List[Dict]:
-        """Identifica studenti a rischio di insuccesso."""
+    def identifica_studenti_rischio(self, soglia: float = 5.5,
+                                    medie: Optional[Dict[int, float]] = None,
+                                    assenze: Optional[Dict[int, int]] = None) -> List[Dict]:
+        """Identifica studenti a rischio di insuccesso.
+        
+        Args:
+            soglia: Media sotto la quale lo studente è a rischio
+            medie: Medie per ID studente già calcolate (evita una scansione per studente)
+            assenze: Assenze da pagella per ID studente già calcolate
+        """
         studenti_rischio = []
         
-        for studente in self.anagrafica.studenti:
-            try:
-                media = self.voti.media_studente(studente.id)
-                
-                # Criteri di rischio
-                rischio_media = media < soglia
-                rischio_fragilita = studente.fragilità_sociale > 60
-                
-                # Conta assenze (simulato)
-                assenze_totali = sum([p.assenze for p in self.voti.pagelle if p.id_studente == studente.id])
-                
-                if rischio_media or (rischio_fragilita and media < 6.5):
-                    studenti_rischio.append({
-                        "studente_id": studente.id,
-                        "nome": studente.nome_completo,
-                        "classe": studente.classe,
-                        "media": round(media, 2),
-                        "fragilita": studente.fragilità_sociale,
-                        "assenze": assenze_totali,
-                        "fattori_rischio": [
-                            "media_bassa" if rischio_media else None,
-                            "fragilita_alta" if rischio_fragilita else None,
-                            "assenze_elevate" if assenze_totali > 30 else None
-                        ],
-                        "priorita": self._calcola_priorita_rischio(media, assenze_totali, studente.fragilità_sociale)
-                    })
-            except:
-                pass
+        if self.indice_rischio is not None and medie is None and assenze is None:
+            # Solo i candidati dagli indici ordinati (punteggi aggiornati per gli studenti modificati)
+            for studente, media, assenze_totali in self.indice_rischio.candidati_rischio(soglia):
+                voce = self._voce_rischio(studente, media, assenze_totali, soglia)
+                if voce is not None:
+                    studenti_rischio.append(voce)
+        else:
+            for studente in self.anagrafica.studenti:
+                try:
+                    if medie is not None:
+                        media = medie.get(studente.id, 0.0)
+                    else:
+                        media = self.voti.media_studente(studente.id)
+                    
+                    # Conta assenze (simulato)
+                    if assenze is not None:
+                        assenze_totali = assenze.get(studente.id, 0)
+                    else:
+                        assenze_totali = sum([p.assenze for p in self.voti.pagelle if p.id_studente == studente.id])
+                    
+                    voce = self._voce_rischio(studente, media, assenze_totali, soglia)
+                    if voce is not None:
+                        studenti_rischio.append(voce)
+                except:
+                    pass
         
         # Ordina per priorità
         studenti_rischio.sort(key=lambda x: (
@@ -172,6 +164,30 @@ class AnaliticaPredittiva:
         
         return studenti_rischio
     
+    def _voce_rischio(self, studente, media: float, assenze_totali: int, soglia: float) -> Optional[Dict]:
+        """Voce di identifica_studenti_rischio (None se lo studente non è a rischio)."""
+        # Criteri di rischio
+        rischio_media = media < soglia
+        rischio_fragilita = studente.fragilità_sociale > 60
+        
+        if not (rischio_media or (rischio_fragilita and media < 6.5)):
+            return None
+        
+        return {
+            "studente_id": studente.id,
+            "nome": studente.nome_completo,
+            "classe": studente.classe,
+            "media": round(media, 2),
+            "fragilita": studente.fragilità_sociale,
+            "assenze": assenze_totali,
+            "fattori_rischio": [
+                "media_bassa" if rischio_media else None,
+                "fragilita_alta" if rischio_fragilita else None,
+                "assenze_elevate" if assenze_totali > 30 else None
+            ],
+            "priorita": self._calcola_priorita_rischio(media, assenze_totali, studente.fragilità_sociale)
+        }
+    
     def _calcola_priorita_rischio(self, media: float, assenze: int, fragilita: float) -> str:
         """Calcola priorità del rischio."""
         if media < 4.5 or assenze > 50 or fragilita > 80:
@@ -182,136 +198,84 @@ class AnaliticaPredittiva:
             return "media"
         return "bassa"
     
+    def aggregati_allerte(self) -> Tuple[Dict[str, Dict[str, float]], Dict[str, Dict[str, Dict]]]:
+        """Metriche valutate dalle regole delle allerte.
+        
+        Returns:
+            (aggregati, dettagli): metrica -> {ambito: valore} e dati aggiuntivi per ambito
+        """
+        if self.indice_rischio is not None:
+            medie = self.indice_rischio.medie()
+        else:
+            # Voti raggruppati in un solo passaggio (media_studente scansiona tutti i voti)
+            somme = {}
+            for v in self.voti.voti:
+                cella = somme.setdefault(v.id_studente, [0.0, 0])
+                cella[0] += v.voto
+                cella[1] += 1
+            medie = {id_studente: somma / numero for id_studente, (somma, numero) in somme.items()}
+        
+        medie_positive = []
+        per_classe = {}
+        for studente in self.anagrafica.studenti:
+            media = medie.get(studente.id, 0.0)
+            if media > 0:
+                medie_positive.append(media)
+            per_classe.setdefault(studente.classe, []).append(media)
+        media_scuola = sum(medie_positive) / len(medie_positive) if medie_positive else 0.0
+        
+        studenti_critici = [s for s in self.identifica_studenti_rischio() if s["priorita"] == "critica"]
+        insegnanti_pesanti = sum(1 for i in self.insegnanti.insegnanti 
+                                 if i.carico_lavoro in ["Elevato", "Critico"])
+        
+        aggregati = {
+            "media_generale": {"scuola": media_scuola},
+            "tasso_frequenza": {"scuola": self.calcola_tasso_frequenza()},
+            "studenti_critici": {"scuola": len(studenti_critici)},
+            "scostamento_media_classe": {
+                classe: abs(sum(valori) / len(valori) - media_scuola) for classe, valori in per_classe.items()
+            },
+            "insegnanti_sovraccarichi": {"scuola": insegnanti_pesanti}
+        }
+        dettagli = {
+            "studenti_critici": {"scuola": {"studenti": studenti_critici[:5]}},
+            "scostamento_media_classe": {
+                classe: {"media_classe": sum(valori) / len(valori), "media_scuola": media_scuola}
+                for classe, valori in per_classe.items()
+            }
+        }
+        return aggregati, dettagli
+    
     def genera_allerte_automatiche(self) -> List[AllertaScuola]:
-        """Genera allerte automatiche basate sui dati."""
-        nuove_allerte = []
+        """Valuta le regole delle allerte sui dati correnti.
         
-        # 1. Allerta Rendimento Basso
-        media_scuola = self.calcola_media_generale_scuola()
-        if media_scuola < 6.0:
-            nuova_allerta = AllertaScuola(
-                id=self._prossimo_id_allerta,
-                titolo="Rendimento Generale Sotto la Soglia",
-                descrizione=f"La media generale della scuola è {media_scuola:.2f}, sotto la soglia minima di 6.0",
-                priorita="alta" if media_scuola < 5.5 else "media",
-                tipo="rendimento",
-                dati_correlati={"media_generale": media_scuola, "soglia": 6.0},
-                data_creazione=datetime.now()
-            )
-            nuove_allerte.append(nuova_allerta)
-            self._prossimo_id_allerta += 1
-        
-        # 2. Allerta Frequenza
-        tasso_frequenza = self.calcola_tasso_frequenza()
-        if tasso_frequenza < 85:
-            nuova_allerta = AllertaScuola(
-                id=self._prossimo_id_allerta,
-                titolo="Tasso di Frequenza Critico",
-                descrizione=f"Il tasso di frequenza è al {tasso_frequenza:.1f}%, sotto la soglia del 85%",
-                priorita="alta" if tasso_frequenza < 80 else "media",
-                tipo="frequenza",
-                dati_correlati={"tasso_frequenza": tasso_frequenza},
-                data_creazione=datetime.now()
-            )
-            nuove_allerte.append(nuova_allerta)
-            self._prossimo_id_allerta += 1
-        
-        # 3. Allerta Studenti a Rischio
-        studenti_rischio = self.identifica_studenti_rischio()
-        studenti_critici = [s for s in studenti_rischio if s["priorita"] == "critica"]
-        
-        if studenti_critici:
-            nuova_allerta = AllertaScuola(
-                id=self._prossimo_id_allerta,
-                titolo=f"{len(studenti_critici)} Studenti a Rischio Critico",
-                descrizione=f"Identificati {len(studenti_critici)} studenti che necessitano interventi immediati",
-                priorita="critica",
-                tipo="rendimento",
-                dati_correlati={"numero_studenti": len(studenti_critici), "studenti": studenti_critici[:5]},
-                data_creazione=datetime.now()
-            )
-            nuove_allerte.append(nuova_allerta)
-            self._prossimo_id_allerta += 1
-        
-        # 4. Allerta Equilibrio Classi
-        distribuzione_classi = self._analizza_distribuzione_classi()
-        classi_sbilanciate = [c for c, dati in distribuzione_classi.items() 
-                            if abs(dati["media"] - media_scuola) > 0.8]
-        
-        if classi_sbilanciate:
-            nuova_allerta = AllertaScuola(
-                id=self._prossimo_id_allerta,
-                titolo="Distribuzione Performance Sbilanciata",
-                descrizione=f"{len(classi_sbilanciate)} classi mostrano significative differenze di rendimento",
-                priorita="media",
-                tipo="rendimento",
-                dati_correlati={"classi_sbilanciate": classi_sbilanciate},
-                data_creazione=datetime.now()
-            )
-            nuove_allerte.append(nuova_allerta)
-            self._prossimo_id_allerta += 1
-        
-        # 5. Allerta Insegnanti Sovraccarichi
-        insegnanti_pesanti = [i for i in self.insegnanti.insegnanti 
-                            if i.carico_lavoro in ["Elevato", "Critico"]]
-        if insegnanti_pesanti:
-            nuova_allerta = AllertaScuola(
-                id=self._prossimo_id_allerta,
-                titolo=f"{len(insegnanti_pesanti)} Insegnanti Sovraccarichi",
-                descrizione=f"{len(insegnanti_pesanti)} insegnanti hanno un carico di lavoro critico",
-                priorita="media",
-                tipo="risorse",
-                dati_correlati={"numero_insegnanti": len(insegnanti_pesanti)},
-                data_creazione=datetime.now()
-            )
-            nuove_allerte.append(nuova_allerta)
-            self._prossimo_id_allerta += 1
-        
-        self.allerte.extend(nuove_allerte)
-        return nuove_allerte
+        Le allerte già aperte per la stessa regola e ambito vengono
+        aggiornate, non duplicate; quelle rientrate vengono risolte.
+        
+        Returns:
+            Allerte aperte da questa valutazione
+        """
+        aggregati, dettagli = self.aggregati_allerte()
+        return self.motore_allerte.valuta(aggregati, dettagli)
+    
+    def risolvi_allerta(self, id_allerta: int, note_azione: str = "") -> Optional[AllertaScuola]:
+        """Chiude manualmente un'allerta (la regola rispetta il cooldown prima di riaprirla)."""
+        return self.motore_allerte.risolvi(id_allerta, note_azione)
     
     def _analizza_distribuzione_classi(self) -> Dict[str, Dict]:
         """Analizza distribuzione performance per classe."""
-        distribuzione = {}
-        
-        for studente in self.anagrafica.studenti:
-            classe = studente.classe
-            
-            if classe not in distribuzione:
-                distribuzione[classe] = {
-                    "studenti": [],
-                    "medie": []
-                }
-            
-            try:
-                media = self.voti.media_studente(studente.id)
-                distribuzione[classe]["studenti"].append(studente.id)
-                distribuzione[classe]["medie"].append(media)
-            except:
-                pass
-        
-        # Calcola medie per classe
-        risultato = {}
-        for classe, dati in distribuzione.items():
-            media_classe = sum(dati["medie"]) / len(dati["medie"]) if dati["medie"] else 0
-            risultato[classe] = {
-                "numero_studenti": len(dati["studenti"]),
-                "media": media_classe,
-                "deviazione_standard": self._calcola_deviazione_standard(dati["medie"]),
-                "min": min(dati["medie"]) if dati["medie"] else 0,
-                "max": max(dati["medie"]) if dati["medie"] else 0
-            }
-        
-        return risultato
+        # Un solo passaggio sui voti, poi analisi indipendenti per classe (in parallelo se possibile)
+        fotografie = fotografa_classi(self.anagrafica, self.voti)
+        if self.report_parallelo is not None:
+            analisi = self.report_parallelo.analizza(fotografie)
+        else:
+            analisi = {foto.classe: analizza_classe(foto) for foto in fotografie}
+        
+        return {classe: dati["distribuzione_medie"] for classe, dati in analisi.items()}
     
     def _calcola_deviazione_standard(self, valori: List[float]) -> float:
         """Calcola deviazione standard."""
-        if not valori:
-            return 0.0
-        
-        media = sum(valori) / len(valori)
-        varianza = sum((x - media) ** 2 for x in valori) / len(valori)
-        return math.sqrt(varianza)
+        return Welford(valori).deviazione_standard
     
     def genera_report_ministeriale(self) -> Dict:
         """Genera un report completo ministeriale."""
@@ -435,23 +399,32 @@ class AnaliticaPredittiva:
         return raccomandazioni
     
     def get_trend_rendimento(self, giorni: int = 30) -> TrendPrestazione:
-        """Calcola trend del rendimento negli ultimi giorni."""
-        # Simula dati storici
-        oggi = datetime.now()
-        valori = []
+        """Calcola trend del rendimento negli ultimi giorni.
+        
+        I valori sono le medie giornaliere dei voti effettivamente registrati
+        (dal rollup incrementale); i giorni senza voti sono esclusi.
+        """
+        if self.rollup_voti is None:
+            self.rollup_voti = RollupVoti(self.voti, self.anagrafica)
         
-        for i in range(giorni):
-            # Simula media giornaliera (semplicemente la media attuale con variazione)
-            media_base = self.calcola_media_generale_scuola()
-            variazione = (media_base * 0.05) * (i / giorni)  # Piccola variazione progressiva
-            valori.append(media_base + variazione)
+        oggi = datetime.now()
+        giorni = max(giorni, 1)
+        serie = self.rollup_voti.ultimi_periodi("giorno", giorni, fino_a=oggi.date())
+        punti = [(i, m) for i, m in enumerate(serie["medie"]) if m is not None]
+        valori = [m for _, m in punti]
         
         media = sum(valori) / len(valori) if valori else 0
         tendenza = self._determina_tendenza(valori)
         
-        # Previsione lineare semplice
-        previsione_7 = media + (valori[-1] - valori[0]) / giorni * 7 if len(valori) > 1 else media
-        previsione_30 = media + (valori[-1] - valori[0]) / giorni * 30 if len(valori) > 1 else media
+        # Previsione lineare: retta ai minimi quadrati sulle medie giornaliere
+        pendenza = 0.0
+        if len(punti) > 1:
+            media_x = sum(x for x, _ in punti) / len(punti)
+            varianza_x = sum((x - media_x) ** 2 for x, _ in punti)
+            if varianza_x > 0:
+                pendenza = sum((x - media_x) * (y - media) for x, y in punti) / varianza_x
+        previsione_7 = media + pendenza * (giorni - 1 - media_x + 7) if pendenza else media
+        previsione_30 = media + pendenza * (giorni - 1 - media_x + 30) if pendenza else media
         
         return TrendPrestazione(
             metrica="rendimento",
@@ -483,9 +456,9 @@ class AnaliticaPredittiva:
     
     def get_allerte(self, solo_attive: bool = True) -> List[Dict]:
         """Restituisce tutte le allerte."""
-        allerte = self.allerte if not solo_attive else [a for a in self.allerte if not a.risolta]
+        allerte = self.allerte.attive() if solo_attive else list(self.allerte)
         return [a.to_dict() for a in sorted(allerte, key=lambda x: (
-            {"critica": 0, "alta": 1, "media": 2, "bassa": 3}[x.priorita],
+            ORDINE_PRIORITA[x.priorita],
             -x.data_creazione.timestamp()
         ))]
     
@@ -0,0 +1,517 @@
+"""
+API asincrona (ASGI) per le operazioni di I/O - ManagerSchool
+Sincronizzazione e backup del database, backup remoto, email e PDF
+attendono l'I/O senza occupare un worker: il database ha un proprio
+thread (accessi SQLite serializzati), i file un pool dedicato e l'attesa
+di rete è un'attesa sull'event loop. Anche lo stream SSE dei delta della
+dashboard è servito qui: un iscritto è una coroutine, non un thread.
+Stessi utenti, token e cookie di sessione dell'interfaccia Flask.
+
+    uvicorn asgi:app --port 5001
+"""
+
+import asyncio
+import json
+import os
+import re
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from itsdangerous import BadSignature
+
+from backup_cloud.remote_backup import RemoteBackupManager
+from email_notifications import EmailNotifier
+
+
+class ErroreRichiesta(Exception):
+    """Errore da restituire al client con un codice HTTP."""
+
+    def __init__(self, stato: int, messaggio: str):
+        super().__init__(messaggio)
+        self.stato = stato
+
+
+@dataclass
+class RichiestaAsincrona:
+    """Richiesta HTTP già letta e autenticata."""
+
+    metodo: str
+    percorso: str
+    intestazioni: Dict[str, str]
+    corpo: bytes = b""
+    parametri: Dict[str, str] = field(default_factory=dict)
+    principale: Any = None
+    argomenti: Dict[str, str] = field(default_factory=dict)  # query string
+
+    def json(self) -> Dict:
+        """Corpo JSON (dizionario vuoto se assente)."""
+        if not self.corpo:
+            return {}
+        try:
+            dati = json.loads(self.corpo)
+        except ValueError:
+            raise ErroreRichiesta(400, "JSON non valido")
+        if not isinstance(dati, dict):
+            raise ErroreRichiesta(400, "Atteso un oggetto JSON")
+        return dati
+
+
+@dataclass
+class RispostaStream:
+    """Risposta inviata a pezzi finché il client resta collegato (es. SSE)."""
+
+    parti: AsyncIterator[str]
+    tipo: str = "text/event-stream"
+    intestazioni: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class Rotta:
+    """Una rotta dell'API asincrona."""
+
+    metodo: str
+    schema: "re.Pattern"
+    gestore: Callable[[RichiestaAsincrona], Awaitable[Tuple[int, Any]]]
+    permesso: Optional[str] = None
+    pubblica: bool = False
+
+
+class ApiAsincrona:
+    """Applicazione ASGI con le route di I/O dell'interfaccia ERP."""
+
+    PREFISSO = "/api/async"
+
+    def __init__(self, erp, thread_file: int = 8, latenza_rete_simulata: float = 0.0,
+                 cartella_pdf: str = "pdf_export", cartella_backup_remoti: str = "backup_remoti"):
+        """Inizializza l'API.
+
+        Args:
+            erp: InterfacciaERP di cui condividere dati e utenti
+            thread_file: Thread per le scritture di file (PDF, copie di backup)
+            latenza_rete_simulata: Secondi di attesa di rete per email e backup
+                remoti (i provider di questo progetto sono simulati)
+            cartella_pdf: Directory dei PDF generati
+            cartella_backup_remoti: Destinazione dei backup con provider "local"
+        """
+        self.erp = erp
+        self.latenza_rete_simulata = latenza_rete_simulata
+        self.cartella_pdf = cartella_pdf
+        self.cartella_backup_remoti = cartella_backup_remoti
+
+        # SQLite: una connessione condivisa, quindi un solo thread che la usa
+        self._esecutore_db = ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-db")
+        self._esecutore_file = ThreadPoolExecutor(max_workers=thread_file, thread_name_prefix="async-file")
+
+        self.email = EmailNotifier()
+        self.backup_remoto = RemoteBackupManager()
+        self._esportatore_pdf = None
+
+        self.rotte: List[Rotta] = []
+        self._registra_rotte()
+
+        # Contatori
+        self.richieste = 0
+        self.in_corso = 0
+        self.massimo_in_corso = 0
+        self.errori = 0
+        self.stream_aperti = 0
+
+    # ============ I/O NON BLOCCANTE ============
+
+    async def database(self, funzione: Callable, *args) -> Any:
+        """Esegue un accesso al database nel suo thread senza bloccare il loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._esecutore_db, lambda: funzione(*args))
+
+    async def file(self, funzione: Callable, *args) -> Any:
+        """Esegue una lettura o scrittura di file nel pool dedicato."""
+        return await asyncio.get_running_loop().run_in_executor(self._esecutore_file, lambda: funzione(*args))
+
+    async def rete(self, funzione: Callable, *args) -> Any:
+        """Chiamata a un servizio remoto: l'attesa di rete non occupa thread."""
+        if self.latenza_rete_simulata > 0:
+            await asyncio.sleep(self.latenza_rete_simulata)
+        return await self.file(funzione, *args)
+
+    # ============ ROUTES ============
+
+    def route(self, metodo: str, percorso: str, permesso: Optional[str] = None, pubblica: bool = False):
+        """Decoratore per registrare una route (parametri come <int:nome> o <nome>)."""
+        espressione = re.sub(
+            r"<(int:)?(\w+)>",
+            lambda m: "(?P<%s>%s)" % (m.group(2), r"\d+" if m.group(1) else "[^/]+"),
+            percorso
+        )
+
+        def decoratore(gestore):
+            self.rotte.append(Rotta(metodo, re.compile(f"^{self.PREFISSO}{espressione}$"),
+                                    gestore, permesso, pubblica))
+            return gestore
+        return decoratore
+
+    def _registra_rotte(self):
+        """Registra le route di I/O."""
+
+        @self.route("GET", "/salute", pubblica=True)
+        async def salute(richiesta):
+            """Liveness e contatori dell'API asincrona."""
+            return 200, {"stato": "ok", "pid": os.getpid(), **self.statistiche()}
+
+        @self.route("POST", "/database/sync", permesso="gestione_studenti")
+        async def database_sync(richiesta):
+            """Sincronizza i dati in memoria con il database."""
+            await self.database(self.erp.db_integration.sincronizza_dati_esistenti)
+            return 200, {"successo": True, "messaggio": "Sincronizzazione completata"}
+
+        @self.route("POST", "/database/backup", permesso="gestione_studenti")
+        async def database_backup(richiesta):
+            """Copia del database SQLite."""
+            percorso = await self.database(self.erp.database.backup_database)
+            return 200, {"successo": True, "filepath": percorso}
+
+        @self.route("POST", "/backup/remoto", permesso="gestione_studenti")
+        async def backup_remoto(richiesta):
+            """Backup del database su provider remoto (local, s3, gdrive)."""
+            provider = richiesta.json().get("provider", "local")
+            if provider not in self.backup_remoto.supported_providers:
+                raise ErroreRichiesta(400, f"Provider non supportato: {provider}")
+            sorgente = await self.database(lambda: self.erp.database.db_path)
+            info = await self.rete(self.backup_remoto.create_backup, sorgente,
+                                   self.cartella_backup_remoti, provider)
+            return 200, {"successo": True, "backup": info}
+
+        @self.route("POST", "/email", permesso="gestione_studenti")
+        async def invia_email(richiesta):
+            """Invia un'email (SMTP del notificatore)."""
+            dati = richiesta.json()
+            mancanti = [c for c in ("destinatario", "oggetto", "corpo") if not dati.get(c)]
+            if mancanti:
+                raise ErroreRichiesta(400, f"Campi obbligatori: {', '.join(mancanti)}")
+            inviata = await self.rete(self.email.invia_email, dati["destinatario"], dati["oggetto"], dati["corpo"])
+            return (200 if inviata else 502), {"successo": inviata}
+
+        @self.route("POST", "/pdf/pagella/<int:studente_id>", permesso="visualizza_report_completi")
+        async def pdf_pagella(richiesta):
+            """Scrive il PDF della pagella di uno studente."""
+            studente_id = int(richiesta.parametri["studente_id"])
+            studente = self.erp.anagrafica.trova_studente(studente_id)
+            if studente is None:
+                raise ErroreRichiesta(404, "Studente non trovato")
+            voti = [{"materia": v.materia, "voto": v.voto, "data": v.data, "tipo": v.tipo, "note": v.note}
+                    for v in self.erp.voti.voti_studente(studente_id)]
+            percorso = os.path.join(self.cartella_pdf, f"pagella_{studente_id}.pdf")
+            byte = await self.file(self._scrivi_pdf_pagella, studente.to_dict(), voti, percorso)
+            return 200, {"successo": True, "filepath": percorso, "byte": byte}
+
+        @self.route("GET", "/dashboard/eventi")
+        async def eventi_dashboard(richiesta):
+            """Stream Server-Sent Events dei delta della dashboard."""
+            ultimo = richiesta.intestazioni.get("last-event-id", richiesta.argomenti.get("ultimo"))
+            ultimo = int(ultimo) if ultimo and ultimo.isdigit() else None
+            if self.erp.stato_condiviso is not None:
+                # Porta agli iscritti di questo processo le scritture dei worker WSGI
+                self.erp._avvia_sorveglianza_stato()
+            return 200, RispostaStream(
+                self.erp.canale_dashboard.stream_sse_async(ultimo),
+                intestazioni={"cache-control": "no-cache", "x-accel-buffering": "no"}
+            )
+
+    def _scrivi_pdf_pagella(self, studente: Dict, voti: List[Dict], percorso: str) -> int:
+        """Genera il PDF (nel pool dei file) e ne restituisce la dimensione."""
+        if self._esportatore_pdf is None:
+            from pdf_exporter import PDFExporter
+            self._esportatore_pdf = PDFExporter()
+        os.makedirs(os.path.dirname(percorso) or ".", exist_ok=True)
+        self._esportatore_pdf.esporta_pagella(studente, voti, percorso)
+        return os.path.getsize(percorso)
+
+    # ============ AUTENTICAZIONE ============
+
+    def _principale(self, intestazioni: Dict[str, str]):
+        """Identità da token Bearer o cookie di sessione Flask."""
+        autorizzazione = intestazioni.get("authorization", "")
+        try:
+            if autorizzazione.startswith("Bearer "):
+                username = self.erp._serializzatore_token().loads(
+                    autorizzazione[7:].strip(), max_age=self.erp.DURATA_TOKEN_SECONDI
+                )
+            else:
+                app = self.erp.app
+                nome_cookie = app.config["SESSION_COOKIE_NAME"]
+                cookie = dict(
+                    parte.strip().split("=", 1)
+                    for parte in intestazioni.get("cookie", "").split(";") if "=" in parte
+                ).get(nome_cookie)
+                serializzatore = app.session_interface.get_signing_serializer(app)
+                if not cookie or serializzatore is None:
+                    return None
+                username = serializzatore.loads(
+                    cookie, max_age=int(app.permanent_session_lifetime.total_seconds())
+                ).get("username")
+        except BadSignature:
+            return None
+        return self.erp.accesso.risolvi_principale(username) if username else None
+
+    # ============ ASGI ============
+
+    async def __call__(self, scope, receive, send):
+        """Punto di ingresso ASGI."""
+        if scope["type"] == "lifespan":
+            await self._ciclo_vita(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        self.richieste += 1
+        self.in_corso += 1
+        self.massimo_in_corso = max(self.massimo_in_corso, self.in_corso)
+        try:
+            stato, dati = await self._gestisci(scope, receive)
+        finally:
+            self.in_corso -= 1
+        if stato >= 500:
+            self.errori += 1
+        if isinstance(dati, RispostaStream):
+            await self._invia_stream(stato, dati, receive, send)
+            return
+
+        corpo = json.dumps(dati, default=str).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": stato,
+            "headers": [(b"content-type", b"application/json"),
+                        (b"content-length", str(len(corpo)).encode())]
+        })
+        await send({"type": "http.response.body", "body": corpo})
+
+    async def _ciclo_vita(self, receive, send):
+        """Eventi di avvio e arresto del server ASGI."""
+        while True:
+            messaggio = await receive()
+            if messaggio["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif messaggio["type"] == "lifespan.shutdown":
+                self.chiudi()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _invia_stream(self, stato: int, risposta: RispostaStream, receive, send):
+        """Inoltra le parti dello stream finché il client non si scollega."""
+        await send({
+            "type": "http.response.start",
+            "status": stato,
+            "headers": [(b"content-type", risposta.tipo.encode())]
+                       + [(k.encode(), v.encode()) for k, v in risposta.intestazioni.items()]
+        })
+
+        async def inoltra():
+            async for parte in risposta.parti:
+                await send({"type": "http.response.body", "body": parte.encode("utf-8"), "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def disconnessione():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        compiti = [asyncio.ensure_future(inoltra()), asyncio.ensure_future(disconnessione())]
+        self.stream_aperti += 1
+        try:
+            await asyncio.wait(compiti, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.stream_aperti -= 1
+            # La cancellazione chiude il generatore (e l'iscrizione al canale)
+            for compito in compiti:
+                compito.cancel()
+            await asyncio.gather(*compiti, return_exceptions=True)
+
+    async def _leggi_corpo(self, receive) -> bytes:
+        """Legge il corpo della richiesta (anche in più parti)."""
+        parti = []
+        while True:
+            messaggio = await receive()
+            parti.append(messaggio.get("body", b""))
+            if not messaggio.get("more_body"):
+                return b"".join(parti)
+
+    async def _gestisci(self, scope, receive) -> Tuple[int, Any]:
+        """Instrada la richiesta e traduce gli errori in risposte JSON."""
+        metodo, percorso = scope["method"], scope["path"]
+        candidate = [(r, r.schema.match(percorso)) for r in self.rotte]
+        candidate = [(r, m) for r, m in candidate if m]
+        if not candidate:
+            return 404, {"errore": "Risorsa non trovata"}
+        rotta, corrispondenza = next(((r, m) for r, m in candidate if r.metodo == metodo), (None, None))
+        if rotta is None:
+            return 405, {"errore": "Metodo non consentito"}
+
+        intestazioni = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        richiesta = RichiestaAsincrona(metodo, percorso, intestazioni, await self._leggi_corpo(receive),
+                                       corrispondenza.groupdict(),
+                                       argomenti=dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"))))
+        try:
+            if not rotta.pubblica:
+                richiesta.principale = self._principale(intestazioni)
+                if richiesta.principale is None:
+                    return 401, {"errore": "Token non valido o scaduto"}
+                if rotta.permesso and not richiesta.principale.ha_permesso(rotta.permesso):
+                    return 403, {"errore": "Permesso negato"}
+            if self.erp.stato_condiviso is not None:
+                # Come before_request di Flask: applica le modifiche degli altri worker
+                await self.database(self.erp.stato_condiviso.sincronizza)
+            return await rotta.gestore(richiesta)
+        except ErroreRichiesta as e:
+            return e.stato, {"errore": str(e)}
+        except Exception as e:
+            return 500, {"errore": str(e)}
+
+    def chiudi(self) -> None:
+        """Arresta i thread di I/O."""
+        self._esecutore_db.shutdown(wait=True)
+        self._esecutore_file.shutdown(wait=True)
+
+    def statistiche(self) -> Dict:
+        """Contatori di richieste e concorrenza."""
+        return {
+            "richieste": self.richieste,
+            "in_corso": self.in_corso,
+            "massimo_in_corso": self.massimo_in_corso,
+            "errori": self.errori,
+            "stream_aperti": self.stream_aperti
+        }
+
+
+# ============ CLIENT DI PROVA E BENCHMARK ============
+
+async def chiama_asgi(app, metodo: str, percorso: str, corpo: Optional[Dict] = None,
+                      intestazioni: Optional[Dict[str, str]] = None) -> Tuple[int, Any]:
+    """Esegue una richiesta su un'applicazione ASGI in memoria.
+
+    Returns:
+        (stato HTTP, corpo JSON decodificato)
+    """
+    dati = json.dumps(corpo).encode() if corpo is not None else b""
+    scope = {
+        "type": "http", "method": metodo, "path": percorso,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (intestazioni or {}).items()]
+    }
+    inviato = False
+    risposta: Dict[str, Any] = {}
+
+    async def receive():
+        nonlocal inviato
+        if not inviato:
+            inviato = True
+            return {"type": "http.request", "body": dati, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(messaggio):
+        if messaggio["type"] == "http.response.start":
+            risposta["stato"] = messaggio["status"]
+        else:
+            risposta["corpo"] = messaggio.get("body", b"")
+
+    await app(scope, receive, send)
+    return risposta["stato"], json.loads(risposta["corpo"] or b"null")
+
+
+def benchmark_concorrenza(richieste: int = 200, latenza: float = 0.1, thread_sync: int = 4) -> Dict:
+    """Confronta un worker sincrono a thread con l'API asincrona sotto I/O lento.
+
+    Ogni richiesta invia un'email con `latenza` secondi di attesa di rete
+    simulata. Il worker sincrono (come gthread di gunicorn) serve al più
+    `thread_sync` richieste alla volta; l'API asincrona le tiene tutte in
+    attesa sullo stesso event loop.
+
+    Args:
+        richieste: Richieste contemporanee
+        latenza: Secondi di I/O simulato per richiesta
+        thread_sync: Thread del worker sincrono
+
+    Returns:
+        Tempi totali, richieste al secondo e concorrenza raggiunta
+    """
+    import contextlib
+    import io
+    import tempfile
+    from flask import Flask, jsonify, request as richiesta_flask
+    from interfaccia_erp import InterfacciaERP
+
+    cartella_precedente = os.getcwd()
+    with tempfile.TemporaryDirectory() as cartella, contextlib.redirect_stdout(io.StringIO()):
+        os.chdir(cartella)
+        try:
+            erp = InterfacciaERP()
+            token = erp._serializzatore_token().dumps("admin")
+            corpo = {"destinatario": "famiglia@example.it", "oggetto": "Avviso", "corpo": "Test"}
+
+            # Worker sincrono: la stessa operazione blocca il thread per tutta l'attesa
+            app_sync = Flask(__name__)
+            notificatore = EmailNotifier()
+
+            @app_sync.route("/email", methods=["POST"])
+            def email_sync():
+                time.sleep(latenza)
+                dati = richiesta_flask.get_json()
+                return jsonify({"successo": notificatore.invia_email(dati["destinatario"], dati["oggetto"], dati["corpo"])})
+
+            def una_sync(_):
+                inizio = time.perf_counter()
+                app_sync.test_client().post("/email", json=corpo)
+                return time.perf_counter() - inizio
+
+            inizio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=thread_sync) as pool:
+                latenze_sync = list(pool.map(una_sync, range(richieste)))
+            totale_sync = time.perf_counter() - inizio
+
+            # API asincrona: un solo thread per l'event loop
+            api = ApiAsincrona(erp, latenza_rete_simulata=latenza)
+
+            async def tutte():
+                async def una():
+                    inizio = time.perf_counter()
+                    await chiama_asgi(api, "POST", "/api/async/email", corpo, {"Authorization": f"Bearer {token}"})
+                    return time.perf_counter() - inizio
+                return await asyncio.gather(*(una() for _ in range(richieste)))
+
+            inizio = time.perf_counter()
+            latenze_async = asyncio.run(tutte())
+            totale_async = time.perf_counter() - inizio
+            api.chiudi()
+        finally:
+            os.chdir(cartella_precedente)
+
+    return {
+        "richieste": richieste,
+        "latenza_io_ms": latenza * 1000,
+        "sync": {
+            "thread": thread_sync,
+            "totale_s": round(totale_sync, 3),
+            "richieste_al_secondo": round(richieste / totale_sync, 1),
+            "p50_ms": round(statistics.median(latenze_sync) * 1000, 1),
+            "concorrenza_massima": thread_sync
+        },
+        "async": {
+            "totale_s": round(totale_async, 3),
+            "richieste_al_secondo": round(richieste / totale_async, 1),
+            "p50_ms": round(statistics.median(latenze_async) * 1000, 1),
+            "concorrenza_massima": api.massimo_in_corso
+        },
+        "capacita_x": round(totale_sync / totale_async, 1)
+    }
+
+
+if __name__ == "__main__":
+    print("⚡ TEST API ASINCRONA")
+    print("=" * 60 + "\n")
+
+    risultato = benchmark_concorrenza()
+    print(f"   {risultato['richieste']} richieste contemporanee, I/O simulato {risultato['latenza_io_ms']:.0f} ms")
+    for modalita in ("sync", "async"):
+        dati = risultato[modalita]
+        print(f"   {modalita:<6} {dati['totale_s']:>7.2f} s  {dati['richieste_al_secondo']:>8.1f} req/s  "
+              f"p50 {dati['p50_ms']:>8.1f} ms  concorrenza {dati['concorrenza_massima']}")
+    print(f"\n   Capacità per processo: {risultato['capacita_x']}x")
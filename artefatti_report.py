@@ -0,0 +1,455 @@
+"""
+Artefatti dei report - ManagerSchool
+Materializza su disco i report costosi (annuale, ministeriale, interventi
+prioritari e i relativi PDF), versionati insieme alla versione dei dati da
+cui derivano, e li restituisce senza ricalcolo. Un report non viene
+rigenerato se i dati non sono cambiati e non produce una nuova versione se
+il contenuto è identico; ogni nuova versione registra le differenze rispetto
+alla precedente.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field, is_dataclass
+from datetime import date, datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from scheduler_attivita import LockFile
+
+
+# Campi che cambiano a ogni generazione senza che cambino i dati
+CAMPI_VOLATILI = ("data_generazione",)
+
+
+class MaterializzazioneFallita(RuntimeError):
+    """Il report non ha versioni salvate e l'ultimo tentativo di generarlo è fallito."""
+
+
+@dataclass
+class SpecificaReport:
+    """Report materializzabile e come generarlo."""
+    nome: str
+    genera: Callable[[], Dict]
+    descrizione: str = ""
+    campi_volatili: Tuple[str, ...] = CAMPI_VOLATILI
+    esporta_pdf: Optional[Callable[[Dict, str], None]] = None
+
+
+@dataclass
+class VersioneArtefatto:
+    """Metadati di una versione salvata di un report."""
+    versione: int
+    versione_dati: str
+    impronta: str
+    generato_il: str
+    durata_ms: float
+    pdf: bool = False
+    numero_differenze: int = 0
+    differenze: List[Dict] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def in_json(valore: Any) -> Any:
+    """Converte un report (dataclass, enum, date, set) in tipi JSON puri."""
+    if is_dataclass(valore) and not isinstance(valore, type):
+        return in_json(asdict(valore))
+    if isinstance(valore, dict):
+        return {str(k): in_json(v) for k, v in valore.items()}
+    if isinstance(valore, (list, tuple, set, frozenset)):
+        return [in_json(v) for v in valore]
+    if isinstance(valore, Enum):
+        return valore.value
+    if isinstance(valore, (datetime, date)):
+        return valore.isoformat()
+    return valore
+
+
+def impronta(report: Dict, campi_volatili: Sequence[str] = CAMPI_VOLATILI) -> str:
+    """SHA-256 del contenuto canonico del report, esclusi i campi volatili."""
+    stabile = {k: v for k, v in report.items() if k not in campi_volatili}
+    testo = json.dumps(stabile, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(testo.encode("utf-8")).hexdigest()
+
+
+def confronta(prima: Any, dopo: Any, campi_volatili: Sequence[str] = CAMPI_VOLATILI,
+              limite: int = 200) -> Tuple[List[Dict], int]:
+    """Differenze strutturali tra due report.
+
+    Args:
+        prima: Report precedente
+        dopo: Report nuovo
+        campi_volatili: Chiavi di primo livello da ignorare
+        limite: Numero massimo di differenze restituite
+
+    Returns:
+        (differenze, numero totale) con differenze {"percorso", "prima", "dopo"};
+        un campo assente da un lato vale None
+    """
+    differenze: List[Dict] = []
+    totale = 0
+    da_visitare = [("", prima, dopo)]
+    while da_visitare:
+        percorso, a, b = da_visitare.pop()
+        if isinstance(a, dict) and isinstance(b, dict):
+            chiavi = list(a) + [k for k in b if k not in a]
+            for chiave in reversed(chiavi):
+                if percorso == "" and chiave in campi_volatili:
+                    continue
+                da_visitare.append((f"{percorso}.{chiave}" if percorso else str(chiave), a.get(chiave), b.get(chiave)))
+        elif isinstance(a, list) and isinstance(b, list):
+            for indice in reversed(range(max(len(a), len(b)))):
+                da_visitare.append((f"{percorso}[{indice}]", a[indice] if indice < len(a) else None,
+                                    b[indice] if indice < len(b) else None))
+        elif a != b:
+            totale += 1
+            if len(differenze) < limite:
+                differenze.append({"percorso": percorso, "prima": a, "dopo": b})
+    return differenze, totale
+
+
+class ArtefattiReport:
+    """Archivio versionato dei report precomputati.
+
+    Struttura su disco: <directory>/<report>/indice.json con i metadati delle
+    versioni e l'ultima versione dei dati verificata, v000001.json (e .pdf)
+    per ogni versione. Le scritture sono atomiche e protette da un lock su
+    file, quindi più worker possono condividere la directory.
+    """
+
+    def __init__(self, directory: str = "report_artefatti",
+                 versione_dati: Optional[Callable[[], Any]] = None,
+                 conserva: int = 30, limite_differenze: int = 200):
+        """Inizializza l'archivio.
+
+        Args:
+            directory: Directory degli artefatti
+            versione_dati: Funzione che restituisce la versione corrente dei dati
+                (None: ogni materializzazione rigenera e confronta il contenuto)
+            conserva: Versioni conservate per report
+            limite_differenze: Differenze salvate per versione
+        """
+        self.directory = Path(directory)
+        self.versione_dati = versione_dati
+        self.conserva = max(1, conserva)
+        self.limite_differenze = limite_differenze
+        self.specifiche: Dict[str, SpecificaReport] = {}
+        self._lock = threading.Lock()
+        self._lock_report: Dict[str, threading.Lock] = {}
+        self._contenuti: Dict[Tuple[str, int], Dict] = {}
+        self.contatori = {"generazioni": 0, "saltate": 0, "nuove_versioni": 0, "letture": 0}
+        # Causa dell'ultima materializzazione fallita per report (in questo processo)
+        self.ultimi_errori: Dict[str, str] = {}
+
+    def registra(self, nome: str, genera: Callable[[], Dict], descrizione: str = "",
+                 campi_volatili: Sequence[str] = CAMPI_VOLATILI,
+                 esporta_pdf: Optional[Callable[[Dict, str], None]] = None) -> SpecificaReport:
+        """Registra un report da materializzare.
+
+        Args:
+            nome: Nome del report (anche nome della sottodirectory)
+            genera: Funzione senza argomenti che calcola il report
+            descrizione: Descrizione leggibile
+            campi_volatili: Chiavi ignorate nel confronto (es. data di generazione)
+            esporta_pdf: Funzione (report, percorso) che scrive il PDF, opzionale
+
+        Returns:
+            SpecificaReport registrata
+        """
+        if not nome or nome.startswith((".", "_")) or os.sep in nome or "/" in nome:
+            raise ValueError(f"Nome report non valido: '{nome}'")
+        specifica = SpecificaReport(nome, genera, descrizione, tuple(campi_volatili), esporta_pdf)
+        self.specifiche[nome] = specifica
+        self._lock_report.setdefault(nome, threading.Lock())
+        return specifica
+
+    # ============ MATERIALIZZAZIONE ============
+
+    def _versione_dati_corrente(self) -> Optional[str]:
+        return None if self.versione_dati is None else str(self.versione_dati())
+
+    @staticmethod
+    def _aggiornato(indice: Dict, versione_dati: Optional[str]) -> bool:
+        """True se l'ultima versione salvata riflette i dati correnti."""
+        return bool(indice["versioni"]) and (versione_dati is None or indice["versione_dati"] == versione_dati)
+
+    def materializza(self, nomi: Optional[Sequence[str]] = None, forza: bool = False) -> Dict[str, Dict]:
+        """Precalcola i report (tutti o quelli indicati).
+
+        Args:
+            nomi: Report da materializzare (default tutti)
+            forza: Se True rigenera anche se la versione dei dati è invariata
+
+        Returns:
+            Esito per report: {"esito": "invariato" | "confermato" | "nuova_versione" | "errore", ...}
+        """
+        esiti = {}
+        for specifica in [self._specifica(nome) for nome in (nomi or list(self.specifiche))]:
+            nome = specifica.nome
+            try:
+                esiti[nome] = self._materializza(specifica, forza)
+                self.ultimi_errori.pop(nome, None)
+            except Exception as e:
+                print(f"⚠️  Materializzazione report '{nome}' fallita: {e}")
+                esiti[nome] = {"esito": "errore", "errore": str(e)}
+                self.ultimi_errori[nome] = str(e)
+        return esiti
+
+    def _materializza(self, specifica: SpecificaReport, forza: bool) -> Dict:
+        with self._lock_report[specifica.nome]:
+            cartella = self.directory / specifica.nome
+            cartella.mkdir(parents=True, exist_ok=True)
+            with LockFile(str(cartella / ".lock")):
+                indice = self._leggi_indice(specifica.nome)
+                versione_dati = self._versione_dati_corrente()
+                ultima = indice["versioni"][-1] if indice["versioni"] else None
+
+                # Dati invariati: il report salvato è ancora valido, nessun ricalcolo
+                if (not forza and ultima is not None and versione_dati is not None
+                        and indice["versione_dati"] == versione_dati):
+                    self.contatori["saltate"] += 1
+                    return {"esito": "invariato", "versione": ultima["versione"]}
+
+                inizio = time.perf_counter()
+                report = in_json(specifica.genera())
+                durata_ms = (time.perf_counter() - inizio) * 1000
+                self.contatori["generazioni"] += 1
+                firma = impronta(report, specifica.campi_volatili)
+                versione_dati = versione_dati if versione_dati is not None else firma
+
+                # Dati cambiati ma contenuto identico: si aggiorna solo la versione dei dati
+                if ultima is not None and ultima["impronta"] == firma:
+                    indice["versione_dati"] = versione_dati
+                    indice["verificato_il"] = datetime.now().isoformat()
+                    self._scrivi_json(cartella / "indice.json", indice)
+                    return {"esito": "confermato", "versione": ultima["versione"],
+                            "durata_ms": round(durata_ms, 2)}
+
+                numero = ultima["versione"] + 1 if ultima is not None else 1
+                differenze, totale = [], 0
+                if ultima is not None:
+                    precedente = self._contenuto(specifica.nome, ultima["versione"])
+                    if precedente is not None:
+                        differenze, totale = confronta(precedente, report, specifica.campi_volatili,
+                                                       self.limite_differenze)
+
+                self._scrivi_json(cartella / f"v{numero:06d}.json", report)
+                pdf = False
+                if specifica.esporta_pdf is not None:
+                    pdf = self._esporta_pdf(specifica, report, cartella / f"v{numero:06d}.pdf")
+
+                nuova = VersioneArtefatto(
+                    versione=numero, versione_dati=versione_dati, impronta=firma,
+                    generato_il=datetime.now().isoformat(), durata_ms=round(durata_ms, 2),
+                    pdf=pdf, numero_differenze=totale, differenze=differenze
+                )
+                indice["versioni"].append(nuova.to_dict())
+                indice["versione_dati"] = versione_dati
+                indice["verificato_il"] = nuova.generato_il
+                for vecchia in indice["versioni"][:-self.conserva]:
+                    self._elimina_versione(specifica.nome, vecchia["versione"])
+                indice["versioni"] = indice["versioni"][-self.conserva:]
+                self._scrivi_json(cartella / "indice.json", indice)
+
+                self._contenuti[(specifica.nome, numero)] = report
+                self.contatori["nuove_versioni"] += 1
+                return {"esito": "nuova_versione", "versione": numero, "differenze": totale,
+                        "durata_ms": nuova.durata_ms}
+
+    def _esporta_pdf(self, specifica: SpecificaReport, report: Dict, percorso: Path) -> bool:
+        temporaneo = percorso.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            specifica.esporta_pdf(report, str(temporaneo))
+            os.replace(temporaneo, percorso)
+            return True
+        except ImportError as e:
+            print(f"⚠️  PDF del report '{specifica.nome}' non disponibile: {e}")
+        except Exception as e:
+            print(f"⚠️  Esportazione PDF del report '{specifica.nome}' fallita: {e}")
+        if temporaneo.exists():
+            temporaneo.unlink()
+        return False
+
+    def _elimina_versione(self, nome: str, versione: int) -> None:
+        self._contenuti.pop((nome, versione), None)
+        for estensione in ("json", "pdf"):
+            percorso = self.directory / nome / f"v{versione:06d}.{estensione}"
+            if percorso.exists():
+                percorso.unlink()
+
+    # ============ LETTURA ============
+
+    def ottieni(self, nome: str, versione: Optional[int] = None, aggiorna: bool = True) -> Dict:
+        """Report materializzato con i suoi metadati.
+
+        Args:
+            nome: Nome del report
+            versione: Versione storica (default l'ultima)
+            aggiorna: Se True e i dati sono cambiati rigenera prima di rispondere
+                (un solo ricalcolo anche con richieste concorrenti)
+
+        Returns:
+            {"report": ..., "metadati": ...}
+
+        Raises:
+            KeyError: Se il report o la versione non esistono
+            MaterializzazioneFallita: Se non c'è alcuna versione e la generazione è fallita
+        """
+        self._specifica(nome)
+        indice = self._leggi_indice(nome)
+        if versione is None:
+            if aggiorna and not self._aggiornato(indice, self._versione_dati_corrente()):
+                # Se il ricalcolo fallisce resta disponibile l'ultima versione salvata
+                self.materializza([nome])
+                indice = self._leggi_indice(nome)
+            if not indice["versioni"]:
+                if nome in self.ultimi_errori:
+                    raise MaterializzazioneFallita(
+                        f"Generazione del report '{nome}' fallita: {self.ultimi_errori[nome]}")
+                raise KeyError(f"Report '{nome}' non ancora materializzato")
+            metadati = indice["versioni"][-1]
+        else:
+            metadati = next((v for v in indice["versioni"] if v["versione"] == versione), None)
+            if metadati is None:
+                raise KeyError(f"Versione {versione} del report '{nome}' non trovata")
+
+        report = self._contenuto(nome, metadati["versione"])
+        if report is None:
+            raise KeyError(f"Versione {metadati['versione']} del report '{nome}' non trovata")
+        self.contatori["letture"] += 1
+        return {
+            "report": report,
+            "metadati": {
+                "nome": nome,
+                "aggiornato": (metadati is indice["versioni"][-1]
+                               and self._aggiornato(indice, self._versione_dati_corrente())),
+                "verificato_il": indice.get("verificato_il"),
+                **{k: v for k, v in metadati.items() if k != "differenze"}
+            }
+        }
+
+    def versioni(self, nome: str) -> List[Dict]:
+        """Metadati delle versioni salvate, dalla più recente."""
+        self._specifica(nome)
+        return [{k: v for k, v in m.items() if k != "differenze"}
+                for m in reversed(self._leggi_indice(nome)["versioni"])]
+
+    def differenze(self, nome: str, da: Optional[int] = None, a: Optional[int] = None) -> Dict:
+        """Differenze tra due versioni (default: l'ultima rispetto alla precedente).
+
+        Raises:
+            KeyError: Se il report o le versioni non esistono
+        """
+        specifica = self._specifica(nome)
+        versioni = [v["versione"] for v in self._leggi_indice(nome)["versioni"]]
+        if not versioni:
+            raise KeyError(f"Report '{nome}' non ancora materializzato")
+        a = versioni[-1] if a is None else a
+        if da is None:
+            precedenti = [v for v in versioni if v < a]
+            da = precedenti[-1] if precedenti else a
+        prima, dopo = self._contenuto(nome, da), self._contenuto(nome, a)
+        if prima is None or dopo is None:
+            raise KeyError(f"Versioni {da}-{a} del report '{nome}' non trovate")
+        differenze, totale = confronta(prima, dopo, specifica.campi_volatili, self.limite_differenze)
+        return {"nome": nome, "da": da, "a": a, "numero_differenze": totale, "differenze": differenze}
+
+    def percorso_pdf(self, nome: str, versione: Optional[int] = None) -> Optional[str]:
+        """Percorso del PDF di una versione (default l'ultima), None se assente."""
+        self._specifica(nome)
+        versioni = self._leggi_indice(nome)["versioni"]
+        metadati = versioni[-1] if versione is None and versioni else next(
+            (v for v in versioni if v["versione"] == versione), None)
+        if metadati is None or not metadati.get("pdf"):
+            return None
+        percorso = self.directory / nome / f"v{metadati['versione']:06d}.pdf"
+        return str(percorso) if percorso.exists() else None
+
+    def stato(self) -> Dict:
+        """Ultima versione e freschezza di ogni report registrato."""
+        versione_dati = self._versione_dati_corrente()
+        report = {}
+        for nome, specifica in self.specifiche.items():
+            indice = self._leggi_indice(nome)
+            ultima = indice["versioni"][-1] if indice["versioni"] else None
+            report[nome] = {
+                "descrizione": specifica.descrizione,
+                "versione": ultima["versione"] if ultima else None,
+                "generato_il": ultima["generato_il"] if ultima else None,
+                "verificato_il": indice.get("verificato_il"),
+                "aggiornato": self._aggiornato(indice, versione_dati),
+                "pdf": bool(ultima and ultima["pdf"]),
+                "versioni_salvate": len(indice["versioni"]),
+                "errore": self.ultimi_errori.get(nome)
+            }
+        return {"report": report, "contatori": dict(self.contatori)}
+
+    # ============ FILE ============
+
+    def _specifica(self, nome: str) -> SpecificaReport:
+        if nome not in self.specifiche:
+            raise KeyError(f"Report '{nome}' non registrato")
+        return self.specifiche[nome]
+
+    def _leggi_indice(self, nome: str) -> Dict:
+        percorso = self.directory / nome / "indice.json"
+        try:
+            with open(percorso, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+        except (OSError, ValueError):
+            indice = {}
+        indice.setdefault("versioni", [])
+        indice.setdefault("versione_dati", None)
+        return indice
+
+    def _contenuto(self, nome: str, versione: int) -> Optional[Dict]:
+        """Contenuto di una versione (i file sono immutabili: cache in memoria)."""
+        chiave = (nome, versione)
+        if chiave not in self._contenuti:
+            try:
+                with open(self.directory / nome / f"v{versione:06d}.json", 'r', encoding='utf-8') as f:
+                    contenuto = json.load(f)
+            except (OSError, ValueError):
+                return None
+            with self._lock:
+                self._contenuti[chiave] = contenuto
+        return self._contenuti[chiave]
+
+    @staticmethod
+    def _scrivi_json(percorso: Path, dati: Dict) -> None:
+        """Scrive un file JSON in modo atomico."""
+        temporaneo = percorso.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporaneo, 'w', encoding='utf-8') as f:
+            json.dump(dati, f, indent=2, ensure_ascii=False)
+        os.replace(temporaneo, percorso)
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("🗂️  TEST ARTEFATTI REPORT")
+    print("=" * 60 + "\n")
+
+    dati = {"studenti": 120, "media": 6.8}
+    modifiche = [0]
+
+    with tempfile.TemporaryDirectory() as cartella:
+        archivio = ArtefattiReport(cartella, versione_dati=lambda: modifiche[0])
+        archivio.registra("riepilogo", lambda: {**dati, "data_generazione": datetime.now().isoformat()},
+                          descrizione="Riepilogo di prova")
+
+        print(f"   Prima esecuzione: {archivio.materializza()['riepilogo']}")
+        print(f"   Dati invariati:   {archivio.materializza()['riepilogo']}")
+        modifiche[0] += 1
+        print(f"   Stesso contenuto: {archivio.materializza()['riepilogo']}")
+        dati["media"] = 7.1
+        modifiche[0] += 1
+        print(f"   Contenuto nuovo:  {archivio.materializza()['riepilogo']}")
+        print(f"   Differenze:       {archivio.differenze('riepilogo')['differenze']}")
+        print(f"   Lettura:          {archivio.ottieni('riepilogo')['metadati']['versione']}")
@@ -0,0 +1,32 @@
+"""
+Entry point ASGI per le route di I/O (`/api/async/...`).
+
+Stessa costruzione dei worker WSGI (store condiviso, utenti, chiave di
+sessione): un processo uvicorn tiene centinaia di richieste in attesa di
+I/O, mentre le pagine e il resto dell'API restano su gunicorn.
+
+Esempi:
+    uvicorn asgi:app --port 5001
+    uvicorn asgi:app --port 5001 --workers 2
+"""
+
+import os
+
+from api_asincrona import ApiAsincrona
+from wsgi import crea_app
+
+
+THREAD_FILE = int(os.environ.get("MANAGERSCHOOL_ASYNC_THREAD_FILE", "8"))
+
+_api = None
+
+
+def __getattr__(nome):
+    """Crea l'app alla prima richiesta di `asgi:app` (import senza effetti collaterali)."""
+    global _api
+    if nome == "app":
+        if _api is None:
+            # Lo scheduler gira già nei worker WSGI
+            _api = ApiAsincrona(crea_app(avvia_scheduler=False), thread_file=THREAD_FILE)
+        return _api
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
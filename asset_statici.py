@@ -0,0 +1,283 @@
+"""
+File statici con impronta del contenuto - ManagerSchool
+Senza passaggi di build: all'avvio (al primo uso) i file di static/
+ricevono un nome con l'hash del contenuto (js/app.js -> js/app.1a2b3c4d5e.js),
+url_for('static', ...) nei template restituisce il nome con impronta e
+questi file sono serviti con cache immutabile e varianti gzip/brotli
+precompresse.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from flask import Response, current_app, request
+
+from formati_risposta import TIPI_COMPRIMIBILI, BROTLI_AVAILABLE, brotli
+
+
+# Un anno: il contenuto di un nome con impronta non cambia mai
+MAX_AGE_IMMUTABILE = 365 * 24 * 3600
+
+
+@dataclass
+class VoceAsset:
+    """Un file statico con la sua impronta e le varianti compresse."""
+
+    originale: str
+    impronta: str
+    nome: str
+    mtime: float
+    dimensione: int
+    mimetype: str
+    varianti: Dict[str, bytes] = field(default_factory=dict, repr=False)
+
+
+class ManifestoAsset:
+    """Manifesto nome originale -> nome con impronta e serving dei file statici."""
+
+    def __init__(self, app=None, lunghezza_hash: int = 10, ricarica: Optional[bool] = None):
+        """Inizializza il manifesto.
+
+        Args:
+            app: Applicazione Flask (opzionale, vedi init_app)
+            lunghezza_hash: Caratteri esadecimali dell'impronta
+            ricarica: Ricalcola l'impronta dei file modificati (default: app.debug)
+        """
+        self.lunghezza_hash = lunghezza_hash
+        self.ricarica = ricarica
+        self.cartella: Optional[str] = None
+        self._per_originale: Dict[str, VoceAsset] = {}
+        self._per_nome: Dict[str, VoceAsset] = {}
+        self._scansionato = False
+        self._lock = threading.Lock()
+        self._schema = re.compile(r"^(.+)\.([0-9a-f]{%d})(\.[^./]+)$" % lunghezza_hash)
+
+        # Contatori
+        self.servite_immutabili = 0
+        self.non_modificate = 0
+        self.byte_risparmiati = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Collega il manifesto all'endpoint static dell'applicazione."""
+        self.cartella = app.static_folder
+        if self.ricarica is None:
+            self.ricarica = app.debug
+        app.url_defaults(self._inietta_impronta)
+        app.view_functions["static"] = self._servi
+
+    # ============ MANIFESTO ============
+
+    def _crea_voce(self, originale: str) -> Optional[VoceAsset]:
+        """Calcola l'impronta di un file della cartella static."""
+        percorso = os.path.join(self.cartella, *originale.split("/"))
+        try:
+            stat = os.stat(percorso)
+            with open(percorso, "rb") as f:
+                impronta = hashlib.sha256(f.read()).hexdigest()[:self.lunghezza_hash]
+        except OSError:
+            return None
+        radice, estensione = os.path.splitext(originale)
+        return VoceAsset(
+            originale=originale,
+            impronta=impronta,
+            nome=f"{radice}.{impronta}{estensione}",
+            mtime=stat.st_mtime,
+            dimensione=stat.st_size,
+            mimetype=mimetypes.guess_type(originale)[0] or "application/octet-stream"
+        )
+
+    def _registra(self, voce: VoceAsset) -> None:
+        """Aggiunge (o sostituisce) una voce negli indici."""
+        precedente = self._per_originale.get(voce.originale)
+        if precedente is not None:
+            self._per_nome.pop(precedente.nome, None)
+        self._per_originale[voce.originale] = voce
+        self._per_nome[voce.nome] = voce
+
+    def scansiona(self) -> int:
+        """Calcola l'impronta di tutti i file della cartella static.
+
+        Returns:
+            Numero di file nel manifesto
+        """
+        with self._lock:
+            self._per_originale.clear()
+            self._per_nome.clear()
+            if self.cartella and os.path.isdir(self.cartella):
+                for radice, _, file in os.walk(self.cartella):
+                    for nome in file:
+                        relativo = os.path.relpath(os.path.join(radice, nome), self.cartella)
+                        voce = self._crea_voce(relativo.replace(os.sep, "/"))
+                        if voce is not None:
+                            self._registra(voce)
+            self._scansionato = True
+            return len(self._per_originale)
+
+    def _voce(self, originale: str) -> Optional[VoceAsset]:
+        """Voce aggiornata di un file (scansione pigra, ricarica in debug)."""
+        if not self._scansionato:
+            self.scansiona()
+        voce = self._per_originale.get(originale)
+        if voce is not None and self.ricarica:
+            try:
+                modificato = os.stat(os.path.join(self.cartella, *originale.split("/"))).st_mtime != voce.mtime
+            except OSError:
+                modificato = True
+            if modificato:
+                nuova = self._crea_voce(originale)
+                with self._lock:
+                    if nuova is None:
+                        self._per_originale.pop(originale, None)
+                        self._per_nome.pop(voce.nome, None)
+                    else:
+                        self._registra(nuova)
+                voce = nuova
+        return voce
+
+    def url(self, originale: str) -> str:
+        """Nome con impronta di un file statico (invariato se sconosciuto)."""
+        voce = self._voce(originale)
+        return voce.nome if voce is not None else originale
+
+    def manifesto(self) -> Dict[str, str]:
+        """Mappa nome originale -> nome con impronta."""
+        if not self._scansionato:
+            self.scansiona()
+        return {originale: voce.nome for originale, voce in sorted(self._per_originale.items())}
+
+    def _inietta_impronta(self, endpoint: str, valori: Dict) -> None:
+        """url_defaults: url_for('static', filename=...) produce il nome con impronta."""
+        if endpoint == "static" and "filename" in valori:
+            valori["filename"] = self.url(valori["filename"])
+
+    # ============ SERVING ============
+
+    def _variante(self, voce: VoceAsset, codifica: Optional[str]) -> bytes:
+        """Corpo del file, compresso una sola volta per codifica alla massima qualità."""
+        chiave = codifica or "identita"
+        if chiave not in voce.varianti:
+            with open(os.path.join(self.cartella, *voce.originale.split("/")), "rb") as f:
+                corpo = f.read()
+            if codifica == "br":
+                corpo = brotli.compress(corpo, quality=11)
+            elif codifica == "gzip":
+                corpo = gzip.compress(corpo, compresslevel=9, mtime=0)
+            voce.varianti[chiave] = corpo
+        return voce.varianti[chiave]
+
+    def _codifica(self, voce: VoceAsset) -> Optional[str]:
+        """Codifica da usare per il client (None se il tipo non si comprime)."""
+        if not voce.mimetype.startswith(TIPI_COMPRIMIBILI):
+            return None
+        candidati = ["br", "gzip"] if BROTLI_AVAILABLE else ["gzip"]
+        scelta = request.accept_encodings.best_match(candidati)
+        if scelta is None or request.accept_encodings[scelta] <= 0:
+            return None
+        # La variante compressa si usa solo se è davvero più piccola
+        if len(self._variante(voce, scelta)) >= voce.dimensione:
+            return None
+        return scelta
+
+    def _servi(self, filename: str) -> Response:
+        """Endpoint static: nomi con impronta immutabili, gli altri con revalidazione."""
+        if not self._scansionato:
+            self.scansiona()
+        voce = self._per_nome.get(filename)
+        if voce is None or (self.ricarica and self._voce(voce.originale) is not voce):
+            return self._servi_senza_impronta(filename)
+
+        etag = f'"{voce.impronta}"'
+        intestazioni = {
+            "Cache-Control": f"public, max-age={MAX_AGE_IMMUTABILE}, immutable",
+            "ETag": etag,
+            "Vary": "Accept-Encoding"
+        }
+        if etag in request.headers.get("If-None-Match", ""):
+            self.non_modificate += 1
+            return Response(status=304, headers=intestazioni)
+
+        codifica = self._codifica(voce)
+        corpo = self._variante(voce, codifica)
+        risposta = Response(corpo, mimetype=voce.mimetype, headers=intestazioni)
+        if codifica:
+            risposta.headers["Content-Encoding"] = codifica
+            self.byte_risparmiati += voce.dimensione - len(corpo)
+        self.servite_immutabili += 1
+        return risposta
+
+    def _servi_senza_impronta(self, filename: str) -> Response:
+        """File richiesto col nome originale o con un'impronta non più valida."""
+        # Pagina in cache con un'impronta precedente (es. durante un deploy)
+        corrispondenza = self._schema.match(filename)
+        if corrispondenza and corrispondenza.group(1) + corrispondenza.group(3) in self._per_originale:
+            filename = corrispondenza.group(1) + corrispondenza.group(3)
+
+        risposta = current_app.send_static_file(filename)
+        risposta.headers["Cache-Control"] = "no-cache"
+        return risposta
+
+    def statistiche(self) -> Dict:
+        """Contatori di serving e dimensione del manifesto."""
+        return {
+            "file": len(self._per_originale),
+            "servite_immutabili": self.servite_immutabili,
+            "non_modificate": self.non_modificate,
+            "byte_risparmiati": self.byte_risparmiati,
+            "ricarica": bool(self.ricarica)
+        }
+
+
+def richieste_ripetute(app, pagina: str, cookie_client=None) -> Tuple[int, int]:
+    """Conta le richieste di una pagina e dei suoi asset alla prima e alla seconda visita.
+
+    Un asset con Cache-Control immutable e max-age non scaduto non viene
+    richiesto di nuovo dal browser; quelli senza devono essere rivalidati.
+
+    Args:
+        app: Applicazione Flask
+        pagina: URL della pagina HTML
+        cookie_client: Client di test già autenticato (opzionale)
+
+    Returns:
+        (richieste prima visita, richieste visita successiva)
+    """
+    client = cookie_client or app.test_client()
+    html = client.get(pagina).get_data(as_text=True)
+    asset = sorted(set(re.findall(r'(?:src|href)="(/static/[^"]+)"', html)))
+
+    ripetute = 1  # la pagina stessa
+    for url in asset:
+        cache = client.get(url).headers.get("Cache-Control", "")
+        if "immutable" not in cache:
+            ripetute += 1
+    return 1 + len(asset), ripetute
+
+
+if __name__ == "__main__":
+    from flask import Flask
+
+    print("🗂️  TEST ASSET STATICI")
+    print("=" * 60 + "\n")
+
+    app = Flask(__name__)
+    manifesto = ManifestoAsset(app)
+    print(f"   File nel manifesto: {manifesto.scansiona()}")
+    for originale, nome in manifesto.manifesto().items():
+        print(f"   - {originale:<28} -> {nome}")
+
+    client = app.test_client()
+    nome = next(iter(manifesto.manifesto().values()), None)
+    if nome:
+        risposta = client.get(f"/static/{nome}", headers={"Accept-Encoding": "br, gzip"})
+        print(f"\n   {nome}: {risposta.headers['Cache-Control']} "
+              f"({risposta.headers.get('Content-Encoding', 'identity')}, {len(risposta.data)} byte)")
+        print(f"   Statistiche: {manifesto.statistiche()}")
@@ -0,0 +1,173 @@
+"""
+Avvio misurato e sottosistemi pigri - ManagerSchool
+Registra la durata di ogni fase di avvio dell'interfaccia e rimanda la
+costruzione dei sottosistemi non essenziali (database, backup, report...)
+al loro primo utilizzo.
+"""
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class FaseAvvio:
+    """Una fase dell'avvio con tempi in millisecondi."""
+
+    nome: str
+    inizio_ms: float
+    durata_ms: float
+    pigro: bool = False
+    errore: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        """Converte la fase in dizionario."""
+        return asdict(self)
+
+
+class CronologiaAvvio:
+    """Cronologia delle fasi di avvio e stato di prontezza."""
+
+    def __init__(self):
+        """Inizializza la cronologia; l'istante zero è la creazione."""
+        self._inizio = time.perf_counter()
+        self._lock = threading.Lock()
+        self.fasi: List[FaseAvvio] = []
+        self.pronto_ms: Optional[float] = None
+
+    def _ms_da_inizio(self) -> float:
+        """Millisecondi trascorsi dalla creazione della cronologia."""
+        return (time.perf_counter() - self._inizio) * 1000
+
+    @contextmanager
+    def fase(self, nome: str, pigro: bool = False):
+        """Misura un blocco di codice come fase di avvio.
+
+        Args:
+            nome: Nome della fase o del sottosistema
+            pigro: True se il sottosistema è costruito al primo uso
+        """
+        inizio = self._ms_da_inizio()
+        errore = None
+        try:
+            yield
+        except Exception as e:
+            errore = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            fase = FaseAvvio(nome, round(inizio, 3), round(self._ms_da_inizio() - inizio, 3), pigro, errore)
+            with self._lock:
+                self.fasi.append(fase)
+
+    def segna_pronto(self) -> None:
+        """Segna la fine dell'avvio: da qui l'applicazione può servire richieste."""
+        if self.pronto_ms is None:
+            self.pronto_ms = round(self._ms_da_inizio(), 3)
+
+    @property
+    def pronto(self) -> bool:
+        """True se l'avvio è terminato."""
+        return self.pronto_ms is not None
+
+    def riepilogo(self) -> Dict:
+        """Fasi di avvio e inizializzazioni pigre, dalla più lenta.
+
+        Returns:
+            Dizionario con tempo di prontezza, fasi e totale per tipo
+        """
+        with self._lock:
+            fasi = list(self.fasi)
+        avvio = [f for f in fasi if not f.pigro]
+        pigre = [f for f in fasi if f.pigro]
+        return {
+            "pronto": self.pronto,
+            "pronto_ms": self.pronto_ms,
+            "avvio_totale_ms": round(sum(f.durata_ms for f in avvio), 3),
+            "pigri_totale_ms": round(sum(f.durata_ms for f in pigre), 3),
+            "fasi": [f.to_dict() for f in avvio],
+            "pigri": [f.to_dict() for f in pigre],
+            "piu_lente": [f.nome for f in sorted(fasi, key=lambda f: f.durata_ms, reverse=True)[:5]]
+        }
+
+
+class Pigro:
+    """Attributo costruito al primo accesso, una sola volta anche tra thread.
+
+    Si usa come decoratore di un metodo fabbrica. Il valore viene salvato
+    nell'istanza, quindi gli accessi successivi sono normali letture di
+    attributo e l'attributo resta assegnabile (es. per sostituire un modulo).
+    L'istanza deve avere `_lock_pigri` (RLock) e può avere
+    `cronologia_avvio` per registrare il tempo di costruzione.
+    """
+
+    def __init__(self, fabbrica: Callable[[Any], Any]):
+        """Inizializza l'attributo.
+
+        Args:
+            fabbrica: Funzione fabbrica(istanza) -> valore
+        """
+        self.fabbrica = fabbrica
+        self.nome = fabbrica.__name__
+        self.__doc__ = fabbrica.__doc__
+
+    def __set_name__(self, proprietario, nome: str):
+        self.nome = nome
+
+    def __get__(self, istanza, proprietario=None):
+        if istanza is None:
+            return self
+        with istanza._lock_pigri:
+            # Un altro thread può averlo costruito mentre attendevamo il lock
+            if self.nome in istanza.__dict__:
+                return istanza.__dict__[self.nome]
+            cronologia = getattr(istanza, "cronologia_avvio", None)
+            with cronologia.fase(self.nome, pigro=True) if cronologia else nullcontext():
+                valore = self.fabbrica(istanza)
+            istanza.__dict__[self.nome] = valore
+        return valore
+
+
+def stato_pigri(istanza) -> Dict[str, bool]:
+    """Sottosistemi pigri di un'istanza e se sono già stati costruiti.
+
+    Args:
+        istanza: Oggetto la cui classe dichiara attributi Pigro
+
+    Returns:
+        Dizionario {nome: inizializzato}
+    """
+    nomi = [
+        nome for classe in type(istanza).__mro__
+        for nome, valore in vars(classe).items() if isinstance(valore, Pigro)
+    ]
+    return {nome: nome in istanza.__dict__ for nome in nomi}
+
+
+if __name__ == "__main__":
+    print("⏱️  TEST AVVIO SOTTOSISTEMI")
+    print("=" * 60 + "\n")
+
+    class Applicazione:
+        def __init__(self):
+            self._lock_pigri = threading.RLock()
+            self.cronologia_avvio = CronologiaAvvio()
+            with self.cronologia_avvio.fase("configurazione"):
+                time.sleep(0.01)
+            self.cronologia_avvio.segna_pronto()
+
+        @Pigro
+        def archivio(self):
+            """Sottosistema lento costruito al primo uso."""
+            time.sleep(0.05)
+            return {"pronto": True}
+
+    app = Applicazione()
+    print(f"   Pronto in {app.cronologia_avvio.pronto_ms} ms, pigri: {stato_pigri(app)}")
+    app.archivio
+    riepilogo = app.cronologia_avvio.riepilogo()
+    print(f"   Dopo il primo uso: {stato_pigri(app)}")
+    for fase in riepilogo["fasi"] + riepilogo["pigri"]:
+        tipo = "pigro" if fase["pigro"] else "avvio"
+        print(f"   - {fase['nome']:<15} {fase['durata_ms']:>8.2f} ms ({tipo})")
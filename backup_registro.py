@@ -224,26 +224,44 @@ class GestoreBackup:
         
         return backup_disponibili
     
-    def pulizia_backup_vecchi(self, giorni_mantieni: int = 30):
-        """Elimina backup più vecchi di N giorni.
+    def pulizia_backup_vecchi(self, giorni_mantieni: int = 30, settimanali_mantieni: int = 8,
+                              mensili_mantieni: int = 12):
+        """Elimina i backup vecchi con una conservazione diversa per tipo.
+        
+        I giornalieri sono eliminati dopo N giorni; di settimanali e mensili
+        si conservano solo gli ultimi N, così restano utili oltre i 30 giorni.
         
         Args:
-            giorni_mantieni: Numero di giorni da mantenere
+            giorni_mantieni: Numero di giorni di backup giornalieri da mantenere
+            settimanali_mantieni: Numero di backup settimanali da mantenere
+            mensili_mantieni: Numero di backup mensili da mantenere
+        
+        Returns:
+            Numero di backup eliminati
         """
         cutoff_date = datetime.now() - timedelta(days=giorni_mantieni)
         eliminati = 0
         
-        for tipo in ["giornalieri", "settimanali", "mensili"]:
-            directory = self.directory_backup / tipo
-            if not directory.exists():
-                continue
-            
+        directory = self.directory_backup / "giornalieri"
+        if directory.exists():
             for filepath in directory.glob("backup_*.json"):
                 if datetime.fromtimestamp(filepath.stat().st_mtime) < cutoff_date:
                     filepath.unlink()
                     eliminati += 1
         
-        print(f"🧹 Eliminati {eliminati} backup vecchi (oltre {giorni_mantieni} giorni)")
+        for tipo, mantieni in (("settimanali", settimanali_mantieni), ("mensili", mensili_mantieni)):
+            directory = self.directory_backup / tipo
+            if not directory.exists():
+                continue
+        
+            # Il nome contiene il timestamp: l'ordine alfabetico è cronologico
+            for filepath in sorted(directory.glob("backup_*.json"), reverse=True)[mantieni:]:
+                filepath.unlink()
+                eliminati += 1
+        
+        print(f"🧹 Eliminati {eliminati} backup vecchi (giornalieri oltre {giorni_mantieni} giorni, "
+              f"ultimi {settimanali_mantieni} settimanali e {mensili_mantieni} mensili conservati)")
+        return eliminati
     
     def backup_automatico(self, registro, tipo: str = "giornalieri"):
         """Esegue un backup automatico.
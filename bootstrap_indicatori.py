@@ -0,0 +1,360 @@
+"""
+Incertezza degli indicatori - ManagerSchool
+Intervalli di confidenza bootstrap e p-value di test di permutazione per
+gli indicatori di equità e qualità (gap pedagogico, correlazione
+reddito-rendimento, divario tra fasce di reddito, indici sintetici).
+
+I ricampionamenti sono vettoriali: ogni blocco di campioni bootstrap è
+una matrice di pesi (quante volte ogni studente viene estratto) e tutte
+le statistiche derivano da somme pesate, cioè da un solo prodotto
+matrice per matrice. I blocchi hanno semi indipendenti, quindi il
+risultato non dipende da come vengono distribuiti tra i thread.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+import time
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from statistiche_streaming import ETICHETTE_FASCE
+
+
+SOGLIA_FRAGILITA = 50  # come AnalisiDidattica.impatto_didattico_fragili
+FASCE = list(ETICHETTE_FASCE)
+
+# Statistiche con test di permutazione (ipotesi nulla: media indipendente da fragilità e reddito)
+STATISTICHE_TESTATE = ("gap_pedagogico", "correlazione_reddito_rendimento", "divario_fasce_reddito")
+
+
+@dataclass
+class StimaIncertezza:
+    """Valore di un indicatore con intervallo bootstrap e p-value."""
+    nome: str
+    valore: float
+    intervallo: Tuple[float, float]
+    errore_standard: float
+    livello: float
+    p_value: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "valore": round(self.valore, 4),
+            "intervallo": [round(self.intervallo[0], 4), round(self.intervallo[1], 4)],
+            "errore_standard": round(self.errore_standard, 4),
+            "livello": self.livello,
+            "p_value": round(self.p_value, 4) if self.p_value is not None else None
+        }
+
+
+class BootstrapIndicatori:
+    """Bootstrap e test di permutazione vettoriali sugli indicatori.
+
+    Le formule replicano indice_equita_educativa e indice_qualita_scolastica
+    di CalcolatoreIndicatori a partire da somme pesate per studente: sul
+    campione originale danno gli stessi valori.
+    """
+
+    def __init__(self, anagrafica, gestione_voti, gestione_insegnanti=None,
+                 ricampionamenti: int = 1000, permutazioni: int = 1000, livello: float = 0.95,
+                 seed: Optional[int] = 0, budget_secondi: Optional[float] = None,
+                 processi: int = 1, elementi_per_blocco: int = 4_000_000):
+        """Inizializza il calcolo.
+
+        Args:
+            anagrafica: Istanza di Anagrafica
+            gestione_voti: Istanza di GestioneVoti
+            gestione_insegnanti: Istanza di GestioneInsegnanti (copertura ore, opzionale)
+            ricampionamenti: Campioni bootstrap
+            permutazioni: Permutazioni per i p-value (0 = nessun test)
+            livello: Livello di confidenza degli intervalli
+            seed: Seme del generatore (stesso seme, stessi risultati)
+            budget_secondi: Tempo massimo: i blocchi non iniziati vengono saltati
+            processi: Thread che elaborano i blocchi (NumPy rilascia il GIL)
+            elementi_per_blocco: Dimensione massima (campioni x studenti) di un blocco
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy non disponibile: il bootstrap degli indicatori lo richiede")
+
+        self.anagrafica = anagrafica
+        self.gestione_voti = gestione_voti
+        self.gestione_insegnanti = gestione_insegnanti
+        self.ricampionamenti = ricampionamenti
+        self.permutazioni = permutazioni
+        self.livello = livello
+        self.seed = seed
+        self.budget_secondi = budget_secondi
+        self.processi = max(1, processi)
+        self.elementi_per_blocco = elementi_per_blocco
+
+    # ============ DATI ============
+
+    def _dati(self, studenti) -> Dict[str, "np.ndarray"]:
+        """Media, fragilità, reddito e fascia di ogni studente (un passaggio sui voti)."""
+        somme: Dict[int, float] = {}
+        conteggi: Dict[int, int] = {}
+        for voto in self.gestione_voti.voti:
+            somme[voto.id_studente] = somme.get(voto.id_studente, 0.0) + voto.voto
+            conteggi[voto.id_studente] = conteggi.get(voto.id_studente, 0) + 1
+        n = len(studenti)
+        reddito = np.fromiter((s.reddito_familiare for s in studenti), dtype=np.float64, count=n)
+        return {
+            "media": np.fromiter((somme[s.id] / conteggi[s.id] if s.id in conteggi else 0.0 for s in studenti),
+                                 dtype=np.float64, count=n),
+            "fragilita": np.fromiter((s.fragilità_sociale for s in studenti), dtype=np.float64, count=n),
+            # Centrato: la correlazione non cambia e le somme dei quadrati restano stabili
+            "reddito": reddito - reddito.mean() if n else reddito,
+            "fascia": np.fromiter((FASCE.index(s.categoria_reddito.name) for s in studenti), dtype=np.int64, count=n)
+        }
+
+    @staticmethod
+    def _colonne(dati) -> List[Tuple[str, Optional[str], Optional["np.ndarray"]]]:
+        """Somme necessarie: (nome, funzione della media, covariata)."""
+        fragilita = dati["fragilita"]
+        fragili = (fragilita >= SOGLIA_FRAGILITA).astype(np.float64)
+        non_fragili = (fragilita <= SOGLIA_FRAGILITA).astype(np.float64)
+        reddito = dati["reddito"]
+        colonne = [
+            ("n", None, None),
+            ("pos", "p", None), ("m", "m", None), ("m2", "m2", None),
+            ("F", None, fragili), ("Fm", "m", fragili), ("Fpos", "p", fragili),
+            ("NF", None, non_fragili), ("NFm", "m", non_fragili),
+            ("f", None, fragilita), ("f2", None, fragilita * fragilita),
+            ("r", "p", reddito), ("r2", "p", reddito * reddito), ("rm", "m", reddito)
+        ]
+        for indice, fascia in enumerate(FASCE):
+            maschera = (dati["fascia"] == indice).astype(np.float64)
+            colonne += [(f"B_{fascia}", None, maschera), (f"Bm_{fascia}", "m", maschera)]
+        return colonne
+
+    @staticmethod
+    def _funzione_media(tipo: Optional[str], media):
+        if tipo == "m":
+            return media
+        if tipo == "m2":
+            return media * media
+        return (media > 0).astype(np.float64)
+
+    def _matrice(self, dati) -> Tuple[List[str], "np.ndarray"]:
+        colonne = self._colonne(dati)
+        n = len(dati["media"])
+        matrice = np.empty((n, len(colonne)))
+        for posizione, (_, tipo, covariata) in enumerate(colonne):
+            valori = np.ones(n) if tipo is None else self._funzione_media(tipo, dati["media"])
+            matrice[:, posizione] = valori if covariata is None else valori * covariata
+        return [c[0] for c in colonne], matrice
+
+    # ============ STATISTICHE DA SOMME PESATE ============
+
+    @staticmethod
+    def _rapporto(numeratore, denominatore):
+        return np.divide(numeratore, denominatore, out=np.zeros_like(numeratore), where=denominatore > 0)
+
+    def _statistiche(self, somme: Dict[str, "np.ndarray"], componente_copertura: float) -> Dict[str, "np.ndarray"]:
+        """Indicatori per ogni riga di somme (un campione per riga)."""
+        r = self._rapporto
+        n = somme["n"]
+
+        media_generale = r(somme["m"], somme["pos"])
+        media_fragili = r(somme["Fm"], somme["F"])
+        gap = np.where(media_fragili > 0, r(somme["NFm"], somme["NF"]) - media_fragili, 0.0)
+        gap_arrotondato = np.round(gap, 2)
+
+        # Dispersione della fragilità (deviazione standard della popolazione)
+        media_f = r(somme["f"], n)
+        deviazione = np.where(n > 1, np.sqrt(np.maximum(0.0, r(somme["f2"], n) - media_f ** 2)), 0.0)
+
+        # Divario tra le fasce di reddito con media > 0 (come correlazione_reddito_rendimento)
+        medie_fasce = np.stack([np.round(r(somme[f"Bm_{f}"], somme[f"B_{f}"]), 2) for f in FASCE], axis=1)
+        valide = medie_fasce > 0
+        fasce_valide = valide.sum(axis=1)
+        massimo = np.where(valide, medie_fasce, -np.inf).max(axis=1)
+        minimo = np.where(valide, medie_fasce, np.inf).min(axis=1)
+        divario = np.where(fasce_valide > 1, massimo - minimo, 0.0)
+
+        # Correlazione di Pearson tra reddito e media (studenti con voti)
+        pos = somme["pos"]
+        media_r, media_m = r(somme["r"], pos), r(somme["m"], pos)
+        covarianza = r(somme["rm"], pos) - media_r * media_m
+        varianze = (r(somme["r2"], pos) - media_r ** 2) * (r(somme["m2"], pos) - media_m ** 2)
+        correlazione = np.clip(r(covarianza, np.sqrt(np.maximum(varianze, 0.0))), -1.0, 1.0)
+
+        equita = (
+            np.maximum(0.0, 40 - gap_arrotondato * 8)
+            + np.where(n > 0, np.maximum(0.0, 30 - deviazione / 2), 0.0)
+            + np.where(fasce_valide > 1, np.maximum(0.0, 30 - divario * 5), 15.0)
+        )
+        qualita = (
+            media_generale / 10.0 * 40
+            + r(somme["Fm"], somme["Fpos"]) / 10.0 * 30
+            + np.minimum(20.0, np.maximum(0.0, 20 - gap_arrotondato * 4))
+            + componente_copertura
+        )
+        return {
+            "media_generale": media_generale,
+            "gap_pedagogico": gap,
+            "correlazione_reddito_rendimento": correlazione,
+            "divario_fasce_reddito": divario,
+            "dispersione_fragilita": deviazione,
+            "indice_equita_educativa": equita,
+            "indice_qualita_scolastica": qualita
+        }
+
+    # ============ RICAMPIONAMENTO ============
+
+    def _blocchi(self, totale: int, n: int, semi) -> List[Tuple[int, "np.random.SeedSequence"]]:
+        dimensione = max(1, self.elementi_per_blocco // max(1, n))
+        numero = -(-totale // dimensione) if totale > 0 else 0
+        figli = semi.spawn(numero)
+        return [(min(dimensione, totale - i * dimensione), figli[i]) for i in range(numero)]
+
+    def _bootstrap(self, nomi, matrice, blocco) -> "np.ndarray":
+        """Somme pesate di un blocco di campioni bootstrap (estrazione con reinserimento)."""
+        righe, seme = blocco
+        n = matrice.shape[0]
+        generatore = np.random.default_rng(seme)
+        estratti = generatore.integers(0, n, size=(righe, n))
+        estratti += np.arange(righe)[:, None] * n
+        pesi = np.bincount(estratti.ravel(), minlength=righe * n).reshape(righe, n)
+        return pesi.astype(np.float64) @ matrice
+
+    def _permutazione(self, colonne, dati, blocco) -> "np.ndarray":
+        """Somme con le medie permutate tra gli studenti (fragilità e reddito fissi)."""
+        righe, seme = blocco
+        generatore = np.random.default_rng(seme)
+        media = dati["media"]
+        permutate = generatore.permuted(np.broadcast_to(media, (righe, len(media))), axis=1)
+        somme = np.empty((righe, len(colonne)))
+        for posizione, (_, tipo, covariata) in enumerate(colonne):
+            if tipo is None:
+                # Non dipende dalla media: invariante per permutazione
+                somme[:, posizione] = len(media) if covariata is None else covariata.sum()
+            elif covariata is None:
+                somme[:, posizione] = self._funzione_media(tipo, media).sum()
+            else:
+                somme[:, posizione] = self._funzione_media(tipo, permutate) @ covariata
+        return somme
+
+    def _esegui(self, funzione: Callable, blocchi, inizio: float) -> Tuple[List["np.ndarray"], bool]:
+        """Elabora i blocchi a ondate di self.processi rispettando il budget di tempo."""
+        risultati: List = []
+        esecutore = ThreadPoolExecutor(self.processi) if self.processi > 1 else None
+        try:
+            for onda in range(0, len(blocchi), self.processi):
+                if self.budget_secondi is not None and time.perf_counter() - inizio > self.budget_secondi:
+                    return risultati, True
+                lotto = blocchi[onda:onda + self.processi]
+                risultati.extend(esecutore.map(funzione, lotto) if esecutore else map(funzione, lotto))
+        finally:
+            if esecutore is not None:
+                esecutore.shutdown()
+        return risultati, False
+
+    # ============ ANALISI ============
+
+    def analizza(self, classe: Optional[str] = None, studenti=None) -> Dict:
+        """Indicatori con intervalli di confidenza e p-value.
+
+        Args:
+            classe: Limita l'analisi agli studenti di una classe
+            studenti: Studenti da analizzare (default: tutti o quelli della classe)
+
+        Returns:
+            Dizionario con le stime per indicatore e i dettagli del calcolo
+        """
+        inizio = time.perf_counter()
+        if studenti is None:
+            studenti = self.anagrafica.studenti_per_classe(classe) if classe else self.anagrafica.studenti
+        studenti = list(studenti)
+        if not studenti:
+            raise ValueError(f"Classe {classe} non trovata" if classe else "Nessuno studente da analizzare")
+
+        dati = self._dati(studenti)
+        colonne = self._colonne(dati)
+        nomi, matrice = self._matrice(dati)
+        n = len(studenti)
+
+        # Copertura insegnanti: non dipende dal campione (stesso numero di studenti)
+        componente_copertura = 0.0
+        if self.gestione_insegnanti is not None:
+            totale_ore = sum(i.totale_ore_settimanali for i in self.gestione_insegnanti.insegnanti)
+            componente_copertura = min(100, totale_ore / (n * 10) * 100) / 100.0 * 10
+
+        def statistiche(somme_matrice):
+            return self._statistiche({nome: somme_matrice[:, i] for i, nome in enumerate(nomi)},
+                                     componente_copertura)
+
+        osservate = {k: float(v[0]) for k, v in statistiche(matrice.sum(axis=0)[None, :]).items()}
+
+        semi = np.random.SeedSequence(self.seed)
+        seme_bootstrap, seme_permutazioni = semi.spawn(2)
+        somme_bootstrap, esaurito_bootstrap = self._esegui(
+            lambda blocco: self._bootstrap(nomi, matrice, blocco),
+            self._blocchi(self.ricampionamenti, n, seme_bootstrap), inizio
+        )
+        somme_permutazioni, esaurito_permutazioni = self._esegui(
+            lambda blocco: self._permutazione(colonne, dati, blocco),
+            self._blocchi(self.permutazioni, n, seme_permutazioni), inizio
+        )
+
+        campioni = statistiche(np.vstack(somme_bootstrap)) if somme_bootstrap else None
+        permutate = statistiche(np.vstack(somme_permutazioni)) if somme_permutazioni else None
+        alfa = (1 - self.livello) / 2
+
+        indicatori = {}
+        for nome, valore in osservate.items():
+            if campioni is not None:
+                basso, alto = np.quantile(campioni[nome], [alfa, 1 - alfa])
+                errore = float(campioni[nome].std(ddof=1)) if len(campioni[nome]) > 1 else 0.0
+            else:
+                basso = alto = valore
+                errore = 0.0
+            p_value = None
+            if permutate is not None and nome in STATISTICHE_TESTATE:
+                # Bilaterale, con la correzione +1 (mai esattamente zero)
+                estremi = int((np.abs(permutate[nome]) >= abs(valore) - 1e-12).sum())
+                p_value = (estremi + 1) / (len(permutate[nome]) + 1)
+            indicatori[nome] = StimaIncertezza(nome, valore, (float(basso), float(alto)), errore,
+                                               self.livello, p_value)
+
+        return {
+            "classe": classe,
+            "numero_studenti": n,
+            "indicatori": {nome: stima.to_dict() for nome, stima in indicatori.items()},
+            "ricampionamenti": sum(len(s) for s in somme_bootstrap),
+            "permutazioni": sum(len(s) for s in somme_permutazioni),
+            "budget_esaurito": esaurito_bootstrap or esaurito_permutazioni,
+            "seed": self.seed,
+            "tempo_ms": round((time.perf_counter() - inizio) * 1000, 1)
+        }
+
+
+if __name__ == "__main__":
+    from anagrafica import Anagrafica
+    from voti import GestioneVoti, Voto
+
+    print("🎯 TEST INCERTEZZA INDICATORI")
+    print("=" * 60 + "\n")
+
+    anagrafica = Anagrafica()
+    voti = GestioneVoti()
+    anagrafica.genera_studenti(50000)
+    generatore = np.random.default_rng(1)
+    voti.voti = [
+        Voto(s.id, "Matematica", float(round(min(10, max(3, v - s.fragilità_sociale / 40)), 1)), "scritto", "2025-11-03")
+        for s, v in zip(anagrafica.studenti, generatore.normal(7, 1.2, len(anagrafica.studenti)))
+    ]
+
+    risultato = BootstrapIndicatori(anagrafica, voti, seed=42).analizza()
+    print(f"   Studenti: {risultato['numero_studenti']}, ricampionamenti: {risultato['ricampionamenti']}, "
+          f"permutazioni: {risultato['permutazioni']}")
+    for nome, stima in risultato["indicatori"].items():
+        print(f"   {nome}: {stima['valore']} [{stima['intervallo'][0]}, {stima['intervallo'][1]}]"
+              f" p={stima['p_value']}")
+    print(f"   Tempo: {risultato['tempo_ms']:.0f} ms")
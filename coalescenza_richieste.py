@@ -0,0 +1,222 @@
+"""
+Coalescenza delle richieste per calcoli costosi (single-flight).
+Richieste concorrenti con la stessa chiave attendono un'unica esecuzione
+in corso e ne condividono il risultato (o l'eccezione).
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _ChiamataInVolo:
+    """Esecuzione in corso condivisa tra più chiamanti."""
+
+    __slots__ = ("evento", "risultato", "eccezione", "in_attesa")
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.risultato: Any = None
+        self.eccezione: Optional[BaseException] = None
+        self.in_attesa = 0
+
+
+def _copia_per_chiamante(eccezione: BaseException) -> BaseException:
+    """Copia dell'eccezione condivisa con traceback proprio per un chiamante accodato.
+
+    Rilanciare lo stesso oggetto da più thread accumulerebbe i traceback di
+    tutti sull'unica istanza; l'originale resta come causa della copia.
+    """
+    try:
+        copia = copy.copy(eccezione).with_traceback(None)
+    except Exception:
+        copia = RuntimeError(f"Calcolo condiviso fallito: {eccezione!r}")
+    copia.__cause__ = eccezione
+    return copia
+
+
+class CoalescenzaRichieste:
+    """Gruppo single-flight: al più un'esecuzione in corso per chiave."""
+
+    # Chiavi con contatori dedicati (le meno recenti sono scartate)
+    MAX_CHIAVI_STATISTICHE = 256
+
+    def __init__(self, timeout_predefinito: Optional[float] = None,
+                 max_chiavi_statistiche: Optional[int] = None):
+        """Inizializza il gruppo.
+
+        Args:
+            timeout_predefinito: Attesa massima (secondi) per chi non esegue
+            max_chiavi_statistiche: Chiavi con contatori per chiave (LRU)
+        """
+        self.timeout_predefinito = timeout_predefinito
+        self.max_chiavi_statistiche = max_chiavi_statistiche or self.MAX_CHIAVI_STATISTICHE
+        self._lock = threading.Lock()
+        self._in_volo: Dict[Hashable, _ChiamataInVolo] = {}
+
+        # Contatori
+        self._esecuzioni = 0
+        self._deduplicate = 0
+        self._errori = 0
+        self._timeout = 0
+        self._per_chiave: "OrderedDict[Hashable, Dict[str, int]]" = OrderedDict()
+
+    def esegui(self, chiave: Hashable, funzione: Callable, *args,
+               timeout: Optional[float] = None, **kwargs) -> Any:
+        """Esegue la funzione o si accoda a un'esecuzione identica in corso.
+
+        Args:
+            chiave: Chiave che identifica il calcolo
+            funzione: Funzione da eseguire
+            timeout: Attesa massima per chi si accoda (default: timeout_predefinito)
+            *args, **kwargs: Argomenti per la funzione
+
+        Returns:
+            Risultato condiviso del calcolo
+
+        Raises:
+            TimeoutError: Se l'esecuzione in corso non termina entro il timeout
+            Exception: L'eccezione sollevata dalla funzione, propagata a tutti
+        """
+        with self._lock:
+            chiamata = self._in_volo.get(chiave)
+            contatori = self._contatori_chiave(chiave)
+            if chiamata is None:
+                chiamata = _ChiamataInVolo()
+                self._in_volo[chiave] = chiamata
+                self._esecuzioni += 1
+                contatori["esecuzioni"] += 1
+                esecutore = True
+            else:
+                chiamata.in_attesa += 1
+                self._deduplicate += 1
+                contatori["deduplicate"] += 1
+                esecutore = False
+
+        if esecutore:
+            return self._esegui_come_esecutore(chiave, chiamata, funzione, args, kwargs)
+
+        if timeout is None:
+            timeout = self.timeout_predefinito
+
+        if not chiamata.evento.wait(timeout):
+            with self._lock:
+                self._timeout += 1
+            raise TimeoutError(f"Timeout in attesa del calcolo '{chiave}' dopo {timeout}s")
+
+        if chiamata.eccezione is not None:
+            raise _copia_per_chiamante(chiamata.eccezione)
+        return chiamata.risultato
+
+    def _contatori_chiave(self, chiave: Hashable) -> Dict[str, int]:
+        """Contatori della chiave (da chiamare sotto lock); scarta le chiavi meno recenti."""
+        contatori = self._per_chiave.get(chiave)
+        if contatori is None:
+            contatori = self._per_chiave[chiave] = {"esecuzioni": 0, "deduplicate": 0}
+            while len(self._per_chiave) > self.max_chiavi_statistiche:
+                self._per_chiave.popitem(last=False)
+        else:
+            self._per_chiave.move_to_end(chiave)
+        return contatori
+
+    def _esegui_come_esecutore(self, chiave: Hashable, chiamata: _ChiamataInVolo,
+                               funzione: Callable, args, kwargs) -> Any:
+        """Esegue il calcolo e sveglia i chiamanti in attesa."""
+        try:
+            chiamata.risultato = funzione(*args, **kwargs)
+        except BaseException as e:
+            chiamata.eccezione = e
+            with self._lock:
+                self._errori += 1
+            raise
+        finally:
+            # Rimuove la chiave prima di svegliare: le richieste successive
+            # al completamento avviano un nuovo calcolo con dati aggiornati
+            with self._lock:
+                self._in_volo.pop(chiave, None)
+            chiamata.evento.set()
+
+        return chiamata.risultato
+
+    def in_corso(self, chiave: Hashable) -> bool:
+        """True se esiste un'esecuzione in corso per la chiave."""
+        with self._lock:
+            return chiave in self._in_volo
+
+    def statistiche(self) -> Dict:
+        """Restituisce i contatori di esecuzioni e deduplicazioni.
+
+        Returns:
+            Dizionario con contatori globali e per chiave (solo le chiavi più recenti)
+        """
+        with self._lock:
+            richieste = self._esecuzioni + self._deduplicate
+            return {
+                "richieste": richieste,
+                "esecuzioni": self._esecuzioni,
+                "deduplicate": self._deduplicate,
+                "percentuale_deduplicate": round(self._deduplicate / richieste * 100, 2) if richieste else 0.0,
+                "errori": self._errori,
+                "timeout": self._timeout,
+                "in_volo": len(self._in_volo),
+                "per_chiave": {str(k): dict(v) for k, v in self._per_chiave.items()}
+            }
+
+    def azzera_statistiche(self) -> None:
+        """Azzera i contatori."""
+        with self._lock:
+            self._esecuzioni = 0
+            self._deduplicate = 0
+            self._errori = 0
+            self._timeout = 0
+            self._per_chiave.clear()
+
+
+# Gruppo globale
+coalescenza_globale = CoalescenzaRichieste()
+
+
+def coalescente(chiave: Optional[Hashable] = None,
+                gruppo: Optional[CoalescenzaRichieste] = None,
+                timeout: Optional[float] = None):
+    """Decorator per rendere single-flight una funzione.
+
+    Args:
+        chiave: Chiave fissa (default: nome funzione + argomenti)
+        gruppo: Gruppo di coalescenza (default: globale)
+        timeout: Attesa massima per i chiamanti accodati
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            gruppo_effettivo = gruppo or coalescenza_globale
+            if chiave is not None:
+                chiave_calcolo = chiave
+            else:
+                chiave_calcolo = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+            return gruppo_effettivo.esegui(chiave_calcolo, func, *args, timeout=timeout, **kwargs)
+        return wrapper
+    return decorator
+
+
+if __name__ == "__main__":
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    print("🔀 TEST COALESCENZA RICHIESTE")
+    print("=" * 60 + "\n")
+
+    gruppo = CoalescenzaRichieste()
+
+    def calcolo_lento():
+        time.sleep(0.2)
+        return 42
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        risultati = list(pool.map(lambda _: gruppo.esegui("quadro", calcolo_lento), range(20)))
+
+    stats = gruppo.statistiche()
+    print(f"   Risultati: {set(risultati)}")
+    print(f"   Esecuzioni: {stats['esecuzioni']}, deduplicate: {stats['deduplicate']}")
@@ -10,6 +10,16 @@ from enum import Enum
 import random
 
 
+# Tipo mittente/destinatario per ruolo dell'utente (valori di accesso.Ruolo);
+# l'ID è quello dell'utente associato (Utente.associato_id)
+TIPO_PER_RUOLO: Dict[str, str] = {
+    "Insegnante": "insegnante",
+    "Dirigente": "dirigente",
+    "Amministratore": "segreteria",
+    "Studente": "studente",
+}
+
+
 class TipoComunicazione(Enum):
     """Tipi di comunicazione disponibili."""
     NOTIFICA = "notifica"
@@ -288,11 +298,13 @@ class GestioneComunicazioni:
         """Ottiene comunicazioni relative a uno studente."""
         return [com for com in self.comunicazioni if com.studente_id == studente_id]
     
-    def marca_come_letta(self, comunicazione_id: int, user_id: int) -> bool:
-        """Marca una comunicazione come letta."""
+    def marca_come_letta(self, comunicazione_id: int, user_id: int,
+                         tipo_utente: Optional[str] = None) -> bool:
+        """Marca una comunicazione come letta (solo dal destinatario)."""
         for com in self.comunicazioni:
             if (com.id == comunicazione_id and 
                 com.destinatario_id == user_id and 
+                (tipo_utente is None or com.destinatario_tipo == tipo_utente) and
                 not com.is_letta):
                 com.marca_come_letta()
                 return True
@@ -0,0 +1,278 @@
+"""
+Formati di trasmissione delle risposte API.
+Compressione gzip/brotli negoziata con Accept-Encoding e codifiche binarie
+opzionali (MessagePack, CBOR) negoziate con Accept.
+"""
+
+import gzip
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Response, jsonify, request
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+try:
+    import cbor2
+    CBOR_AVAILABLE = True
+except ImportError:
+    cbor2 = None
+    CBOR_AVAILABLE = False
+
+
+MIME_JSON = "application/json"
+MIME_MSGPACK = "application/msgpack"
+MIME_CBOR = "application/cbor"
+
+# Tipi che vale la pena comprimere (le immagini e i PDF sono già compressi)
+TIPI_COMPRIMIBILI = (
+    "application/json", "application/msgpack", "application/cbor",
+    "application/javascript", "text/"
+)
+
+
+def _codifica_msgpack(dati: Any) -> bytes:
+    """Codifica MessagePack (date e oggetti non nativi come stringhe)."""
+    return msgpack.packb(dati, default=str, use_bin_type=True)
+
+
+def _codifica_cbor(dati: Any) -> bytes:
+    """Codifica CBOR (date e oggetti non nativi come stringhe)."""
+    return cbor2.dumps(dati, default=lambda encoder, valore: encoder.encode(str(valore)))
+
+
+def _qualita_esplicita(accept, tipi: Tuple[str, ...]) -> float:
+    """Qualità massima con cui l'header Accept elenca uno dei tipi (0 se assente)."""
+    return max((qualita for tipo, qualita in accept if tipo in tipi), default=0)
+
+
+def formati_disponibili() -> List[str]:
+    """Tipi MIME utilizzabili, JSON per primo (default)."""
+    formati = [MIME_JSON]
+    if MSGPACK_AVAILABLE:
+        formati.append(MIME_MSGPACK)
+    if CBOR_AVAILABLE:
+        formati.append(MIME_CBOR)
+    return formati
+
+
+def risposta_negoziata(dati: Any, status: int = 200) -> Response:
+    """Serializza i dati nel formato richiesto dal client.
+
+    Il formato si sceglie con l'header Accept (application/msgpack,
+    application/x-msgpack, application/cbor) o con ?formato=msgpack|cbor|json.
+    Senza preferenze esplicite la risposta resta JSON.
+
+    Args:
+        dati: Dati serializzabili
+        status: Codice HTTP
+
+    Returns:
+        Response con Content-Type e Vary impostati
+    """
+    richiesto = request.args.get("formato")
+    if richiesto:
+        mime = {"msgpack": MIME_MSGPACK, "cbor": MIME_CBOR}.get(richiesto, MIME_JSON)
+    else:
+        # Un formato binario solo se elencato esplicitamente ("*/*" resta JSON)
+        accept = request.accept_mimetypes
+        q_json = _qualita_esplicita(accept, (MIME_JSON,))
+        candidati = [(_qualita_esplicita(accept, (MIME_MSGPACK, "application/x-msgpack")), MIME_MSGPACK),
+                     (_qualita_esplicita(accept, (MIME_CBOR,)), MIME_CBOR)]
+        q_binario, mime = max(candidati)
+        if q_binario == 0 or q_binario < q_json:
+            mime = MIME_JSON
+
+    if mime == MIME_MSGPACK and MSGPACK_AVAILABLE:
+        risposta = Response(_codifica_msgpack(dati), status=status, mimetype=MIME_MSGPACK)
+    elif mime == MIME_CBOR and CBOR_AVAILABLE:
+        risposta = Response(_codifica_cbor(dati), status=status, mimetype=MIME_CBOR)
+    else:
+        risposta = jsonify(dati)
+        risposta.status_code = status
+
+    risposta.vary.add("Accept")
+    return risposta
+
+
+class CompressioneRisposte:
+    """Middleware Flask: comprime le risposte sopra una soglia di dimensione."""
+
+    def __init__(self, app=None, soglia_byte: int = 1024, livello_gzip: int = 6,
+                 qualita_brotli: int = 4):
+        """Inizializza il middleware.
+
+        Args:
+            app: Applicazione Flask (opzionale, vedi init_app)
+            soglia_byte: Dimensione minima del corpo da comprimere
+            livello_gzip: Livello gzip (1-9)
+            qualita_brotli: Qualità brotli (0-11; 4 è un buon compromesso per risposte dinamiche)
+        """
+        self.soglia_byte = soglia_byte
+        self.livello_gzip = livello_gzip
+        self.qualita_brotli = qualita_brotli
+
+        # Contatori
+        self.risposte_compresse = 0
+        self.byte_originali = 0
+        self.byte_trasmessi = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Registra l'hook sull'applicazione."""
+        app.after_request(self._comprimi)
+
+    def codifica_scelta(self, accept_encoding) -> Optional[str]:
+        """Sceglie la codifica migliore tra quelle accettate dal client.
+
+        Args:
+            accept_encoding: request.accept_encodings
+
+        Returns:
+            "br", "gzip" o None
+        """
+        candidati = ["br", "gzip"] if BROTLI_AVAILABLE else ["gzip"]
+        scelta = accept_encoding.best_match(candidati)
+        if scelta is None or accept_encoding[scelta] <= 0:
+            return None
+        return scelta
+
+    def comprimi_corpo(self, corpo: bytes, codifica: str) -> bytes:
+        """Comprime un corpo con la codifica indicata."""
+        if codifica == "br":
+            return brotli.compress(corpo, quality=self.qualita_brotli)
+        return gzip.compress(corpo, compresslevel=self.livello_gzip, mtime=0)
+
+    def _comprimi(self, risposta: Response) -> Response:
+        """Comprime la risposta se il client lo accetta e conviene."""
+        if (risposta.direct_passthrough or risposta.is_streamed
+                or risposta.status_code < 200 or risposta.status_code in (204, 206, 304)
+                or "Content-Encoding" in risposta.headers
+                or not (risposta.mimetype or "").startswith(TIPI_COMPRIMIBILI)):
+            return risposta
+
+        risposta.vary.add("Accept-Encoding")
+        codifica = self.codifica_scelta(request.accept_encodings)
+        if codifica is None:
+            return risposta
+
+        corpo = risposta.get_data()
+        if len(corpo) < self.soglia_byte:
+            return risposta
+
+        compresso = self.comprimi_corpo(corpo, codifica)
+        risposta.set_data(compresso)
+        risposta.headers["Content-Encoding"] = codifica
+
+        self.risposte_compresse += 1
+        self.byte_originali += len(corpo)
+        self.byte_trasmessi += len(compresso)
+        return risposta
+
+    def statistiche(self) -> Dict:
+        """Restituisce i contatori di compressione."""
+        return {
+            "risposte_compresse": self.risposte_compresse,
+            "byte_originali": self.byte_originali,
+            "byte_trasmessi": self.byte_trasmessi,
+            "rapporto": round(self.byte_trasmessi / self.byte_originali, 4) if self.byte_originali else None,
+            "brotli": BROTLI_AVAILABLE,
+            "formati": formati_disponibili()
+        }
+
+
+# ============ BENCHMARK ============
+
+def _record_demo(n: int) -> List[Dict]:
+    """Genera n record simili a quelli di /api/voti."""
+    materie = ["Matematica", "Italiano", "Inglese", "Storia", "Educazione Fisica", "Religione"]
+    return [
+        {
+            "studente": f"Studente {i % 1200}",
+            "classe": f"{i % 5 + 1}{'ABCD'[i % 4]}",
+            "materia": materie[i % len(materie)],
+            "voto": round(4.0 + (i * 37 % 60) / 10, 1),
+            "tipo": "Prova scritta" if i % 3 else "Prova orale",
+            "data": f"2025-{i % 9 + 1:02d}-{i % 28 + 1:02d}"
+        }
+        for i in range(n)
+    ]
+
+
+def _cronometra(funzione: Callable[[], Any], ripetizioni: int) -> Tuple[Any, float]:
+    """Esegue la funzione e restituisce (ultimo risultato, tempo medio in ms)."""
+    inizio = time.perf_counter()
+    for _ in range(ripetizioni):
+        risultato = funzione()
+    return risultato, (time.perf_counter() - inizio) / ripetizioni * 1000
+
+
+def benchmark_formati(dimensioni: Tuple[int, ...] = (1000, 10000, 100000),
+                      ripetizioni: int = 3) -> List[Dict]:
+    """Confronta dimensione e tempi di codifica/decodifica rispetto a JSON.
+
+    Args:
+        dimensioni: Numero di record per ciascuna prova
+        ripetizioni: Ripetizioni per la media dei tempi
+
+    Returns:
+        Una riga per (dimensione, formato) con byte, rapporto e tempi in ms
+    """
+    formati = {
+        "json": (lambda d: json.dumps(d, separators=(",", ":")).encode(), json.loads),
+        "json+gzip": (lambda d: gzip.compress(json.dumps(d, separators=(",", ":")).encode(), 6, mtime=0),
+                      lambda b: json.loads(gzip.decompress(b))),
+    }
+    if BROTLI_AVAILABLE:
+        formati["json+br"] = (lambda d: brotli.compress(json.dumps(d, separators=(",", ":")).encode(), quality=4),
+                              lambda b: json.loads(brotli.decompress(b)))
+    if MSGPACK_AVAILABLE:
+        formati["msgpack"] = (_codifica_msgpack, lambda b: msgpack.unpackb(b, raw=False))
+        formati["msgpack+gzip"] = (lambda d: gzip.compress(_codifica_msgpack(d), 6, mtime=0),
+                                   lambda b: msgpack.unpackb(gzip.decompress(b), raw=False))
+    if CBOR_AVAILABLE:
+        formati["cbor"] = (_codifica_cbor, cbor2.loads)
+
+    risultati = []
+    for n in dimensioni:
+        dati = _record_demo(n)
+        byte_json = None
+        for nome, (codifica, decodifica) in formati.items():
+            corpo, ms_codifica = _cronometra(lambda: codifica(dati), ripetizioni)
+            decodificato, ms_decodifica = _cronometra(lambda: decodifica(corpo), ripetizioni)
+            assert decodificato == dati, f"{nome}: decodifica non equivalente"
+            if byte_json is None:
+                byte_json = len(corpo)
+            risultati.append({
+                "record": n,
+                "formato": nome,
+                "byte": len(corpo),
+                "rapporto_json": round(len(corpo) / byte_json, 3),
+                "codifica_ms": round(ms_codifica, 2),
+                "decodifica_ms": round(ms_decodifica, 2)
+            })
+    return risultati
+
+
+if __name__ == "__main__":
+    print("📦 BENCHMARK FORMATI DI RISPOSTA")
+    print("=" * 72 + "\n")
+    print(f"{'record':>8} {'formato':<14} {'byte':>11} {'vs json':>8} {'cod. ms':>9} {'dec. ms':>9}")
+    for riga in benchmark_formati():
+        print(f"{riga['record']:>8} {riga['formato']:<14} {riga['byte']:>11} "
+              f"{riga['rapporto_json']:>8} {riga['codifica_ms']:>9} {riga['decodifica_ms']:>9}")
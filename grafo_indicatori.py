@@ -0,0 +1,624 @@
+"""
+Grafo degli indicatori - ManagerSchool
+Gli indicatori sintetici come nodi di un grafo aciclico di metriche
+intermedie (composizione e rendimento di ogni classe, aggregati della
+scuola, gap pedagogico, medie per fascia, medie degli insegnanti) con
+memoizzazione e propagazione delle modifiche: quando cambiano i voti di
+una classe si ricalcolano solo i nodi che ne dipendono. Ogni nodo
+registra il proprio tempo di calcolo per il profiling.
+"""
+
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import threading
+import time
+
+from indicatori import IndiceSintetico
+from statistiche_streaming import ETICHETTE_FASCE, Welford
+
+
+@dataclass
+class NodoGrafo:
+    """Metrica memoizzata con le sue dipendenze e i tempi di calcolo."""
+    nome: str
+    calcola: Callable[[Dict[str, Any]], Any]
+    dipendenze: Tuple[str, ...] = ()
+    valore: Any = None
+    sporco: bool = True
+    ricalcoli: int = 0
+    letture: int = 0
+    ultimo_ms: float = 0.0
+    totale_ms: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "dipendenze": list(self.dipendenze),
+            "sporco": self.sporco,
+            "ricalcoli": self.ricalcoli,
+            "letture": self.letture,
+            "ultimo_ms": round(self.ultimo_ms, 3),
+            "totale_ms": round(self.totale_ms, 3),
+            "medio_ms": round(self.totale_ms / self.ricalcoli, 3) if self.ricalcoli else 0.0
+        }
+
+
+class GrafoDipendenze:
+    """Grafo aciclico di nodi memoizzati, valutati su richiesta.
+
+    Un nodo sporco ha sempre tutti i dipendenti sporchi: l'invalidazione
+    si ferma ai nodi già sporchi e la lettura ricalcola solo il necessario.
+    """
+
+    def __init__(self):
+        self._nodi: Dict[str, NodoGrafo] = {}
+        self._dipendenti: Dict[str, Set[str]] = {}
+        self._lock = threading.RLock()
+        self.ricalcoli_totali = 0
+
+    def aggiungi(self, nome: str, calcola: Callable[[Dict[str, Any]], Any], dipendenze=()) -> None:
+        """Aggiunge (o sostituisce) un nodo.
+
+        Args:
+            nome: Nome del nodo
+            calcola: Funzione che riceve {dipendenza: valore} e restituisce il valore del nodo
+            dipendenze: Nomi dei nodi da cui dipende (devono esistere)
+        """
+        with self._lock:
+            for dipendenza in dipendenze:
+                if dipendenza not in self._nodi:
+                    raise KeyError(f"Dipendenza sconosciuta: {dipendenza}")
+            precedente = self._nodi.get(nome)
+            if precedente is not None:
+                if any(d == nome or nome in self._antenati(d) for d in dipendenze):
+                    raise ValueError(f"Il nodo {nome} creerebbe un ciclo")
+                for dipendenza in precedente.dipendenze:
+                    self._dipendenti[dipendenza].discard(nome)
+            nodo = NodoGrafo(nome, calcola, tuple(dipendenze))
+            if precedente is not None:
+                nodo.ricalcoli, nodo.letture, nodo.totale_ms = precedente.ricalcoli, precedente.letture, precedente.totale_ms
+            self._nodi[nome] = nodo
+            self._dipendenti.setdefault(nome, set())
+            for dipendenza in nodo.dipendenze:
+                self._dipendenti[dipendenza].add(nome)
+            nodo.sporco = False
+            self.invalida(nome)
+
+    def _antenati(self, nome: str) -> Set[str]:
+        visti: Set[str] = set()
+        da_visitare = [nome]
+        while da_visitare:
+            for dipendenza in self._nodi[da_visitare.pop()].dipendenze:
+                if dipendenza not in visti:
+                    visti.add(dipendenza)
+                    da_visitare.append(dipendenza)
+        return visti
+
+    def rimuovi(self, nome: str) -> None:
+        """Rimuove un nodo senza dipendenti."""
+        with self._lock:
+            if self._dipendenti.get(nome):
+                raise ValueError(f"Il nodo {nome} ha ancora dipendenti: {sorted(self._dipendenti[nome])}")
+            nodo = self._nodi.pop(nome)
+            del self._dipendenti[nome]
+            for dipendenza in nodo.dipendenze:
+                self._dipendenti[dipendenza].discard(nome)
+
+    def invalida(self, *nomi: str) -> int:
+        """Segna come sporchi i nodi indicati e tutti i loro dipendenti.
+
+        Returns:
+            Numero di nodi diventati sporchi
+        """
+        with self._lock:
+            invalidati = 0
+            da_visitare = [n for n in nomi if n in self._nodi]
+            while da_visitare:
+                nodo = self._nodi[da_visitare.pop()]
+                if nodo.sporco:
+                    continue
+                nodo.sporco = True
+                invalidati += 1
+                da_visitare.extend(self._dipendenti[nodo.nome])
+            return invalidati
+
+    def invalida_tutto(self) -> None:
+        with self._lock:
+            for nodo in self._nodi.values():
+                nodo.sporco = True
+
+    def valore(self, nome: str) -> Any:
+        """Valore di un nodo, ricalcolando solo le dipendenze sporche."""
+        with self._lock:
+            return self._valuta(nome)
+
+    def _valuta(self, nome: str) -> Any:
+        nodo = self._nodi[nome]
+        nodo.letture += 1
+        if nodo.sporco:
+            valori = {dipendenza: self._valuta(dipendenza) for dipendenza in nodo.dipendenze}
+            # Tempo del solo nodo, senza le dipendenze
+            inizio = time.perf_counter()
+            nodo.valore = nodo.calcola(valori)
+            nodo.ultimo_ms = (time.perf_counter() - inizio) * 1000
+            nodo.totale_ms += nodo.ultimo_ms
+            nodo.ricalcoli += 1
+            nodo.sporco = False
+            self.ricalcoli_totali += 1
+        return nodo.valore
+
+    def __contains__(self, nome: str) -> bool:
+        return nome in self._nodi
+
+    def nodi(self) -> List[str]:
+        return list(self._nodi)
+
+    def sporchi(self) -> List[str]:
+        with self._lock:
+            return [nome for nome, nodo in self._nodi.items() if nodo.sporco]
+
+    def tempi(self) -> Dict[str, Dict]:
+        """Ricalcoli, letture e tempi (ms) di ogni nodo."""
+        with self._lock:
+            return {nome: nodo.to_dict() for nome, nodo in self._nodi.items()}
+
+
+# Indicatori del quadro completo e nodi che li calcolano
+INDICATORI = {
+    "qualita_scolastica": "indice_qualita_scolastica",
+    "equita_educativa": "indice_equita_educativa",
+    "efficacia_didattica": "indice_efficacia_didattica",
+    "coesione_sociale": "indice_coesione_sociale",
+    "benessere_scolastico": "indice_benessere_scolastico"
+}
+SOGLIA_FRAGILI = 50
+
+
+def _media(somma: float, numero: int) -> float:
+    return somma / numero if numero else 0.0
+
+
+class GrafoIndicatori(GrafoDipendenze):
+    """Indicatori di CalcolatoreIndicatori calcolati sul grafo delle metriche.
+
+    Nodi per classe: composizione:<classe> (solo anagrafica) e
+    rendimento:<classe> (medie degli studenti della classe). I nodi della
+    scuola li combinano; gli indici dipendono solo dalle metriche che usano.
+    I voti arrivano come eventi di GestioneVoti; l'anagrafica e gli
+    insegnanti vengono confrontati con un'impronta prima di ogni lettura.
+    """
+
+    def __init__(self, anagrafica, gestione_voti, gestione_insegnanti=None):
+        """Inizializza il grafo.
+
+        Args:
+            anagrafica: Istanza di Anagrafica
+            gestione_voti: Istanza di GestioneVoti (osservata)
+            gestione_insegnanti: Istanza di GestioneInsegnanti
+        """
+        super().__init__()
+        self.anagrafica = None
+        self.gestione_voti = None
+        self.gestione_insegnanti = gestione_insegnanti
+
+        self._somme_studenti: Dict[int, List[float]] = {}
+        self._somme_materie: Dict[str, List[float]] = {}
+        self._impronte: Dict[int, Tuple] = {}
+        self._membri: Dict[str, Dict[int, Any]] = {}
+        self._classi: Tuple[str, ...] = ()
+        self._impronta_insegnanti: Optional[Tuple] = None
+
+        self.aggiungi("insegnanti", lambda _: self._dati_insegnanti())
+        self.aggiungi("composizione_scuola", self._unisci_composizioni)
+        self.aggiungi("rendimento_scuola", self._unisci_rendimenti)
+        self.aggiungi("medie_insegnanti", self._medie_insegnanti, ("insegnanti",))
+        self.aggiungi("gap_pedagogico", self._gap_pedagogico, ("rendimento_scuola",))
+        self.aggiungi("medie_fasce_reddito", self._medie_fasce, ("rendimento_scuola",))
+        self.aggiungi("indice_qualita_scolastica", self._indice_qualita,
+                      ("rendimento_scuola", "composizione_scuola", "gap_pedagogico", "insegnanti"))
+        self.aggiungi("indice_equita_educativa", self._indice_equita,
+                      ("composizione_scuola", "gap_pedagogico", "medie_fasce_reddito"))
+        self.aggiungi("indice_efficacia_didattica", self._indice_efficacia,
+                      ("medie_insegnanti", "rendimento_scuola", "composizione_scuola"))
+        self.aggiungi("indice_coesione_sociale", self._indice_coesione, ("composizione_scuola",))
+        self.aggiungi("indice_benessere_scolastico", self._indice_benessere,
+                      ("composizione_scuola", "rendimento_scuola"))
+
+        self.collega(gestione_voti, anagrafica)
+
+    # ============ SORGENTI ============
+
+    def collega(self, gestione_voti, anagrafica=None) -> None:
+        """Osserva una GestioneVoti (sostituisce la precedente) e ricalcola tutto alla prossima lettura."""
+        with self._lock:
+            if self.gestione_voti is not None and self.su_evento_voto in self.gestione_voti.osservatori:
+                self.gestione_voti.osservatori.remove(self.su_evento_voto)
+            self.gestione_voti = gestione_voti
+            if anagrafica is not None:
+                self.anagrafica = anagrafica
+            gestione_voti.osservatori.append(self.su_evento_voto)
+            self._ricarica_voti()
+            self._impronte.clear()
+            self._membri.clear()
+            self._impronta_insegnanti = None
+            self.invalida_tutto()
+
+    def ricostruisci(self) -> None:
+        """Ricalcola da zero le somme dei voti e tutti i nodi (verifica della deriva)."""
+        with self._lock:
+            self._ricarica_voti()
+            self.invalida_tutto()
+
+    def _ricarica_voti(self) -> None:
+        self._somme_studenti.clear()
+        self._somme_materie.clear()
+        for voto in list(self.gestione_voti.voti):
+            self._somma(voto, 1)
+
+    def _somma(self, voto, segno: int) -> None:
+        for somme, chiave in ((self._somme_studenti, voto.id_studente), (self._somme_materie, voto.materia)):
+            totale = somme.setdefault(chiave, [0.0, 0])
+            totale[0] += segno * voto.voto
+            totale[1] += segno
+
+    def su_evento_voto(self, evento: str, voto=None) -> None:
+        """Osservatore di GestioneVoti: invalida solo le classi coinvolte."""
+        with self._lock:
+            if evento in ("aggiunto", "aggiunti", "rimosso"):
+                voti = voto if evento == "aggiunti" else [voto]
+                segno = -1 if evento == "rimosso" else 1
+                for singolo in voti:
+                    self._somma(singolo, segno)
+                    impronta = self._impronte.get(singolo.id_studente)
+                    if impronta is not None:
+                        self.invalida(f"rendimento:{impronta[0]}")
+            else:  # "azzerati", "ricaricati"
+                self._ricarica_voti()
+                self.invalida(*(f"rendimento:{classe}" for classe in self._classi))
+            self.invalida("medie_insegnanti")
+
+    def sincronizza(self) -> None:
+        """Confronta anagrafica e insegnanti con l'ultima lettura e invalida le classi cambiate."""
+        with self._lock:
+            presenti = set()
+            toccate: Set[str] = set()
+            for studente in self.anagrafica.studenti:
+                presenti.add(studente.id)
+                impronta = (studente.classe, studente.fragilità_sociale, studente.reddito_familiare,
+                            studente.categoria_reddito, studente.condizione_salute, studente.situazione_familiare)
+                precedente = self._impronte.get(studente.id)
+                if precedente == impronta:
+                    continue
+                if precedente is not None:
+                    toccate.add(precedente[0])
+                    self._membri[precedente[0]].pop(studente.id, None)
+                toccate.add(studente.classe)
+                self._membri.setdefault(studente.classe, {})[studente.id] = studente
+                self._impronte[studente.id] = impronta
+            for id_studente in [i for i in self._impronte if i not in presenti]:
+                classe = self._impronte.pop(id_studente)[0]
+                self._membri[classe].pop(id_studente, None)
+                toccate.add(classe)
+
+            classi = tuple(sorted(c for c, membri in self._membri.items() if membri))
+            if classi != self._classi:
+                self._aggiorna_classi(classi)
+            self.invalida(*(f"composizione:{classe}" for classe in toccate))
+
+            insegnanti = self._lista_insegnanti()
+            impronta = tuple((i.id, tuple(i.materie), i.totale_ore_settimanali, i.anni_esperienza) for i in insegnanti)
+            if impronta != self._impronta_insegnanti:
+                self._impronta_insegnanti = impronta
+                self.invalida("insegnanti")
+
+    def _aggiorna_classi(self, classi: Tuple[str, ...]) -> None:
+        """Aggiunge e rimuove i nodi per classe e ricollega gli aggregati della scuola."""
+        for classe in classi:
+            if f"composizione:{classe}" not in self:
+                self.aggiungi(f"composizione:{classe}", lambda _, c=classe: self._composizione(c))
+                self.aggiungi(f"rendimento:{classe}", lambda valori, c=classe: self._rendimento(c, valori),
+                              (f"composizione:{classe}",))
+        self.aggiungi("composizione_scuola", self._unisci_composizioni,
+                      tuple(f"composizione:{c}" for c in classi))
+        self.aggiungi("rendimento_scuola", self._unisci_rendimenti,
+                      tuple(f"rendimento:{c}" for c in classi))
+        for classe in set(self._classi) - set(classi):
+            self.rimuovi(f"rendimento:{classe}")
+            self.rimuovi(f"composizione:{classe}")
+            self._membri.pop(classe, None)
+        self._classi = classi
+
+    def _lista_insegnanti(self) -> list:
+        return list(self.gestione_insegnanti.insegnanti) if self.gestione_insegnanti is not None else []
+
+    # ============ METRICHE PER CLASSE ============
+
+    def _composizione(self, classe: str) -> Dict:
+        """Dati anagrafici della classe: dimensione, fragilità, reddito, salute, famiglia."""
+        fragilita = Welford()
+        dati = {"numero": 0, "fragili": 0, "alta_fragilita": 0, "reddito": 0.0, "salute_buona": 0,
+                "nucleo_tradizionale": 0, "studenti": []}
+        for studente in self._membri.get(classe, {}).values():
+            f = studente.fragilità_sociale
+            fragilita.aggiungi(f)
+            dati["numero"] += 1
+            dati["fragili"] += f >= SOGLIA_FRAGILI
+            dati["alta_fragilita"] += f >= 60
+            dati["reddito"] += studente.reddito_familiare
+            dati["salute_buona"] += studente.condizione_salute.value in ("Eccellente", "Buona")
+            dati["nucleo_tradizionale"] += studente.situazione_familiare == "Nucleo tradizionale"
+            dati["studenti"].append((studente.id, f >= SOGLIA_FRAGILI, f <= SOGLIA_FRAGILI,
+                                     studente.categoria_reddito.name))
+        dati["fragilita"] = fragilita
+        return dati
+
+    def _rendimento(self, classe: str, valori: Dict) -> Dict:
+        """Medie degli studenti della classe, per gruppo di fragilità e fascia di reddito."""
+        positive, fragili_positive = Welford(), Welford()
+        dati = {"fragili": [0.0, 0], "non_fragili": [0.0, 0], "fasce": {f: [0.0, 0] for f in ETICHETTE_FASCE}}
+        for id_studente, fragile, non_fragile, fascia in valori[f"composizione:{classe}"]["studenti"]:
+            somma = self._somme_studenti.get(id_studente)
+            media = somma[0] / somma[1] if somma and somma[1] else 0.0
+            if media > 0:
+                positive.aggiungi(media)
+                if fragile:
+                    fragili_positive.aggiungi(media)
+            for gruppo, appartiene in (("fragili", fragile), ("non_fragili", non_fragile)):
+                if appartiene:
+                    dati[gruppo][0] += media
+                    dati[gruppo][1] += 1
+            dati["fasce"][fascia][0] += media
+            dati["fasce"][fascia][1] += 1
+        dati["positive"] = positive
+        dati["fragili_positive"] = fragili_positive
+        return dati
+
+    # ============ METRICHE DELLA SCUOLA ============
+
+    def _unisci_composizioni(self, valori: Dict) -> Dict:
+        scuola = {"numero": 0, "fragili": 0, "alta_fragilita": 0, "reddito": 0.0, "salute_buona": 0,
+                  "nucleo_tradizionale": 0, "fragilita": Welford(), "dimensioni_classi": {}}
+        for nome, classe in valori.items():
+            for chiave in ("numero", "fragili", "alta_fragilita", "reddito", "salute_buona", "nucleo_tradizionale"):
+                scuola[chiave] += classe[chiave]
+            scuola["fragilita"].unisci(classe["fragilita"])
+            scuola["dimensioni_classi"][nome.split(":", 1)[1]] = classe["numero"]
+        return scuola
+
+    def _unisci_rendimenti(self, valori: Dict) -> Dict:
+        scuola = {"positive": Welford(), "fragili_positive": Welford(), "fragili": [0.0, 0],
+                  "non_fragili": [0.0, 0], "fasce": {f: [0.0, 0] for f in ETICHETTE_FASCE}}
+        for classe in valori.values():
+            scuola["positive"].unisci(classe["positive"])
+            scuola["fragili_positive"].unisci(classe["fragili_positive"])
+            for gruppo in ("fragili", "non_fragili"):
+                scuola[gruppo][0] += classe[gruppo][0]
+                scuola[gruppo][1] += classe[gruppo][1]
+            for fascia, (somma, numero) in classe["fasce"].items():
+                scuola["fasce"][fascia][0] += somma
+                scuola["fasce"][fascia][1] += numero
+        return scuola
+
+    def _dati_insegnanti(self) -> Dict:
+        insegnanti = self._lista_insegnanti()
+        return {"insegnanti": insegnanti, "ore_totali": sum(i.totale_ore_settimanali for i in insegnanti)}
+
+    def _medie_insegnanti(self, valori: Dict) -> List[Dict]:
+        """Media dei voti delle materie di ogni insegnante ed efficacia (come graduatoria_insegnanti)."""
+        risultati = []
+        for insegnante in valori["insegnanti"]["insegnanti"]:
+            somma, numero = 0.0, 0
+            for materia in set(insegnante.materie):
+                totale = self._somme_materie.get(materia)
+                if totale:
+                    somma += totale[0]
+                    numero += totale[1]
+            media_voti = somma / numero if numero else 6.0
+
+            ore = insegnante.totale_ore_settimanali
+            if 14 <= ore <= 18:
+                peso_carico = 20
+            elif ore < 14:
+                peso_carico = ore / 14.0 * 15
+            else:
+                peso_carico = max(0, 20 - (ore - 18) * 2)
+            efficacia = media_voti / 10.0 * 50 + min(insegnante.anni_esperienza / 35.0, 1.0) * 30 + peso_carico
+            risultati.append({"id": insegnante.id, "media_voti": round(media_voti, 2), "efficacia": round(efficacia, 2)})
+        return risultati
+
+    def _gap_pedagogico(self, valori: Dict) -> float:
+        rendimento = valori["rendimento_scuola"]
+        media_fragili = _media(*rendimento["fragili"])
+        media_non_fragili = _media(*rendimento["non_fragili"])
+        return round(media_non_fragili - media_fragili if media_fragili > 0 else 0, 2)
+
+    def _medie_fasce(self, valori: Dict) -> Dict[str, Dict]:
+        """Come AnalisiDidattica.correlazione_reddito_rendimento."""
+        return {
+            etichetta: {
+                "numero_studenti": valori["rendimento_scuola"]["fasce"][fascia][1],
+                "media_rendimento": round(_media(*valori["rendimento_scuola"]["fasce"][fascia]), 2)
+            }
+            for fascia, etichetta in ETICHETTE_FASCE.items()
+        }
+
+    # ============ INDICI ============
+
+    def _indice_qualita(self, valori: Dict) -> IndiceSintetico:
+        rendimento = valori["rendimento_scuola"]
+        componente_media = rendimento["positive"].media / 10.0 * 40
+        componente_fragili = rendimento["fragili_positive"].media / 10.0 * 30
+        componente_equita = min(20, max(0, 20 - (valori["gap_pedagogico"] * 4)))
+        ore_necessarie = valori["composizione_scuola"]["numero"] * 10
+        copertura = min(100, (valori["insegnanti"]["ore_totali"] / ore_necessarie) * 100) if ore_necessarie > 0 else 0
+        componente_copertura = (copertura / 100.0) * 10
+
+        return IndiceSintetico(
+            nome="Indice Qualità Scolastica",
+            valore=round(componente_media + componente_fragili + componente_equita + componente_copertura, 2),
+            componenti={
+                "Media generale": round(componente_media, 2),
+                "Performance fragili": round(componente_fragili, 2),
+                "Equità educativa": round(componente_equita, 2),
+                "Copertura insegnanti": round(componente_copertura, 2)
+            }
+        )
+
+    def _indice_equita(self, valori: Dict) -> IndiceSintetico:
+        componente_gap = max(0, 40 - (valori["gap_pedagogico"] * 8))
+        fragilita = valori["composizione_scuola"]["fragilita"]
+        componente_dispersione = max(0, 30 - (fragilita.deviazione_standard / 2)) if fragilita.n else 0
+        medie_fasce = [d["media_rendimento"] for d in valori["medie_fasce_reddito"].values() if d["media_rendimento"] > 0]
+        if len(medie_fasce) > 1:
+            componente_accessibilita = max(0, 30 - ((max(medie_fasce) - min(medie_fasce)) * 5))
+        else:
+            componente_accessibilita = 15
+
+        return IndiceSintetico(
+            nome="Indice Equità Educativa",
+            valore=round(componente_gap + componente_dispersione + componente_accessibilita, 2),
+            componenti={
+                "Riduzione gap": round(componente_gap, 2),
+                "Dispersione sociale": round(componente_dispersione, 2),
+                "Accessibilità reddito": round(componente_accessibilita, 2)
+            }
+        )
+
+    def _indice_efficacia(self, valori: Dict) -> IndiceSintetico:
+        efficacie = [i["efficacia"] for i in valori["medie_insegnanti"]]
+        componente_insegnanti = (_media(sum(efficacie), len(efficacie)) / 100.0) * 50 if efficacie else 0
+        rendimento = valori["rendimento_scuola"]
+        if valori["composizione_scuola"]["fragili"]:
+            componente_crescita = (rendimento["fragili_positive"].media / 10.0) * 30
+        else:
+            componente_crescita = 0
+        if rendimento["positive"].n > 1:
+            componente_stabilita = max(0, 20 - (rendimento["positive"].deviazione_standard * 2))
+        else:
+            componente_stabilita = 10
+
+        return IndiceSintetico(
+            nome="Indice Efficacia Didattica",
+            valore=round(componente_insegnanti + componente_crescita + componente_stabilita, 2),
+            componenti={
+                "Efficacia insegnanti": round(componente_insegnanti, 2),
+                "Crescita fragili": round(componente_crescita, 2),
+                "Stabilità risultati": round(componente_stabilita, 2)
+            }
+        )
+
+    def _indice_coesione(self, valori: Dict) -> IndiceSintetico:
+        scuola = valori["composizione_scuola"]
+        totale = scuola["numero"]
+        if totale > 0:
+            percentuale_alta = round((scuola["alta_fragilita"] / totale) * 100, 1)
+            componente_distribuzione = max(0, 40 * (1 - abs(percentuale_alta - 25) / 100))
+        else:
+            componente_distribuzione = 0
+        dimensioni = list(scuola["dimensioni_classi"].values())
+        if dimensioni:
+            massima, minima = max(dimensioni), min(dimensioni)
+            componente_omogeneita = max(0, 30 * (1 - (massima - minima) / massima if massima > 0 else 1))
+        else:
+            componente_omogeneita = 0
+        if totale > 0:
+            componente_integrazione = max(0, 30 * (1 - abs(scuola["fragili"] / totale - 0.25)))
+        else:
+            componente_integrazione = 0
+
+        return IndiceSintetico(
+            nome="Indice Coesione Sociale",
+            valore=round(componente_distribuzione + componente_omogeneita + componente_integrazione, 2),
+            componenti={
+                "Distribuzione fragilità": round(componente_distribuzione, 2),
+                "Omogeneità classi": round(componente_omogeneita, 2),
+                "Integrazione inclusiva": round(componente_integrazione, 2)
+            }
+        )
+
+    def _indice_benessere(self, valori: Dict) -> IndiceSintetico:
+        scuola = valori["composizione_scuola"]
+        totale = scuola["numero"]
+        componente_reddito = min(30, (scuola["reddito"] / totale / 25000) * 30) if totale else 0
+        componente_salute = (scuola["salute_buona"] / totale) * 30 if totale else 0
+        componente_famiglia = (scuola["nucleo_tradizionale"] / totale) * 20 if totale else 0
+        positive = valori["rendimento_scuola"]["positive"]
+        componente_rendimento = (positive.media / 10.0) * 20 if positive.n else 0
+
+        return IndiceSintetico(
+            nome="Indice Benessere Scolastico",
+            valore=round(componente_reddito + componente_salute + componente_famiglia + componente_rendimento, 2),
+            componenti={
+                "Sicurezza reddito": round(componente_reddito, 2),
+                "Qualità salute": round(componente_salute, 2),
+                "Supporto familiare": round(componente_famiglia, 2),
+                "Rendimento": round(componente_rendimento, 2)
+            }
+        )
+
+    # ============ LETTURE ============
+
+    def valore(self, nome: str) -> Any:
+        with self._lock:
+            self.sincronizza()
+            return super().valore(nome)
+
+    def indice(self, chiave: str) -> IndiceSintetico:
+        """Indice del quadro (es. "equita_educativa"), copia del valore memoizzato."""
+        return self.quadro((chiave,))[chiave]
+
+    def quadro(self, chiavi=tuple(INDICATORI)) -> Dict[str, IndiceSintetico]:
+        """Indici richiesti (default tutti, come CalcolatoreIndicatori.quadro_indicatori_completo)."""
+        with self._lock:
+            self.sincronizza()
+            quadro = {}
+            for chiave in chiavi:
+                indice = super().valore(INDICATORI[chiave])
+                quadro[chiave] = replace(indice, componenti=dict(indice.componenti))
+            return quadro
+
+    def profilo(self) -> Dict:
+        """Tempi e ricalcoli di ogni nodo, dal più costoso."""
+        with self._lock:
+            tempi = self.tempi()
+            return {
+                "numero_nodi": len(tempi),
+                "ricalcoli_totali": self.ricalcoli_totali,
+                "sporchi": self.sporchi(),
+                "nodi": dict(sorted(tempi.items(), key=lambda v: -v[1]["totale_ms"]))
+            }
+
+
+if __name__ == "__main__":
+    import random
+
+    from anagrafica import Anagrafica
+    from insegnanti import GestioneInsegnanti
+    from voti import GestioneVoti, Voto
+
+    print("🕸️  TEST GRAFO INDICATORI")
+    print("=" * 60 + "\n")
+
+    anagrafica, voti, insegnanti = Anagrafica(), GestioneVoti(), GestioneInsegnanti()
+    for numero in range(40):
+        anagrafica.genera_studenti(25, classe=f"{numero % 5 + 1}{chr(65 + numero // 5)}")
+    casuale = random.Random(1)
+    voti.aggiungi_voti([
+        Voto(s.id, "Matematica", round(casuale.uniform(3, 10), 1), "scritto", "2025-11-03")
+        for s in anagrafica.studenti for _ in range(10)
+    ])
+
+    grafo = GrafoIndicatori(anagrafica, voti, insegnanti)
+    inizio = time.perf_counter()
+    grafo.quadro()
+    completo_ms = (time.perf_counter() - inizio) * 1000
+
+    ricalcoli = grafo.ricalcoli_totali
+    voti.aggiungi_voto(anagrafica.studenti_per_classe("1A")[0].id, "Italiano", 9.0)
+    inizio = time.perf_counter()
+    quadro = grafo.quadro()
+    parziale_ms = (time.perf_counter() - inizio) * 1000
+
+    print(f"   Nodi: {len(grafo.nodi())}, primo calcolo {completo_ms:.1f} ms")
+    print(f"   Dopo un voto in 1A: {grafo.ricalcoli_totali - ricalcoli} nodi ricalcolati in {parziale_ms:.1f} ms")
+    for chiave, indice in quadro.items():
+        print(f"   {indice.nome}: {indice.valore}")
@@ -0,0 +1,71 @@
+"""
+Configurazione gunicorn per ManagerSchool.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Variabili d'ambiente:
+    MANAGERSCHOOL_WORKERS: numero di processi (default: numero di core)
+    MANAGERSCHOOL_THREADS: thread per processo (default: 4)
+    MANAGERSCHOOL_WORKER_CLASS: tipo di worker (default: gevent se installato e
+        lo stream della dashboard è servito da gunicorn, altrimenti gthread)
+    MANAGERSCHOOL_URL_EVENTI: dove reindirizzare /api/dashboard/eventi (default:
+        vuoto = stream servito da gunicorn; /api/async/dashboard/eventi solo con
+        un reverse proxy che inoltra /api/async/ a uvicorn)
+    MANAGERSCHOOL_BIND: indirizzo di ascolto (default: 0.0.0.0:5000)
+    MANAGERSCHOOL_DB_CONDIVISO: file dello store condiviso
+    PROMETHEUS_MULTIPROC_DIR: se impostata (e prometheus_client è installato)
+        /metrics aggrega i valori di tutti i worker; altrimenti ogni scrape
+        vede solo il worker che risponde (etichetta worker)
+"""
+
+import glob
+import importlib.util
+import multiprocessing
+import os
+
+bind = os.environ.get("MANAGERSCHOOL_BIND", "0.0.0.0:5000")
+
+# I calcoli sono CPU-bound in Python: un processo per core scala con i core,
+# i thread coprono l'attesa su I/O e sui lock dello store
+workers = int(os.environ.get("MANAGERSCHOOL_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("MANAGERSCHOOL_THREADS", 4))
+# Uno stream SSE della dashboard occupa un thread gthread per tutta la
+# connessione: se resta su gunicorn (default) si usa gevent quando è
+# installato, dove un iscritto costa una greenlet. Con un proxy verso
+# uvicorn (asgi.py) impostare MANAGERSCHOOL_URL_EVENTI e gunicorn reindirizza lì
+stream_su_gunicorn = not os.environ.get("MANAGERSCHOOL_URL_EVENTI", "")
+gevent_disponibile = importlib.util.find_spec("gevent") is not None
+worker_class = os.environ.get(
+    "MANAGERSCHOOL_WORKER_CLASS", "gevent" if stream_su_gunicorn and gevent_disponibile else "gthread"
+)
+
+# Ogni worker apre le proprie connessioni SQLite: niente preload prima del fork
+preload_app = False
+
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# Riciclo periodico dei worker contro la crescita della memoria
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = "-"
+errorlog = "-"
+
+# Metriche multiprocesso: file azzerati all'avvio, worker terminati tolti dai gauge
+cartella_metriche = os.environ.get("PROMETHEUS_MULTIPROC_DIR", "")
+metriche_multiprocesso = bool(cartella_metriche) and importlib.util.find_spec("prometheus_client") is not None
+
+
+def on_starting(server):
+    if metriche_multiprocesso:
+        os.makedirs(cartella_metriche, exist_ok=True)
+        for file in glob.glob(os.path.join(cartella_metriche, "*.db")):
+            os.remove(file)
+
+
+def child_exit(server, worker):
+    if metriche_multiprocesso:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
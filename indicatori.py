@@ -6,6 +6,8 @@ Genera indicatori compositi per valutare la qualità del sistema scolastico.
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 import utils
+from statistiche_streaming import Welford
+from bootstrap_indicatori import BootstrapIndicatori
 
 
 @dataclass
@@ -33,6 +35,8 @@ class CalcolatoreIndicatori:
         self.gestione_voti = gestione_voti
         self.gestione_insegnanti = gestione_insegnanti
         self.analisi_didattica = analisi_didattica
+        # GrafoIndicatori opzionale: indici memoizzati e ricalcolati solo dove cambiano i dati
+        self.grafo = None
     
     def indice_qualita_scolastica(self) -> IndiceSintetico:
         """Calcola l'indice di qualità scolastica generale (0-100).
@@ -46,6 +50,9 @@ class CalcolatoreIndicatori:
         Returns:
             IndiceSintetico con valore e componenti
         """
+        if self.grafo is not None:
+            return self.grafo.indice("qualita_scolastica")
+        
         # Media generale
         medie_studenti = []
         for studente in self.anagrafica.studenti:
@@ -103,15 +110,22 @@ class CalcolatoreIndicatori:
         Returns:
             IndiceSintetico con valore e componenti
         """
+        if self.grafo is not None:
+            return self.grafo.indice("equita_educativa")
+        
         # Gap pedagogico (invertito: gap alto = equità bassa)
         impatto = self.analisi_didattica.impatto_didattico_fragili()
         gap = impatto.get("gap_pedagogico", 0)
         componente_gap = max(0, 40 - (gap * 8))
         
         # Dispersione sociale
-        fragilità = [s.fragilità_sociale for s in self.anagrafica.studenti]
-        if fragilità:
-            deviazione = utils.calcola_deviazione_standard(fragilità)
+        statistiche = getattr(self.gestione_voti, "statistiche", None)
+        if statistiche is not None:
+            fragilità = statistiche.fragilita()
+        else:
+            fragilità = Welford(s.fragilità_sociale for s in self.anagrafica.studenti)
+        if fragilità.n:
+            deviazione = fragilità.deviazione_standard
             componente_disperione = max(0, 30 - (deviazione / 2))
         else:
             componente_disperione = 0
@@ -152,6 +166,9 @@ class CalcolatoreIndicatori:
         Returns:
             IndiceSintetico con valore e componenti
         """
+        if self.grafo is not None:
+            return self.grafo.indice("efficacia_didattica")
+        
         # Media efficacia insegnanti
         graduatoria_insegnanti = self.analisi_didattica.graduatoria_insegnanti(
             self.gestione_insegnanti
@@ -176,13 +193,17 @@ class CalcolatoreIndicatori:
             componente_crescita = 0
         
         # Stabilità risultati (variabilità media)
-        medie_tutti = [
-            self.gestione_voti.media_studente(s.id) 
-            for s in self.anagrafica.studenti
-        ]
-        medie_valide = [m for m in medie_tutti if m > 0]
-        if len(medie_valide) > 1:
-            variabilita = utils.calcola_deviazione_standard(medie_valide)
+        statistiche = getattr(self.gestione_voti, "statistiche", None)
+        if statistiche is not None:
+            medie_valide = statistiche.medie_studenti()
+        else:
+            medie_valide = Welford()
+            for s in self.anagrafica.studenti:
+                media = self.gestione_voti.media_studente(s.id)
+                if media > 0:
+                    medie_valide.aggiungi(media)
+        if medie_valide.n > 1:
+            variabilita = medie_valide.deviazione_standard
             componente_stabilita = max(0, 20 - (variabilita * 2))
         else:
             componente_stabilita = 10
@@ -210,6 +231,9 @@ class CalcolatoreIndicatori:
         Returns:
             IndiceSintetico con valore e componenti
         """
+        if self.grafo is not None:
+            return self.grafo.indice("coesione_sociale")
+        
         # Distribuzione fragilità
         statistiche = self.anagrafica.statistica_fragilita()
         tot = statistiche.get("totale", 0)
@@ -266,6 +290,9 @@ class CalcolatoreIndicatori:
         Returns:
             IndiceSintetico con valore e componenti
         """
+        if self.grafo is not None:
+            return self.grafo.indice("benessere_scolastico")
+        
         # Sicurezza reddito
         redditi = [s.reddito_familiare for s in self.anagrafica.studenti]
         if redditi:
@@ -322,12 +349,36 @@ class CalcolatoreIndicatori:
             }
         )
     
+    def incertezza_indicatori(self, classe: Optional[str] = None, ricampionamenti: int = 1000,
+                              permutazioni: int = 1000, seed: Optional[int] = 0,
+                              budget_secondi: Optional[float] = None) -> Dict:
+        """Intervalli di confidenza bootstrap e p-value degli indicatori di equità e qualità.
+        
+        Args:
+            classe: Limita l'analisi a una classe (default: tutta la scuola)
+            ricampionamenti: Campioni bootstrap
+            permutazioni: Permutazioni per i p-value
+            seed: Seme per la riproducibilità
+            budget_secondi: Tempo massimo di calcolo
+            
+        Returns:
+            Dizionario con valore, intervallo, errore standard e p-value per indicatore
+        """
+        bootstrap = BootstrapIndicatori(
+            self.anagrafica, self.gestione_voti, self.gestione_insegnanti,
+            ricampionamenti=ricampionamenti, permutazioni=permutazioni,
+            seed=seed, budget_secondi=budget_secondi
+        )
+        return bootstrap.analizza(classe)
+    
     def quadro_indicatori_completo(self) -> Dict[str, IndiceSintetico]:
         """Calcola tutti gli indicatori sintetici.
         
         Returns:
             Dizionario con tutti gli indici
         """
+        if self.grafo is not None:
+            return self.grafo.quadro()
         return {
             "qualita_scolastica": self.indice_qualita_scolastica(),
             "equita_educativa": self.indice_equita_educativa(),
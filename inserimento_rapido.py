@@ -3,10 +3,12 @@ Modulo per l'inserimento rapido voti tramite interpretazione linguistica.
 Permette ai docenti di inserire voti usando linguaggio naturale.
 """
 
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 import re
 
+from voti import Voto
+
 
 class InterpreteDocente:
     """Interpreta frasi naturali per l'inserimento voti."""
@@ -215,6 +217,97 @@ class GestoreInserimentoVeloce:
             "voce": voce
         }
     
+    def inserisci_voti_classe(self, classe: str, materia: str, righe: List[Dict],
+                              tipo: str = "Prova scritta", data: Optional[str] = None,
+                              docente: str = "") -> Dict:
+        """Inserisce i voti di una verifica per un'intera classe.
+        
+        Tutte le righe sono validate prima di qualsiasi scrittura: se anche
+        una sola è errata non viene inserito nulla e si restituiscono gli
+        errori riga per riga. Altrimenti i voti sono aggiunti in un unico lotto.
+        
+        Args:
+            classe: Classe della verifica
+            materia: Materia
+            righe: Lista di {"id_studente", "voto", "note" (opzionale)}
+            tipo: Tipo di valutazione
+            data: Data della verifica (se None, usa oggi)
+            docente: Nome del docente
+            
+        Returns:
+            Dizionario con esito, voti inseriti ed errori per riga
+        """
+        errori = []
+        if not materia:
+            errori.append({"riga": None, "errore": "Materia obbligatoria"})
+        if data is None:
+            data = datetime.now().strftime("%Y-%m-%d")
+        try:
+            datetime.strptime(data, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            errori.append({"riga": None, "errore": f"Data non valida: {data}"})
+        if not righe:
+            errori.append({"riga": None, "errore": "Nessun voto da inserire"})
+            righe = []
+        elif not isinstance(righe, list):
+            errori.append({"riga": None, "errore": "I voti devono essere una lista"})
+            righe = []
+        
+        alunni_classe = {s.id for s in self.anagrafica.studenti if s.classe == classe}
+        if not alunni_classe:
+            errori.append({"riga": None, "errore": f"Classe '{classe}' senza studenti"})
+        
+        validi = []
+        visti = set()
+        for indice, riga in enumerate(righe):
+            id_studente = riga.get("id_studente") if isinstance(riga, dict) else None
+            try:
+                if not isinstance(id_studente, int) or isinstance(id_studente, bool):
+                    raise ValueError("id_studente mancante o non intero")
+                if id_studente not in alunni_classe:
+                    raise ValueError(f"Studente {id_studente} non appartiene alla classe {classe}")
+                if id_studente in visti:
+                    raise ValueError(f"Studente {id_studente} ripetuto nel lotto")
+                valore = riga.get("voto")
+                if not isinstance(valore, (int, float)) or isinstance(valore, bool):
+                    raise ValueError("voto mancante o non numerico")
+                voto = Voto(
+                    id_studente=id_studente,
+                    materia=materia,
+                    voto=float(valore),
+                    tipo=tipo,
+                    data=data,
+                    note=riga.get("note") or (f"Inserito da {docente}" if docente else "")
+                )
+            except ValueError as e:
+                errori.append({"riga": indice, "id_studente": id_studente, "errore": str(e)})
+                continue
+            visti.add(id_studente)
+            validi.append(voto)
+        
+        if errori:
+            return {"successo": False, "inseriti": 0, "errori": errori}
+        
+        self.gestione_voti.aggiungi_voti(validi)
+        
+        self.cronologia_voci.append({
+            "docente": docente,
+            "classe": classe,
+            "studente": f"{len(validi)} studenti",
+            "materia": materia,
+            "tipo": tipo,
+            "voto": round(sum(v.voto for v in validi) / len(validi), 2),
+            "data": data,
+            "ora": datetime.now().strftime("%H:%M")
+        })
+        
+        return {
+            "successo": True,
+            "inseriti": len(validi),
+            "errori": [],
+            "messaggio": f"{len(validi)} voti in {materia} registrati per la classe {classe}"
+        }
+    
     def visualizza_cronologia(self, limit: int = 10) -> list:
         """Visualizza le ultime voci inserite.
         
@@ -3,10 +3,18 @@ Modulo per interfacce ERP web-based.
 Implementa una dashboard web con Flask per gestione completa del sistema scolastico.
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for, g, send_file
+from markupsafe import Markup
+from itsdangerous import URLSafeTimedSerializer, BadSignature
 from functools import wraps
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from contextlib import nullcontext
+import hashlib
+import math
 import os
+import threading
+import time
 
 # Import dei moduli esistenti
 from anagrafica import Anagrafica
@@ -14,14 +22,19 @@ from insegnanti import GestioneInsegnanti
 from voti import GestioneVoti
 from orari import GestioneOrari
 from analisi import AnalisiDidattica
-from ai.predictive_engine import PredictiveEngine, predictive_engine
-from accesso import GestoreAccessi, Ruolo
+from ai.predictive_engine import PredictiveEngine
+from ai.modello_rischio import (
+    ModelloRischio, NUMPY_AVAILABLE, PERCORSO_MODELLO_RISCHIO, addestra_con_validazione,
+    dataset_da_registro, dati_predittivi_studente
+)
+from accesso import GestoreAccessi, Ruolo, Principale
 from indicatori import CalcolatoreIndicatori
 from report import GeneratoreReport
-from interventi import SimulatoreInterventi
+from report_parallelo import ReportParallelo
+from interventi import SimulatoreInterventi, TipoIntervento, IntensitàIntervento
 from calendario_scolastico import CalendarioScolastico
 from macro_dati import GestoreMacroDati
-from comunicazioni import GestioneComunicazioni
+from comunicazioni import GestioneComunicazioni, TIPO_PER_RUOLO
 from analytics_predittive import AnaliticaPredittiva
 from inserimento_rapido import GestoreInserimentoVeloce
 from amministrativa_school import AmministrativaSchool
@@ -30,104 +43,284 @@ from valutazione_impatto import ValutazioneImpattoEducativo
 from costruttore_corso import CostruttoreCorsoDocente
 from database_manager import DatabaseManager
 from database_integration import DatabaseIntegration
+from scheduler_attivita import SchedulerAttivita
+from coalescenza_richieste import CoalescenzaRichieste
+from stato_condiviso import StatoCondiviso
+from metriche_route import MetricheRoute
+from formati_risposta import CompressioneRisposte, risposta_negoziata
+from rollup_grafici import RollupVoti, RollupPresenze, GRANULARITA, TUTTE
+from realtime.delta_dashboard import CanaleDelta, CalcolatoreDelta
+from widget_dashboard import ContestoDashboard, RegistroWidget
+from avvio_sottosistemi import CronologiaAvvio, Pigro, stato_pigri
+from asset_statici import ManifestoAsset
+from paginazione import CacheFrammenti, pagina_di, parametri_paginazione
+from rischio_incrementale import IndiceRischio
+from statistiche_streaming import StatisticheVoti
+from grafo_indicatori import GrafoIndicatori
+from artefatti_report import ArtefattiReport, MaterializzazioneFallita
+from profili_apprendimento import ProfiliApprendimento
+from simulazione_interventi import SimulatoreMonteCarlo
+from regole_allerte import carica_regole
 
 
 class InterfacciaERP:
     """Interfaccia web ERP per il sistema scolastico."""
     
+    # Validità dei token API (Authorization: Bearer)
+    DURATA_TOKEN_SECONDI = 8 * 3600
+    
+    # Massimo accettato per ?limite= sulle liste di studenti
+    MAX_LIMITE_STUDENTI = 1000
+    
     def __init__(self):
-        """Inizializza l'applicazione Flask."""
-        self.app = Flask(__name__)
-        self.app.secret_key = os.urandom(24)
+        """Inizializza l'applicazione Flask.
         
-        # Inizializza i moduli del sistema
-        self.anagrafica = Anagrafica()
-        self.insegnanti = GestioneInsegnanti()
-        self.voti = GestioneVoti()
-        self.orari = GestioneOrari()
-        self.analisi = AnalisiDidattica(self.anagrafica, self.voti)
-        self.calendario = CalendarioScolastico()
-        self.comunicazioni = GestioneComunicazioni()
-        self.accesso = GestoreAccessi()
+        I sottosistemi non necessari alla prima richiesta (database, backup,
+        report, calendario...) sono costruiti al primo uso: vedi i metodi
+        decorati con @Pigro. I tempi di ogni fase sono in /api/avvio.
+        """
+        self.cronologia_avvio = CronologiaAvvio()
+        self._lock_pigri = threading.RLock()
         
-        # Inizializza analytics (dopo che tutti i moduli sono pronti)
-        self.analytics = None  # Sarà inizializzato dopo il caricamento dati
-        try:
-            self.gestore_macro_dati = GestoreMacroDati(self.anagrafica)
-        except Exception:
-            self.gestore_macro_dati = None
+        with self.cronologia_avvio.fase("flask"):
+            self.app = Flask(__name__)
+            self.app.secret_key = os.urandom(24)
         
-        # Calcolatori
-        self.calcolatore_indicatori = CalcolatoreIndicatori(
-            self.anagrafica, self.voti, self.insegnanti, self.analisi
-        )
+        # Inizializza i moduli del sistema
+        with self.cronologia_avvio.fase("moduli_dati"):
+            self.anagrafica = Anagrafica()
+            self.insegnanti = GestioneInsegnanti()
+            self.voti = GestioneVoti()
+            self.analisi = AnalisiDidattica(self.anagrafica, self.voti)
+            self.comunicazioni = GestioneComunicazioni()
+            self.accesso = GestoreAccessi()
         
-        # Inizializza analytics manualmente (sarà definito dopo)
-        try:
-            self.analytics = AnaliticaPredittiva(
-                self.anagrafica, 
-                self.voti, 
-                self.insegnanti, 
-                self.comunicazioni
+        # Calcolatori
+        with self.cronologia_avvio.fase("indicatori_e_rollup"):
+            self.calcolatore_indicatori = CalcolatoreIndicatori(
+                self.anagrafica, self.voti, self.insegnanti, self.analisi
             )
-        except Exception as e:
-            print(f"⚠️  Analytics non disponibile: {e}")
-            self.analytics = None
+            
+            # Rollup incrementali dei voti per i grafici (aggiornati a ogni voto)
+            self.rollup_voti = RollupVoti(self.voti, self.anagrafica)
+            
+            # Statistiche in streaming per materia, classe e fascia di reddito
+            # (lette da voti.statistiche_materia, analisi e indicatori)
+            self.statistiche_voti = StatisticheVoti(self.voti, self.anagrafica)
+            
+            # Indicatori sintetici su grafo di dipendenze: un voto ricalcola solo la sua classe
+            self.grafo_indicatori = GrafoIndicatori(self.anagrafica, self.voti, self.insegnanti)
+            self.calcolatore_indicatori.grafo = self.grafo_indicatori
         
-        try:
-            self.generatore_report = GeneratoreReport(
-                self.anagrafica, self.voti, self.insegnanti, 
-                self.analisi, self.calcolatore_indicatori
-            )
-        except TypeError:
-            # Fallback se GeneratoreReport non accetta tutti i parametri
-            self.generatore_report = None
-        self.simulatore_interventi = SimulatoreInterventi(
-            self.anagrafica, self.voti
-        )
+        # Inizializza analytics (dopo che tutti i moduli sono pronti)
+        with self.cronologia_avvio.fase("analytics"):
+            # Predizioni: euristica o modello addestrato salvato su disco
+            self.motore_predittivo = PredictiveEngine()
+            self._mtime_modello_rischio = None
+            self._valutazione_modello_rischio = None
+            
+            # Analisi per classe dei report (processi avviati al primo report grande)
+            self.report_parallelo = ReportParallelo()
+            
+            # Rischio per studente ricalcolato solo per gli studenti modificati
+            self.indice_rischio = IndiceRischio(self.anagrafica, self.voti, self.motore_predittivo)
+            
+            try:
+                self.analytics = AnaliticaPredittiva(
+                    self.anagrafica, 
+                    self.voti, 
+                    self.insegnanti, 
+                    self.comunicazioni,
+                    rollup_voti=self.rollup_voti,
+                    indice_rischio=self.indice_rischio,
+                    regole_allerte=carica_regole(),
+                    report_parallelo=self.report_parallelo
+                )
+            except Exception as e:
+                print(f"⚠️  Analytics non disponibile: {e}")
+                self.analytics = None
         
-        # Gestore inserimento rapido voti
-        self.gestore_inserimento_rapido = GestoreInserimentoVeloce(
-            self.anagrafica, self.voti
-        )
+        with self.cronologia_avvio.fase("inserimento_e_amministrativa"):
+            # Gestore inserimento rapido voti
+            self.gestore_inserimento_rapido = GestoreInserimentoVeloce(
+                self.anagrafica, self.voti
+            )
+            
+            # Gestione amministrativa
+            self.amministrativa = AmministrativaSchool()
+            self.rollup_presenze = RollupPresenze(self.amministrativa, self.anagrafica)
         
-        # Gestione amministrativa
-        self.amministrativa = AmministrativaSchool()
+        # Coalescenza dei calcoli costosi richiesti in contemporanea
+        self.coalescenza = CoalescenzaRichieste(timeout_predefinito=60)
         
-        # Gestore backup
-        self.gestore_backup = GestoreBackup()
+        # Store condiviso tra worker (vedi abilita_stato_condiviso e wsgi.py)
+        self.stato_condiviso = None
         
-        # Valutazione impatto educativo
-        self.valutazione_impatto = ValutazioneImpattoEducativo(
-            self.anagrafica, self.voti
-        )
+        # Scheduler attività periodiche (avviato in run())
+        with self.cronologia_avvio.fase("scheduler"):
+            self.scheduler = SchedulerAttivita("scheduler")
+            self._registra_attivita_pianificate()
         
-        # Costruttore corsi digitali
-        self.costruttore_corso = CostruttoreCorsoDocente(
-            self.anagrafica, self.voti
-        )
+        with self.cronologia_avvio.fase("middleware"):
+            # Metriche per route (registrate prima delle routes per misurare anche gli altri hook)
+            self.metriche = MetricheRoute(self.app)
+            
+            # Compressione gzip/brotli delle risposte grandi
+            self.compressione = CompressioneRisposte(self.app, soglia_byte=1024)
+            
+            # File statici con impronta del contenuto e cache immutabile
+            self.asset = ManifestoAsset(self.app)
+        
+        # Delta della dashboard inviati ai client iscritti (SSE / WebSocket)
+        with self.cronologia_avvio.fase("delta_dashboard"):
+            self.canale_dashboard = CanaleDelta()
+            self.delta_dashboard = CalcolatoreDelta(
+                self.canale_dashboard,
+                kpi=self._kpi_dashboard,
+                medie_classi=lambda: self.rollup_voti.medie_per("classe"),
+                allerte=lambda: self.analytics.get_allerte() if self.analytics is not None else []
+            )
+            self.delta_dashboard.osserva_voti(self.voti)
+            self._sorveglianza_attiva = False
+            self._lock_sorveglianza = threading.Lock()
+            # Un solo delta per richiesta anche se la richiesta modifica migliaia di voti
+            self.app.before_request(self.delta_dashboard.apri_lotto)
+            self.app.teardown_request(lambda errore: self.delta_dashboard.chiudi_lotto())
+            self.app.after_request(self._pubblica_delta_dopo_scrittura)
+            # Se impostato (wsgi.py), /api/dashboard/eventi reindirizza allo stream dell'API asincrona
+            self.url_eventi_asincroni: Optional[str] = None
+            
+            # Widget della dashboard calcolabili in un'unica richiesta
+            self._registra_widget_dashboard()
         
-        # Database SQLite per persistenza
-        self.database = DatabaseManager("managerschool.db")
-        self.db_integration = DatabaseIntegration(self.anagrafica, self.voti)
+        # Indici e frammenti HTML delle pagine paginate, validi per una versione dei dati
+        self._cache_pagine = CacheFrammenti(capacita=512)
+        self._modifiche_pagine = 0
+        self.voti.osservatori.append(self._su_modifica_voti_pagine)
+        self.app.after_request(self._invalida_pagine_dopo_scrittura)
         
-        # Crea utenti demo
-        self._crea_utenti_demo()
+        with self.cronologia_avvio.fase("utenti_demo"):
+            self._crea_utenti_demo()
         
         # Registra le routes
-        self._registra_routes()
+        with self.cronologia_avvio.fase("routes"):
+            self._registra_routes()
+        
+        self.cronologia_avvio.segna_pronto()
+    
+    # ============ SOTTOSISTEMI PIGRI ============
+    
+    @Pigro
+    def orari(self):
+        """Gestione orari."""
+        return GestioneOrari()
+    
+    @Pigro
+    def calendario(self):
+        """Calendario scolastico."""
+        return CalendarioScolastico()
+    
+    @Pigro
+    def gestore_macro_dati(self):
+        """Macro-dati territoriali (None se non disponibili)."""
+        try:
+            return GestoreMacroDati()
+        except Exception:
+            return None
+    
+    @Pigro
+    def generatore_report(self):
+        """Generatore dei report annuali e di equità (None se non disponibile)."""
+        try:
+            return GeneratoreReport(
+                self.anagrafica, self.voti, self.insegnanti, 
+                self.analisi, self.calcolatore_indicatori,
+                report_parallelo=self.report_parallelo
+            )
+        except TypeError:
+            # Fallback se GeneratoreReport non accetta tutti i parametri
+            return None
+    
+    @Pigro
+    def simulatore_interventi(self):
+        """Simulatore degli interventi prioritari."""
+        return SimulatoreInterventi(self.anagrafica, self.voti)
+    
+    @Pigro
+    def simulatore_montecarlo(self):
+        """Simulazione Monte Carlo degli interventi e ottimizzazione del budget."""
+        return SimulatoreMonteCarlo(self.anagrafica, self.voti)
+    
+    @Pigro
+    def artefatti_report(self):
+        """Report precomputati e versionati su disco (crea report_artefatti/)."""
+        self._impronta_report = (None, "")
+        artefatti = ArtefattiReport("report_artefatti", versione_dati=self._versione_dati_report)
+        if self.generatore_report is not None:
+            artefatti.registra(
+                "report_annuale", self.generatore_report.report_annuale,
+                descrizione="Report annuale completo", esporta_pdf=self._pdf_report_annuale
+            )
+        if self.analytics is not None:
+            artefatti.registra(
+                "report_ministeriale", self.analytics.genera_report_ministeriale,
+                descrizione="Report ministeriale"
+            )
+        artefatti.registra(
+            "interventi_prioritari", lambda: self.simulatore_interventi.report_interventi_prioritari(10),
+            descrizione="Primi 10 studenti per priorità di intervento"
+        )
+        return artefatti
+    
+    @Pigro
+    def profili_apprendimento(self):
+        """Profili di apprendimento degli studenti (None senza NumPy)."""
+        try:
+            return ProfiliApprendimento(self.anagrafica, self.voti, self.amministrativa, k=5)
+        except RuntimeError:
+            return None
+    
+    @Pigro
+    def gestore_backup(self):
+        """Gestore backup (crea la directory backup/)."""
+        return GestoreBackup()
+    
+    @Pigro
+    def valutazione_impatto(self):
+        """Valutazione impatto educativo."""
+        return ValutazioneImpattoEducativo(self.anagrafica, self.voti)
+    
+    @Pigro
+    def costruttore_corso(self):
+        """Costruttore corsi digitali."""
+        return CostruttoreCorsoDocente(self.anagrafica, self.voti)
+    
+    @Pigro
+    def database(self):
+        """Database SQLite per persistenza (crea managerschool.db)."""
+        return DatabaseManager("managerschool.db")
+    
+    @Pigro
+    def db_integration(self):
+        """Sincronizzazione dei dati in memoria con il database."""
+        return DatabaseIntegration(self.anagrafica, self.voti)
     
     def _crea_utenti_demo(self):
         """Crea utenti demo per testing."""
-        # Controlla se gli utenti esistono già
+        # Controlla se gli utenti esistono già; associato_id è l'ID usato
+        # dalle comunicazioni per il tipo del ruolo (segreteria 1, dirigente 1, ...)
         if "admin" not in self.accesso.utenti:
-            self.accesso.registra_utente("admin", "admin123", Ruolo.AMMINISTRATORE, "Amministratore Sistema")
+            self.accesso.registra_utente("admin", "admin123", Ruolo.AMMINISTRATORE, "Amministratore Sistema",
+                                         associato_id=1)
         if "dirigente" not in self.accesso.utenti:
-            self.accesso.registra_utente("dirigente", "dirigente123", Ruolo.DIRIGENTE, "Dirigente Scolastico")
+            self.accesso.registra_utente("dirigente", "dirigente123", Ruolo.DIRIGENTE, "Dirigente Scolastico",
+                                         associato_id=1)
         if "insegnante" not in self.accesso.utenti:
-            self.accesso.registra_utente("insegnante", "insegnante123", Ruolo.INSEGNANTE, "Prof. Mario Rossi")
+            self.accesso.registra_utente("insegnante", "insegnante123", Ruolo.INSEGNANTE, "Prof. Mario Rossi",
+                                         associato_id=1)
         if "studente" not in self.accesso.utenti:
-            self.accesso.registra_utente("studente", "studente123", Ruolo.STUDENTE, "Studente Demo")
+            self.accesso.registra_utente("studente", "studente123", Ruolo.STUDENTE, "Studente Demo",
+                                         associato_id=1)
     
     def _registra_routes(self):
         """Registra tutte le routes dell'applicazione."""
@@ -147,9 +340,10 @@ class InterfacciaERP:
                 username = request.form.get('username')
                 password = request.form.get('password')
                 
-                if self.accesso.autentica(username, password):
-                    session['username'] = username
-                    session['ruolo'] = self.accesso.get_ruolo_corrente().value
+                utente = self.accesso.verifica_credenziali(username, password)
+                if utente is not None:
+                    session['username'] = utente.username
+                    session['ruolo'] = utente.ruolo.value
                     return redirect(url_for('dashboard'))
                 else:
                     return render_template('login.html', 
@@ -160,10 +354,29 @@ class InterfacciaERP:
         @self.app.route('/logout')
         def logout():
             """Logout."""
-            self.accesso.disconnetti()
             session.clear()
             return redirect(url_for('home'))
         
+        @self.app.route('/api/token', methods=['POST'])
+        def api_token():
+            """API: Rilascia un token firmato per l'header Authorization."""
+            dati = request.get_json(silent=True) or request.form
+            utente = self.accesso.verifica_credenziali(dati.get('username'), dati.get('password'))
+            if utente is None:
+                return jsonify({"errore": "Credenziali non valide"}), 401
+            
+            return jsonify({
+                "token": self._serializzatore_token().dumps(utente.username),
+                "tipo": "Bearer",
+                "scadenza_secondi": self.DURATA_TOKEN_SECONDI
+            })
+        
+        @self.app.route('/api/utente/corrente')
+        @self.richiede_accesso
+        def api_utente_corrente():
+            """API: Identità e permessi dell'utente della richiesta."""
+            return jsonify(g.principale.to_dict())
+        
         # ============ ROUTES DASHBOARD ============
         
         @self.app.route('/dashboard')
@@ -182,7 +395,7 @@ class InterfacciaERP:
             # Ordina gli studenti per classe
             studenti_ordinati = sorted(self.anagrafica.studenti, key=lambda s: s.classe)
             studenti = [s.to_dict() for s in studenti_ordinati]
-            return jsonify(studenti)
+            return risposta_negoziata(studenti)
         
         @self.app.route('/api/studenti/<int:studente_id>')
         @self.richiede_accesso
@@ -216,7 +429,7 @@ class InterfacciaERP:
         def api_insegnanti():
             """API: Lista insegnanti."""
             insegnanti = [i.to_dict() for i in self.insegnanti.insegnanti]
-            return jsonify(insegnanti)
+            return risposta_negoziata(insegnanti)
         
         # ============ API VOTI ============
         
@@ -233,7 +446,7 @@ class InterfacciaERP:
                         "materia": v.materia,
                         "voto": v.voto
                     })
-            return jsonify(voti)
+            return risposta_negoziata(voti)
         
         # ============ API ANALISI ============
         
@@ -258,21 +471,54 @@ class InterfacciaERP:
             correl = self.analisi.correlazione_reddito_rendimento()
             return jsonify(correl)
         
+        @self.app.route('/api/analisi/statistiche')
+        @self.richiede_accesso
+        def api_statistiche_streaming():
+            """API: Statistiche dei voti per materia, classe e fascia di reddito."""
+            return jsonify(self.statistiche_voti.riepilogo())
+        
+        @self.app.route('/api/analisi/completa')
+        @self.richiede_accesso
+        def api_analisi_completa():
+            """API: Analisi completa del sistema scolastico."""
+            analisi = self._calcolo_condiviso(
+                "analisi_completa",
+                lambda: self.coalescenza.esegui(
+                    "analisi_completa", self.analisi.analisi_completa, self.insegnanti
+                )
+            )
+            return jsonify(analisi)
+        
         # ============ API INDICATORI ============
         
         @self.app.route('/api/indicatori')
         @self.richiede_permesso("visualizza_indicatori_privati")
         def api_indicatori():
             """API: Tutti gli indicatori sintetici."""
-            quadro = self.calcolatore_indicatori.quadro_indicatori_completo()
-            return jsonify({
-                k: {
-                    "nome": v.nome,
-                    "valore": v.valore,
-                    "componenti": v.componenti
-                }
-                for k, v in quadro.items()
-            })
+            return jsonify(self._quadro_indicatori())
+        
+        @self.app.route('/api/indicatori/incertezza')
+        @self.richiede_permesso("visualizza_indicatori_privati")
+        def api_indicatori_incertezza():
+            """API: Intervalli di confidenza e p-value degli indicatori di equità e qualità."""
+            ricampionamenti = max(0, min(request.args.get('ricampionamenti', 1000, type=int), 5000))
+            try:
+                risultato = self.calcolatore_indicatori.incertezza_indicatori(
+                    classe=request.args.get('classe') or None,
+                    ricampionamenti=ricampionamenti,
+                    permutazioni=ricampionamenti,
+                    seed=request.args.get('seed', 0, type=int),
+                    budget_secondi=10.0
+                )
+            except ValueError as e:
+                return jsonify({"errore": str(e)}), 404
+            return jsonify(risultato)
+        
+        @self.app.route('/api/indicatori/profilo')
+        @self.richiede_permesso("visualizza_indicatori_privati")
+        def api_indicatori_profilo():
+            """API: Tempi di calcolo e ricalcoli di ogni nodo del grafo degli indicatori."""
+            return jsonify(self.grafo_indicatori.profilo())
         
         @self.app.route('/api/indicatori/<indice_name>')
         @self.richiede_permesso("visualizza_indicatori_privati")
@@ -301,8 +547,15 @@ class InterfacciaERP:
         @self.app.route('/api/report/annuale')
         @self.richiede_permesso("visualizza_report_completi")
         def api_report_annuale():
-            """API: Report annuale."""
-            report = self.generatore_report.report_annuale()
+            """API: Report annuale (precomputato, ricalcolato solo se i dati sono cambiati)."""
+            return self._risposta_artefatto("report_annuale")
+        
+        @self.app.route('/api/report/classi')
+        @self.richiede_permesso("visualizza_report_completi")
+        def api_report_classi():
+            """API: Report per classe (?classi=1A,2B; default tutte), analizzati in parallelo."""
+            classi = [c.strip() for c in request.args.get('classi', '').split(',') if c.strip()]
+            report = self.generatore_report.report_classi(classi or None)
             return jsonify(report)
         
         @self.app.route('/api/report/equita')
@@ -312,6 +565,120 @@ class InterfacciaERP:
             report = self.generatore_report.report_equita_educativa()
             return jsonify(report)
         
+        @self.app.route('/api/report/artefatti')
+        @self.richiede_permesso("visualizza_report_completi")
+        def api_artefatti_report():
+            """API: Report precomputati, ultima versione e freschezza."""
+            return jsonify(self.artefatti_report.stato())
+        
+        @self.app.route('/api/report/artefatti/materializza', methods=['POST'])
+        @self.richiede_permesso("visualizza_report_completi")
+        def api_materializza_report():
+            """API: Precalcola subito i report (json opzionale: nomi, forza)."""
+            dati = request.get_json(silent=True) or {}
+            try:
+                esiti = self.artefatti_report.materializza(dati.get("nomi") or None, bool(dati.get("forza")))
+            except KeyError as e:
+                return jsonify({"errore": e.args[0]}), 404
+            return jsonify(esiti)
+        
+        @self.app.route('/api/report/artefatti/<nome>')
+        @self.richiede_permesso("visualizza_report_completi")
+        def api_artefatto_report(nome):
+            """API: Una versione di un report (?versione=N, default l'ultima) con i metadati."""
+            try:
+                return jsonify(self.artefatti_report.ottieni(nome, request.args.get('versione', type=int)))
+            except KeyError as e:
+                return jsonify({"errore": e.args[0]}), 404
+            except MaterializzazioneFallita as e:
+                return jsonify({"errore": str(e)}), 500
+        
+        @self.app.route('/api/report/artefatti/<nome>/versioni')
+        @self.richiede_permesso("visualizza_report_completi")
+        def api_versioni_report(nome):
+            """API: Versioni salvate di un report."""
+            try:
+                return jsonify(self.artefatti_report.versioni(nome))
+            except KeyError as e:
+                return jsonify({"errore": e.args[0]}), 404
+        
+        @self.app.route('/api/report/artefatti/<nome>/differenze')
+        @self.richiede_permesso("visualizza_report_completi")
+        def api_differenze_report(nome):
+            """API: Differenze tra due versioni (?da=N&a=M, default le ultime due)."""
+            try:
+                return jsonify(self.artefatti_report.differenze(
+                    nome, request.args.get('da', type=int), request.args.get('a', type=int)
+                ))
+            except KeyError as e:
+                return jsonify({"errore": e.args[0]}), 404
+        
+        @self.app.route('/api/report/artefatti/<nome>/pdf')
+        @self.richiede_permesso("visualizza_report_completi")
+        def api_pdf_report(nome):
+            """API: PDF di una versione del report, se esportato."""
+            try:
+                percorso = self.artefatti_report.percorso_pdf(nome, request.args.get('versione', type=int))
+            except KeyError as e:
+                return jsonify({"errore": e.args[0]}), 404
+            if percorso is None:
+                return jsonify({"errore": "PDF non disponibile"}), 404
+            return send_file(os.path.abspath(percorso), mimetype='application/pdf',
+                             download_name=f"{nome}.pdf")
+        
+        # ============ API PROFILI DI APPRENDIMENTO ============
+        
+        @self.app.route('/api/profili-apprendimento')
+        @self.richiede_permesso("visualizza_report_completi")
+        def api_profili_apprendimento():
+            """API: Profili di apprendimento (sola lettura, vedi /addestra)."""
+            errore = self._profili_non_leggibili()
+            if errore is not None:
+                return errore
+            return jsonify(self.profili_apprendimento.riepilogo())
+        
+        @self.app.route('/api/profili-apprendimento/addestra', methods=['POST'])
+        @self.richiede_permesso("visualizza_report_completi")
+        def api_addestra_profili_apprendimento():
+            """API: Riaddestra i profili sui dati correnti (json opzionale: k)."""
+            if self.profili_apprendimento is None:
+                return jsonify({"errore": "Profili di apprendimento non disponibili (NumPy assente)"}), 503
+            k = (request.get_json(silent=True) or {}).get('k')
+            try:
+                return jsonify(self.profili_apprendimento.addestra(max(1, min(int(k), 12)) if k else None))
+            except (TypeError, ValueError) as e:
+                return jsonify({"errore": str(e)}), 400
+        
+        @self.app.route('/api/profili-apprendimento/studente/<int:id_studente>')
+        @self.richiede_permesso("visualizza_report_completi")
+        def api_profilo_apprendimento_studente(id_studente):
+            """API: Profilo di uno studente (i nuovi studenti vengono assegnati al volo)."""
+            errore = self._profili_non_leggibili()
+            if errore is not None:
+                return errore
+            try:
+                profilo = self.profili_apprendimento.profilo_studente(id_studente)
+            except ValueError as e:
+                return jsonify({"errore": str(e)}), 400
+            if profilo is None:
+                return jsonify({"errore": "Studente non trovato"}), 404
+            return jsonify(profilo)
+        
+        @self.app.route('/api/profili-apprendimento/<int:profilo>/studenti')
+        @self.richiede_permesso("visualizza_report_completi")
+        def api_studenti_profilo_apprendimento(profilo):
+            """API: Studenti di un profilo, per indirizzare gli interventi."""
+            errore = self._profili_non_leggibili()
+            if errore is not None:
+                return errore
+            limite = self._parametro_limite(100, self.MAX_LIMITE_STUDENTI)
+            if limite is None:
+                return jsonify({"errore": f"limite deve essere un intero tra 1 e {self.MAX_LIMITE_STUDENTI}"}), 400
+            try:
+                return jsonify(self.profili_apprendimento.studenti_profilo(profilo, limite))
+            except ValueError as e:
+                return jsonify({"errore": str(e)}), 404
+        
         # ============ API INTERVENTI ============
         
         @self.app.route('/api/interventi/prioritari')
@@ -319,9 +686,62 @@ class InterfacciaERP:
         def api_interventi_prioritari():
             """API: Studenti prioritari per interventi."""
             limit = request.args.get('limit', 10, type=int)
+            if limit == 10:
+                return self._risposta_artefatto("interventi_prioritari")
             report = self.simulatore_interventi.report_interventi_prioritari(limit)
             return jsonify(report)
         
+        @self.app.route('/api/interventi/simula-classe')
+        @self.richiede_permesso("visualizza_report_completi")
+        def api_interventi_simula_classe():
+            """API: Effetto di un intervento su una classe con intervalli di incertezza."""
+            try:
+                tipo = TipoIntervento[request.args.get('tipo', 'INTERVENTO_COMPLETO')]
+                intensità = IntensitàIntervento[request.args.get('intensita', 'MEDIA')]
+            except KeyError:
+                return jsonify({"errore": "Tipo o intensità non validi"}), 400
+            try:
+                scenario = self.simulatore_montecarlo.simula_intervento_classe(
+                    request.args.get('classe', ''), tipo, intensità
+                )
+            except ValueError as e:
+                return jsonify({"errore": str(e)}), 404
+            return jsonify(scenario)
+        
+        @self.app.route('/api/interventi/ottimizza', methods=['POST'])
+        @self.richiede_permesso("visualizza_report_completi")
+        def api_interventi_ottimizza():
+            """API: Distribuzione di un budget tra studenti e interventi."""
+            dati = request.get_json(silent=True) or {}
+            classe = dati.get('classe')
+            if classe and not self.anagrafica.studenti_per_classe(classe):
+                return jsonify({"errore": f"Classe {classe} non trovata"}), 404
+            limite = self._parametro_limite(100, self.MAX_LIMITE_STUDENTI)
+            if limite is None:
+                return jsonify({"errore": f"limite deve essere un intero tra 1 e {self.MAX_LIMITE_STUDENTI}"}), 400
+            try:
+                budget = float(dati.get('budget', 0))
+                min_fragilita = float(dati.get('min_fragilita', 0))
+            except (TypeError, ValueError):
+                return jsonify({"errore": "budget e min_fragilita devono essere numeri"}), 400
+            # float() accetta "nan" e "inf": rifiutati prima dell'ottimizzazione
+            if not math.isfinite(budget) or budget < 0:
+                return jsonify({"errore": "budget deve essere un numero finito non negativo"}), 400
+            if not math.isfinite(min_fragilita):
+                return jsonify({"errore": "min_fragilita deve essere un numero finito"}), 400
+            try:
+                piano = self.simulatore_montecarlo.ottimizza_budget(
+                    budget,
+                    obiettivo=dati.get('obiettivo', 'voti'),
+                    classe=classe,
+                    min_fragilita=min_fragilita
+                )
+            except (TypeError, ValueError) as e:
+                return jsonify({"errore": str(e)}), 400
+            risultato = piano.to_dict()
+            risultato["assegnazioni"] = risultato["assegnazioni"][:limite]
+            return jsonify(risultato)
+        
         # ============ API MACRO-DATI ============
         
         @self.app.route('/api/macro-dati')
@@ -426,79 +846,79 @@ class InterfacciaERP:
                 # Materie complete come nelle pagelle reali
                 materie = ["Matematica", "Italiano", "Inglese", "Storia", "Educazione Fisica", "Religione"]
                 
-                # Pulisci voti e pagelle esistenti per rigenerare
-                self.voti.voti.clear()
-                self.voti.pagelle.clear()
+                # Un'unica transazione: gli altri worker vedono tutto o niente
+                with self._transazione_dati():
+                    # Pulisci voti e pagelle esistenti per rigenerare
+                    self.voti.azzera()
                 
-                voti_creati = 0
-                pagelle_create = 0
+                    voti_creati = 0
+                    pagelle_create = 0
                 
-                # Genera voti per ogni studente
-                for studente in self.anagrafica.studenti:
-                    for materia in materie:
-                        import random
-                        n_voti = random.randint(2, 6)
+                    # Genera voti per ogni studente
+                    for studente in self.anagrafica.studenti:
+                        for materia in materie:
+                            import random
+                            n_voti = random.randint(2, 6)
                         
-                        for _ in range(n_voti):
-                            # Voto influenzato dalla fragilità sociale
-                            base = 6.5 - (studente.fragilità_sociale / 100)
+                            for _ in range(n_voti):
+                                # Voto influenzato dalla fragilità sociale
+                                base = 6.5 - (studente.fragilità_sociale / 100)
                             
-                            # Aggiustamenti per materie specifiche
-                            if materia == "Educazione Fisica":
-                                base += 0.4
-                            elif materia == "Religione":
-                                base += 0.3
-                            elif materia == "Matematica":
-                                base -= 0.2  # Matematica più difficile
+                                # Aggiustamenti per materie specifiche
+                                if materia == "Educazione Fisica":
+                                    base += 0.4
+                                elif materia == "Religione":
+                                    base += 0.3
+                                elif materia == "Matematica":
+                                    base -= 0.2  # Matematica più difficile
                             
-                            # Variazione casuale
-                            variazione = random.uniform(-1.0, 1.0)
-                            voto_finale = max(3.0, min(10.0, base + variazione))
+                                # Variazione casuale
+                                variazione = random.uniform(-1.0, 1.0)
+                                voto_finale = max(3.0, min(10.0, base + variazione))
                             
-                            # Crea voto
-                            import datetime
-                            giorni_fa = random.randint(1, 90)
-                            data = datetime.datetime.now() - datetime.timedelta(days=giorni_fa)
+                                # Crea voto
+                                giorni_fa = random.randint(1, 90)
+                                data = datetime.now() - timedelta(days=giorni_fa)
                             
-                            self.voti.aggiungi_voto(
-                                studente.id, 
-                                materia, 
-                                round(voto_finale, 1),
-                                random.choice(["Prova scritta", "Prova orale", "Verifica"]),
-                                data.strftime("%Y-%m-%d")
-                            )
-                            voti_creati += 1
+                                self.voti.aggiungi_voto(
+                                    studente.id, 
+                                    materia, 
+                                    round(voto_finale, 1),
+                                    random.choice(["Prova scritta", "Prova orale", "Verifica"]),
+                                    data.strftime("%Y-%m-%d")
+                                )
+                                voti_creati += 1
                 
-                # Crea pagelle per tutti gli studenti
-                for studente in self.anagrafica.studenti:
-                    # Genera voto di condotta basato sulla fragilità
-                    condotta_base = 9.0 - (studente.fragilità_sociale / 50)
-                    condotta = max(6.0, min(10.0, condotta_base + random.uniform(-0.3, 0.2)))
+                    # Crea pagelle per tutti gli studenti
+                    for studente in self.anagrafica.studenti:
+                        # Genera voto di condotta basato sulla fragilità
+                        condotta_base = 9.0 - (studente.fragilità_sociale / 50)
+                        condotta = max(6.0, min(10.0, condotta_base + random.uniform(-0.3, 0.2)))
                     
-                    # Genera assenze correlate alla fragilità
-                    assenze_base = int(studente.fragilità_sociale / 10)
-                    assenze = random.randint(max(0, assenze_base - 2), assenze_base + 6)
+                        # Genera assenze correlate alla fragilità
+                        assenze_base = int(studente.fragilità_sociale / 10)
+                        assenze = random.randint(max(0, assenze_base - 2), assenze_base + 6)
                     
-                    # Note basate sul rendimento
-                    media = self.voti.media_studente(studente.id)
-                    if media >= 8.0:
-                        note = "Ottimo rendimento e partecipazione attiva"
-                    elif media >= 7.0:
-                        note = "Buon rendimento generale"
-                    elif media >= 6.0:
-                        note = "Rendimento sufficiente"
-                    else:
-                        note = "Necessita di maggiore impegno e supporto"
+                        # Note basate sul rendimento
+                        media = self.voti.media_studente(studente.id)
+                        if media >= 8.0:
+                            note = "Ottimo rendimento e partecipazione attiva"
+                        elif media >= 7.0:
+                            note = "Buon rendimento generale"
+                        elif media >= 6.0:
+                            note = "Rendimento sufficiente"
+                        else:
+                            note = "Necessita di maggiore impegno e supporto"
                     
-                    # Crea pagella
-                    pagella = self.voti.crea_pagella(
-                        studente.id,
-                        quadrimestre=1,
-                        assenze=assenze,
-                        comportamento=round(condotta, 1),
-                        note=note
-                    )
-                    pagelle_create += 1
+                        # Crea pagella
+                        pagella = self.voti.crea_pagella(
+                            studente.id,
+                            quadrimestre=1,
+                            assenze=assenze,
+                            comportamento=round(condotta, 1),
+                            note=note
+                        )
+                        pagelle_create += 1
                 
                 return jsonify({
                     "successo": True,
@@ -520,13 +940,24 @@ class InterfacciaERP:
         @self.app.route('/api/pagelle')
         @self.richiede_accesso
         def api_pagelle():
-            """API: Lista tutte le pagelle create."""
-            pagelle_data = []
+            """API: Lista tutte le pagelle create.
             
-            for pagella in self.voti.pagelle:
-                # Trova lo studente corrispondente
-                studente = next((s for s in self.anagrafica.studenti if s.id == pagella.id_studente), None)
-                
+            Con ?pagina= (e opzionali per_pagina, classe) restituisce una pagina
+            ordinata per classe e cognome con i metadati di paginazione.
+            """
+            if 'pagina' in request.args:
+                numero, per_pagina = parametri_paginazione(request.args, per_pagina_predefinito=20)
+                classe = request.args.get('classe', '').strip()
+                indice = self._indice_pagelle()
+                coppie = indice["per_classe"].get(classe, []) if classe else indice["ordinate"]
+                pagina = pagina_di(coppie, numero, per_pagina)
+            else:
+                studenti_per_id = {s.id: s for s in self.anagrafica.studenti}
+                coppie = [(studenti_per_id.get(p.id_studente), p) for p in self.voti.pagelle]
+                pagina = None
+            
+            pagelle_data = []
+            for studente, pagella in (pagina.elementi if pagina else coppie):
                 if studente:
                     pagelle_data.append({
                         "studente": {
@@ -546,6 +977,8 @@ class InterfacciaERP:
                         }
                     })
             
+            if pagina is not None:
+                return jsonify({"pagelle": pagelle_data, **pagina.to_dict()})
             return jsonify(pagelle_data)
         
         @self.app.route('/api/pagelle/studente/<int:studente_id>')
@@ -641,8 +1074,10 @@ class InterfacciaERP:
         @self.richiede_accesso
         def api_comunicazioni():
             """API: Lista comunicazioni per l'utente corrente."""
-            user_id = session.get('user_id', 1)  # Default per demo
-            tipo_utente = session.get('ruolo', 'admin')
+            identita = self._identita_comunicazioni()
+            if identita is None:
+                return self._risposta_senza_identita_comunicazioni()
+            user_id, tipo_utente = identita
             
             solo_non_lette = request.args.get('non_lette', 'false').lower() == 'true'
             
@@ -656,11 +1091,14 @@ class InterfacciaERP:
         @self.richiede_accesso
         def api_invia_comunicazione():
             """API: Invia nuova comunicazione."""
+            identita = self._identita_comunicazioni()
+            if identita is None:
+                return self._risposta_senza_identita_comunicazioni()
             data = request.get_json()
             
             comunicazione = self.comunicazioni.crea_comunicazione(
-                mittente_id=session.get('user_id', 1),
-                mittente_tipo=session.get('ruolo', 'admin'),
+                mittente_id=identita[0],
+                mittente_tipo=identita[1],
                 destinatario_id=data['destinatario_id'],
                 destinatario_tipo=data['destinatario_tipo'],
                 oggetto=data['oggetto'],
@@ -678,9 +1116,11 @@ class InterfacciaERP:
         @self.richiede_accesso
         def api_leggi_comunicazione(comunicazione_id):
             """API: Marca comunicazione come letta."""
-            user_id = session.get('user_id', 1)
+            identita = self._identita_comunicazioni()
+            if identita is None:
+                return self._risposta_senza_identita_comunicazioni()
             
-            successo = self.comunicazioni.marca_come_letta(comunicazione_id, user_id)
+            successo = self.comunicazioni.marca_come_letta(comunicazione_id, *identita)
             
             return jsonify({
                 "successo": successo,
@@ -691,12 +1131,15 @@ class InterfacciaERP:
         @self.richiede_accesso
         def api_rispondi_comunicazione(comunicazione_id):
             """API: Risponde a una comunicazione."""
+            identita = self._identita_comunicazioni()
+            if identita is None:
+                return self._risposta_senza_identita_comunicazioni()
             data = request.get_json()
             
             risposta = self.comunicazioni.crea_risposta(
                 comunicazione_originale_id=comunicazione_id,
-                mittente_id=session.get('user_id', 1),
-                mittente_tipo=session.get('ruolo', 'admin'),
+                mittente_id=identita[0],
+                mittente_tipo=identita[1],
                 messaggio=data['messaggio']
             )
             
@@ -754,17 +1197,16 @@ class InterfacciaERP:
         @self.richiede_accesso
         def api_report_ministeriale():
             """API: Genera report ministeriale completo."""
-            if not self.analytics:
+            if self.analytics is None:
                 return jsonify({"errore": "Analytics non disponibile"}), 503
             
-            report = self.analytics.genera_report_ministeriale()
-            return jsonify(report)
+            return self._risposta_artefatto("report_ministeriale")
         
         @self.app.route('/api/analytics/studenti-rischio')
         @self.richiede_accesso
         def api_studenti_rischio():
             """API: Lista studenti a rischio."""
-            if not self.analytics:
+            if self.analytics is None:
                 return jsonify({"errore": "Analytics non disponibile"}), 503
             
             soglia = request.args.get('soglia', 5.5, type=float)
@@ -775,7 +1217,7 @@ class InterfacciaERP:
         @self.richiede_accesso
         def api_allerte():
             """API: Lista allerte attive."""
-            if not self.analytics:
+            if self.analytics is None:
                 return jsonify({"errore": "Analytics non disponibile"}), 503
             
             solo_attive = request.args.get('solo_attive', 'true').lower() == 'true'
@@ -786,7 +1228,7 @@ class InterfacciaERP:
         @self.richiede_accesso
         def api_genera_allerte():
             """API: Genera allerte automatiche."""
-            if not self.analytics:
+            if self.analytics is None:
                 return jsonify({"errore": "Analytics non disponibile"}), 503
             
             nuove_allerte = self.analytics.genera_allerte_automatiche()
@@ -796,11 +1238,24 @@ class InterfacciaERP:
                 "allerte": [a.to_dict() for a in nuove_allerte]
             })
         
+        @self.app.route('/api/analytics/allerte/<int:id_allerta>/risolvi', methods=['POST'])
+        @self.richiede_accesso
+        def api_risolvi_allerta(id_allerta):
+            """API: Chiude un'allerta con le azioni intraprese."""
+            if self.analytics is None:
+                return jsonify({"errore": "Analytics non disponibile"}), 503
+            
+            dati = request.get_json(silent=True) or {}
+            allerta = self.analytics.risolvi_allerta(id_allerta, dati.get("note_azione", ""))
+            if allerta is None:
+                return jsonify({"errore": "Allerta non trovata o già risolta"}), 404
+            return jsonify({"successo": True, "allerta": allerta.to_dict()})
+        
         @self.app.route('/api/analytics/trend-rendimento')
         @self.richiede_accesso
         def api_trend_rendimento():
             """API: Trend rendimento studenti."""
-            if not self.analytics:
+            if self.analytics is None:
                 return jsonify({"errore": "Analytics non disponibile"}), 503
             
             giorni = request.args.get('giorni', 30, type=int)
@@ -811,7 +1266,7 @@ class InterfacciaERP:
         @self.richiede_accesso
         def api_statistiche_scuola():
             """API: Statistiche generali della scuola."""
-            if not self.analytics:
+            if self.analytics is None:
                 return jsonify({"errore": "Analytics non disponibile"}), 503
             
             return jsonify({
@@ -826,7 +1281,7 @@ class InterfacciaERP:
         @self.richiede_accesso
         def api_distribuzione_classi():
             """API: Distribuzione performance per classe."""
-            if not self.analytics:
+            if self.analytics is None:
                 return jsonify({"errore": "Analytics non disponibile"}), 503
             
             distribuzione = self.analytics._analizza_distribuzione_classi()
@@ -837,11 +1292,28 @@ class InterfacciaERP:
         @self.app.route('/studenti')
         @self.richiede_accesso
         def pagina_studenti():
-            """Pagina studenti."""
-            # Ordina gli studenti per classe prima di convertirli in dizionari
-            studenti_ordinati = sorted(self.anagrafica.studenti, key=lambda s: s.classe)
-            studenti = [s.to_dict() for s in studenti_ordinati]
-            return render_template('studenti.html', studenti=studenti)
+            """Pagina studenti (paginata, filtri ?classe= e ?q=)."""
+            numero, per_pagina = parametri_paginazione(request.args)
+            classe = request.args.get('classe', '').strip()
+            cerca = request.args.get('q', '').strip().lower()
+            indice = self._indice_studenti()
+            
+            def tabella():
+                pagina = pagina_di(self._studenti_filtrati(classe, cerca), numero, per_pagina)
+                gruppi = {}
+                for studente in pagina.elementi:
+                    gruppi.setdefault(studente.classe, []).append(studente.to_dict())
+                return render_template('_tabella_studenti.html', pagina=pagina, gruppi=gruppi,
+                                       parametri=self._parametri_pagina(classe=classe, q=cerca, per_pagina=per_pagina))
+            
+            return render_template(
+                'studenti.html',
+                totale=len(indice["ordinati"]),
+                classi=indice["classi"],
+                classe=classe,
+                cerca=cerca,
+                tabella=self._frammento(('studenti', classe, cerca, numero, per_pagina), tabella)
+            )
         
         @self.app.route('/insegnanti')
         @self.richiede_accesso
@@ -851,25 +1323,66 @@ class InterfacciaERP:
             return render_template('insegnanti.html', insegnanti=insegnanti)
         
         @self.app.route('/voti')
+        @self.app.route('/pagelle')
         @self.richiede_accesso
         def pagina_voti():
-            """Pagina voti."""
-            return render_template('voti.html')
+            """Pagina voti e pagelle (paginata, filtro ?classe=)."""
+            numero, per_pagina = parametri_paginazione(request.args, per_pagina_predefinito=20)
+            classe = request.args.get('classe', '').strip()
+            indice = self._indice_pagelle()
+            
+            def elenco():
+                righe = indice["per_classe"].get(classe, []) if classe else indice["ordinate"]
+                pagina = pagina_di(righe, numero, per_pagina)
+                gruppi = {}
+                for studente, pagella in pagina.elementi:
+                    gruppi.setdefault(studente.classe, []).append((studente, pagella))
+                return render_template('_pagelle.html', pagina=pagina, gruppi=gruppi,
+                                       parametri=self._parametri_pagina(classe=classe, per_pagina=per_pagina))
+            
+            return render_template(
+                'voti.html',
+                totale_pagelle=len(indice["ordinate"]),
+                classi=indice["classi"],
+                classe=classe,
+                elenco_pagelle=self._frammento(('pagelle', classe, numero, per_pagina), elenco)
+            )
         
         @self.app.route('/analisi')
         @self.richiede_accesso
         def pagina_analisi():
-            """Pagina analisi."""
-            graduatoria = self.analisi.graduatoria_studenti()[:20]
-            return render_template('analisi.html', graduatoria=graduatoria)
+            """Pagina analisi: graduatoria paginata (la prima pagina è la top 20)."""
+            numero, per_pagina = parametri_paginazione(request.args, per_pagina_predefinito=20)
+            classe = request.args.get('classe', '').strip()
+            
+            def graduatoria():
+                righe = self._graduatoria_pagine()
+                if classe:
+                    righe = self._cache_pagine.ottieni(
+                        ('graduatoria_classe', classe), self._versione_pagine(),
+                        lambda: [r for r in self._graduatoria_pagine() if r["classe"] == classe]
+                    )
+                return render_template('_graduatoria.html', pagina=pagina_di(righe, numero, per_pagina),
+                                       parametri=self._parametri_pagina(classe=classe, per_pagina=per_pagina))
+            
+            return render_template(
+                'analisi.html',
+                classi=self._indice_studenti()["classi"],
+                classe=classe,
+                graduatoria=self._frammento(('graduatoria', classe, numero, per_pagina), graduatoria)
+            )
         
         @self.app.route('/indicatori')
         @self.richiede_accesso
         def pagina_indicatori():
             """Pagina indicatori."""
             try:
-                quadro = self.calcolatore_indicatori.quadro_indicatori_completo()
-                sintesi = self.calcolatore_indicatori.sintesi_indicatori()
+                quadro = self.coalescenza.esegui(
+                    "quadro_indicatori", self.calcolatore_indicatori.quadro_indicatori_completo
+                )
+                sintesi = self.coalescenza.esegui(
+                    "sintesi_indicatori", self.calcolatore_indicatori.sintesi_indicatori
+                )
             except (AttributeError, TypeError) as e:
                 quadro = {}
                 sintesi = {}
@@ -914,8 +1427,8 @@ class InterfacciaERP:
             data = request.get_json()
             frase = data.get('frase', '')
             
-            # Preleva dati utente dalla sessione
-            docente = session.get('username', 'Docente')
+            # Docente dal principale della richiesta (sessione o token)
+            docente = g.principale.username
             classe_corrente = request.args.get('classe', 'ClasseX')
             
             # Usa il gestore inserimento veloce
@@ -925,6 +1438,32 @@ class InterfacciaERP:
             
             return jsonify(risultato)
         
+        @self.app.route('/api/voti/classe', methods=['POST'])
+        @self.richiede_permesso("gestione_voti")
+        def api_voti_classe():
+            """API: Inserisce in un unico lotto i voti di una verifica di classe.
+            
+            Corpo JSON: {"classe", "materia", "data", "tipo",
+            "voti": [{"id_studente", "voto", "note"}]}. Tutto o niente:
+            con righe non valide risponde 422 con gli errori per riga, con un
+            corpo malformato (voti non lista di oggetti) risponde 400.
+            """
+            dati_lotto = request.get_json(silent=True) or {}
+            righe = dati_lotto.get('voti') if isinstance(dati_lotto, dict) else None
+            if not isinstance(righe, list) or not all(isinstance(riga, dict) for riga in righe):
+                return jsonify({"errore": "Il campo 'voti' deve essere una lista di oggetti"}), 400
+            
+            with self._transazione_dati():
+                risultato = self.gestore_inserimento_rapido.inserisci_voti_classe(
+                    classe=dati_lotto.get('classe', ''),
+                    materia=dati_lotto.get('materia', ''),
+                    righe=righe,
+                    tipo=dati_lotto.get('tipo') or "Prova scritta",
+                    data=dati_lotto.get('data'),
+                    docente=g.principale.nome_completo
+                )
+            return jsonify(risultato), 200 if risultato["successo"] else 422
+        
         @self.app.route('/api/inserimento-rapido/cronologia')
         @self.richiede_accesso
         def api_cronologia_inserimenti():
@@ -973,13 +1512,7 @@ class InterfacciaERP:
         @self.richiede_permesso("gestione_studenti")
         def api_backup_crea():
             """API: Crea nuovo backup."""
-            from main import RegistroScolastico
-            registro = RegistroScolastico()
-            registro.anagrafica = self.anagrafica
-            registro.voti = self.voti
-            registro.insegnanti = self.insegnanti
-            
-            filepath = self.gestore_backup.salva_backup(registro)
+            filepath = self.gestore_backup.salva_backup(self._registro_corrente())
             return jsonify({"successo": True, "filepath": filepath})
         
         # ============ API VALUTAZIONE IMPATTO ============
@@ -1078,8 +1611,6 @@ class InterfacciaERP:
         @self.richiede_accesso
         def api_predict_studente():
             """API: Predizione per studente."""
-            from ai.predictive_engine import predictive_engine
-            
             studente_id = request.args.get('studente_id', type=int)
             if not studente_id:
                 return jsonify({"errore": "studente_id mancante"}), 400
@@ -1093,15 +1624,8 @@ class InterfacciaERP:
             voti_oggetti = self.voti.voti_studente(studente_id)
             voti = [v.voto for v in voti_oggetti]
             
-            # Crea dati studente
-            studente_data = {
-                'fragilita': getattr(studente, 'fragilita', 50),
-                'assenze_rate': 0.1,  # Da implementare
-                'interventi_count': 0  # Da implementare
-            }
-            
             # Predizione
-            predizione = predictive_engine.predict_complete(studente_data, voti)
+            predizione = self._motore_predittivo().predict_complete(dati_predittivi_studente(studente), voti)
             
             return jsonify({
                 'studente_id': studente_id,
@@ -1116,69 +1640,363 @@ class InterfacciaERP:
         @self.richiede_accesso
         def api_early_warning():
             """API: Sistema early warning."""
-            from ai.predictive_engine import predictive_engine
-            
-            # Prepara dati classi
-            classi_dict = {}
-            for studente in self.anagrafica.studenti:
-                classe = studente.classe
-                if classe not in classi_dict:
-                    classi_dict[classe] = {'classe': classe, 'studenti': []}
-                
-                voti = [v.voto for v in self.voti.voti_studente(studente.id)]
-                studente_data = {
-                    'nome_completo': studente.nome_completo,
-                    'fragilita': getattr(studente, 'fragilita', 50),
-                    'voti': voti
-                }
-                classi_dict[classe]['studenti'].append(studente_data)
+            # Ricarica un modello aggiornato da un altro worker (l'indice ricalcola tutti)
+            self._motore_predittivo()
+            limite = min(max(request.args.get('limite', 20, type=int), 0), 200)
             
-            # Predizione early warning
-            warning_list = predictive_engine.early_warning_system(list(classi_dict.values()))
+            # Predizione early warning: solo gli studenti modificati, primi N dall'indice ordinato
+            warning_list = self.indice_rischio.early_warning(limite)
             
             return jsonify({
-                'totale_warning': len(warning_list),
-                'warning_list': warning_list[:20]  # Max 20
+                'totale_warning': self.indice_rischio.totale_early_warning(),
+                'warning_list': warning_list
+            })
+        
+        @self.app.route('/api/ai/modello-rischio')
+        @self.richiede_accesso
+        def api_modello_rischio():
+            """API: Modello di rischio attivo e metriche dell'ultimo addestramento."""
+            modello = self._motore_predittivo().models.get('rischio')
+            if modello is None:
+                return jsonify({"modello": None, "euristica": True})
+            dati = modello.to_dict()
+            return jsonify({
+                "modello": {c: dati[c] for c in ("tipo", "feature", "pesi", "bias",
+                                                 "esempi_visti", "aggiornamenti", "versione")},
+                "euristica": False,
+                "valutazione": self._valutazione_modello_rischio
             })
         
+        @self.app.route('/api/ai/modello-rischio/addestra', methods=['POST'])
+        @self.richiede_permesso("modifica_configurazione")
+        def api_addestra_modello_rischio():
+            """API: Addestra il modello sugli esiti delle pagelle (default: fine anno)."""
+            if not NUMPY_AVAILABLE:
+                return jsonify({"errore": "NumPy non disponibile"}), 503
+            dati = request.get_json(silent=True) or {}
+            try:
+                valutazione = self._addestra_modello_rischio(int(dati.get('quadrimestre', 2)), dati.get('data_limite'))
+            except ValueError as e:
+                return jsonify({"errore": str(e)}), 400
+            return jsonify({"successo": True, "valutazione": valutazione})
+        
+        @self.app.route('/api/ai/modello-rischio/aggiorna', methods=['POST'])
+        @self.richiede_permesso("modifica_configurazione")
+        def api_aggiorna_modello_rischio():
+            """API: Aggiornamento online con le nuove pagelle."""
+            dati = request.get_json(silent=True) or {}
+            try:
+                nuovi = self._aggiorna_modello_rischio(int(dati.get('quadrimestre', 2)), dati.get('data_limite'))
+            except ValueError as e:
+                return jsonify({"errore": str(e)}), 400
+            modello = self.motore_predittivo.models['rischio']
+            return jsonify({"successo": True, "nuovi_esempi": nuovi, "esempi_visti": modello.esempi_visti})
+        
         # ============ API STATISTICHE DASHBOARD ============
         
         @self.app.route('/api/dashboard/stats')
         @self.richiede_accesso
         def api_stats_dashboard():
             """API: Statistiche per dashboard."""
-            return jsonify(self._calcola_statistiche_dashboard())
+            return risposta_negoziata(self._calcola_statistiche_dashboard())
         
         @self.app.route('/api/dashboard/charts')
         @self.richiede_accesso
         def api_charts_dashboard():
             """API: Dati per grafici dashboard."""
-            return jsonify(self._calcola_dati_grafici())
+            return risposta_negoziata(self._calcola_dati_grafici())
+        
+        @self.app.route('/api/grafici/andamento')
+        @self.richiede_accesso
+        def api_grafici_andamento():
+            """API: Serie delle medie per giorno/settimana/mese, classe e materia."""
+            granularita = request.args.get('granularita', 'settimana')
+            if granularita not in GRANULARITA or granularita == "totale":
+                return jsonify({"errore": f"Granularità non valida: {granularita}"}), 400
+            periodi = min(max(request.args.get('periodi', 10, type=int), 1), 366)
+            serie = self.rollup_voti.ultimi_periodi(
+                granularita, periodi,
+                classe=request.args.get('classe') or TUTTE,
+                materia=request.args.get('materia') or TUTTE
+            )
+            return risposta_negoziata({"granularita": granularita, **serie})
+        
+        @self.app.route('/api/grafici/presenze')
+        @self.richiede_accesso
+        def api_grafici_presenze():
+            """API: Tasso di presenza giornaliero (scuola o classe)."""
+            giorni = min(max(request.args.get('giorni', 30, type=int), 1), 366)
+            oggi = datetime.now().date()
+            serie = self.rollup_presenze.serie_giornaliera(
+                oggi - timedelta(days=giorni - 1), oggi,
+                classe=request.args.get('classe') or TUTTE
+            )
+            return risposta_negoziata(serie)
+        
+        @self.app.route('/api/dashboard/widget')
+        @self.richiede_accesso
+        def api_widget_dashboard():
+            """API: Più widget della dashboard in una sola richiesta.
+            
+            ?ids=stats,charts,indicatori,allerte,studenti_rischio (senza ids
+            restituisce l'elenco dei widget disponibili). Gli aggregati comuni
+            sono calcolati una volta; la risposta riporta i tempi per widget.
+            """
+            ids = [i.strip() for i in request.args.get('ids', '').split(',') if i.strip()]
+            if not ids:
+                return jsonify({"disponibili": self.widget_dashboard.disponibili(g.principale)})
+            
+            parametri = {
+                "soglia": request.args.get('soglia', 5.5, type=float),
+                "solo_attive": request.args.get('solo_attive', 'true').lower() == 'true'
+            }
+            risultato = self.widget_dashboard.calcola(
+                ids, self._contesto_dashboard(), principale=g.principale, parametri=parametri
+            )
+            return risposta_negoziata(risultato)
+        
+        @self.app.route('/api/dashboard/eventi')
+        @self.richiede_accesso
+        def api_eventi_dashboard():
+            """API: Stream Server-Sent Events dei delta della dashboard."""
+            if self.url_eventi_asincroni:
+                # Con worker a thread ogni stream terrebbe occupato un thread per ore
+                destinazione = self.url_eventi_asincroni
+                if request.query_string:
+                    destinazione += '?' + request.query_string.decode('latin-1')
+                return redirect(destinazione, code=307)
+            
+            ultimo = request.headers.get('Last-Event-ID', request.args.get('ultimo'))
+            ultimo = int(ultimo) if ultimo and ultimo.isdigit() else None
+            if self.stato_condiviso is not None:
+                self._avvia_sorveglianza_stato()
+            return Response(
+                self.canale_dashboard.stream_sse(ultimo),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
+        @self.app.route('/api/dashboard/eventi/statistiche')
+        @self.richiede_permesso("modifica_configurazione")
+        def api_eventi_dashboard_statistiche():
+            """API: Iscritti e delta pubblicati."""
+            return jsonify(self.delta_dashboard.statistiche())
+        
+        @self.app.route('/api/coalescenza/statistiche')
+        @self.richiede_permesso("modifica_configurazione")
+        def api_coalescenza_statistiche():
+            """API: Contatori dei calcoli deduplicati."""
+            return jsonify(self.coalescenza.statistiche())
+        
+        @self.app.errorhandler(TimeoutError)
+        def gestisci_timeout(errore):
+            """Calcolo condiviso non terminato entro il timeout."""
+            return jsonify({"errore": str(errore)}), 503
+        
+        # ============ METRICHE ============
+        
+        @self.app.route('/metrics')
+        def metriche_prometheus():
+            """Metriche per route in formato Prometheus."""
+            # Se configurato, lo scraper deve presentare il token
+            token = os.environ.get('MANAGERSCHOOL_METRICHE_TOKEN')
+            if token and request.headers.get('Authorization') != f'Bearer {token}':
+                return Response("Non autorizzato\n", status=401, mimetype='text/plain')
+            return Response(self.metriche.formato_prometheus(),
+                            mimetype='text/plain; version=0.0.4; charset=utf-8')
+        
+        @self.app.route('/api/metriche')
+        @self.richiede_permesso("modifica_configurazione")
+        def api_metriche():
+            """API: Riepilogo latenze (p50/p95/p99), conteggi ed errori per route."""
+            return jsonify({**self.metriche.riepilogo(), "compressione": self.compressione.statistiche()})
+        
+        # ============ AVVIO E PRONTEZZA ============
+        
+        @self.app.route('/api/health')
+        def api_health():
+            """API: Liveness, il processo risponde."""
+            return jsonify({"stato": "ok", "pid": os.getpid()})
+        
+        @self.app.route('/api/pronto')
+        def api_pronto():
+            """API: Readiness per load balancer e orchestratori (503 se non pronto)."""
+            controlli = {"avvio": self.cronologia_avvio.pronto}
+            if self.stato_condiviso is not None:
+                try:
+                    self.stato_condiviso.versione()
+                    controlli["stato_condiviso"] = True
+                except Exception:
+                    controlli["stato_condiviso"] = False
+            pronto = all(controlli.values())
+            return jsonify({
+                "pronto": pronto,
+                "controlli": controlli,
+                "pronto_ms": self.cronologia_avvio.pronto_ms
+            }), 200 if pronto else 503
+        
+        @self.app.route('/api/avvio')
+        @self.richiede_permesso("modifica_configurazione")
+        def api_avvio():
+            """API: Millisecondi per fase di avvio e per sottosistema pigro."""
+            return jsonify({**self.cronologia_avvio.riepilogo(), "sottosistemi_pigri": stato_pigri(self)})
+        
+        # ============ STATO CONDIVISO (MULTI-WORKER) ============
+        
+        @self.app.before_request
+        def sincronizza_stato_condiviso():
+            """Applica le modifiche fatte dagli altri worker prima di rispondere."""
+            # Liveness e readiness rispondono anche con lo store non raggiungibile
+            if self.stato_condiviso is not None and request.endpoint not in ('api_health', 'api_pronto'):
+                self.stato_condiviso.sincronizza()
+        
+        @self.app.route('/api/stato-condiviso/statistiche')
+        @self.richiede_permesso("modifica_configurazione")
+        def api_stato_condiviso_statistiche():
+            """API: Versioni e contatori dello store condiviso per questo worker."""
+            if self.stato_condiviso is None:
+                return jsonify({"attivo": False, "pid": os.getpid()})
+            return jsonify({"attivo": True, **self.stato_condiviso.statistiche()})
+        
+        # ============ API SCHEDULER ============
+        
+        @self.app.route('/api/scheduler/stato')
+        @self.richiede_permesso("modifica_configurazione")
+        def api_scheduler_stato():
+            """API: Stato e statistiche delle attività pianificate."""
+            return jsonify({
+                "attivo": self.scheduler.attivo,
+                "attivita": self.scheduler.statistiche()
+            })
+        
+        @self.app.route('/api/scheduler/<nome>/storico')
+        @self.richiede_permesso("modifica_configurazione")
+        def api_scheduler_storico(nome):
+            """API: Storico esecuzioni di un'attività."""
+            if nome not in self.scheduler.attivita:
+                return jsonify({"errore": "Attività non trovata"}), 404
+            limit = request.args.get('limit', 20, type=int)
+            return jsonify(self.scheduler.storico(nome, limit))
+        
+        @self.app.route('/api/scheduler/<nome>/esegui', methods=['POST'])
+        @self.richiede_permesso("modifica_configurazione")
+        def api_scheduler_esegui(nome):
+            """API: Esegue subito un'attività pianificata."""
+            if nome not in self.scheduler.attivita:
+                return jsonify({"errore": "Attività non trovata"}), 404
+            esecuzione = self.scheduler.esegui_ora(nome)
+            if esecuzione is None:
+                return jsonify({"successo": False, "messaggio": "Attività già in esecuzione"}), 409
+            return jsonify({"successo": esecuzione.esito == "ok", "esecuzione": esecuzione.to_dict()})
     
-    def _calcola_statistiche_dashboard(self) -> Dict:
+    def _quadro_indicatori(self) -> Dict:
+        """Quadro completo degli indicatori, deduplicato e condiviso tra worker."""
+        def serializza_quadro():
+            quadro = self.coalescenza.esegui(
+                "quadro_indicatori", self.calcolatore_indicatori.quadro_indicatori_completo
+            )
+            return {
+                k: {
+                    "nome": v.nome,
+                    "valore": v.valore,
+                    "componenti": v.componenti
+                }
+                for k, v in quadro.items()
+            }
+        
+        return self._calcolo_condiviso("api_indicatori", serializza_quadro)
+    
+    def _registra_widget_dashboard(self):
+        """Registra i widget calcolabili in lotto da /api/dashboard/widget."""
+        self.widget_dashboard = RegistroWidget()
+        registra = self.widget_dashboard.registra
+        
+        registra("stats", lambda c, p: self._calcola_statistiche_dashboard(c),
+                 descrizione="KPI generali (come /api/dashboard/stats)")
+        registra("charts", lambda c, p: self._calcola_dati_grafici(c),
+                 descrizione="Dati dei grafici (come /api/dashboard/charts)")
+        registra("indicatori", lambda c, p: self._quadro_indicatori(),
+                 permesso="visualizza_indicatori_privati",
+                 descrizione="Indicatori sintetici (come /api/indicatori)")
+        registra("allerte", lambda c, p: self.analytics.get_allerte(p.get("solo_attive", True)),
+                 descrizione="Allerte per la dirigenza (come /api/analytics/allerte)")
+        registra("studenti_rischio",
+                 lambda c, p: self.analytics.identifica_studenti_rischio(
+                     p.get("soglia", 5.5), medie=c.medie_studenti, assenze=c.assenze_per_studente
+                 ),
+                 descrizione="Studenti a rischio (come /api/analytics/studenti-rischio)")
+    
+    def _contesto_dashboard(self) -> ContestoDashboard:
+        """Nuovo contesto di aggregati condivisi per una richiesta."""
+        return ContestoDashboard(self.anagrafica, self.voti)
+    
+    def _calcola_statistiche_dashboard(self, contesto: Optional[ContestoDashboard] = None) -> Dict:
         """Calcola statistiche per la dashboard."""
-        stats_generali = self.anagrafica.statistiche_generali()
-        fragilita_stats = self.anagrafica.statistica_fragilita()
+        contesto = contesto or self._contesto_dashboard()
+        fragilita = list(contesto.fragilita.values())
+        alta = sum(1 for f in fragilita if f >= 60)
         
         return {
             "studenti_totali": len(self.anagrafica.studenti),
             "insegnanti_totali": len(self.insegnanti.insegnanti),
-            "classi_totali": stats_generali.get("numero_classi", 0),
-            "reddito_medio": stats_generali.get("reddito_medio", 0),
-            "fragilita_media": fragilita_stats.get("media", 0),
-            "fragilita_alta": fragilita_stats.get("percentuale_alta", 0)
+            "classi_totali": len(contesto.classi),
+            "reddito_medio": contesto.reddito_medio,
+            "fragilita_media": round(sum(fragilita) / len(fragilita), 2) if fragilita else 0,
+            "fragilita_alta": round(alta / len(fragilita) * 100, 1) if fragilita else 0
+        }
+    
+    def _kpi_dashboard(self) -> Dict:
+        """KPI economici da confrontare a ogni scrittura (lookup, nessuna scansione dei voti)."""
+        oggi = datetime.now().date()
+        presenze_oggi = self.rollup_presenze.serie_giornaliera(oggi, oggi)["tasso_presenza"][0]
+        return {
+            "studenti_totali": len(self.anagrafica.studenti),
+            "insegnanti_totali": len(self.insegnanti.insegnanti),
+            "voti_totali": len(self.voti.voti),
+            "media_generale": self.rollup_voti.media("totale", "tutto"),
+            "tasso_presenza_oggi": presenze_oggi,
+            "allerte_attive": self.analytics.allerte.numero_attive() if self.analytics is not None else 0
         }
     
-    def _calcola_dati_grafici(self) -> Dict:
+    def _pubblica_delta_dopo_scrittura(self, risposta):
+        """Dopo una richiesta di scrittura riuscita invia i delta della dashboard."""
+        if request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and risposta.status_code < 400:
+            self.delta_dashboard.aggiorna()
+        return risposta
+    
+    def _avvia_sorveglianza_stato(self):
+        """Avvia (una volta) il thread che porta ai client le scritture degli altri worker."""
+        with self._lock_sorveglianza:
+            if self._sorveglianza_attiva:
+                return
+            self._sorveglianza_attiva = True
+        threading.Thread(target=self._sorveglia_stato_condiviso, daemon=True,
+                         name="sorveglianza-delta").start()
+    
+    def _sorveglia_stato_condiviso(self):
+        """Finché ci sono iscritti applica le modifiche degli altri worker e pubblica i delta."""
+        try:
+            time.sleep(2.0)
+            while self.canale_dashboard.iscritti > 0 and self.stato_condiviso is not None:
+                with self.delta_dashboard.lotto():
+                    if self.stato_condiviso.sincronizza():
+                        self.delta_dashboard.aggiorna()
+                time.sleep(2.0)
+        finally:
+            self._sorveglianza_attiva = False
+    
+    def _calcola_dati_grafici(self, contesto: Optional[ContestoDashboard] = None) -> Dict:
         """Calcola dati per grafici interattivi."""
+        contesto = contesto or self._contesto_dashboard()
+        
         # Distribuzione voti
-        distribuzione = self._calcola_distribuzione_voti()
+        distribuzione = self._calcola_distribuzione_voti(contesto)
         
         # Trend andamento
         trend = self._calcola_trend_andamento()
         
         # Fragilità vs voti
-        fragilita = self._calcola_fragilita_vs_voti()
+        fragilita = self._calcola_fragilita_vs_voti(contesto)
         
         # Medie per materia
         medie = self._calcola_medie_per_materia()
@@ -1194,105 +2012,454 @@ class InterfacciaERP:
             "presenze": presenze
         }
     
-    def _calcola_distribuzione_voti(self) -> Dict:
+    def _calcola_distribuzione_voti(self, contesto: Optional[ContestoDashboard] = None) -> Dict:
         """Calcola distribuzione voti per intervalli."""
-        voti = [v.voto for v in self.voti.voti]
-        distribuzione = {f"{i}-{i+1}": 0 for i in range(0, 10)}
-        
-        for voto in voti:
-            if 0 <= voto < 1:
-                distribuzione["0-1"] += 1
-            elif 1 <= voto < 2:
-                distribuzione["1-2"] += 1
-            elif 2 <= voto < 3:
-                distribuzione["2-3"] += 1
-            elif 3 <= voto < 4:
-                distribuzione["3-4"] += 1
-            elif 4 <= voto < 5:
-                distribuzione["4-5"] += 1
-            elif 5 <= voto < 6:
-                distribuzione["5-6"] += 1
-            elif 6 <= voto < 7:
-                distribuzione["6-7"] += 1
-            elif 7 <= voto < 8:
-                distribuzione["7-8"] += 1
-            elif 8 <= voto < 9:
-                distribuzione["8-9"] += 1
-            elif 9 <= voto <= 10:
-                distribuzione["9-10"] += 1
+        contesto = contesto or self._contesto_dashboard()
+        distribuzione = contesto.distribuzione_voti
         
         return {
             "labels": list(distribuzione.keys()),
             "values": list(distribuzione.values())
         }
     
-    def _calcola_trend_andamento(self) -> Dict:
-        """Calcola trend andamento media nel tempo."""
-        # Calcola media per periodo
-        labels = []
-        medie = []
-        
-        # Simula trend (da implementare con dati reali)
-        for i in range(10):
-            labels.append(f"Settimana {i+1}")
-            medie.append(6.5 + (i * 0.1))
-        
+    def _calcola_trend_andamento(self, settimane: int = 10) -> Dict:
+        """Media settimanale dei voti nelle ultime settimane (lookup sul rollup)."""
+        serie = self.rollup_voti.ultimi_periodi("settimana", settimane)
         return {
-            "labels": labels,
-            "medie": medie
+            "labels": [f"Sett. {datetime.strptime(p, '%Y-%m-%d').strftime('%d/%m')}" for p in serie["labels"]],
+            "medie": serie["medie"],
+            "conteggi": serie["conteggi"]
         }
     
-    def _calcola_fragilita_vs_voti(self) -> Dict:
+    def _calcola_fragilita_vs_voti(self, contesto: Optional[ContestoDashboard] = None) -> Dict:
         """Calcola correlazione fragilità-voti."""
+        contesto = contesto or self._contesto_dashboard()
+        medie, fragilita = contesto.medie_studenti, contesto.fragilita
         points = []
         
-        for studente in self.anagrafica.studenti[:20]:  # Limit a 20 studenti
-            voti_stud = [v.voto for v in self.voti.voti_studente(studente.id)]
-            if voti_stud:
-                media = sum(voti_stud) / len(voti_stud)
-                fragilita = getattr(studente, 'fragilita', 50)
-                points.append({"x": fragilita, "y": media})
+        for studente in self.anagrafica.studenti:
+            if studente.id in medie:
+                points.append({"x": fragilita[studente.id], "y": medie[studente.id]})
+                if len(points) == 20:  # Limit a 20 studenti
+                    break
         
         return {"points": points}
     
     def _calcola_medie_per_materia(self) -> Dict:
         """Calcola medie per materia."""
-        materie = {}
-        
-        for voto in self.voti.voti:
-            if voto.materia not in materie:
-                materie[voto.materia] = []
-            materie[voto.materia].append(voto.voto)
-        
-        medie_calc = {m: sum(v) / len(v) for m, v in materie.items()}
+        medie_calc = self.rollup_voti.medie_per("materia")
         
         return {
             "labels": list(medie_calc.keys()),
             "values": list(medie_calc.values())
         }
     
-    def _calcola_presenze_chart(self) -> Dict:
-        """Calcola dati presenze per grafico."""
-        classi = set(s.classe for s in self.anagrafica.studenti)
-        
-        presenze_data = []
-        assenze_data = []
+    def _calcola_presenze_chart(self, giorni: int = 30) -> Dict:
+        """Presenze e assenze registrate per classe negli ultimi giorni."""
+        oggi = datetime.now().date()
+        totali = self.rollup_presenze.totali_per_classe(oggi - timedelta(days=giorni - 1), oggi)
+        classi = sorted(set(s.classe for s in self.anagrafica.studenti) | set(totali))
+        vuoto = {"presenti": 0, "assenti": 0}
         
-        for classe in sorted(classi):
-            # Simula dati (da implementare con dati reali presenze)
-            presenze_data.append(len([s for s in self.anagrafica.studenti if s.classe == classe]) * 0.9)
-            assenze_data.append(len([s for s in self.anagrafica.studenti if s.classe == classe]) * 0.1)
+        presenze_data = [totali.get(classe, vuoto)["presenti"] for classe in classi]
+        assenze_data = [totali.get(classe, vuoto)["assenti"] for classe in classi]
         
         return {
-            "labels": sorted(classi),
+            "labels": classi,
             "presenze": presenze_data,
-            "assenze": assenze_data
+            "assenze": assenze_data,
+            "tasso_presenza": [
+                round(p / (p + a) * 100, 2) if p + a else None
+                for p, a in zip(presenze_data, assenze_data)
+            ]
         }
     
+    # ============ PAGINE HTML PAGINATE ============
+    
+    def _su_modifica_voti_pagine(self, evento: str, voto=None):
+        """Osservatore di GestioneVoti: i frammenti in cache non sono più validi."""
+        self._modifiche_pagine += 1
+    
+    def _invalida_pagine_dopo_scrittura(self, risposta):
+        """Dopo una richiesta di scrittura riuscita invalida indici e frammenti."""
+        if request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and risposta.status_code < 400:
+            self._modifiche_pagine += 1
+        return risposta
+    
+    def _versione_pagine(self) -> Tuple:
+        """Versione dei dati mostrati dalle pagine (calcolo in tempo costante).
+        
+        Cambia a ogni modifica dei voti, a ogni scrittura via API e quando
+        cambiano numero di studenti o pagelle o i moduli dati stessi. Con lo
+        store condiviso include la sua versione: una modifica a uno studente
+        fatta da un altro worker non cambia i contatori locali.
+        """
+        return (
+            self._modifiche_pagine,
+            id(self.anagrafica), len(self.anagrafica.studenti),
+            id(self.voti), len(self.voti.voti), len(self.voti.pagelle),
+            self.stato_condiviso.versione_sincronizzata() if self.stato_condiviso is not None else None
+        )
+    
+    def _risposta_artefatto(self, nome: str):
+        """Risposta JSON con l'ultima versione di un report materializzato.
+        
+        503 se il report non è ancora pronto, 500 con la causa se la sua
+        generazione è fallita e non c'è una versione precedente.
+        """
+        try:
+            artefatto = self.artefatti_report.ottieni(nome)
+        except KeyError as e:
+            return jsonify({"errore": e.args[0]}), 503
+        except MaterializzazioneFallita as e:
+            return jsonify({"errore": str(e)}), 500
+        risposta = jsonify(artefatto["report"])
+        risposta.headers['X-Report-Versione'] = str(artefatto["metadati"]["versione"])
+        risposta.headers['X-Report-Generato'] = artefatto["metadati"]["generato_il"]
+        return risposta
+    
+    def _versione_dati_report(self) -> str:
+        """Versione dei dati dei report materializzati, uguale su tutti i worker.
+        
+        Con lo store condiviso è la sua versione (dopo l'allineamento dei dati
+        locali), altrimenti un'impronta del contenuto: worker e riavvii con gli
+        stessi dati riusano gli artefatti già salvati. Gli insegnanti non sono
+        nello store e vengono sempre confrontati per contenuto.
+        """
+        if self.stato_condiviso is not None:
+            dati = f"condiviso-{self.stato_condiviso.versione_sincronizzata()}"
+        else:
+            dati = self._impronta_dati_report()
+        insegnanti = hashlib.sha256(repr(self.insegnanti.insegnanti).encode()).hexdigest()[:16]
+        return f"{dati}:{insegnanti}"
+    
+    def _impronta_dati_report(self) -> str:
+        """Impronta del contenuto di anagrafica, voti e pagelle.
+        
+        Ricalcolata solo quando cambia la versione locale delle pagine.
+        """
+        versione = self._versione_pagine()
+        if self._impronta_report[0] != versione:
+            contenuto = repr((self.anagrafica.studenti, self.voti.voti, self.voti.pagelle))
+            self._impronta_report = (versione, hashlib.sha256(contenuto.encode()).hexdigest()[:16])
+        return self._impronta_report[1]
+    
+    @staticmethod
+    def _pdf_report_annuale(report: Dict, percorso: str) -> None:
+        """PDF del report annuale (richiede reportlab)."""
+        from pdf_exporter import PDFExporter
+        
+        riepilogo = report.get("riepilogo_generale", {})
+        PDFExporter().esporta_report_generale({
+            "studenti_totali": riepilogo.get("totale_studenti", 0),
+            "insegnanti_totali": riepilogo.get("totale_insegnanti", 0),
+            "classi_totali": riepilogo.get("totale_classi", 0),
+            "voti_totali": report.get("statistiche_voti", {}).get("totale_voti", 0)
+        }, percorso)
+    
+    @staticmethod
+    def _parametri_pagina(**parametri) -> Dict:
+        """Filtri da conservare nei link di paginazione (senza i valori vuoti)."""
+        return {nome: valore for nome, valore in parametri.items() if valore}
+    
+    def _frammento(self, chiave: Tuple, funzione) -> Markup:
+        """HTML renderizzato una volta per versione dei dati e parametri."""
+        return Markup(self._cache_pagine.ottieni(chiave, self._versione_pagine(), funzione))
+    
+    def _indice_studenti(self) -> Dict:
+        """Studenti ordinati per classe e cognome, raggruppati per classe."""
+        def costruisci():
+            ordinati = sorted(self.anagrafica.studenti, key=lambda s: (s.classe, s.cognome, s.nome, s.id))
+            per_classe: Dict[str, list] = {}
+            for studente in ordinati:
+                per_classe.setdefault(studente.classe, []).append(studente)
+            return {"ordinati": ordinati, "per_classe": per_classe, "classi": sorted(per_classe)}
+        return self._cache_pagine.ottieni(('indice_studenti',), self._versione_pagine(), costruisci)
+    
+    def _studenti_filtrati(self, classe: str = "", cerca: str = "") -> List:
+        """Studenti di una classe e/o il cui nome contiene `cerca` (minuscolo)."""
+        indice = self._indice_studenti()
+        elenco = indice["per_classe"].get(classe, []) if classe else indice["ordinati"]
+        if not cerca:
+            return elenco
+        return self._cache_pagine.ottieni(
+            ('studenti_filtrati', classe, cerca), self._versione_pagine(),
+            lambda: [s for s in elenco if cerca in s.nome_completo.lower()]
+        )
+    
+    def _graduatoria_pagine(self) -> List[Dict]:
+        """Graduatoria per media come AnalisiDidattica.graduatoria_studenti, in una passata sui voti."""
+        def costruisci():
+            medie = ContestoDashboard(self.anagrafica, self.voti).medie_studenti
+            righe = [
+                {
+                    "id": studente.id,
+                    "nome": studente.nome_completo,
+                    "classe": studente.classe,
+                    "media": medie.get(studente.id, 0.0),
+                    "fragilita": studente.fragilità_sociale
+                }
+                for studente in self.anagrafica.studenti
+            ]
+            righe.sort(key=lambda r: r["media"], reverse=True)
+            for posizione, riga in enumerate(righe, 1):
+                riga["posizione"] = posizione
+            return righe
+        return self._cache_pagine.ottieni(('graduatoria',), self._versione_pagine(), costruisci)
+    
+    def _indice_pagelle(self) -> Dict:
+        """Coppie (studente, pagella) ordinate per classe e cognome, raggruppate per classe."""
+        def costruisci():
+            studenti = {s.id: s for s in self.anagrafica.studenti}
+            ordinate = sorted(
+                ((studenti[p.id_studente], p) for p in self.voti.pagelle if p.id_studente in studenti),
+                key=lambda coppia: (coppia[0].classe, coppia[0].cognome, coppia[0].nome, coppia[1].quadrimestre)
+            )
+            per_classe: Dict[str, list] = {}
+            for studente, pagella in ordinate:
+                per_classe.setdefault(studente.classe, []).append((studente, pagella))
+            return {"ordinate": ordinate, "per_classe": per_classe, "classi": sorted(per_classe)}
+        return self._cache_pagine.ottieni(('indice_pagelle',), self._versione_pagine(), costruisci)
+    
+    # ============ ATTIVITÀ PIANIFICATE ============
+    
+    def abilita_stato_condiviso(self, stato: StatoCondiviso):
+        """Condivide anagrafica, voti e pagelle con gli altri worker.
+        
+        Args:
+            stato: Store condiviso su cui allineare i dati in memoria
+        """
+        self.stato_condiviso = stato
+        # Cookie di sessione validi su qualsiasi worker
+        self.app.secret_key = stato.segreto_sessioni()
+        stato.collega(self.anagrafica, self.voti)
+        
+        self.scheduler.registra(
+            "compatta_stato_condiviso", stato.compatta, "15 4 * * *",
+            descrizione="Compattazione log modifiche e cache condivisa"
+        )
+    
+    def _calcolo_condiviso(self, chiave: str, funzione):
+        """Riusa tra worker un risultato JSON calcolato sulla versione corrente dei dati."""
+        if self.stato_condiviso is None:
+            return funzione()
+        return self.stato_condiviso.calcola_con_cache(chiave, funzione)
+    
+    def _transazione_dati(self):
+        """Transazione atomica sullo store condiviso, se attivo."""
+        if self.stato_condiviso is None:
+            return nullcontext()
+        return self.stato_condiviso.blocco()
+    
+    def _registro_corrente(self):
+        """Crea un RegistroScolastico che punta ai dati in memoria."""
+        from main import RegistroScolastico
+        registro = RegistroScolastico()
+        registro.anagrafica = self.anagrafica
+        registro.voti = self.voti
+        registro.insegnanti = self.insegnanti
+        return registro
+    
+    def _motore_predittivo(self) -> PredictiveEngine:
+        """Motore delle predizioni, con il modello di rischio più recente su disco.
+        
+        Il modello salvato da un worker viene caricato dagli altri al primo
+        uso successivo (confronto della data di modifica del file).
+        """
+        try:
+            mtime = os.path.getmtime(PERCORSO_MODELLO_RISCHIO)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime_modello_rischio:
+            modello = None
+            if mtime is not None and NUMPY_AVAILABLE:
+                try:
+                    modello = ModelloRischio.carica(PERCORSO_MODELLO_RISCHIO)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"⚠️  Modello di rischio non caricato: {e}")
+            self.motore_predittivo.imposta_modello_rischio(modello)
+            self._mtime_modello_rischio = mtime
+        return self.motore_predittivo
+    
+    def _addestra_modello_rischio(self, quadrimestre: int = 2, data_limite: Optional[str] = None) -> Dict:
+        """Addestra il modello di rischio sugli esiti delle pagelle e lo salva.
+        
+        Le feature usano solo i voti precedenti a data_limite (default: primo
+        quadrimestre per l'esito finale). Un quarto degli studenti è tenuto da
+        parte per la valutazione, poi il modello è riaddestrato su tutti gli esempi.
+        
+        Returns:
+            Metriche sugli studenti tenuti da parte
+        """
+        valori, esiti, ids = dataset_da_registro(
+            self.anagrafica, self.voti, self.motore_predittivo, quadrimestre, data_limite=data_limite
+        )
+        if len(esiti) < 20 or esiti.min() == esiti.max():
+            raise ValueError("Servono almeno 20 pagelle con esiti sia positivi sia negativi")
+        
+        modello, valutazione = addestra_con_validazione(valori, esiti)
+        modello.esiti_usati = set(ids)
+        modello.salva(PERCORSO_MODELLO_RISCHIO)
+        self._valutazione_modello_rischio = valutazione
+        self.motore_predittivo.imposta_modello_rischio(modello)
+        self._mtime_modello_rischio = os.path.getmtime(PERCORSO_MODELLO_RISCHIO)
+        return valutazione
+    
+    def _aggiorna_modello_rischio(self, quadrimestre: int = 2, data_limite: Optional[str] = None) -> int:
+        """Aggiornamento online con le pagelle non ancora usate dal modello.
+        
+        Gli esiti già usati sono salvati nel modello stesso, quindi valgono
+        anche dopo un riavvio e sugli altri worker.
+        
+        Returns:
+            Numero di nuovi esempi
+        """
+        modello = self._motore_predittivo().models.get('rischio')
+        if modello is None:
+            raise ValueError("Nessun modello di rischio: addestrarlo prima")
+        valori, esiti, ids = dataset_da_registro(
+            self.anagrafica, self.voti, self.motore_predittivo, quadrimestre,
+            escludi=modello.esiti_usati, data_limite=data_limite
+        )
+        if len(esiti):
+            modello.aggiorna(valori, esiti, passi=5)
+            modello.esiti_usati.update(ids)
+            modello.salva(PERCORSO_MODELLO_RISCHIO)
+            self._mtime_modello_rischio = os.path.getmtime(PERCORSO_MODELLO_RISCHIO)
+        return len(esiti)
+    
+    def _dati_early_warning(self) -> list:
+        """Prepara i dati per classe richiesti da early_warning_system."""
+        # Voti raggruppati in un solo passaggio (voti_studente scansiona tutti i voti)
+        voti_per_studente = {}
+        for v in self.voti.voti:
+            voti_per_studente.setdefault(v.id_studente, []).append(v.voto)
+        
+        classi_dict = {}
+        for studente in self.anagrafica.studenti:
+            classe = studente.classe
+            if classe not in classi_dict:
+                classi_dict[classe] = {'classe': classe, 'studenti': []}
+            
+            studente_data = dati_predittivi_studente(studente)
+            studente_data['voti'] = voti_per_studente.get(studente.id, [])
+            classi_dict[classe]['studenti'].append(studente_data)
+        
+        return list(classi_dict.values())
+    
+    def _invia_digest_dirigenza(self) -> List:
+        """Invia a ogni dirigente il riepilogo giornaliero di allerte e rischi.
+        
+        Returns:
+            Comunicazioni create, una per dirigente attivo con ID associato
+        """
+        if self.analytics is None:
+            return []
+        dirigenti = [u for u in self.accesso.utenti.values()
+                     if u.ruolo == Ruolo.DIRIGENTE and u.attivo and u.associato_id is not None]
+        if not dirigenti:
+            return []
+        
+        allerte = self.analytics.get_allerte(solo_attive=True)
+        studenti_rischio = self.analytics.identifica_studenti_rischio()
+        messaggio = (
+            f"Allerte attive: {len(allerte)}\n"
+            f"Studenti a rischio: {len(studenti_rischio)}\n"
+            f"Media generale: {self.analytics.calcola_media_generale_scuola():.2f}"
+        )
+        oggetto = f"Riepilogo giornaliero {datetime.now().strftime('%d/%m/%Y')}"
+        return [self.comunicazioni.crea_comunicazione(
+            mittente_id=0,
+            mittente_tipo="sistema",
+            destinatario_id=dirigente.associato_id,
+            destinatario_tipo=TIPO_PER_RUOLO[Ruolo.DIRIGENTE.value],
+            oggetto=oggetto,
+            messaggio=messaggio
+        ) for dirigente in dirigenti]
+    
+    def _registra_attivita_pianificate(self):
+        """Registra backup, manutenzione e analytics periodiche.
+        
+        Le attività pesanti sono pianificate di notte e non si sovrappongono.
+        """
+        self.scheduler.registra(
+            "backup_giornaliero",
+            lambda: self.gestore_backup.backup_automatico(self._registro_corrente(), "giornalieri"),
+            "30 2 * * *", jitter_secondi=600, pesante=True,
+            descrizione="Backup completo giornaliero"
+        )
+        self.scheduler.registra(
+            "backup_settimanale",
+            lambda: self.gestore_backup.backup_automatico(self._registro_corrente(), "settimanali"),
+            "0 3 * * 0", jitter_secondi=600, pesante=True,
+            descrizione="Backup completo settimanale (domenica)"
+        )
+        self.scheduler.registra(
+            "backup_mensile",
+            lambda: self.gestore_backup.backup_automatico(self._registro_corrente(), "mensili"),
+            "30 3 1 * *", jitter_secondi=600, pesante=True,
+            descrizione="Backup completo mensile"
+        )
+        self.scheduler.registra(
+            "pulizia_backup_vecchi",
+            lambda: self.gestore_backup.pulizia_backup_vecchi(),
+            "0 4 * * *", jitter_secondi=300, pesante=True,
+            descrizione="Eliminazione giornalieri oltre 30 giorni, ultimi 8 settimanali e 12 mensili conservati"
+        )
+        if self.analytics is not None:
+            self.scheduler.registra(
+                "allerte_automatiche",
+                self.analytics.genera_allerte_automatiche,
+                "0 6 * * 1-6", jitter_secondi=300, pesante=True,
+                descrizione="Generazione allerte per la dirigenza"
+            )
+        self.scheduler.registra(
+            "early_warning",
+            lambda: (self._motore_predittivo(), self.indice_rischio.early_warning()),
+            "30 6 * * 1-6", jitter_secondi=300, pesante=True,
+            descrizione="Calcolo early warning studenti"
+        )
+        self.scheduler.registra(
+            "ricostruzione_rollup_grafici",
+            lambda: (self.rollup_voti.ricostruisci(), self.rollup_presenze.ricostruisci(),
+                     self.statistiche_voti.ricostruisci(), self.grafo_indicatori.ricostruisci()),
+            "45 3 * * *", jitter_secondi=300, pesante=True,
+            descrizione="Ricalcolo completo dei rollup dei grafici e delle statistiche (verifica deriva)"
+        )
+        self.scheduler.registra(
+            "profili_apprendimento",
+            lambda: self.profili_apprendimento.addestra() if self.profili_apprendimento is not None else None,
+            "50 4 * * *", jitter_secondi=300, pesante=True,
+            descrizione="Riaddestramento dei profili di apprendimento degli studenti"
+        )
+        self.scheduler.registra(
+            "materializzazione_report",
+            lambda: self.artefatti_report.materializza(),
+            "15 5 * * *", jitter_secondi=300, pesante=True,
+            descrizione="Precalcolo dei report annuale, ministeriale e interventi (solo se i dati sono cambiati)"
+        )
+        self.scheduler.registra(
+            "digest_dirigenza",
+            self._invia_digest_dirigenza,
+            "0 7 * * 1-6", jitter_secondi=120, recupera_mancate=False,
+            tolleranza_secondi=3 * 3600,
+            descrizione="Riepilogo giornaliero alla dirigenza"
+        )
+    
     # ============ DECORATORS ============
     
     def _init_analytics(self):
         """Inizializza il modulo analytics."""
+        # I moduli dati possono essere stati sostituiti dopo la costruzione
+        self.rollup_voti.collega(self.voti, self.anagrafica)
+        self.rollup_presenze.collega(self.amministrativa, self.anagrafica)
+        self.statistiche_voti.collega(self.voti, self.anagrafica)
+        self.grafo_indicatori.collega(self.voti, self.anagrafica)
+        self.delta_dashboard.osserva_voti(self.voti)
+        if self._su_modifica_voti_pagine not in self.voti.osservatori:
+            self.voti.osservatori.append(self._su_modifica_voti_pagine)
+        self.indice_rischio.collega(self.anagrafica, self.voti)
+        
         if self.comunicazioni is None:
             return
             
@@ -1301,25 +2468,104 @@ class InterfacciaERP:
                 self.anagrafica, 
                 self.voti, 
                 self.insegnanti, 
-                self.comunicazioni
+                self.comunicazioni,
+                rollup_voti=self.rollup_voti,
+                indice_rischio=self.indice_rischio,
+                regole_allerte=carica_regole(),
+                report_parallelo=self.report_parallelo,
+                # Le allerte aperte restano tali (nessun duplicato alla prossima valutazione)
+                archivio_allerte=self.analytics.allerte if self.analytics is not None else None
             )
         except Exception as e:
             print(f"⚠️  Analytics non disponibile: {e}")
             self.analytics = None
     
+    def _serializzatore_token(self) -> URLSafeTimedSerializer:
+        """Firma dei token API con la stessa chiave delle sessioni."""
+        return URLSafeTimedSerializer(self.app.secret_key, salt="managerschool-api-token")
+    
+    def _principale_richiesta(self) -> Optional[Principale]:
+        """Risolve l'identità della richiesta da token Bearer o cookie di sessione.
+        
+        Returns:
+            Principale immutabile della richiesta, None se non autenticata
+        """
+        if 'principale' in g:
+            return g.principale
+        
+        intestazione = request.headers.get('Authorization', '')
+        if intestazione.startswith('Bearer '):
+            try:
+                username = self._serializzatore_token().loads(
+                    intestazione[7:].strip(), max_age=self.DURATA_TOKEN_SECONDI
+                )
+            except BadSignature:
+                username = None
+        else:
+            username = session.get('username')
+        
+        g.principale = self.accesso.risolvi_principale(username) if username else None
+        return g.principale
+    
+    def _identita_comunicazioni(self) -> Optional[Tuple[int, str]]:
+        """(ID, tipo) del principale nella convenzione di GestioneComunicazioni.
+        
+        Returns:
+            Coppia (associato_id, tipo), None se l'utente non è associato
+        """
+        principale = g.principale
+        tipo = TIPO_PER_RUOLO.get(principale.ruolo.value)
+        if tipo is None or principale.associato_id is None:
+            return None
+        return principale.associato_id, tipo
+    
+    def _profili_non_leggibili(self):
+        """Errore se i profili di apprendimento non sono leggibili, altrimenti None.
+        
+        Le GET non addestrano: il modello nasce da POST
+        /api/profili-apprendimento/addestra o dall'attività notturna.
+        """
+        if self.profili_apprendimento is None:
+            return jsonify({"errore": "Profili di apprendimento non disponibili (NumPy assente)"}), 503
+        if not self.profili_apprendimento.addestrato:
+            return jsonify({"errore": "Profili non ancora addestrati: usare POST /api/profili-apprendimento/addestra"}), 409
+        return None
+    
+    @staticmethod
+    def _parametro_limite(predefinito: int, massimo: int) -> Optional[int]:
+        """Legge ?limite= dalla richiesta.
+        
+        Args:
+            predefinito: Valore se il parametro è assente
+            massimo: Valore massimo accettato
+            
+        Returns:
+            Il limite tra 1 e massimo, None se non valido
+        """
+        valore = request.args.get('limite')
+        if valore is None:
+            return predefinito
+        try:
+            limite = int(valore)
+        except ValueError:
+            return None
+        return limite if 1 <= limite <= massimo else None
+    
+    def _risposta_senza_identita_comunicazioni(self):
+        """Risposta 403 per utenti senza mittente/destinatario associato."""
+        return jsonify({"errore": "Utente non associato a un mittente o destinatario delle comunicazioni"}), 403
+    
     def richiede_accesso(self, f):
         """Decorator per richiedere autenticazione."""
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if 'username' not in session:
+            # Identità per singola richiesta: nessuno stato condiviso tra utenti
+            if self._principale_richiesta() is None:
+                if request.headers.get('Authorization'):
+                    return jsonify({"errore": "Token non valido o scaduto"}), 401
+                session.clear()
                 return redirect(url_for('login'))
             
-            # Ricostruisci sessione dallo storage
-            if not self.accesso.get_utente_corrente():
-                username = session.get('username')
-                if username in self.accesso.utenti:
-                    self.accesso.sessione_corrente = self.accesso.utenti[username]
-            
             return f(*args, **kwargs)
         return decorated_function
     
@@ -1329,7 +2575,7 @@ class InterfacciaERP:
             @wraps(f)
             @self.richiede_accesso
             def decorated_function(*args, **kwargs):
-                if not self.accesso.verifica_permesso(permesso):
+                if not g.principale.ha_permesso(permesso):
                     return jsonify({"errore": "Permesso negato"}), 403
                 return f(*args, **kwargs)
             return decorated_function
@@ -1348,6 +2594,9 @@ class InterfacciaERP:
         print("   - studente/studente123 (Studente)")
         print(f"\n{'='*80}\n")
         
+        # Il lock su file evita esecuzioni doppie anche con il reloader di debug
+        self.scheduler.avvia()
+        
         self.app.run(host=host, port=port, debug=debug)
 
 
@@ -90,6 +90,30 @@ class SimulatoreInterventi:
         TipoIntervento.INTERVENTO_COMPLETO: 18
     }
     
+    # Riduzione della fragilità (in punti)
+    RIDUZIONE_FRAGILITA = {
+        TipoIntervento.AUMENTO_REDDITO: {
+            IntensitàIntervento.BASSA: 5,
+            IntensitàIntervento.MEDIA: 15,
+            IntensitàIntervento.ALTA: 30
+        },
+        TipoIntervento.SUPPORTO_FAMILIARE: {
+            IntensitàIntervento.BASSA: 3,
+            IntensitàIntervento.MEDIA: 10,
+            IntensitàIntervento.ALTA: 20
+        },
+        TipoIntervento.MIGLIORAMENTO_SALUTE: {
+            IntensitàIntervento.BASSA: 4,
+            IntensitàIntervento.MEDIA: 12,
+            IntensitàIntervento.ALTA: 25
+        },
+        TipoIntervento.INTERVENTO_COMPLETO: {
+            IntensitàIntervento.BASSA: 12,
+            IntensitàIntervento.MEDIA: 35,
+            IntensitàIntervento.ALTA: 60
+        }
+    }
+    
     def __init__(self, anagrafica, gestione_voti):
         """Inizializza il simulatore.
         
@@ -240,31 +264,7 @@ class SimulatoreInterventi:
                                   intensità: IntensitàIntervento) -> float:
         """Calcola la nuova fragilità dopo l'intervento."""
         
-        # Valori di riduzione fragilità (in punti)
-        riduzione = {
-            TipoIntervento.AUMENTO_REDDITO: {
-                IntensitàIntervento.BASSA: 5,
-                IntensitàIntervento.MEDIA: 15,
-                IntensitàIntervento.ALTA: 30
-            },
-            TipoIntervento.SUPPORTO_FAMILIARE: {
-                IntensitàIntervento.BASSA: 3,
-                IntensitàIntervento.MEDIA: 10,
-                IntensitàIntervento.ALTA: 20
-            },
-            TipoIntervento.MIGLIORAMENTO_SALUTE: {
-                IntensitàIntervento.BASSA: 4,
-                IntensitàIntervento.MEDIA: 12,
-                IntensitàIntervento.ALTA: 25
-            },
-            TipoIntervento.INTERVENTO_COMPLETO: {
-                IntensitàIntervento.BASSA: 12,
-                IntensitàIntervento.MEDIA: 35,
-                IntensitàIntervento.ALTA: 60
-            }
-        }
-        
-        riduzione_valore = riduzione[tipo][intensità]
+        riduzione_valore = self.RIDUZIONE_FRAGILITA[tipo][intensità]
         nuova_fragilita = max(0, studente.fragilità_sociale - riduzione_valore)
         
         return nuova_fragilita
@@ -0,0 +1,370 @@
+"""
+Metriche per route dell'applicazione Flask.
+Conteggi, errori, richieste in corso e istogrammi di latenza per ogni
+coppia (metodo, rotta), esposti in formato Prometheus e in JSON.
+
+Con più processi (gunicorn) ogni worker ha i propri contatori: le serie
+portano l'etichetta worker (pid). Se PROMETHEUS_MULTIPROC_DIR è impostata
+e prometheus_client è installato, /metrics somma invece i valori di tutti
+i worker (modalità multiprocesso di prometheus_client).
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from flask import request
+
+try:
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+    PROMETHEUS_CLIENT_AVAILABLE = True
+except ImportError:
+    multiprocess = None
+    PROMETHEUS_CLIENT_AVAILABLE = False
+
+
+# Limiti superiori dei bucket (secondi), come i default dei client Prometheus
+BUCKET_PREDEFINITI = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                      0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class IstogrammaLatenze:
+    """Istogramma a bucket fissi: registrazione O(log bucket), memoria costante."""
+
+    __slots__ = ("limiti", "conteggi", "totale", "somma")
+
+    def __init__(self, limiti: Tuple[float, ...] = BUCKET_PREDEFINITI):
+        """Inizializza l'istogramma.
+
+        Args:
+            limiti: Limiti superiori crescenti dei bucket (l'ultimo è +Inf implicito)
+        """
+        self.limiti = limiti
+        self.conteggi = [0] * (len(limiti) + 1)
+        self.totale = 0
+        self.somma = 0.0
+
+    def registra(self, valore: float) -> None:
+        """Aggiunge un'osservazione (secondi)."""
+        self.conteggi[bisect_left(self.limiti, valore)] += 1
+        self.totale += 1
+        self.somma += valore
+
+    def quantile(self, q: float) -> float:
+        """Stima un quantile interpolando linearmente dentro il bucket.
+
+        Stessa stima di histogram_quantile di Prometheus: l'errore è al più
+        l'ampiezza del bucket che contiene il quantile.
+
+        Args:
+            q: Quantile tra 0 e 1
+
+        Returns:
+            Valore stimato in secondi (0.0 se vuoto)
+        """
+        if self.totale == 0:
+            return 0.0
+
+        obiettivo = q * self.totale
+        cumulato = 0
+        for i, conteggio in enumerate(self.conteggi):
+            if cumulato + conteggio >= obiettivo and conteggio > 0:
+                if i == len(self.limiti):
+                    # Oltre l'ultimo limite: non c'è un estremo superiore
+                    return self.limiti[-1]
+                inferiore = self.limiti[i - 1] if i > 0 else 0.0
+                superiore = self.limiti[i]
+                return inferiore + (superiore - inferiore) * (obiettivo - cumulato) / conteggio
+            cumulato += conteggio
+        return self.limiti[-1]
+
+    def cumulativi(self) -> List[int]:
+        """Conteggi cumulativi per bucket (formato Prometheus, +Inf incluso)."""
+        risultato, cumulato = [], 0
+        for conteggio in self.conteggi:
+            cumulato += conteggio
+            risultato.append(cumulato)
+        return risultato
+
+
+class _MetricheRotta:
+    """Contatori di una singola coppia (metodo, rotta)."""
+
+    __slots__ = ("lock", "etichette", "richieste", "errori", "in_corso", "per_classe_stato", "istogramma")
+
+    def __init__(self, limiti: Tuple[float, ...], etichette: Tuple[str, str] = ("", "")):
+        self.lock = threading.Lock()
+        self.etichette = etichette  # (metodo, rotta)
+        self.richieste = 0
+        self.errori = 0
+        self.in_corso = 0
+        self.per_classe_stato = [0] * 6  # indice = stato // 100
+        self.istogramma = IstogrammaLatenze(limiti)
+
+    def classi_stato(self) -> Dict[str, int]:
+        """Conteggi per classe di stato HTTP (es. {"2xx": 10})."""
+        return {f"{i}xx": n for i, n in enumerate(self.per_classe_stato) if n}
+
+
+class _MetricheMultiprocesso:
+    """Le stesse metriche su prometheus_client, condivise tra i worker.
+
+    Ogni processo scrive i propri valori nei file di PROMETHEUS_MULTIPROC_DIR
+    (letta da prometheus_client all'import, quindi va impostata prima di
+    avviare gunicorn); l'esportazione li aggrega con MultiProcessCollector,
+    qualunque sia il worker che risponde allo scrape.
+    """
+
+    def __init__(self, prefisso: str, limiti: Tuple[float, ...]):
+        etichette = ("metodo", "rotta")
+        # registry=None: i valori finiscono comunque nei file del processo
+        self.richieste = Counter(f"{prefisso}_richieste_http", "Richieste HTTP completate.",
+                                 etichette + ("classe_stato",), registry=None)
+        self.errori = Counter(f"{prefisso}_errori_http", "Richieste HTTP terminate con stato 5xx.",
+                              etichette, registry=None)
+        self.in_corso = Gauge(f"{prefisso}_richieste_http_in_corso", "Richieste HTTP in elaborazione.",
+                              etichette, registry=None, multiprocess_mode="livesum")
+        self.durate = Histogram(f"{prefisso}_durata_richiesta_http_seconds", "Latenza delle richieste HTTP.",
+                                etichette, buckets=limiti, registry=None)
+
+    def inizio(self, etichette: Tuple[str, str]) -> None:
+        self.in_corso.labels(*etichette).inc()
+
+    def fine(self, etichette: Tuple[str, str], stato: int, durata: float) -> None:
+        self.in_corso.labels(*etichette).dec()
+        self.richieste.labels(*etichette, f"{min(stato // 100, 5)}xx").inc()
+        if stato >= 500:
+            self.errori.labels(*etichette).inc()
+        self.durate.labels(*etichette).observe(durata)
+
+    @staticmethod
+    def esporta() -> str:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        return generate_latest(registro).decode("utf-8")
+
+
+class MetricheRoute:
+    """Middleware Flask che misura ogni route registrata."""
+
+    def __init__(self, app=None, limiti: Tuple[float, ...] = BUCKET_PREDEFINITI,
+                 prefisso: str = "managerschool"):
+        """Inizializza le metriche.
+
+        Args:
+            app: Applicazione Flask (opzionale, vedi init_app)
+            limiti: Limiti dei bucket di latenza in secondi
+            prefisso: Prefisso dei nomi delle metriche Prometheus
+        """
+        self.limiti = tuple(limiti)
+        self.prefisso = prefisso
+        self.avvio = time.time()
+        self._lock = threading.Lock()
+        self._rotte: Dict[Tuple[str, str], _MetricheRotta] = {}
+        self._multiprocesso = (_MetricheMultiprocesso(prefisso, self.limiti)
+                               if PROMETHEUS_CLIENT_AVAILABLE and os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+                               else None)
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Registra gli hook di misura sull'applicazione."""
+        app.before_request(self._prima_richiesta)
+        app.after_request(self._dopo_richiesta)
+        app.teardown_request(self._fine_richiesta)
+
+    # ============ HOOK ============
+
+    def _metriche_rotta(self, metodo: str, rotta: str) -> _MetricheRotta:
+        """Restituisce (creandoli) i contatori della rotta."""
+        chiave = (metodo, rotta)
+        metriche = self._rotte.get(chiave)
+        if metriche is None:
+            with self._lock:
+                metriche = self._rotte.setdefault(chiave, _MetricheRotta(self.limiti, chiave))
+        return metriche
+
+    def _prima_richiesta(self) -> None:
+        """Avvia la misura: la rotta è il template (es. /api/studenti/<int:studente_id>)."""
+        # Un solo accesso al proxy: i dati viaggiano sull'oggetto richiesta
+        richiesta = request._get_current_object()
+        regola = richiesta.url_rule
+        metriche = self._metriche_rotta(richiesta.method, regola.rule if regola is not None else "<non_trovata>")
+        with metriche.lock:
+            metriche.in_corso += 1
+        if self._multiprocesso is not None:
+            self._multiprocesso.inizio(metriche.etichette)
+        richiesta._metriche = (metriche, time.perf_counter())
+
+    def _dopo_richiesta(self, risposta):
+        """Chiude la misura con lo stato della risposta (anche per errori 500 gestiti da Flask)."""
+        self._chiudi(request._get_current_object(), risposta.status_code)
+        return risposta
+
+    def _fine_richiesta(self, eccezione: Optional[BaseException]) -> None:
+        """Chiude la misura se after_request non è stato eseguito."""
+        self._chiudi(request._get_current_object(), 500)
+
+    def _chiudi(self, richiesta, stato: int) -> None:
+        """Registra durata ed esito della richiesta (una sola volta)."""
+        dati = richiesta.__dict__.pop("_metriche", None)
+        if dati is None:
+            return
+        metriche, inizio = dati
+        durata = time.perf_counter() - inizio
+
+        with metriche.lock:
+            metriche.in_corso -= 1
+            metriche.richieste += 1
+            if stato >= 500:
+                metriche.errori += 1
+            metriche.per_classe_stato[min(stato // 100, 5)] += 1
+            metriche.istogramma.registra(durata)
+        if self._multiprocesso is not None:
+            self._multiprocesso.fine(metriche.etichette, stato, durata)
+
+    # ============ ESPOSIZIONE ============
+
+    def riepilogo(self) -> Dict:
+        """Riepilogo JSON per rotta con percentili in millisecondi.
+
+        Riguarda solo il worker che risponde (campo "worker").
+
+        Returns:
+            Dizionario con totali e dettaglio per "METODO rotta", dalla più lenta (p95)
+        """
+        secondi = max(time.time() - self.avvio, 1e-9)
+        rotte = {}
+        totale_richieste = totale_errori = totale_in_corso = 0
+
+        with self._lock:
+            elementi = list(self._rotte.items())
+
+        for (metodo, rotta), m in elementi:
+            with m.lock:
+                istogramma = m.istogramma
+                rotte[f"{metodo} {rotta}"] = {
+                    "richieste": m.richieste,
+                    "errori": m.errori,
+                    "in_corso": m.in_corso,
+                    "per_classe_stato": m.classi_stato(),
+                    "richieste_al_secondo": round(m.richieste / secondi, 3),
+                    "media_ms": round(istogramma.somma / istogramma.totale * 1000, 3) if istogramma.totale else 0.0,
+                    "p50_ms": round(istogramma.quantile(0.50) * 1000, 3),
+                    "p95_ms": round(istogramma.quantile(0.95) * 1000, 3),
+                    "p99_ms": round(istogramma.quantile(0.99) * 1000, 3)
+                }
+                totale_richieste += m.richieste
+                totale_errori += m.errori
+                totale_in_corso += m.in_corso
+
+        return {
+            "worker": os.getpid(),
+            "uptime_secondi": round(secondi, 1),
+            "richieste": totale_richieste,
+            "errori": totale_errori,
+            "in_corso": totale_in_corso,
+            "rotte": dict(sorted(rotte.items(), key=lambda kv: kv[1]["p95_ms"], reverse=True))
+        }
+
+    def formato_prometheus(self) -> str:
+        """Esporta le metriche nel formato testuale Prometheus 0.0.4.
+
+        In modalità multiprocesso i valori sono quelli aggregati di tutti i
+        worker; altrimenti sono del solo processo corrente, con etichetta worker.
+        """
+        if self._multiprocesso is not None:
+            return self._multiprocesso.esporta()
+        p = self.prefisso
+        righe = [
+            f"# HELP {p}_richieste_http_total Richieste HTTP completate.",
+            f"# TYPE {p}_richieste_http_total counter",
+        ]
+        errori = [
+            f"# HELP {p}_errori_http_total Richieste HTTP terminate con stato 5xx.",
+            f"# TYPE {p}_errori_http_total counter",
+        ]
+        in_corso = [
+            f"# HELP {p}_richieste_http_in_corso Richieste HTTP in elaborazione.",
+            f"# TYPE {p}_richieste_http_in_corso gauge",
+        ]
+        durate = [
+            f"# HELP {p}_durata_richiesta_http_seconds Latenza delle richieste HTTP.",
+            f"# TYPE {p}_durata_richiesta_http_seconds histogram",
+        ]
+
+        with self._lock:
+            elementi = sorted(self._rotte.items())
+        worker = os.getpid()
+
+        for (metodo, rotta), m in elementi:
+            etichette = f'worker="{worker}",metodo="{metodo}",rotta="{_escape(rotta)}"'
+            with m.lock:
+                for classe_stato, conteggio in m.classi_stato().items():
+                    righe.append(f'{p}_richieste_http_total{{{etichette},classe_stato="{classe_stato}"}} {conteggio}')
+                errori.append(f"{p}_errori_http_total{{{etichette}}} {m.errori}")
+                in_corso.append(f"{p}_richieste_http_in_corso{{{etichette}}} {m.in_corso}")
+                cumulativi = m.istogramma.cumulativi()
+                for limite, cumulato in zip(self.limiti, cumulativi):
+                    durate.append(f'{p}_durata_richiesta_http_seconds_bucket{{{etichette},le="{limite}"}} {cumulato}')
+                durate.append(f'{p}_durata_richiesta_http_seconds_bucket{{{etichette},le="+Inf"}} {cumulativi[-1]}')
+                durate.append(f"{p}_durata_richiesta_http_seconds_sum{{{etichette}}} {m.istogramma.somma:.6f}")
+                durate.append(f"{p}_durata_richiesta_http_seconds_count{{{etichette}}} {m.istogramma.totale}")
+
+        return "\n".join(righe + errori + in_corso + durate) + "\n"
+
+    def azzera(self) -> None:
+        """Azzera tutte le metriche."""
+        with self._lock:
+            self._rotte.clear()
+            self.avvio = time.time()
+
+
+def _escape(valore: str) -> str:
+    """Escape di un valore di etichetta Prometheus."""
+    return valore.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def misura_overhead(iterazioni: int = 20000) -> float:
+    """Microbenchmark: costo degli hook per richiesta, in microsecondi.
+
+    Esegue gli hook direttamente in un contesto di richiesta già aperto,
+    così il tempo misurato è solo quello aggiunto dal middleware.
+    """
+    from flask import Flask, Response
+
+    app = Flask(__name__)
+    metriche = MetricheRoute(app)
+
+    @app.route("/ping/<int:n>")
+    def ping(n):
+        return "ok"
+
+    risposta = Response("ok")
+    with app.test_request_context("/ping/1"):
+        # Il routing avviene alla push del contesto, come in una richiesta reale
+        inizio = time.perf_counter()
+        for _ in range(iterazioni):
+            metriche._prima_richiesta()
+            metriche._dopo_richiesta(risposta)
+            metriche._fine_richiesta(None)
+        durata = time.perf_counter() - inizio
+
+    return durata / iterazioni * 1e6
+
+
+if __name__ == "__main__":
+    print("📈 TEST METRICHE ROUTE")
+    print("=" * 60 + "\n")
+
+    print(f"   Overhead per richiesta: {misura_overhead():.2f} µs")
+
+    istogramma = IstogrammaLatenze()
+    for i in range(1000):
+        istogramma.registra(0.002 + i * 0.0001)
+    print(f"   p50={istogramma.quantile(0.5) * 1000:.1f} ms, "
+          f"p95={istogramma.quantile(0.95) * 1000:.1f} ms, "
+          f"p99={istogramma.quantile(0.99) * 1000:.1f} ms")
@@ -0,0 +1,246 @@
+"""
+Paginazione lato server e cache dei frammenti HTML - ManagerSchool
+Le pagine HTML mostrano una pagina di risultati alla volta; gli indici
+ordinati e i frammenti già renderizzati sono riusati finché la versione
+dei dati non cambia, così il tempo di risposta non cresce con la scuola.
+"""
+
+import math
+import statistics
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Tuple
+
+
+PER_PAGINA_PREDEFINITO = 50
+PER_PAGINA_MASSIMO = 200
+
+
+@dataclass
+class Pagina:
+    """Una pagina di risultati."""
+
+    elementi: List[Any]
+    numero: int
+    per_pagina: int
+    totale: int
+
+    @property
+    def pagine(self) -> int:
+        """Numero totale di pagine (almeno 1)."""
+        return max(1, math.ceil(self.totale / self.per_pagina))
+
+    @property
+    def ha_precedente(self) -> bool:
+        return self.numero > 1
+
+    @property
+    def ha_successiva(self) -> bool:
+        return self.numero < self.pagine
+
+    @property
+    def primo(self) -> int:
+        """Posizione (da 1) del primo elemento della pagina."""
+        return (self.numero - 1) * self.per_pagina + 1 if self.totale else 0
+
+    @property
+    def ultimo(self) -> int:
+        """Posizione (da 1) dell'ultimo elemento della pagina."""
+        return self.primo + len(self.elementi) - 1 if self.elementi else 0
+
+    def numeri_vicini(self, raggio: int = 2) -> List[int]:
+        """Numeri di pagina da mostrare attorno alla corrente."""
+        return list(range(max(1, self.numero - raggio), min(self.pagine, self.numero + raggio) + 1))
+
+    def to_dict(self) -> Dict:
+        """Metadati della pagina (senza gli elementi)."""
+        return {
+            "pagina": self.numero,
+            "per_pagina": self.per_pagina,
+            "totale": self.totale,
+            "pagine": self.pagine
+        }
+
+
+def pagina_di(elementi: Sequence[Any], numero: int, per_pagina: int) -> Pagina:
+    """Estrae una pagina da una sequenza già filtrata e ordinata.
+
+    Args:
+        elementi: Sequenza completa
+        numero: Pagina richiesta (da 1; oltre l'ultima si usa l'ultima)
+        per_pagina: Elementi per pagina
+
+    Returns:
+        Pagina con i soli elementi richiesti
+    """
+    totale = len(elementi)
+    ultima = max(1, math.ceil(totale / per_pagina))
+    numero = min(max(1, numero), ultima)
+    inizio = (numero - 1) * per_pagina
+    return Pagina(list(elementi[inizio:inizio + per_pagina]), numero, per_pagina, totale)
+
+
+def parametri_paginazione(args, per_pagina_predefinito: int = PER_PAGINA_PREDEFINITO,
+                          massimo: int = PER_PAGINA_MASSIMO) -> Tuple[int, int]:
+    """Legge pagina e per_pagina dalla query string con valori sicuri.
+
+    Args:
+        args: request.args
+        per_pagina_predefinito: Valore se per_pagina manca
+        massimo: Limite superiore di per_pagina
+
+    Returns:
+        (pagina, per_pagina)
+    """
+    numero = args.get('pagina', 1, type=int) or 1
+    per_pagina = args.get('per_pagina', per_pagina_predefinito, type=int) or per_pagina_predefinito
+    return max(1, numero), min(max(1, per_pagina), massimo)
+
+
+class CacheFrammenti:
+    """Cache LRU di valori (indici, frammenti HTML) legati a una versione dei dati.
+
+    Una voce vale solo per la versione con cui è stata calcolata: al cambio
+    di versione viene ricalcolata al primo accesso, le voci vecchie escono
+    per LRU.
+    """
+
+    def __init__(self, capacita: int = 256):
+        """Inizializza la cache.
+
+        Args:
+            capacita: Numero massimo di voci
+        """
+        self.capacita = capacita
+        self._voci: "OrderedDict[Hashable, Tuple[Hashable, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Contatori
+        self.successi = 0
+        self.mancati = 0
+
+    def ottieni(self, chiave: Hashable, versione: Hashable, funzione: Callable[[], Any]) -> Any:
+        """Restituisce il valore in cache o lo calcola.
+
+        Args:
+            chiave: Identifica il frammento (es. nome e parametri della pagina)
+            versione: Versione dei dati su cui il valore è calcolato
+            funzione: Calcolo del valore se assente o di un'altra versione
+        """
+        with self._lock:
+            voce = self._voci.get(chiave)
+            if voce is not None and voce[0] == versione:
+                self._voci.move_to_end(chiave)
+                self.successi += 1
+                return voce[1]
+            self.mancati += 1
+
+        valore = funzione()
+        with self._lock:
+            self._voci[chiave] = (versione, valore)
+            self._voci.move_to_end(chiave)
+            while len(self._voci) > self.capacita:
+                self._voci.popitem(last=False)
+        return valore
+
+    def svuota(self) -> None:
+        """Elimina tutte le voci."""
+        with self._lock:
+            self._voci.clear()
+
+    def statistiche(self) -> Dict:
+        """Contatori della cache."""
+        richieste = self.successi + self.mancati
+        return {
+            "voci": len(self._voci),
+            "capacita": self.capacita,
+            "successi": self.successi,
+            "mancati": self.mancati,
+            "tasso_successo": round(self.successi / richieste, 4) if richieste else None
+        }
+
+
+# ============ BENCHMARK ============
+
+MATERIE_BENCHMARK = ["Matematica", "Italiano", "Inglese"]
+
+
+def benchmark_pagine(dimensioni: Tuple[int, ...] = (100, 1000, 10000, 50000),
+                     pagine: Tuple[str, ...] = ("/studenti?pagina=2", "/analisi", "/voti?pagina=2"),
+                     ripetizioni: int = 20) -> List[Dict]:
+    """Misura il tempo di risposta delle pagine HTML al crescere degli studenti.
+
+    Per ogni dimensione costruisce un'interfaccia con N studenti, tre voti
+    e una pagella ciascuno, e misura la prima richiesta dopo il cambio dei
+    dati (indici da ricostruire) e la mediana delle richieste successive.
+
+    Args:
+        dimensioni: Numeri di studenti
+        pagine: URL da misurare
+        ripetizioni: Richieste per la mediana
+
+    Returns:
+        Una riga per (dimensione, pagina) con tempi in millisecondi
+    """
+    import os
+    import tempfile
+    from interfaccia_erp import InterfacciaERP
+    from voti import Pagella, Voto
+
+    risultati = []
+    cartella_precedente = os.getcwd()
+    with tempfile.TemporaryDirectory() as cartella:
+        os.chdir(cartella)
+        try:
+            for numero in dimensioni:
+                erp = InterfacciaERP()
+                erp.anagrafica.genera_studenti(numero)
+                erp.voti.aggiungi_voti([
+                    Voto(s.id, materia, 4 + (s.id * 7 + i) % 6, "scritto", "2025-10-15")
+                    for s in erp.anagrafica.studenti for i, materia in enumerate(MATERIE_BENCHMARK)
+                ])
+                # Pagelle costruite direttamente: crea_pagella scansiona tutti i voti
+                erp.voti.pagelle.extend(
+                    Pagella(s.id, 1, {m: 6.0 + s.id % 4 for m in MATERIE_BENCHMARK}, 0.0, 8.0, s.id % 12)
+                    for s in erp.anagrafica.studenti
+                )
+
+                client = erp.app.test_client()
+                client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+                for url in pagine:
+                    inizio = time.perf_counter()
+                    risposta = client.get(url)
+                    primo = (time.perf_counter() - inizio) * 1000
+                    if risposta.status_code != 200:
+                        raise RuntimeError(f"{url}: HTTP {risposta.status_code}")
+
+                    tempi = []
+                    for _ in range(ripetizioni):
+                        inizio = time.perf_counter()
+                        client.get(url)
+                        tempi.append((time.perf_counter() - inizio) * 1000)
+                    risultati.append({
+                        "studenti": numero,
+                        "pagina": url,
+                        "primo_ms": round(primo, 2),
+                        "mediana_ms": round(statistics.median(tempi), 3)
+                    })
+        finally:
+            os.chdir(cartella_precedente)
+    return risultati
+
+
+if __name__ == "__main__":
+    print("📄 TEST PAGINAZIONE E CACHE FRAMMENTI")
+    print("=" * 60 + "\n")
+
+    elementi = list(range(1, 124))
+    pagina = pagina_di(elementi, 3, 50)
+    print(f"   Pagina {pagina.numero}/{pagina.pagine}: elementi {pagina.primo}-{pagina.ultimo} di {pagina.totale}")
+
+    print("\n   Tempo di risposta (ms) al crescere degli studenti:")
+    for riga in benchmark_pagine():
+        print(f"   {riga['studenti']:>6} studenti  {riga['pagina']:<20} "
+              f"prima {riga['primo_ms']:>9.2f}  mediana {riga['mediana_ms']:>7.3f}")
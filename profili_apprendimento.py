@@ -0,0 +1,581 @@
+"""
+Profili di apprendimento - ManagerSchool
+Raggruppa gli studenti per profilo di apprendimento con un k-means vettoriale
+(NumPy) sulle feature per studente: media per materia, varianza e pendenza
+dei voti, fragilità sociale e tasso di assenze. Oltre qualche decina di
+migliaia di studenti usa il mini-batch k-means; i nuovi studenti vengono
+assegnati al profilo più vicino senza riaddestrare. Ogni profilo descrive i
+suoi studenti in unità originali e suggerisce l'intervento più adatto.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import threading
+import time
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from amministrativa_school import TipoPresenza
+from interventi import TipoIntervento
+
+
+# Feature dopo le medie per materia (una colonna per materia)
+FEATURE_FISSE = ["varianza", "pendenza", "fragilita", "assenze"]
+
+# Componenti di fragilità sui valori generati da dati.py (stessi pesi di Studente.fragilità_sociale)
+SITUAZIONI_FRAGILI = ("Monoparentale", "Genitori separati", "Affidamento")
+SALUTE_NUMERICA = {"Eccellente": 0, "Buona": 0.25, "Discreta": 0.5, "Problematica": 0.75, "Critica": 1.0}
+INTERVENTO_PER_COMPONENTE = {
+    "economica": TipoIntervento.AUMENTO_REDDITO,
+    "familiare": TipoIntervento.SUPPORTO_FAMILIARE,
+    "sanitaria": TipoIntervento.MIGLIORAMENTO_SALUTE
+}
+
+
+@dataclass
+class MatriceProfili:
+    """Feature di un gruppo di studenti (una riga per studente)."""
+    ids: List[int]
+    materie: List[str]
+    valori: "np.ndarray"   # (studenti, len(materie) + len(FEATURE_FISSE))
+    media: "np.ndarray"    # media generale dei voti (0 senza voti)
+    num_voti: "np.ndarray"
+
+    @property
+    def nomi(self) -> List[str]:
+        return [f"media_{m}" for m in self.materie] + FEATURE_FISSE
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def estrai_feature(anagrafica, gestione_voti, amministrativa=None, studenti=None,
+                   materie: Optional[Sequence[str]] = None) -> MatriceProfili:
+    """Costruisce le feature di tutti gli studenti in un passaggio sui voti.
+
+    Le statistiche per studente e per (studente, materia) sono somme per
+    gruppo con np.bincount. Una materia senza voti prende la media generale
+    dello studente; uno studente senza voti la media della scuola.
+
+    Args:
+        anagrafica: Istanza di Anagrafica
+        gestione_voti: Istanza di GestioneVoti
+        amministrativa: AmministrativaSchool per il tasso di assenze (opzionale)
+        studenti: Studenti da includere (default tutti)
+        materie: Colonne delle materie (default quelle presenti nei voti)
+
+    Returns:
+        MatriceProfili
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("NumPy non disponibile: i profili di apprendimento lo richiedono")
+
+    studenti = list(anagrafica.studenti if studenti is None else studenti)
+    n = len(studenti)
+    riga = {s.id: i for i, s in enumerate(studenti)}
+    righe, nomi_materie, voti = [], [], []
+    for voto in gestione_voti.voti:
+        r = riga.get(voto.id_studente)
+        if r is not None:
+            righe.append(r)
+            nomi_materie.append(voto.materia)
+            voti.append(voto.voto)
+
+    materie = sorted(set(nomi_materie)) if materie is None else list(materie)
+    codice = {m: i for i, m in enumerate(materie)}
+    m = len(materie)
+    righe = np.array(righe, dtype=np.int64)
+    voti = np.array(voti, dtype=np.float64)
+    codici = np.array([codice.get(nome, -1) for nome in nomi_materie], dtype=np.int64)
+
+    # Media, varianza e pendenza per studente (voti nell'ordine di inserimento)
+    conteggi = np.bincount(righe, minlength=n)
+    divisori = np.maximum(conteggi, 1)
+    media = np.bincount(righe, weights=voti, minlength=n) / divisori
+    ordine = np.argsort(righe, kind="stable")
+    righe_ordinate, voti_ordinati = righe[ordine], voti[ordine]
+    inizio = np.cumsum(conteggi) - conteggi
+    scarti = voti_ordinati - media[righe_ordinate]
+    varianza = np.bincount(righe_ordinate, weights=scarti ** 2, minlength=n) / divisori
+    posizioni = np.arange(voti.size) - inizio[righe_ordinate] - (conteggi[righe_ordinate] - 1) / 2
+    sxx = np.bincount(righe_ordinate, weights=posizioni ** 2, minlength=n)
+    sxy = np.bincount(righe_ordinate, weights=posizioni * scarti, minlength=n)
+    pendenza = np.divide(sxy, sxx, out=np.zeros(n), where=sxx > 0)
+
+    # Media per (studente, materia), con imputazione
+    validi = codici >= 0
+    cella = righe[validi] * m + codici[validi]
+    somme_materie = np.bincount(cella, weights=voti[validi], minlength=n * m).reshape(n, m)
+    conteggi_materie = np.bincount(cella, minlength=n * m).reshape(n, m)
+    media_scuola = float(voti.mean()) if voti.size else 6.0
+    riferimento = np.where(conteggi > 0, media, media_scuola)
+    medie_materie = np.where(conteggi_materie > 0, somme_materie / np.maximum(conteggi_materie, 1),
+                             riferimento[:, None])
+
+    # Tasso di assenze sulle registrazioni (come statistiche_presenze)
+    registrazioni = np.zeros(n)
+    assenze = np.zeros(n)
+    if amministrativa is not None:
+        for presenza in amministrativa.presenze:
+            r = riga.get(presenza.studente_id)
+            if r is not None:
+                registrazioni[r] += 1
+                assenze[r] += presenza.tipo == TipoPresenza.ASSENTE
+    tasso_assenze = np.divide(assenze, registrazioni, out=np.zeros(n), where=registrazioni > 0)
+
+    fragilita = np.array([s.fragilità_sociale for s in studenti], dtype=np.float64)
+    valori = np.column_stack([medie_materie.reshape(n, m), varianza, pendenza, fragilita, tasso_assenze])
+    return MatriceProfili(ids=[s.id for s in studenti], materie=materie, valori=valori,
+                          media=media, num_voti=conteggi)
+
+
+# ============ K-MEANS ============
+
+def _distanze(Z: "np.ndarray", centroidi: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """Centroide più vicino e distanza al quadrato per ogni riga."""
+    d2 = (Z ** 2).sum(axis=1)[:, None] - 2 * Z @ centroidi.T + (centroidi ** 2).sum(axis=1)[None, :]
+    etichette = d2.argmin(axis=1)
+    return etichette, np.maximum(d2[np.arange(len(Z)), etichette], 0.0)
+
+
+def _somme_gruppi(Z: "np.ndarray", etichette: "np.ndarray", k: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    somme = np.column_stack([np.bincount(etichette, weights=Z[:, j], minlength=k) for j in range(Z.shape[1])])
+    return somme.reshape(k, Z.shape[1]), np.bincount(etichette, minlength=k)
+
+
+def inizializza_kmeanspp(Z: "np.ndarray", k: int, rng: "np.random.Generator",
+                         campione: int = 20000) -> "np.ndarray":
+    """Centroidi iniziali k-means++ (campionamento D² su al più `campione` righe)."""
+    if len(Z) > campione:
+        Z = Z[rng.choice(len(Z), campione, replace=False)]
+    centroidi = [Z[rng.integers(len(Z))]]
+    d2 = ((Z - centroidi[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        totale = d2.sum()
+        scelta = rng.choice(len(Z), p=d2 / totale) if totale > 0 else rng.integers(len(Z))
+        centroidi.append(Z[scelta])
+        d2 = np.minimum(d2, ((Z - Z[scelta]) ** 2).sum(axis=1))
+    return np.array(centroidi, dtype=np.float64)
+
+
+def kmeans(Z: "np.ndarray", k: int, rng: "np.random.Generator", iterazioni: int = 100,
+           tolleranza: float = 1e-4) -> Tuple["np.ndarray", "np.ndarray", float, int]:
+    """K-means di Lloyd con inizializzazione k-means++.
+
+    Un gruppo rimasto vuoto riparte dal punto più lontano dal suo centroide.
+
+    Returns:
+        (centroidi, etichette, inerzia, iterazioni eseguite)
+    """
+    centroidi = inizializza_kmeanspp(Z, k, rng)
+    soglia = tolleranza * float(Z.var(axis=0).sum())
+    eseguite = 0
+    for eseguite in range(1, iterazioni + 1):
+        etichette, d2 = _distanze(Z, centroidi)
+        somme, conteggi = _somme_gruppi(Z, etichette, k)
+        nuovi = somme / np.maximum(conteggi, 1)[:, None]
+        vuoti = np.flatnonzero(conteggi == 0)
+        if vuoti.size:
+            nuovi[vuoti] = Z[np.argsort(d2)[::-1][:vuoti.size]]
+        spostamento = float(((nuovi - centroidi) ** 2).sum())
+        centroidi = nuovi
+        if spostamento <= soglia:
+            break
+    etichette, d2 = _distanze(Z, centroidi)
+    return centroidi, etichette, float(d2.sum()), eseguite
+
+
+def kmeans_minibatch(Z: "np.ndarray", k: int, rng: "np.random.Generator", dimensione_batch: int = 2048,
+                     iterazioni: int = 200, tolleranza: float = 1e-4) -> Tuple["np.ndarray", "np.ndarray", float, int]:
+    """Mini-batch k-means: ogni centroide si sposta verso la media del batch con passo 1/conteggio.
+
+    Returns:
+        (centroidi, etichette, inerzia, iterazioni eseguite)
+    """
+    centroidi = inizializza_kmeanspp(Z, k, rng)
+    visti = np.zeros(k)
+    soglia = tolleranza * float(Z.var(axis=0).sum())
+    spostamento_medio = None
+    eseguite = 0
+    for eseguite in range(1, iterazioni + 1):
+        batch = Z[rng.integers(0, len(Z), size=min(dimensione_batch, len(Z)))]
+        etichette, _ = _distanze(batch, centroidi)
+        somme, conteggi = _somme_gruppi(batch, etichette, k)
+        visti += conteggi
+        aggiornati = conteggi > 0
+        precedenti = centroidi.copy()
+        centroidi[aggiornati] += ((somme[aggiornati] - conteggi[aggiornati, None] * centroidi[aggiornati])
+                                  / visti[aggiornati, None])
+        spostamento = float(((centroidi - precedenti) ** 2).sum())
+        # Media mobile dello spostamento: un singolo batch fortunato non ferma l'addestramento
+        spostamento_medio = spostamento if spostamento_medio is None else 0.7 * spostamento_medio + 0.3 * spostamento
+        if eseguite >= 10 and spostamento_medio <= soglia:
+            break
+    etichette, d2 = _distanze(Z, centroidi)
+    return centroidi, etichette, float(d2.sum()), eseguite
+
+
+def silhouette(Z: "np.ndarray", etichette: "np.ndarray", rng: "np.random.Generator",
+               campione: int = 2000) -> Optional[float]:
+    """Silhouette media su un campione di studenti (None con meno di 2 gruppi)."""
+    if len(Z) > campione:
+        scelti = rng.choice(len(Z), campione, replace=False)
+        Z, etichette = Z[scelti], etichette[scelti]
+    gruppi = np.unique(etichette)
+    if gruppi.size < 2:
+        return None
+    quadrati = (Z ** 2).sum(axis=1)
+    distanze = np.sqrt(np.maximum(quadrati[:, None] - 2 * Z @ Z.T + quadrati[None, :], 0.0))
+    medie = np.column_stack([distanze[:, etichette == g].mean(axis=1) for g in gruppi])
+    proprio = np.searchsorted(gruppi, etichette)
+    dimensioni = np.bincount(proprio, minlength=gruppi.size)
+    # Distanza media dagli altri membri del proprio gruppo (esclusa la distanza da sé)
+    a = medie[np.arange(len(Z)), proprio] * dimensioni[proprio] / np.maximum(dimensioni[proprio] - 1, 1)
+    medie[np.arange(len(Z)), proprio] = np.inf
+    b = medie.min(axis=1)
+    s = np.where(dimensioni[proprio] > 1, (b - a) / np.maximum(np.maximum(a, b), 1e-12), 0.0)
+    return round(float(s.mean()), 4)
+
+
+# ============ PROFILI ============
+
+class ProfiliApprendimento:
+    """Profili di apprendimento degli studenti (k-means sulle feature per studente)."""
+
+    def __init__(self, anagrafica, gestione_voti, amministrativa=None, k: int = 5, seed: Optional[int] = 0,
+                 metodo: str = "auto", soglia_minibatch: int = 20000, dimensione_batch: int = 2048,
+                 inizializzazioni: int = 3):
+        """Inizializza i profili (addestrati alla prima richiesta).
+
+        Args:
+            anagrafica: Istanza di Anagrafica
+            gestione_voti: Istanza di GestioneVoti
+            amministrativa: AmministrativaSchool per le assenze (opzionale)
+            k: Numero di profili
+            seed: Seme per la riproducibilità
+            metodo: "lloyd", "minibatch" o "auto" (mini-batch oltre soglia_minibatch studenti)
+            soglia_minibatch: Studenti oltre cui "auto" usa il mini-batch
+            dimensione_batch: Studenti per batch del mini-batch
+            inizializzazioni: Ripartenze di Lloyd (si tiene l'inerzia minima)
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy non disponibile: i profili di apprendimento lo richiedono")
+        if k < 1:
+            raise ValueError("Servono almeno un profilo (k >= 1)")
+        if metodo not in ("auto", "lloyd", "minibatch"):
+            raise ValueError(f"Metodo sconosciuto: {metodo}")
+
+        self.anagrafica = anagrafica
+        self.gestione_voti = gestione_voti
+        self.amministrativa = amministrativa
+        self.k = k
+        self.seed = seed
+        self.metodo = metodo
+        self.soglia_minibatch = soglia_minibatch
+        self.dimensione_batch = dimensione_batch
+        self.inizializzazioni = max(1, inizializzazioni)
+
+        self.addestrato = False
+        self.materie: List[str] = []
+        self.centroidi = None
+        self._media = None
+        self._scala = None
+        self._pesi = None
+        self._conteggi = None
+        self._assegnazioni: Dict[int, int] = {}
+        self._matrice: Optional[MatriceProfili] = None
+        self._etichette = None
+        self._profili: Optional[List[Dict]] = None
+        self._lock = threading.RLock()
+        self.statistiche: Dict = {}
+
+    # ============ ADDESTRAMENTO ============
+
+    def _standardizza(self, valori: "np.ndarray") -> "np.ndarray":
+        return (valori - self._media) / self._scala * self._pesi
+
+    def addestra(self, k: Optional[int] = None) -> Dict:
+        """Calcola le feature di tutti gli studenti e i profili.
+
+        Args:
+            k: Numero di profili (default quello corrente)
+
+        Returns:
+            Statistiche dell'addestramento
+        """
+        with self._lock:
+            return self._addestra(k)
+
+    def _addestra(self, k: Optional[int]) -> Dict:
+        inizio = time.perf_counter()
+        self.k = k or self.k
+        matrice = estrai_feature(self.anagrafica, self.gestione_voti, self.amministrativa)
+        if not len(matrice):
+            raise ValueError("Nessuno studente da raggruppare")
+        tempo_feature = time.perf_counter() - inizio
+        k = min(self.k, len(matrice))
+
+        # Z-score; le medie per materia pesano insieme quanto una singola feature
+        self.materie = matrice.materie
+        self._media = matrice.valori.mean(axis=0)
+        scala = matrice.valori.std(axis=0)
+        self._scala = np.where(scala > 1e-12, scala, 1.0)
+        self._pesi = np.ones(matrice.valori.shape[1])
+        if self.materie:
+            self._pesi[:len(self.materie)] = 1 / np.sqrt(len(self.materie))
+        Z = self._standardizza(matrice.valori)
+
+        rng = np.random.default_rng(self.seed)
+        minibatch = self.metodo == "minibatch" or (self.metodo == "auto" and len(Z) > self.soglia_minibatch)
+        if minibatch:
+            centroidi, etichette, inerzia, iterazioni = kmeans_minibatch(Z, k, rng, self.dimensione_batch)
+        else:
+            migliore = None
+            for _ in range(self.inizializzazioni):
+                risultato = kmeans(Z, k, rng)
+                if migliore is None or risultato[2] < migliore[2]:
+                    migliore = risultato
+            centroidi, etichette, inerzia, iterazioni = migliore
+
+        # Profili numerati dalla media generale più alta alla più bassa
+        medie_gruppi = np.bincount(etichette, weights=matrice.media, minlength=k) / np.maximum(
+            np.bincount(etichette, minlength=k), 1)
+        ordine = np.argsort(-medie_gruppi, kind="stable")
+        rinumera = np.empty(k, dtype=np.int64)
+        rinumera[ordine] = np.arange(k)
+        self.centroidi = centroidi[ordine]
+        self._etichette = rinumera[etichette]
+        self._conteggi = np.bincount(self._etichette, minlength=k).astype(np.float64)
+        self._matrice = matrice
+        self._assegnazioni = dict(zip(matrice.ids, self._etichette.tolist()))
+        self._profili = None
+        self.addestrato = True
+
+        self.statistiche = {
+            "studenti": len(matrice),
+            "profili": k,
+            "feature": matrice.nomi,
+            "metodo": "minibatch" if minibatch else "lloyd",
+            "iterazioni": iterazioni,
+            "inerzia": round(inerzia, 3),
+            "silhouette": silhouette(Z, self._etichette, rng),
+            "tempo_feature_ms": round(tempo_feature * 1000, 2),
+            "tempo_ms": round((time.perf_counter() - inizio) * 1000, 2)
+        }
+        return self.statistiche
+
+    def _verifica(self) -> None:
+        with self._lock:
+            if not self.addestrato:
+                self._addestra(None)
+
+    # ============ ASSEGNAZIONE INCREMENTALE ============
+
+    def assegna(self, studenti, aggiorna_centroidi: bool = False) -> Dict[int, int]:
+        """Assegna studenti (anche nuovi) al profilo più vicino senza riaddestrare.
+
+        Args:
+            studenti: Studenti da assegnare
+            aggiorna_centroidi: Se True sposta i centroidi verso i nuovi studenti
+                (passo 1/conteggio, come il mini-batch)
+
+        Returns:
+            {id studente: profilo}
+        """
+        self._verifica()
+        studenti = list(studenti)
+        if not studenti:
+            return {}
+        with self._lock:
+            return self._assegna(studenti, aggiorna_centroidi)
+
+    def _assegna(self, studenti: list, aggiorna_centroidi: bool) -> Dict[int, int]:
+        matrice = estrai_feature(self.anagrafica, self.gestione_voti, self.amministrativa,
+                                 studenti=studenti, materie=self.materie)
+        Z = self._standardizza(matrice.valori)
+        etichette, _ = _distanze(Z, self.centroidi)
+        if aggiorna_centroidi:
+            for riga, profilo in zip(Z, etichette):
+                self._conteggi[profilo] += 1
+                self.centroidi[profilo] += (riga - self.centroidi[profilo]) / self._conteggi[profilo]
+        assegnazioni = dict(zip(matrice.ids, etichette.tolist()))
+        self._assegnazioni.update(assegnazioni)
+        return assegnazioni
+
+    def profilo_studente(self, id_studente: int) -> Optional[Dict]:
+        """Profilo di uno studente; uno studente nuovo viene assegnato al volo.
+
+        Returns:
+            {"id_studente", "profilo", "etichetta", "nuovo"} o None se lo studente non esiste
+        """
+        self._verifica()
+        nuovo = id_studente not in self._assegnazioni
+        if nuovo:
+            studente = self.anagrafica.trova_studente(id_studente)
+            if studente is None:
+                return None
+            self.assegna([studente])
+        profilo = self._assegnazioni[id_studente]
+        return {
+            "id_studente": id_studente,
+            "profilo": profilo,
+            "etichetta": self.profili()[profilo]["etichetta"],
+            "nuovo": nuovo
+        }
+
+    def studenti_profilo(self, profilo: int, limite: Optional[int] = None) -> List[Dict]:
+        """Studenti di un profilo (addestramento e assegnazioni successive)."""
+        self._verifica()
+        if not 0 <= profilo < len(self.centroidi):
+            raise ValueError(f"Profilo {profilo} inesistente")
+        per_id = {s.id: s for s in self.anagrafica.studenti}
+        studenti = []
+        for id_studente, assegnato in self._assegnazioni.items():
+            if assegnato != profilo:
+                continue
+            studente = per_id.get(id_studente)
+            if studente is not None:
+                studenti.append({"id": studente.id, "nome": studente.nome_completo, "classe": studente.classe,
+                                 "fragilita": studente.fragilità_sociale})
+            if limite is not None and len(studenti) >= limite:
+                break
+        return studenti
+
+    # ============ DESCRIZIONE ============
+
+    def profili(self) -> List[Dict]:
+        """Descrizione di ogni profilo sugli studenti dell'addestramento."""
+        with self._lock:
+            self._verifica()
+            if self._profili is None:
+                self._profili = self._descrivi()
+            return self._profili
+
+    def _descrivi(self) -> List[Dict]:
+        matrice, etichette = self._matrice, self._etichette
+        studenti = {s.id: s for s in self.anagrafica.studenti}
+        m = len(self.materie)
+        risultati = []
+        for profilo in range(len(self.centroidi)):
+            membri = etichette == profilo
+            numero = int(membri.sum())
+            valori = matrice.valori[membri].mean(axis=0) if numero else np.zeros(matrice.valori.shape[1])
+            varianza, pendenza, fragilita, assenze = valori[m:]
+            con_voti = membri & (matrice.num_voti > 0)
+            media = float(matrice.media[con_voti].mean()) if con_voti.any() else 0.0
+            medie_materie = {materia: round(float(v), 2) for materia, v in zip(self.materie, valori[:m])}
+
+            componenti = {"economica": 0.0, "sanitaria": 0.0, "familiare": 0.0}
+            classi: Dict[str, int] = {}
+            membri_studenti = [studenti[i] for i, dentro in zip(matrice.ids, membri) if dentro and i in studenti]
+            for s in membri_studenti:
+                componenti["economica"] += 1 - min(s.reddito_familiare / 45000, 1)
+                componenti["sanitaria"] += SALUTE_NUMERICA.get(s.condizione_salute.value, 0)
+                componenti["familiare"] += s.situazione_familiare in SITUAZIONI_FRAGILI
+                classi[s.classe] = classi.get(s.classe, 0) + 1
+            if membri_studenti:
+                componenti = {c: round(v / len(membri_studenti), 3) for c, v in componenti.items()}
+
+            risultati.append({
+                "profilo": profilo,
+                "etichetta": self._etichetta(media, pendenza, varianza, fragilita, assenze),
+                "numero_studenti": numero,
+                "percentuale": round(numero / len(etichette) * 100, 1),
+                "media_generale": round(media, 2),
+                "medie_materie": medie_materie,
+                "materie_deboli": sorted((mat for mat, v in medie_materie.items() if v < 6),
+                                         key=medie_materie.get)[:3],
+                "varianza": round(float(varianza), 2),
+                "pendenza": round(float(pendenza), 3),
+                "fragilita": round(float(fragilita), 1),
+                "assenze_percentuale": round(float(assenze) * 100, 1),
+                "componenti_fragilita": componenti,
+                "classi_principali": sorted(classi, key=lambda c: (-classi[c], c))[:3],
+                **self._suggerimenti(media, pendenza, varianza, fragilita, assenze, componenti, medie_materie)
+            })
+        return risultati
+
+    @staticmethod
+    def _etichetta(media: float, pendenza: float, varianza: float, fragilita: float, assenze: float) -> str:
+        parti = [
+            "Rendimento alto" if media >= 7.5 else ("Rendimento medio" if media >= 6 else "Rendimento basso"),
+            "in crescita" if pendenza > 0.05 else ("in calo" if pendenza < -0.05 else "stabile"),
+            "fragilità alta" if fragilita >= 60 else ("fragilità media" if fragilita >= 30 else "fragilità bassa")
+        ]
+        if varianza >= 2.0:
+            parti.append("discontinuo")
+        if assenze >= 0.15:
+            parti.append("assenze frequenti")
+        return ", ".join(parti)
+
+    @staticmethod
+    def _suggerimenti(media: float, pendenza: float, varianza: float, fragilita: float, assenze: float,
+                      componenti: Dict[str, float], medie_materie: Dict[str, float]) -> Dict:
+        """Intervento (TipoIntervento) e azioni didattiche consigliate per il profilo."""
+        intervento = None
+        if fragilita >= 50:
+            rilevanti = [c for c, v in componenti.items() if v >= 0.5]
+            if len(rilevanti) >= 2:
+                intervento = TipoIntervento.INTERVENTO_COMPLETO
+            else:
+                intervento = INTERVENTO_PER_COMPONENTE[max(componenti, key=componenti.get)]
+
+        azioni = []
+        deboli = [m for m, v in medie_materie.items() if v < 6]
+        if deboli:
+            azioni.append(f"Corsi di recupero: {', '.join(sorted(deboli, key=medie_materie.get)[:3])}")
+        if pendenza < -0.05:
+            azioni.append("Colloqui con le famiglie: rendimento in calo")
+        if varianza >= 2.0:
+            azioni.append("Tutoraggio per la continuità nello studio")
+        if assenze >= 0.15:
+            azioni.append("Monitoraggio della frequenza")
+        if media >= 8 and pendenza >= 0:
+            azioni.append("Percorsi di potenziamento")
+        return {
+            "intervento_suggerito": intervento.name if intervento else None,
+            "azioni_consigliate": azioni
+        }
+
+    def riepilogo(self) -> Dict:
+        """Profili e statistiche dell'addestramento."""
+        self._verifica()
+        return {"statistiche": self.statistiche, "profili": self.profili()}
+
+
+if __name__ == "__main__":
+    import random
+
+    from anagrafica import Anagrafica
+    from voti import GestioneVoti, Voto
+
+    print("🧭 TEST PROFILI DI APPRENDIMENTO")
+    print("=" * 60 + "\n")
+
+    anagrafica, voti = Anagrafica(), GestioneVoti()
+    anagrafica.genera_studenti(50000)
+    casuale = random.Random(0)
+    materie = ["Italiano", "Matematica", "Inglese", "Storia", "Scienze"]
+    elenco = []
+    for s in anagrafica.studenti:
+        livello = casuale.gauss(7, 1) - s.fragilità_sociale / 40
+        tendenza = casuale.gauss(0, 0.1)
+        for prova in range(10):
+            elenco.append(Voto(s.id, materie[prova % 5],
+                               round(min(10, max(3, livello + tendenza * prova + casuale.gauss(0, 0.8))), 1),
+                               "scritto", "2025-11-03"))
+    voti.voti = elenco
+
+    profili = ProfiliApprendimento(anagrafica, voti, k=5)
+    statistiche = profili.addestra()
+    print(f"   {statistiche['studenti']} studenti, metodo {statistiche['metodo']}, "
+          f"{statistiche['tempo_ms']:.0f} ms (feature {statistiche['tempo_feature_ms']:.0f} ms), "
+          f"silhouette {statistiche['silhouette']}")
+    for profilo in profili.profili():
+        print(f"   [{profilo['profilo']}] {profilo['numero_studenti']:>6} studenti - {profilo['etichetta']}"
+              f" → {profilo['intervento_suggerito'] or '-'}")
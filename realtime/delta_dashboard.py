@@ -0,0 +1,432 @@
+"""
+Delta della dashboard inviati dal server - ManagerSchool
+Dopo ogni scrittura calcola solo ciò che è cambiato (KPI, medie di classe,
+nuove allerte) e lo pubblica agli iscritti via Server-Sent Events o
+tramite callback (es. RealtimeServer per WebSocket).
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class CanaleDelta:
+    """Buffer circolare di eventi numerati con attesa bloccante o asincrona.
+
+    Un iscritto è solo un numero di sequenza: gli iscritti inattivi
+    restano fermi su una Condition (thread) o su un Future (event loop)
+    e non consumano CPU.
+    """
+
+    def __init__(self, capacita: int = 256, heartbeat_secondi: float = 15.0):
+        """Inizializza il canale.
+
+        Args:
+            capacita: Eventi conservati per chi si riconnette (Last-Event-ID)
+            heartbeat_secondi: Intervallo dei commenti keep-alive SSE
+        """
+        self.heartbeat_secondi = heartbeat_secondi
+        self._condizione = threading.Condition()
+        self._eventi: deque = deque(maxlen=capacita)
+        self._sequenza = 0
+        self._callback: List[Callable[[Dict], None]] = []
+        # Iscritti asincroni in attesa: (event loop, future da completare)
+        self._attese_async: set = set()
+
+        # Contatori
+        self.iscritti = 0
+        self.pubblicati = 0
+
+    @property
+    def sequenza(self) -> int:
+        """Numero dell'ultimo evento pubblicato."""
+        return self._sequenza
+
+    def iscrivi_callback(self, callback: Callable[[Dict], None]) -> None:
+        """Registra una funzione chiamata a ogni evento (es. ponte WebSocket)."""
+        self._callback.append(callback)
+
+    def pubblica(self, tipo: str, dati: Any) -> Dict:
+        """Pubblica un evento e sveglia gli iscritti in attesa.
+
+        Args:
+            tipo: Nome dell'evento (es. "delta")
+            dati: Contenuto serializzabile in JSON
+
+        Returns:
+            Evento pubblicato con seq e istante
+        """
+        with self._condizione:
+            self._sequenza += 1
+            evento = {"seq": self._sequenza, "tipo": tipo, "istante": time.time(), "dati": dati}
+            self._eventi.append(evento)
+            self.pubblicati += 1
+            self._condizione.notify_all()
+            attese_async = list(self._attese_async)
+
+        # Il loop può girare in un altro thread: il risveglio passa da call_soon_threadsafe
+        for loop, futuro in attese_async:
+            try:
+                loop.call_soon_threadsafe(_completa, futuro)
+            except RuntimeError:
+                pass  # loop già chiuso
+
+        for callback in self._callback:
+            try:
+                callback(evento)
+            except Exception as e:
+                print(f"❌ Errore callback delta: {e}")
+        return evento
+
+    def attendi(self, ultimo: int, timeout: Optional[float] = None) -> Optional[List[Dict]]:
+        """Attende eventi successivi a `ultimo`.
+
+        Args:
+            ultimo: Ultima sequenza già ricevuta
+            timeout: Attesa massima in secondi
+
+        Returns:
+            Eventi nuovi (lista vuota allo scadere del timeout), oppure None
+            se alcuni eventi sono già usciti dal buffer e il client deve
+            ricaricare lo stato completo
+        """
+        with self._condizione:
+            self._condizione.wait_for(lambda: self._sequenza != ultimo, timeout)
+            return self._eventi_dopo(ultimo)
+
+    async def attendi_async(self, ultimo: int, timeout: Optional[float] = None) -> Optional[List[Dict]]:
+        """Come attendi, ma l'attesa è sull'event loop e non occupa un thread."""
+        loop = asyncio.get_running_loop()
+        with self._condizione:
+            if self._sequenza != ultimo:
+                return self._eventi_dopo(ultimo)
+            attesa = (loop, loop.create_future())
+            self._attese_async.add(attesa)
+        try:
+            await asyncio.wait_for(attesa[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condizione:
+                self._attese_async.discard(attesa)
+        with self._condizione:
+            return self._eventi_dopo(ultimo)
+
+    def _eventi_dopo(self, ultimo: int) -> Optional[List[Dict]]:
+        """Eventi successivi a `ultimo` (da chiamare con il lock del canale)."""
+        if self._sequenza == ultimo:
+            return []
+        if ultimo > self._sequenza or not self._eventi or self._eventi[0]["seq"] > ultimo + 1:
+            return None
+        return [e for e in self._eventi if e["seq"] > ultimo]
+
+    @contextmanager
+    def _iscrizione(self):
+        """Conta un iscritto per la durata dello stream."""
+        with self._condizione:
+            self.iscritti += 1
+        try:
+            yield
+        finally:
+            with self._condizione:
+                self.iscritti -= 1
+
+    def _messaggi_sse(self, ultimo: int, eventi: Optional[List[Dict]]) -> Tuple[int, List[str]]:
+        """Messaggi text/event-stream per il risultato di un'attesa e nuova sequenza."""
+        if eventi is None:
+            ultimo = self._sequenza
+            return ultimo, [f"id: {ultimo}\nevent: reset\ndata: {json.dumps({'seq': ultimo})}\n\n"]
+        if not eventi:
+            # Commento keep-alive: rileva i client disconnessi
+            return ultimo, [": heartbeat\n\n"]
+        messaggi = []
+        for evento in eventi:
+            ultimo = evento["seq"]
+            messaggi.append(f"id: {ultimo}\nevent: {evento['tipo']}\ndata: {json.dumps(evento['dati'], default=str)}\n\n")
+        return ultimo, messaggi
+
+    @staticmethod
+    def _apertura_sse(ultimo: int) -> str:
+        """Primo messaggio dello stream: intervallo di riconnessione e sequenza di partenza."""
+        return f"retry: 3000\nid: {ultimo}\nevent: pronto\ndata: {json.dumps({'seq': ultimo})}\n\n"
+
+    def stream_sse(self, ultimo: Optional[int] = None) -> Iterator[str]:
+        """Generatore di eventi in formato text/event-stream.
+
+        Occupa un thread per tutta la connessione: adatto al server di
+        sviluppo e ai worker gevent. Con worker a thread usare stream_sse_async.
+
+        Args:
+            ultimo: Sequenza da cui riprendere (header Last-Event-ID)
+        """
+        ultimo = self._sequenza if ultimo is None else ultimo
+        with self._iscrizione():
+            yield self._apertura_sse(ultimo)
+            while True:
+                ultimo, messaggi = self._messaggi_sse(ultimo, self.attendi(ultimo, self.heartbeat_secondi))
+                yield from messaggi
+
+    async def stream_sse_async(self, ultimo: Optional[int] = None) -> AsyncIterator[str]:
+        """Stream text/event-stream per un event loop (un iscritto è una coroutine).
+
+        Args:
+            ultimo: Sequenza da cui riprendere (header Last-Event-ID)
+        """
+        ultimo = self._sequenza if ultimo is None else ultimo
+        with self._iscrizione():
+            yield self._apertura_sse(ultimo)
+            while True:
+                eventi = await self.attendi_async(ultimo, self.heartbeat_secondi)
+                ultimo, messaggi = self._messaggi_sse(ultimo, eventi)
+                for messaggio in messaggi:
+                    yield messaggio
+
+    def statistiche(self) -> Dict:
+        """Restituisce i contatori del canale."""
+        return {
+            "sequenza": self._sequenza,
+            "iscritti": self.iscritti,
+            "pubblicati": self.pubblicati,
+            "in_buffer": len(self._eventi),
+            "callback": len(self._callback)
+        }
+
+
+def _completa(futuro: "asyncio.Future") -> None:
+    """Sveglia un iscritto asincrono (eseguita nel suo event loop)."""
+    if not futuro.done():
+        futuro.set_result(None)
+
+
+class CalcolatoreDelta:
+    """Confronta lo stato della dashboard con l'ultimo pubblicato e invia le differenze."""
+
+    def __init__(self, canale: CanaleDelta, kpi: Callable[[], Dict],
+                 medie_classi: Callable[[], Dict[str, float]],
+                 allerte: Optional[Callable[[], List[Dict]]] = None):
+        """Inizializza il calcolatore.
+
+        Args:
+            canale: Canale su cui pubblicare
+            kpi: Funzione (economica) che restituisce i KPI correnti
+            medie_classi: Funzione che restituisce {classe: media}
+            allerte: Funzione che restituisce le allerte correnti (con "id")
+        """
+        self.canale = canale
+        self._kpi = kpi
+        self._medie_classi = medie_classi
+        self._allerte = allerte
+        self._lock = threading.Lock()
+        self._ultimo_kpi: Dict = {}
+        self._ultime_medie: Dict[str, float] = {}
+        self._allerte_viste: set = set()
+        self._gestione_voti = None
+        # Lotti aperti nel thread corrente: le modifiche dei voti vengono raccolte
+        self._locale = threading.local()
+
+        self.calcoli = 0
+        self.delta_pubblicati = 0
+        self.aggiorna(pubblica=False)
+
+    def osserva_voti(self, gestione_voti) -> None:
+        """Ricalcola i delta a ogni modifica dei voti (sostituisce l'osservazione precedente)."""
+        if self._gestione_voti is not None and self._su_evento_voti in self._gestione_voti.osservatori:
+            self._gestione_voti.osservatori.remove(self._su_evento_voti)
+        self._gestione_voti = gestione_voti
+        gestione_voti.osservatori.append(self._su_evento_voti)
+
+    def _su_evento_voti(self, evento: str, voto=None) -> None:
+        """Osservatore di GestioneVoti: dentro un lotto rimanda il delta alla chiusura."""
+        if getattr(self._locale, "lotti", 0):
+            self._locale.in_sospeso = True
+            return
+        self.aggiorna()
+
+    def apri_lotto(self) -> None:
+        """Da qui alla chiusura le modifiche dei voti del thread producono un solo delta."""
+        self._locale.lotti = getattr(self._locale, "lotti", 0) + 1
+
+    def chiudi_lotto(self) -> Optional[Dict]:
+        """Chiude un lotto; all'ultima chiusura pubblica le modifiche raccolte.
+
+        Returns:
+            Delta pubblicato, None se non è cambiato nulla
+        """
+        self._locale.lotti = max(getattr(self._locale, "lotti", 0) - 1, 0)
+        if self._locale.lotti or not getattr(self._locale, "in_sospeso", False):
+            return None
+        return self.aggiorna()
+
+    @contextmanager
+    def lotto(self):
+        """Contesto che raggruppa le modifiche in un solo delta (es. una sincronizzazione)."""
+        self.apri_lotto()
+        try:
+            yield
+        finally:
+            self.chiudi_lotto()
+
+    def aggiorna(self, pubblica: bool = True) -> Optional[Dict]:
+        """Calcola e pubblica le differenze rispetto all'ultimo stato.
+
+        Args:
+            pubblica: Se False aggiorna solo lo stato di riferimento
+
+        Returns:
+            Delta pubblicato, None se non è cambiato nulla
+        """
+        self._locale.in_sospeso = False
+        with self._lock:
+            self.calcoli += 1
+            kpi = {k: round(v, 2) if isinstance(v, float) else v for k, v in self._kpi().items()}
+            medie = {c: round(m, 2) for c, m in self._medie_classi().items()}
+            allerte = self._allerte() if self._allerte else []
+
+            delta: Dict[str, Any] = {}
+            kpi_cambiati = {k: v for k, v in kpi.items() if self._ultimo_kpi.get(k) != v}
+            if kpi_cambiati:
+                delta["kpi"] = kpi_cambiati
+            medie_cambiate = {c: m for c, m in medie.items() if self._ultime_medie.get(c) != m}
+            rimosse = [c for c in self._ultime_medie if c not in medie]
+            if medie_cambiate or rimosse:
+                delta["medie_classi"] = {**medie_cambiate, **{c: None for c in rimosse}}
+            nuove = [a for a in allerte if a.get("id") not in self._allerte_viste]
+            if nuove:
+                delta["allerte"] = nuove
+
+            self._ultimo_kpi = kpi
+            self._ultime_medie = medie
+            self._allerte_viste.update(a.get("id") for a in nuove)
+
+        if not delta or not pubblica:
+            return None
+        self.delta_pubblicati += 1
+        self.canale.pubblica("delta", delta)
+        return delta
+
+    def statistiche(self) -> Dict:
+        """Contatori di calcolo e pubblicazione."""
+        return {"calcoli": self.calcoli, "delta_pubblicati": self.delta_pubblicati, **self.canale.statistiche()}
+
+
+def misura_carico_iscritti(iscritti: int = 2000, secondi_inattivi: float = 1.0) -> Dict:
+    """Misura il costo di molti iscritti inattivi e di una pubblicazione.
+
+    Ogni iscritto è un thread fermo su CanaleDelta.attendi, come una
+    connessione SSE servita da un worker a thread.
+
+    Args:
+        iscritti: Numero di iscritti simulati
+        secondi_inattivi: Durata della fase senza eventi
+
+    Returns:
+        CPU consumata da fermi (secondi e percentuale) e tempo di consegna di un evento
+    """
+    canale = CanaleDelta(heartbeat_secondi=3600)
+    ricevuti = []
+    pronti = threading.Barrier(iscritti + 1)
+    lock_ricevuti = threading.Lock()
+
+    def iscritto():
+        ultimo = canale.sequenza
+        pronti.wait()
+        eventi = canale.attendi(ultimo, timeout=60)
+        with lock_ricevuti:
+            ricevuti.append((time.perf_counter(), len(eventi or ())))
+
+    stack_precedente = threading.stack_size(256 * 1024)
+    try:
+        thread = [threading.Thread(target=iscritto, daemon=True) for _ in range(iscritti)]
+        for t in thread:
+            t.start()
+    finally:
+        threading.stack_size(stack_precedente)
+    pronti.wait()
+    time.sleep(0.5)  # tutti in attesa sulla Condition
+
+    # CPU dell'intero processo (tutti i thread)
+    cpu_inizio = time.process_time()
+    time.sleep(secondi_inattivi)
+    cpu_inattiva = time.process_time() - cpu_inizio
+
+    inizio = time.perf_counter()
+    canale.pubblica("delta", {"kpi": {"voti_totali": 1}})
+    for t in thread:
+        t.join(timeout=30)
+
+    return {
+        "iscritti": iscritti,
+        "consegnati": sum(n for _, n in ricevuti),
+        "cpu_inattiva_secondi": round(cpu_inattiva, 4),
+        "cpu_inattiva_percento": round(cpu_inattiva / secondi_inattivi * 100, 2),
+        "consegna_ms": round((max(t for t, _ in ricevuti) - inizio) * 1000, 1) if ricevuti else None
+    }
+
+
+def misura_carico_iscritti_async(iscritti: int = 2000, secondi_inattivi: float = 1.0) -> Dict:
+    """Come misura_carico_iscritti, con gli iscritti come coroutine su un solo event loop.
+
+    È il caso dello stream servito dall'API asincrona: nessun thread per
+    connessione, la pubblicazione arriva da un altro thread.
+
+    Args:
+        iscritti: Numero di iscritti simulati
+        secondi_inattivi: Durata della fase senza eventi
+
+    Returns:
+        CPU consumata da fermi (secondi e percentuale) e tempo di consegna di un evento
+    """
+    canale = CanaleDelta(heartbeat_secondi=3600)
+
+    async def scenario():
+        ricevuti = []
+
+        async def iscritto(ultimo):
+            eventi = await canale.attendi_async(ultimo, timeout=60)
+            ricevuti.append((time.perf_counter(), len(eventi or ())))
+
+        attivi = [asyncio.ensure_future(iscritto(canale.sequenza)) for _ in range(iscritti)]
+        await asyncio.sleep(0.2)  # tutti in attesa sui rispettivi Future
+
+        cpu_inizio = time.process_time()
+        await asyncio.sleep(secondi_inattivi)
+        cpu_inattiva = time.process_time() - cpu_inizio
+
+        inizio = time.perf_counter()
+        threading.Thread(target=canale.pubblica, args=("delta", {"kpi": {"voti_totali": 1}})).start()
+        await asyncio.wait_for(asyncio.gather(*attivi), timeout=30)
+        return ricevuti, cpu_inattiva, inizio
+
+    ricevuti, cpu_inattiva, inizio = asyncio.run(scenario())
+    return {
+        "iscritti": iscritti,
+        "consegnati": sum(n for _, n in ricevuti),
+        "cpu_inattiva_secondi": round(cpu_inattiva, 4),
+        "cpu_inattiva_percento": round(cpu_inattiva / secondi_inattivi * 100, 2),
+        "consegna_ms": round((max(t for t, _ in ricevuti) - inizio) * 1000, 1) if ricevuti else None
+    }
+
+
+if __name__ == "__main__":
+    print("📡 TEST DELTA DASHBOARD")
+    print("=" * 60 + "\n")
+
+    stato = {"voti_totali": 0}
+    calcolatore = CalcolatoreDelta(CanaleDelta(), kpi=lambda: dict(stato), medie_classi=lambda: {"1A": 6.5})
+    stato["voti_totali"] = 30
+    print(f"   Delta dopo un lotto di voti: {calcolatore.aggiorna()}")
+    print(f"   Delta senza modifiche: {calcolatore.aggiorna()}")
+
+    risultato = misura_carico_iscritti()
+    print(f"\n   {risultato['iscritti']} iscritti inattivi: CPU {risultato['cpu_inattiva_percento']}% "
+          f"({risultato['cpu_inattiva_secondi']} s)")
+    print(f"   Consegna di un delta a tutti: {risultato['consegna_ms']} ms "
+          f"({risultato['consegnati']} eventi)")
+
+    risultato = misura_carico_iscritti_async()
+    print(f"\n   {risultato['iscritti']} iscritti asincroni: CPU {risultato['cpu_inattiva_percento']}%, "
+          f"consegna {risultato['consegna_ms']} ms ({risultato['consegnati']} eventi)")
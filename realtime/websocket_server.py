@@ -139,6 +139,16 @@ class RealtimeServer:
         """
         self.broadcast_event('nuova_comunicazione', comunicazione_data)
     
+    def collega_canale_delta(self, canale):
+        """Inoltra ai client WebSocket i delta della dashboard.
+        
+        Args:
+            canale: CanaleDelta (vedi realtime/delta_dashboard.py)
+        """
+        canale.iscrivi_callback(
+            lambda evento: self.broadcast_event('dashboard_delta', {"seq": evento["seq"], **evento["dati"]})
+        )
+    
     def get_connected_clients(self) -> int:
         """Ottiene numero client connessi.
         
@@ -186,6 +196,7 @@ if __name__ == "__main__":
     print("   - studente_modificato")
     print("   - presenza_registrata")
     print("   - nuova_comunicazione")
+    print("   - dashboard_delta")
     
     print("\nPer usare il server:")
     print("   server.notify_voto_inserito({'voto': 8, 'materia': 'Matematica'})")
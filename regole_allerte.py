@@ -0,0 +1,448 @@
+"""
+Motore di regole per le allerte della dirigenza - ManagerSchool
+Regole definite come dati (metrica, ambito, soglia, isteresi, cooldown)
+valutate solo sugli aggregati cambiati, allerte deduplicate per
+(regola, ambito) con ciclo di vita aperta/risolta e archivio limitato
+e indicizzato.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+ORDINE_PRIORITA = {"critica": 0, "alta": 1, "media": 2, "bassa": 3}
+OPERATORI = ("<", ">")
+# Regole personalizzate della scuola (se il file manca valgono REGOLE_PREDEFINITE)
+PERCORSO_REGOLE_ALLERTE = "regole_allerte.json"
+
+
+@dataclass
+class AllertaScuola:
+    """Rappresenta un'allerta per la dirigenza."""
+
+    id: int
+    titolo: str
+    descrizione: str
+    priorita: str  # "bassa", "media", "alta", "critica"
+    tipo: str  # "rendimento", "frequenza", "risorse", "comportamento"
+    dati_correlati: Dict
+    data_creazione: datetime
+    data_scadenza: Optional[datetime] = None
+    risolta: bool = False
+    note_azione: str = ""
+    regola: str = ""  # regola che l'ha aperta (vuota per le allerte manuali)
+    ambito: str = ""  # "scuola" o la classe
+    data_aggiornamento: Optional[datetime] = None
+    data_risoluzione: Optional[datetime] = None
+
+    def to_dict(self) -> Dict:
+        """Converte in dizionario."""
+        return {
+            "id": self.id,
+            "titolo": self.titolo,
+            "descrizione": self.descrizione,
+            "priorita": self.priorita,
+            "tipo": self.tipo,
+            "dati_correlati": self.dati_correlati,
+            "data_creazione": self.data_creazione.isoformat(),
+            "data_scadenza": self.data_scadenza.isoformat() if self.data_scadenza else None,
+            "risolta": self.risolta,
+            "note_azione": self.note_azione,
+            "regola": self.regola,
+            "ambito": self.ambito,
+            "data_aggiornamento": self.data_aggiornamento.isoformat() if self.data_aggiornamento else None,
+            "data_risoluzione": self.data_risoluzione.isoformat() if self.data_risoluzione else None
+        }
+
+
+@dataclass
+class RegolaAllerta:
+    """Regola di allerta su una metrica aggregata.
+
+    L'allerta si apre quando il valore supera la soglia (secondo
+    l'operatore) e si chiude solo quando rientra oltre l'isteresi; dopo
+    una risoluzione non si riapre prima del cooldown.
+    """
+
+    nome: str
+    metrica: str
+    soglia: float
+    operatore: str = "<"  # "<": allerta sotto la soglia, ">": sopra
+    ambito: str = "scuola"  # "scuola" o "classe" (un'allerta per classe)
+    isteresi: float = 0.0
+    cooldown_secondi: int = 6 * 3600
+    priorita: str = "media"
+    soglia_escalation: Optional[float] = None  # oltre questa la priorità diventa priorita_escalation
+    priorita_escalation: str = "alta"
+    tipo: str = "rendimento"
+    titolo: str = ""
+    descrizione: str = ""
+
+    def __post_init__(self):
+        if self.operatore not in OPERATORI:
+            raise ValueError(f"Operatore non valido: {self.operatore}")
+        if self.priorita not in ORDINE_PRIORITA or self.priorita_escalation not in ORDINE_PRIORITA:
+            raise ValueError(f"Priorità non valida nella regola {self.nome}")
+        if self.isteresi < 0 or self.cooldown_secondi < 0:
+            raise ValueError(f"Isteresi e cooldown non possono essere negativi ({self.nome})")
+
+    def violata(self, valore: float) -> bool:
+        """True se il valore fa scattare l'allerta."""
+        return valore < self.soglia if self.operatore == "<" else valore > self.soglia
+
+    def rientrata(self, valore: float) -> bool:
+        """True se il valore è rientrato oltre l'isteresi (l'allerta si chiude)."""
+        if self.operatore == "<":
+            return valore >= self.soglia + self.isteresi
+        return valore <= self.soglia - self.isteresi
+
+    def priorita_per(self, valore: float) -> str:
+        """Priorità dell'allerta per il valore corrente."""
+        if self.soglia_escalation is not None and (
+            valore < self.soglia_escalation if self.operatore == "<" else valore > self.soglia_escalation
+        ):
+            return self.priorita_escalation
+        return self.priorita
+
+    def testi(self, valore: float, ambito: str) -> Tuple[str, str]:
+        """Titolo e descrizione con valore, soglia e ambito sostituiti."""
+        campi = {"valore": valore, "soglia": self.soglia, "ambito": ambito}
+        return (self.titolo or self.nome).format(**campi), self.descrizione.format(**campi)
+
+    def to_dict(self) -> Dict:
+        """Converte in dizionario."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, dati: Dict) -> "RegolaAllerta":
+        """Crea una regola da un dizionario (es. letto da JSON)."""
+        return cls(**dati)
+
+
+# Regole equivalenti alle soglie storiche di genera_allerte_automatiche
+REGOLE_PREDEFINITE: List[RegolaAllerta] = [
+    RegolaAllerta(
+        nome="rendimento_generale", metrica="media_generale", soglia=6.0, operatore="<",
+        isteresi=0.1, soglia_escalation=5.5, priorita="media", priorita_escalation="alta",
+        titolo="Rendimento Generale Sotto la Soglia",
+        descrizione="La media generale della scuola è {valore:.2f}, sotto la soglia minima di {soglia}"
+    ),
+    RegolaAllerta(
+        nome="frequenza", metrica="tasso_frequenza", soglia=85, operatore="<",
+        isteresi=1.0, soglia_escalation=80, priorita="media", priorita_escalation="alta",
+        tipo="frequenza", titolo="Tasso di Frequenza Critico",
+        descrizione="Il tasso di frequenza è al {valore:.1f}%, sotto la soglia del {soglia}%"
+    ),
+    RegolaAllerta(
+        nome="studenti_rischio_critico", metrica="studenti_critici", soglia=0, operatore=">",
+        priorita="critica", titolo="{valore:.0f} Studenti a Rischio Critico",
+        descrizione="Identificati {valore:.0f} studenti che necessitano interventi immediati"
+    ),
+    RegolaAllerta(
+        nome="classe_sbilanciata", metrica="scostamento_media_classe", soglia=0.8, operatore=">",
+        ambito="classe", isteresi=0.1, priorita="media",
+        titolo="Classe {ambito}: Performance Sbilanciata",
+        descrizione="La media della classe {ambito} si discosta di {valore:.2f} punti dalla media della scuola"
+    ),
+    RegolaAllerta(
+        nome="insegnanti_sovraccarichi", metrica="insegnanti_sovraccarichi", soglia=0, operatore=">",
+        priorita="media", tipo="risorse", titolo="{valore:.0f} Insegnanti Sovraccarichi",
+        descrizione="{valore:.0f} insegnanti hanno un carico di lavoro critico"
+    ),
+]
+
+
+def carica_regole(percorso: str = PERCORSO_REGOLE_ALLERTE) -> Optional[List[RegolaAllerta]]:
+    """Legge le regole da un file JSON (lista di dizionari).
+
+    Returns:
+        Regole lette, o None se il file non esiste
+    """
+    if not os.path.exists(percorso):
+        return None
+    with open(percorso, encoding="utf-8") as f:
+        return [RegolaAllerta.from_dict(dati) for dati in json.load(f)]
+
+
+class ArchivioAllerte:
+    """Allerte aperte indicizzate per (regola, ambito) e per ID, con uno
+    storico limitato delle risolte (le più vecchie vengono scartate).
+    """
+
+    def __init__(self, capacita_storico: int = 500):
+        """Inizializza l'archivio.
+
+        Args:
+            capacita_storico: Numero massimo di allerte risolte conservate
+        """
+        self._lock = threading.RLock()
+        self.capacita_storico = capacita_storico
+        self._aperte: Dict[Tuple[str, str], AllertaScuola] = {}
+        self._per_id: Dict[int, AllertaScuola] = {}
+        self._storico: "OrderedDict[int, AllertaScuola]" = OrderedDict()
+        self._ultima_risoluzione: Dict[Tuple[str, str], datetime] = {}
+        self._prossimo_id = 1
+        self.scartate = 0
+
+    def nuovo_id(self) -> int:
+        with self._lock:
+            prossimo = self._prossimo_id
+            self._prossimo_id += 1
+            return prossimo
+
+    def aperta(self, regola: str, ambito: str) -> Optional[AllertaScuola]:
+        """Allerta aperta per (regola, ambito), se esiste."""
+        return self._aperte.get((regola, ambito))
+
+    def ultima_risoluzione(self, regola: str, ambito: str) -> Optional[datetime]:
+        return self._ultima_risoluzione.get((regola, ambito))
+
+    def aggiungi(self, allerta: AllertaScuola) -> AllertaScuola:
+        """Registra un'allerta aperta (le manuali sono indicizzate per ID)."""
+        with self._lock:
+            chiave = (allerta.regola, allerta.ambito) if allerta.regola else ("", str(allerta.id))
+            self._aperte[chiave] = allerta
+            self._per_id[allerta.id] = allerta
+            return allerta
+
+    def risolvi(self, id_allerta: int, note_azione: str = "", ora: Optional[datetime] = None) -> Optional[AllertaScuola]:
+        """Chiude un'allerta aperta e la sposta nello storico.
+
+        Returns:
+            L'allerta risolta (None se non esiste o era già risolta)
+        """
+        with self._lock:
+            allerta = self._per_id.get(id_allerta)
+            if allerta is None or allerta.risolta:
+                return None
+            chiave = (allerta.regola, allerta.ambito) if allerta.regola else ("", str(allerta.id))
+            del self._aperte[chiave]
+            allerta.risolta = True
+            allerta.data_risoluzione = ora or datetime.now()
+            if note_azione:
+                allerta.note_azione = note_azione
+            if allerta.regola:
+                self._ultima_risoluzione[chiave] = allerta.data_risoluzione
+            self._storico[allerta.id] = allerta
+            while len(self._storico) > self.capacita_storico:
+                id_vecchia, _ = self._storico.popitem(last=False)
+                del self._per_id[id_vecchia]
+                self.scartate += 1
+            return allerta
+
+    def trova(self, id_allerta: int) -> Optional[AllertaScuola]:
+        return self._per_id.get(id_allerta)
+
+    def attive(self) -> List[AllertaScuola]:
+        """Allerte aperte (costo proporzionale al loro numero)."""
+        with self._lock:
+            return list(self._aperte.values())
+
+    def risolte(self) -> List[AllertaScuola]:
+        with self._lock:
+            return list(self._storico.values())
+
+    def numero_attive(self) -> int:
+        return len(self._aperte)
+
+    def __iter__(self) -> Iterator[AllertaScuola]:
+        return iter(self.attive() + self.risolte())
+
+    def __len__(self) -> int:
+        return len(self._aperte) + len(self._storico)
+
+
+class MotoreRegoleAllerte:
+    """Valuta le regole sugli aggregati e mantiene le allerte deduplicate.
+
+    Ogni chiamata a valuta riceve i valori correnti per metrica e ambito:
+    solo le coppie (metrica, ambito) con un valore cambiato, o ancora in
+    attesa di cooldown, vengono valutate.
+    """
+
+    def __init__(self, regole: Optional[List[RegolaAllerta]] = None,
+                 archivio: Optional[ArchivioAllerte] = None):
+        """Inizializza il motore.
+
+        Args:
+            regole: Regole da applicare (default REGOLE_PREDEFINITE)
+            archivio: Archivio delle allerte (default uno nuovo)
+        """
+        self._lock = threading.RLock()
+        self.archivio = archivio if archivio is not None else ArchivioAllerte()
+        self.regole: Dict[str, RegolaAllerta] = {}
+        self._per_metrica: Dict[str, List[RegolaAllerta]] = {}
+        self._ultimi_valori: Dict[Tuple[str, str], float] = {}
+        self._in_cooldown: Dict[Tuple[str, str], float] = {}  # (regola, ambito) -> valore in attesa
+        self.valutazioni = 0
+        self.applicazioni = 0  # valutazioni di singole coppie (regola, ambito)
+        for regola in (REGOLE_PREDEFINITE if regole is None else regole):
+            self.aggiungi_regola(regola)
+
+    def aggiungi_regola(self, regola: RegolaAllerta) -> None:
+        """Aggiunge o sostituisce una regola (rivalutata alla prossima chiamata)."""
+        with self._lock:
+            self.rimuovi_regola(regola.nome)
+            self.regole[regola.nome] = regola
+            self._per_metrica.setdefault(regola.metrica, []).append(regola)
+            # I valori già visti vanno rivalutati con la nuova regola
+            for chiave in [c for c in self._ultimi_valori if c[0] == regola.metrica]:
+                del self._ultimi_valori[chiave]
+
+    def rimuovi_regola(self, nome: str) -> None:
+        """Rimuove una regola e chiude le sue allerte aperte."""
+        with self._lock:
+            regola = self.regole.pop(nome, None)
+            if regola is None:
+                return
+            self._per_metrica[regola.metrica].remove(regola)
+            for allerta in self.archivio.attive():
+                if allerta.regola == nome:
+                    self.archivio.risolvi(allerta.id, "Regola rimossa")
+            for chiave in [c for c in self._in_cooldown if c[0] == nome]:
+                del self._in_cooldown[chiave]
+
+    def risolvi(self, id_allerta: int, note_azione: str = "",
+                ora: Optional[datetime] = None) -> Optional[AllertaScuola]:
+        """Chiude manualmente un'allerta.
+
+        Se la condizione persiste il valore resta in attesa di cooldown: la
+        regola si riapre alla scadenza anche se l'aggregato non cambia.
+
+        Returns:
+            L'allerta risolta (None se non esiste o era già risolta)
+        """
+        with self._lock:
+            allerta = self.archivio.risolvi(id_allerta, note_azione, ora)
+            regola = self.regole.get(allerta.regola) if allerta is not None else None
+            if regola is not None:
+                valore = self._ultimi_valori.get((regola.metrica, allerta.ambito))
+                if valore is not None:
+                    self._in_cooldown[(regola.nome, allerta.ambito)] = valore
+            return allerta
+
+    def valuta(self, aggregati: Dict[str, Dict[str, float]],
+               dettagli: Optional[Dict[str, Dict[str, Dict]]] = None,
+               ora: Optional[datetime] = None) -> List[AllertaScuola]:
+        """Applica le regole agli aggregati cambiati.
+
+        Args:
+            aggregati: metrica -> {ambito: valore} ("scuola" per le metriche globali)
+            dettagli: metrica -> {ambito: dati aggiuntivi per dati_correlati}
+            ora: Istante della valutazione (default adesso)
+
+        Returns:
+            Allerte aperte da questa valutazione
+        """
+        ora = ora or datetime.now()
+        dettagli = dettagli or {}
+        nuove = []
+        with self._lock:
+            self.valutazioni += 1
+            for metrica, valori in aggregati.items():
+                regole = self._per_metrica.get(metrica)
+                if not regole:
+                    continue
+                # Ambiti spariti (es. classe senza più studenti): valore assente
+                for chiave in [c for c in self._ultimi_valori if c[0] == metrica and c[1] not in valori]:
+                    del self._ultimi_valori[chiave]
+                    for regola in regole:
+                        allerta = self.archivio.aperta(regola.nome, chiave[1])
+                        if allerta is not None:
+                            self.archivio.risolvi(allerta.id, "Ambito non più presente", ora)
+                        self._in_cooldown.pop((regola.nome, chiave[1]), None)
+
+                for ambito, valore in valori.items():
+                    if self._ultimi_valori.get((metrica, ambito)) == valore:
+                        continue
+                    self._ultimi_valori[(metrica, ambito)] = valore
+                    extra = dettagli.get(metrica, {}).get(ambito, {})
+                    for regola in regole:
+                        if (ambito == "scuola") != (regola.ambito == "scuola"):
+                            continue
+                        allerta = self._applica(regola, ambito, valore, extra, ora)
+                        if allerta is not None:
+                            nuove.append(allerta)
+
+            # Allerte trattenute dal cooldown: si aprono alla scadenza se la condizione persiste
+            for (nome, ambito), valore in list(self._in_cooldown.items()):
+                regola = self.regole[nome]
+                allerta = self._applica(regola, ambito, valore,
+                                        dettagli.get(regola.metrica, {}).get(ambito, {}), ora)
+                if allerta is not None:
+                    nuove.append(allerta)
+        return nuove
+
+    def _applica(self, regola: RegolaAllerta, ambito: str, valore: float,
+                 extra: Dict, ora: datetime) -> Optional[AllertaScuola]:
+        """Aggiorna, chiude o apre l'allerta di (regola, ambito).
+
+        Returns:
+            La nuova allerta se ne è stata aperta una
+        """
+        self.applicazioni += 1
+        chiave = (regola.nome, ambito)
+        allerta = self.archivio.aperta(*chiave)
+        if allerta is not None:
+            if regola.rientrata(valore):
+                self.archivio.risolvi(allerta.id, "Rientrata automaticamente", ora)
+            else:
+                # Stessa allerta aggiornata, nessun duplicato
+                allerta.titolo, allerta.descrizione = regola.testi(valore, ambito)
+                allerta.priorita = regola.priorita_per(valore)
+                allerta.dati_correlati = {"valore": valore, "soglia": regola.soglia, **extra}
+                allerta.data_aggiornamento = ora
+            return None
+
+        self._in_cooldown.pop(chiave, None)
+        if not regola.violata(valore):
+            return None
+        risolta_il = self.archivio.ultima_risoluzione(*chiave)
+        if risolta_il is not None and ora - risolta_il < timedelta(seconds=regola.cooldown_secondi):
+            self._in_cooldown[chiave] = valore
+            return None
+
+        titolo, descrizione = regola.testi(valore, ambito)
+        return self.archivio.aggiungi(AllertaScuola(
+            id=self.archivio.nuovo_id(),
+            titolo=titolo,
+            descrizione=descrizione,
+            priorita=regola.priorita_per(valore),
+            tipo=regola.tipo,
+            dati_correlati={"valore": valore, "soglia": regola.soglia, **extra},
+            data_creazione=ora,
+            regola=regola.nome,
+            ambito=ambito
+        ))
+
+    def statistiche(self) -> Dict:
+        """Contatori del motore."""
+        return {
+            "regole": len(self.regole),
+            "valutazioni": self.valutazioni,
+            "applicazioni": self.applicazioni,
+            "allerte_aperte": self.archivio.numero_attive(),
+            "allerte_risolte": len(self.archivio.risolte()),
+            "in_cooldown": len(self._in_cooldown),
+            "scartate_dallo_storico": self.archivio.scartate
+        }
+
+
+if __name__ == "__main__":
+    print("🚨 TEST MOTORE REGOLE ALLERTE")
+    print("=" * 60 + "\n")
+
+    motore = MotoreRegoleAllerte()
+    inizio = datetime(2025, 11, 3, 6, 0)
+    sequenza = [5.8, 5.8, 5.4, 6.05, 6.2, 5.9]
+    for ora, media in enumerate(sequenza):
+        nuove = motore.valuta({"media_generale": {"scuola": media}}, ora=inizio + timedelta(hours=ora))
+        attive = motore.archivio.attive()
+        print(f"   media {media}: nuove {len(nuove)}, aperte "
+              f"{[(a.id, a.priorita) for a in attive]}")
+    print(f"\n   {motore.statistiche()}")
@@ -3,16 +3,18 @@ Modulo per la generazione di report aggregati.
 Crea report completi su vari aspetti del sistema scolastico.
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
 from datetime import datetime
 import utils
+from report_parallelo import ReportParallelo, analizza_classe, fotografa_classi
 
 
 class GeneratoreReport:
     """Genera report aggregati sul sistema scolastico."""
     
     def __init__(self, anagrafica, gestione_voti, gestione_insegnanti, 
-                 analisi_didattica, calcolatore_indicatori):
+                 analisi_didattica, calcolatore_indicatori,
+                 report_parallelo: Optional[ReportParallelo] = None):
         """Inizializza il generatore di report.
         
         Args:
@@ -21,12 +23,14 @@ class GeneratoreReport:
             gestione_insegnanti: Istanza di GestioneInsegnanti
             analisi_didattica: Istanza di AnalisiDidattica
             calcolatore_indicatori: Istanza di CalcolatoreIndicatori
+            report_parallelo: Pool per l'analisi per classe (default uno per CPU)
         """
         self.anagrafica = anagrafica
         self.gestione_voti = gestione_voti
         self.gestione_insegnanti = gestione_insegnanti
         self.analisi_didattica = analisi_didattica
         self.calcolatore_indicatori = calcolatore_indicatori
+        self.report_parallelo = report_parallelo if report_parallelo is not None else ReportParallelo()
     
     def report_annuale(self) -> Dict:
         """Genera un report annuale completo.
@@ -49,7 +53,8 @@ class GeneratoreReport:
             },
             "analisi_equita": self.analisi_didattica.impatto_didattico_fragili(),
             "correlazione_reddito": self.analisi_didattica.correlazione_reddito_rendimento(),
-            "indicatori": self.calcolatore_indicatori.sintesi_indicatori()
+            "indicatori": self.calcolatore_indicatori.sintesi_indicatori(),
+            "classi_performance": self._classi_performance()
         }
     
     def report_classe(self, classe: str) -> Dict:
@@ -61,32 +66,40 @@ class GeneratoreReport:
         Returns:
             Dizionario con report classe
         """
-        studenti_classe = self.anagrafica.studenti_per_classe(classe)
+        fotografie = fotografa_classi(self.anagrafica, self.gestione_voti, [classe])
         
-        if not studenti_classe:
+        if not fotografie:
             return {"errore": f"Classe {classe} non trovata"}
         
-        # Calcola statistiche
-        medie = []
-        for studente in studenti_classe:
-            media = self.gestione_voti.media_studente(studente.id)
-            if media > 0:
-                medie.append(media)
-        
-        media_classe = utils.calcola_media(medie) if medie else 0
+        return self._report_da_analisi(analizza_classe(fotografie[0]))
+    
+    def report_classi(self, classi: Optional[Sequence[str]] = None) -> Dict[str, Dict]:
+        """Genera i report di più classi, analizzate in parallelo per classe.
         
+        Args:
+            classi: Classi da includere (default tutte)
+            
+        Returns:
+            Report per classe, in ordine di nome della classe
+        """
+        analisi = self._analisi_classi(classi)
+        return {classe: self._report_da_analisi(analisi[classe]) for classe in sorted(analisi)}
+    
+    def _analisi_classi(self, classi: Optional[Sequence[str]] = None) -> Dict[str, Dict]:
+        """Analisi per classe dalla fotografia corrente dei dati."""
+        return self.report_parallelo.analizza(fotografa_classi(self.anagrafica, self.gestione_voti, classi))
+    
+    def _report_da_analisi(self, analisi: Dict) -> Dict:
+        """Report di una classe nel formato di report_classe."""
         return {
-            "classe": classe,
+            "classe": analisi["classe"],
             "data_generazione": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "numero_studenti": len(studenti_classe),
-            "media_classe": round(media_classe, 2),
-            "statistiche_studenti": {
-                "media_eta": round(utils.calcola_media([s.eta for s in studenti_classe]), 1),
-                "numero_maschi": sum(1 for s in studenti_classe if s.nome[-1] == 'o'),
-                "numero_femmine": sum(1 for s in studenti_classe if s.nome[-1] == 'a')
-            },
-            "distribuzione_fragilita": self._distribuzione_fragilita(studenti_classe),
-            "top_3_studenti": self._top_studenti_classe(classe, 3)
+            "numero_studenti": analisi["numero_studenti"],
+            "media_classe": analisi["media_classe"],
+            "statistiche_studenti": analisi["statistiche_studenti"],
+            "distribuzione_fragilita": analisi["distribuzione_fragilita"],
+            "top_3_studenti": analisi["top_studenti"],
+            "medie_materie": analisi["medie_materie"]
         }
     
     def report_insegnante(self, insegnante_id: int) -> Dict:
@@ -222,34 +235,10 @@ class GeneratoreReport:
             )
         }
     
-    def _distribuzione_fragilita(self, studenti: List) -> Dict:
-        """Calcola la distribuzione della fragilità."""
-        fragili_alte = sum(1 for s in studenti if s.fragilità_sociale >= 60)
-        fragili_medie = sum(1 for s in studenti if 30 <= s.fragilità_sociale < 60)
-        fragili_basse = sum(1 for s in studenti if s.fragilità_sociale < 30)
-        
-        return {
-            "alta": fragili_alte,
-            "media": fragili_medie,
-            "bassa": fragili_basse
-        }
-    
     def _top_studenti_classe(self, classe: str, limit: int = 3) -> List[Dict]:
         """Restituisce i top studenti di una classe."""
-        studenti_classe = self.anagrafica.studenti_per_classe(classe)
-        
-        risultati = []
-        for studente in studenti_classe:
-            media = self.gestione_voti.media_studente(studente.id)
-            if media > 0:
-                risultati.append({
-                    "nome": studente.nome_completo,
-                    "media": round(media, 2)
-                })
-        
-        # Ordina per media
-        risultati.sort(key=lambda x: x["media"], reverse=True)
-        return risultati[:limit]
+        fotografie = fotografa_classi(self.anagrafica, self.gestione_voti, [classe])
+        return analizza_classe(fotografie[0], limit)["top_studenti"] if fotografie else []
     
     def _distribuzione_voti(self, voti: List) -> Dict:
         """Calcola la distribuzione dei voti."""
@@ -269,24 +258,10 @@ class GeneratoreReport:
     
     def _classi_performance(self) -> List[Dict]:
         """Restituisce le classi ordinate per performance."""
-        classi_performance = []
-        
-        for classe in set(s.classe for s in self.anagrafica.studenti):
-            studenti = self.anagrafica.studenti_per_classe(classe)
-            medie = []
-            for studente in studenti:
-                media = self.gestione_voti.media_studente(studente.id)
-                if media > 0:
-                    medie.append(media)
-            
-            if medie:
-                classi_performance.append({
-                    "classe": classe,
-                    "media": round(utils.calcola_media(medie), 2),
-                    "studenti": len(studenti)
-                })
+        analisi = self._analisi_classi()
         
-        # Ordina per media
+        # Ordine per nome prima dell'ordinamento stabile: risultato deterministico
+        classi_performance = [analisi[c]["performance"] for c in sorted(analisi) if analisi[c]["performance"]]
         classi_performance.sort(key=lambda x: x["media"], reverse=True)
         return classi_performance
     
@@ -0,0 +1,326 @@
+"""
+Report per classe in parallelo - ManagerSchool
+Il lavoro dei report è diviso per classe: una fotografia compatta e
+serializzabile dei dati di ogni classe viene analizzata in un pool di
+processi e i risultati sono riuniti nell'ordine delle classi.
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import utils
+
+
+@dataclass
+class FotografiaClasse:
+    """Dati di una classe necessari ai report, senza riferimenti agli oggetti del registro.
+
+    I voti sono in array contigui (serializzati con una copia di memoria):
+    quelli dello studente i stanno in valori[inizio[i]:inizio[i + 1]].
+    """
+
+    classe: str
+    # (id, nome, nome_completo, eta, fragilità) nell'ordine dell'anagrafica
+    studenti: List[Tuple[int, str, str, int, float]] = field(default_factory=list)
+    materie: List[str] = field(default_factory=list)
+    inizio: array = field(default_factory=lambda: array("l", [0]))
+    indici_materia: array = field(default_factory=lambda: array("H"))
+    valori: array = field(default_factory=lambda: array("d"))
+
+    @property
+    def peso(self) -> int:
+        """Stima del lavoro di analisi (studenti + voti)."""
+        return len(self.studenti) + len(self.valori)
+
+
+def fotografa_classi(anagrafica, gestione_voti, classi: Optional[Sequence[str]] = None) -> List[FotografiaClasse]:
+    """Fotografie delle classi con un solo passaggio su studenti e voti.
+
+    Args:
+        anagrafica: Anagrafica
+        gestione_voti: GestioneVoti
+        classi: Solo queste classi (default tutte)
+
+    Returns:
+        Fotografie nell'ordine di prima comparsa delle classi in anagrafica
+    """
+    richieste = set(classi) if classi is not None else None
+    voti_per_studente: Dict[int, List] = {}
+    for studente in anagrafica.studenti:
+        if richieste is None or studente.classe in richieste:
+            voti_per_studente[studente.id] = []
+    for voto in gestione_voti.voti:
+        lista = voti_per_studente.get(voto.id_studente)
+        if lista is not None:
+            lista.append(voto)
+
+    fotografie: Dict[str, FotografiaClasse] = {}
+    indici_materie: Dict[Tuple[str, str], int] = {}
+    for studente in anagrafica.studenti:
+        if richieste is not None and studente.classe not in richieste:
+            continue
+        foto = fotografie.get(studente.classe)
+        if foto is None:
+            foto = fotografie[studente.classe] = FotografiaClasse(studente.classe)
+        foto.studenti.append((studente.id, studente.nome, studente.nome_completo,
+                              studente.eta, studente.fragilità_sociale))
+        for voto in voti_per_studente[studente.id]:
+            indice = indici_materie.get((foto.classe, voto.materia))
+            if indice is None:
+                indice = indici_materie[(foto.classe, voto.materia)] = len(foto.materie)
+                foto.materie.append(voto.materia)
+            foto.indici_materia.append(indice)
+            foto.valori.append(voto.voto)
+        foto.inizio.append(len(foto.valori))
+    return list(fotografie.values())
+
+
+def analizza_classe(foto: FotografiaClasse, limite_top: int = 3) -> Dict:
+    """Analisi completa di una classe (funzione pura, eseguibile in un altro processo).
+
+    Returns:
+        Report della classe (campi di report_classe), distribuzione delle
+        medie (come _analizza_distribuzione_classi) e riga delle performance
+    """
+    medie_tutte = []  # media 0.0 per gli studenti senza voti
+    migliori = []
+    for i, (_, _, nome_completo, _, _) in enumerate(foto.studenti):
+        voti = foto.valori[foto.inizio[i]:foto.inizio[i + 1]]
+        media = sum(voti) / len(voti) if voti else 0.0
+        medie_tutte.append(media)
+        if media > 0:
+            migliori.append({"nome": nome_completo, "media": round(media, 2)})
+    medie = [m for m in medie_tutte if m > 0]
+    migliori.sort(key=lambda x: x["media"], reverse=True)
+
+    per_materia: List[List[float]] = [[] for _ in foto.materie]
+    for indice, voto in zip(foto.indici_materia, foto.valori):
+        per_materia[indice].append(voto)
+
+    media_tutte = sum(medie_tutte) / len(medie_tutte) if medie_tutte else 0
+    varianza = sum((m - media_tutte) ** 2 for m in medie_tutte) / len(medie_tutte) if medie_tutte else 0.0
+    fragilita = [s[4] for s in foto.studenti]
+    nomi = [s[1] for s in foto.studenti]
+
+    return {
+        "classe": foto.classe,
+        "numero_studenti": len(foto.studenti),
+        "media_classe": round(utils.calcola_media(medie) if medie else 0, 2),
+        "statistiche_studenti": {
+            "media_eta": round(utils.calcola_media([s[3] for s in foto.studenti]), 1),
+            "numero_maschi": sum(1 for nome in nomi if nome[-1] == 'o'),
+            "numero_femmine": sum(1 for nome in nomi if nome[-1] == 'a')
+        },
+        "distribuzione_fragilita": {
+            "alta": sum(1 for f in fragilita if f >= 60),
+            "media": sum(1 for f in fragilita if 30 <= f < 60),
+            "bassa": sum(1 for f in fragilita if f < 30)
+        },
+        "top_studenti": migliori[:limite_top],
+        "medie_materie": {
+            materia: round(utils.calcola_media(voti), 2)
+            for materia, voti in sorted(zip(foto.materie, per_materia))
+        },
+        "distribuzione_medie": {
+            "numero_studenti": len(foto.studenti),
+            "media": media_tutte,
+            "deviazione_standard": math.sqrt(varianza),
+            "min": min(medie_tutte) if medie_tutte else 0,
+            "max": max(medie_tutte) if medie_tutte else 0
+        },
+        "performance": {
+            "classe": foto.classe,
+            "media": round(utils.calcola_media(medie), 2),
+            "studenti": len(foto.studenti)
+        } if medie else None
+    }
+
+
+def _analizza_lotto(lotto: Tuple[List[FotografiaClasse], int]) -> List[Dict]:
+    """Analizza un gruppo di classi in un processo del pool."""
+    fotografie, limite_top = lotto
+    return [analizza_classe(foto, limite_top) for foto in fotografie]
+
+
+def dividi_in_lotti(fotografie: List[FotografiaClasse], numero: int) -> List[List[FotografiaClasse]]:
+    """Divide le classi in lotti contigui di peso simile (l'ordine è preservato)."""
+    if numero <= 1 or len(fotografie) <= 1:
+        return [list(fotografie)]
+    totale = sum(f.peso for f in fotografie) or 1
+    obiettivo = totale / numero
+    lotti, corrente, peso = [], [], 0
+    for foto in fotografie:
+        corrente.append(foto)
+        peso += foto.peso
+        if peso >= obiettivo * (len(lotti) + 1) and len(lotti) < numero - 1:
+            lotti.append(corrente)
+            corrente = []
+    if corrente:
+        lotti.append(corrente)
+    return lotti
+
+
+class ReportParallelo:
+    """Analisi delle classi distribuita su un pool di processi.
+
+    Il pool è creato al primo uso con il metodo "spawn" (sicuro anche in
+    un server multi-thread) e riusato tra le richieste.
+    """
+
+    def __init__(self, processi: Optional[int] = None, classi_minime: int = 8,
+                 peso_minimo: int = 200_000, lotti_per_processo: int = 2):
+        """Inizializza l'analizzatore.
+
+        Args:
+            processi: Processi del pool (default numero di CPU; 1 = nessun pool)
+            classi_minime: Sotto questo numero di classi l'analisi resta nel processo corrente
+            peso_minimo: Sotto questo numero di studenti + voti il costo di
+                trasferimento supera il guadagno: analisi nel processo corrente
+            lotti_per_processo: Lotti per processo (bilancia classi di dimensioni diverse)
+        """
+        self.processi = processi if processi is not None else (os.cpu_count() or 1)
+        self.classi_minime = classi_minime
+        self.peso_minimo = peso_minimo
+        self.lotti_per_processo = lotti_per_processo
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.analisi_parallele = 0
+        self.analisi_seriali = 0
+
+    def _esecutore(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processi, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def analizza(self, fotografie: List[FotografiaClasse], limite_top: int = 3) -> Dict[str, Dict]:
+        """Analizza le classi, in parallelo se conviene.
+
+        Returns:
+            classe -> analisi, nello stesso ordine delle fotografie
+        """
+        if (self.processi <= 1 or len(fotografie) < self.classi_minime
+                or sum(f.peso for f in fotografie) < self.peso_minimo):
+            self.analisi_seriali += 1
+            risultati = _analizza_lotto((fotografie, limite_top))
+        else:
+            self.analisi_parallele += 1
+            lotti = dividi_in_lotti(fotografie, self.processi * self.lotti_per_processo)
+            risultati = [
+                analisi
+                for parziali in self._esecutore().map(_analizza_lotto, [(lotto, limite_top) for lotto in lotti])
+                for analisi in parziali
+            ]
+        return {analisi["classe"]: analisi for analisi in risultati}
+
+    def chiudi(self) -> None:
+        """Termina i processi del pool."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+def genera_distretto(numero_classi: int = 100, studenti_per_classe: int = 25, voti_per_studente: int = 40,
+                     materie: Sequence[str] = ("Matematica", "Italiano", "Inglese", "Storia", "Scienze")):
+    """Anagrafica e voti sintetici di un distretto (per il benchmark).
+
+    Returns:
+        (anagrafica, gestione_voti)
+    """
+    import random
+
+    from anagrafica import Anagrafica
+    from voti import GestioneVoti, Voto
+
+    casuale = random.Random(7)
+    anagrafica = Anagrafica()
+    gestione_voti = GestioneVoti()
+    voti = []
+    for numero in range(numero_classi):
+        classe = f"C{numero:03d}"
+        for studente in anagrafica.genera_studenti(studenti_per_classe, classe=classe):
+            base = casuale.uniform(4.5, 8.5)
+            voti.extend(
+                Voto(studente.id, materie[i % len(materie)],
+                     round(min(10.0, max(3.0, casuale.gauss(base, 1.0))), 1), "Prova scritta", "2025-11-03")
+                for i in range(voti_per_studente)
+            )
+    gestione_voti.aggiungi_voti(voti)
+    return anagrafica, gestione_voti
+
+
+def benchmark_report_classi(numero_classi: int = 100, studenti_per_classe: int = 25, voti_per_studente: int = 40,
+                            processi: Sequence[int] = (1, 2, 4, 8), ripetizioni: int = 3) -> Dict:
+    """Tempi dell'analisi per classe con pool di dimensioni diverse.
+
+    La fotografia è presa una volta; il pool è scaldato prima della misura.
+    Lo speedup dipende dalle CPU disponibili: con una sola CPU il pool
+    aggiunge solo il costo di trasferimento.
+
+    Returns:
+        Tempi migliori in ms, speedup rispetto a 1 processo e CPU disponibili
+    """
+    anagrafica, gestione_voti = genera_distretto(numero_classi, studenti_per_classe, voti_per_studente)
+
+    # Percorso precedente: una scansione di tutti i voti per ogni studente (media_studente)
+    inizio = time.perf_counter()
+    for studente in anagrafica.studenti_per_classe(anagrafica.studenti[0].classe):
+        gestione_voti.media_studente(studente.id)
+    originale_per_classe_ms = (time.perf_counter() - inizio) * 1000
+
+    inizio = time.perf_counter()
+    fotografie = fotografa_classi(anagrafica, gestione_voti)
+    fotografia_ms = (time.perf_counter() - inizio) * 1000
+
+    tempi = {}
+    riferimento = None
+    for numero in processi:
+        analizzatore = ReportParallelo(numero, classi_minime=1, peso_minimo=0)
+        try:
+            risultato = analizzatore.analizza(fotografie)  # avvio del pool
+            if riferimento is None:
+                riferimento = risultato
+            assert risultato == riferimento, "risultati diversi con processi diversi"
+            migliori = []
+            for _ in range(ripetizioni):
+                inizio = time.perf_counter()
+                analizzatore.analizza(fotografie)
+                migliori.append((time.perf_counter() - inizio) * 1000)
+            tempi[numero] = round(min(migliori), 2)
+        finally:
+            analizzatore.chiudi()
+
+    base = tempi[processi[0]]
+    return {
+        "classi": numero_classi,
+        "studenti": numero_classi * studenti_per_classe,
+        "voti": len(gestione_voti.voti),
+        "cpu": os.cpu_count(),
+        "originale_stimato_ms": round(originale_per_classe_ms * numero_classi, 1),
+        "fotografia_ms": round(fotografia_ms, 2),
+        "tempi_ms": tempi,
+        "speedup": {numero: round(base / t, 2) for numero, t in tempi.items()}
+    }
+
+
+if __name__ == "__main__":
+    print("🏫 BENCHMARK REPORT PER CLASSE IN PARALLELO")
+    print("=" * 60 + "\n")
+
+    risultato = benchmark_report_classi()
+    print(f"   {risultato['classi']} classi, {risultato['studenti']} studenti, {risultato['voti']} voti "
+          f"({risultato['cpu']} CPU)")
+    print(f"   Calcolo per studente precedente (stima): {risultato['originale_stimato_ms']} ms")
+    print(f"   Fotografia dei dati: {risultato['fotografia_ms']} ms")
+    for numero, tempo in risultato["tempi_ms"].items():
+        print(f"   {numero} processi: {tempo:8.2f} ms  (speedup {risultato['speedup'][numero]}x)")
@@ -0,0 +1,517 @@
+"""
+Indice incrementale del rischio studenti - ManagerSchool
+Punteggi di rischio per studente (early warning e criteri di
+AnaliticaPredittiva) ricalcolati solo per gli studenti i cui voti,
+assenze o dati di fragilità sono cambiati, con indici ordinati che
+rendono "i primi N studenti a rischio" una lettura.
+"""
+
+import bisect
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from ai.modello_rischio import NUMPY_AVAILABLE, dati_predittivi_studente
+from ai.predictive_engine import PredictiveEngine
+
+
+# Soglie di identifica_studenti_rischio indipendenti dalla soglia richiesta
+SOGLIA_FRAGILITA = 60
+MEDIA_MASSIMA_FRAGILI = 6.5
+# Soglia dell'early warning (sul rischio arrotondato a un decimale)
+SOGLIA_EARLY_WARNING = 60
+
+
+@dataclass
+class StatoRischioStudente:
+    """Ingressi e punteggi in cache di uno studente."""
+
+    studente: object
+    impronta: Tuple
+    voti: List = field(default_factory=list)  # oggetti Voto nell'ordine di inserimento
+    assenze: int = 0
+    media: float = 0.0
+    fragilita: float = 0.0
+    dati: Dict = field(default_factory=dict)
+    rischio: float = 0.0  # early warning, non arrotondato
+    voto_previsto: float = 0.0
+    ordine: int = 0
+    chiave_warning: Optional[Tuple] = None  # chiave inserita nell'indice early warning
+
+
+def impronta_studente(studente) -> Tuple:
+    """Campi dello studente da cui dipendono fragilità e dati predittivi."""
+    return (studente.nome, studente.cognome, studente.classe, studente.categoria_reddito,
+            studente.condizione_salute, studente.situazione_familiare)
+
+
+class IndiceRischio:
+    """Cache dei punteggi di rischio per studente con indici ordinati.
+
+    I voti arrivano dagli osservatori di GestioneVoti e gli studenti
+    aggiunti, rimossi o modificati da quelli di Anagrafica: una lettura
+    senza modifiche in sospeso non scorre l'anagrafica. Le pagelle
+    (assenze) sono lette a partire dall'ultima vista. L'anagrafica intera è
+    riconfrontata con un'impronta per studente solo dopo una ricarica, un
+    cambio di classe o una modifica non notificata al numero di studenti.
+    """
+
+    def __init__(self, anagrafica=None, gestione_voti=None, motore: Optional[PredictiveEngine] = None):
+        """Inizializza l'indice.
+
+        Args:
+            anagrafica: Anagrafica da indicizzare (opzionale, vedi collega)
+            gestione_voti: GestioneVoti da osservare
+            motore: PredictiveEngine per il punteggio early warning
+        """
+        self._lock = threading.RLock()
+        self.motore = motore or PredictiveEngine()
+        self.anagrafica = None
+        self.gestione_voti = None
+
+        self._stati: Dict[int, StatoRischioStudente] = {}
+        self._voti_orfani: Dict[int, List] = {}  # voti di studenti non (ancora) in anagrafica
+        self._modificati: Set[int] = set()
+        # id studente -> (evento, studente) notificati dall'anagrafica
+        self._studenti_notificati: Dict[int, Tuple[str, object]] = {}
+        self._scansione_anagrafica = True
+        self._da_ricostruire = True
+        self._pagelle_viste = 0
+        self._versione_modello = None
+        self._ordine_classi: Dict[str, int] = {}
+        self._primo_classe: Dict[str, int] = {}  # ordine del primo studente di ogni classe
+        self._prossimo_ordine = 0
+
+        # Indici ordinati
+        self._indice_warning: List[Tuple] = []  # (-rischio arrotondato, ordine classe, ordine, id)
+        self._indice_medie: List[Tuple[float, int]] = []
+        self._indice_fragili: List[Tuple[float, int]] = []
+
+        # Contatori
+        self.sincronizzazioni = 0
+        self.ricalcoli_totali = 0
+        self.ricalcolati_ultima = 0
+        self.ultima_sincronizzazione_ms = 0.0
+
+        if anagrafica is not None and gestione_voti is not None:
+            self.collega(anagrafica, gestione_voti)
+
+    def collega(self, anagrafica, gestione_voti) -> None:
+        """Indicizza un'anagrafica e osserva i voti (sostituisce i precedenti)."""
+        with self._lock:
+            if self.gestione_voti is not None and self.su_evento_voto in self.gestione_voti.osservatori:
+                self.gestione_voti.osservatori.remove(self.su_evento_voto)
+            if self.anagrafica is not None and self.su_evento_anagrafica in self.anagrafica.osservatori:
+                self.anagrafica.osservatori.remove(self.su_evento_anagrafica)
+            self.anagrafica = anagrafica
+            self.gestione_voti = gestione_voti
+            gestione_voti.osservatori.append(self.su_evento_voto)
+            anagrafica.osservatori.append(self.su_evento_anagrafica)
+            self._da_ricostruire = True
+
+    # ============ EVENTI ============
+
+    def _lista_voti(self, id_studente: int) -> List:
+        stato = self._stati.get(id_studente)
+        return stato.voti if stato is not None else self._voti_orfani.setdefault(id_studente, [])
+
+    def su_evento_voto(self, evento: str, voto=None) -> None:
+        """Osservatore di GestioneVoti: segna gli studenti da ricalcolare."""
+        with self._lock:
+            if self._da_ricostruire:
+                return
+            if evento in ("aggiunto", "aggiunti"):
+                for singolo in (voto if evento == "aggiunti" else [voto]):
+                    self._lista_voti(singolo.id_studente).append(singolo)
+                    self._modificati.add(singolo.id_studente)
+            elif evento == "rimosso":
+                lista = self._lista_voti(voto.id_studente)
+                for i, esistente in enumerate(lista):
+                    if esistente is voto:
+                        del lista[i]
+                        break
+                else:
+                    if voto in lista:
+                        lista.remove(voto)
+                self._modificati.add(voto.id_studente)
+            else:  # "azzerati", "ricaricati"
+                self._da_ricostruire = True
+
+    def su_evento_anagrafica(self, evento: str, studente=None) -> None:
+        """Osservatore di Anagrafica: segna gli studenti da riconciliare."""
+        with self._lock:
+            if self._da_ricostruire or self._scansione_anagrafica:
+                return
+            if studente is not None and evento in ("aggiunto", "rimosso", "modificato"):
+                self._studenti_notificati[studente.id] = (evento, studente)
+            else:  # "ricaricati"
+                self._scansione_anagrafica = True
+
+    def segna_modificato(self, id_studente: int) -> None:
+        """Forza il ricalcolo di uno studente alla prossima sincronizzazione."""
+        with self._lock:
+            self._modificati.add(id_studente)
+
+    # ============ SINCRONIZZAZIONE ============
+
+    def sincronizza(self) -> int:
+        """Applica le modifiche e ricalcola solo gli studenti interessati.
+
+        Returns:
+            Numero di studenti ricalcolati
+        """
+        if self.anagrafica is None:
+            return 0
+        inizio = time.perf_counter()
+        with self._lock:
+            ricostruzione = self._da_ricostruire
+            if ricostruzione:
+                self._ricostruisci_ingressi()
+
+            self._sincronizza_assenze()
+            riordinare = False
+            if not self._scansione_anagrafica:
+                self._applica_notifiche_anagrafica()
+            # Studenti aggiunti o rimossi senza notifica: confronto completo
+            if self._scansione_anagrafica or len(self._stati) != len(self.anagrafica.studenti):
+                riordinare = self._sincronizza_anagrafica()
+
+            modello = self.motore.models.get('rischio')
+            versione = modello.versione if modello is not None else None
+            if versione != self._versione_modello:
+                self._versione_modello = versione
+                self._modificati.update(self._stati)
+
+            modificati = [i for i in self._modificati if i in self._stati]
+            self._modificati.clear()
+            self._ricalcola(modificati)
+
+            if ricostruzione or riordinare:
+                self._ricostruisci_indici()
+            else:
+                self._aggiorna_indici(modificati)
+
+            self.sincronizzazioni += 1
+            self.ricalcolati_ultima = len(modificati)
+            self.ricalcoli_totali += len(modificati)
+            self.ultima_sincronizzazione_ms = round((time.perf_counter() - inizio) * 1000, 3)
+            return len(modificati)
+
+    def _ricostruisci_ingressi(self) -> None:
+        """Raggruppa di nuovo voti e assenze di tutti gli studenti."""
+        voti_per_studente: Dict[int, List] = {}
+        for voto in self.gestione_voti.voti:
+            voti_per_studente.setdefault(voto.id_studente, []).append(voto)
+        assenze: Dict[int, int] = {}
+        for pagella in self.gestione_voti.pagelle:
+            assenze[pagella.id_studente] = assenze.get(pagella.id_studente, 0) + pagella.assenze
+
+        self._stati.clear()
+        for studente in self.anagrafica.studenti:
+            self._stati[studente.id] = StatoRischioStudente(
+                studente=studente,
+                impronta=impronta_studente(studente),
+                voti=voti_per_studente.pop(studente.id, []),
+                assenze=assenze.get(studente.id, 0)
+            )
+        self._voti_orfani = voti_per_studente
+        self._pagelle_viste = len(self.gestione_voti.pagelle)
+        self._modificati = set(self._stati)
+        self._scansione_anagrafica = True
+        self._da_ricostruire = False
+
+    def _sincronizza_assenze(self) -> None:
+        """Assenze dalle pagelle aggiunte dall'ultima sincronizzazione."""
+        pagelle = self.gestione_voti.pagelle
+        if len(pagelle) < self._pagelle_viste:
+            # Pagelle rimosse o sostituite: ricalcolo delle sole assenze
+            assenze: Dict[int, int] = {}
+            for pagella in pagelle:
+                assenze[pagella.id_studente] = assenze.get(pagella.id_studente, 0) + pagella.assenze
+            for id_studente, stato in self._stati.items():
+                if stato.assenze != assenze.get(id_studente, 0):
+                    stato.assenze = assenze.get(id_studente, 0)
+                    self._modificati.add(id_studente)
+        else:
+            for pagella in pagelle[self._pagelle_viste:]:
+                stato = self._stati.get(pagella.id_studente)
+                if stato is not None:
+                    stato.assenze += pagella.assenze
+                    self._modificati.add(pagella.id_studente)
+        self._pagelle_viste = len(pagelle)
+
+    def _nuovo_stato(self, studente, ordine: int) -> StatoRischioStudente:
+        """Stato di uno studente appena comparso in anagrafica (da ricalcolare)."""
+        stato = StatoRischioStudente(
+            studente=studente,
+            impronta=impronta_studente(studente),
+            voti=self._voti_orfani.pop(studente.id, []),
+            assenze=sum(p.assenze for p in self.gestione_voti.pagelle if p.id_studente == studente.id),
+            ordine=ordine
+        )
+        self._stati[studente.id] = stato
+        self._modificati.add(studente.id)
+        return stato
+
+    def _applica_notifiche_anagrafica(self) -> None:
+        """Applica gli eventi dell'anagrafica ai soli studenti notificati.
+
+        Rimuovere il primo studente di una classe o cambiare classe può
+        cambiare l'ordine delle classi: in quel caso si passa al confronto
+        completo (_scansione_anagrafica).
+        """
+        notificati, self._studenti_notificati = self._studenti_notificati, {}
+        for id_studente, (evento, studente) in notificati.items():
+            stato = self._stati.get(id_studente)
+            if evento == "rimosso":
+                if stato is None:
+                    continue
+                if self._primo_classe.get(stato.studente.classe) == stato.ordine:
+                    self._scansione_anagrafica = True
+                    return
+                self._rimuovi_da_indici(stato)
+                self._voti_orfani[id_studente] = self._stati.pop(id_studente).voti
+            elif stato is None:
+                if studente.classe not in self._ordine_classi:
+                    self._ordine_classi[studente.classe] = len(self._ordine_classi)
+                    self._primo_classe[studente.classe] = self._prossimo_ordine
+                self._nuovo_stato(studente, self._prossimo_ordine)
+                self._prossimo_ordine += 1
+            else:
+                impronta = impronta_studente(studente)
+                if studente.classe != stato.impronta[2]:
+                    self._scansione_anagrafica = True
+                    return
+                # Studente sostituito in coda (es. dallo store condiviso)
+                if (stato.ordine != self._prossimo_ordine - 1
+                        and self.anagrafica.studenti and self.anagrafica.studenti[-1] is studente):
+                    if self._primo_classe.get(studente.classe) == stato.ordine:
+                        self._scansione_anagrafica = True
+                        return
+                    self._rimuovi_da_indici(stato)
+                    stato.ordine = self._prossimo_ordine
+                    self._prossimo_ordine += 1
+                    self._modificati.add(id_studente)
+                if stato.studente is not studente or stato.impronta != impronta:
+                    stato.studente = studente
+                    stato.impronta = impronta
+                    self._modificati.add(id_studente)
+
+    def _sincronizza_anagrafica(self) -> bool:
+        """Confronto completo: studenti aggiunti, rimossi o con dati cambiati.
+
+        Returns:
+            True se l'ordine di studenti o classi è cambiato (indici da riordinare)
+        """
+        presenti = set()
+        ordine_classi: Dict[str, int] = {}
+        primo_classe: Dict[str, int] = {}  # classe -> id del primo studente
+        riordinare = False
+        precedente = -1
+        for studente in self.anagrafica.studenti:
+            presenti.add(studente.id)
+            ordine_classi.setdefault(studente.classe, len(ordine_classi))
+            primo_classe.setdefault(studente.classe, studente.id)
+            stato = self._stati.get(studente.id)
+            if stato is None:
+                stato = self._nuovo_stato(studente, precedente + 1)
+            else:
+                impronta = impronta_studente(studente)
+                if stato.studente is not studente or stato.impronta != impronta:
+                    stato.studente = studente
+                    stato.impronta = impronta
+                    self._modificati.add(studente.id)
+            if stato.ordine <= precedente:
+                riordinare = True
+            precedente = stato.ordine
+
+        if riordinare:
+            for posizione, studente in enumerate(self.anagrafica.studenti):
+                self._stati[studente.id].ordine = posizione
+            precedente = len(self.anagrafica.studenti) - 1
+        self._primo_classe = {classe: self._stati[i].ordine for classe, i in primo_classe.items()}
+        self._prossimo_ordine = precedente + 1
+        self._studenti_notificati.clear()
+        self._scansione_anagrafica = False
+
+        rimossi = [i for i in self._stati if i not in presenti]
+        for id_studente in rimossi:
+            self._rimuovi_da_indici(self._stati[id_studente])
+            self._voti_orfani[id_studente] = self._stati.pop(id_studente).voti
+
+        if ordine_classi != self._ordine_classi:
+            self._ordine_classi = ordine_classi
+            riordinare = True
+        return riordinare
+
+    def _ricalcola(self, ids: List[int]) -> None:
+        """Ricalcola media, fragilità e punteggio early warning degli studenti indicati."""
+        if not ids:
+            return
+        stati = [self._stati[i] for i in ids]
+        for stato in stati:
+            self._rimuovi_da_indici(stato)
+            valori = [v.voto for v in stato.voti]
+            stato.media = sum(valori) / len(valori) if valori else 0.0
+            stato.fragilita = stato.studente.fragilità_sociale
+            stato.dati = dati_predittivi_studente(stato.studente)
+
+        serie = [[v.voto for v in stato.voti] for stato in stati]
+        if NUMPY_AVAILABLE:
+            punteggi = self.motore.punteggi_batch(self.motore.costruisci_feature([s.dati for s in stati], serie))
+            rischi = punteggi["rischio"].tolist()
+            voti_previsti = punteggi["voto_previsto"].tolist()
+        else:
+            rischi = [self.motore.predict_rischio_insufficienza(s.dati, v) for s, v in zip(stati, serie)]
+            voti_previsti = [self.motore.predict_voto_finale(v, v[-1] - v[-2] if len(v) >= 2 else 0) for v in serie]
+        for stato, rischio, voto in zip(stati, rischi, voti_previsti):
+            stato.rischio = rischio
+            stato.voto_previsto = voto
+
+    # ============ INDICI ============
+
+    def _chiave_warning(self, stato: StatoRischioStudente) -> Tuple:
+        return (-round(stato.rischio, 1), self._ordine_classi[stato.studente.classe],
+                stato.ordine, stato.studente.id)
+
+    def _rimuovi_da_indici(self, stato: StatoRischioStudente) -> None:
+        """Toglie lo studente dagli indici con i valori precedenti al ricalcolo."""
+        if not stato.dati:
+            return  # mai calcolato
+        id_studente = stato.studente.id
+        _rimuovi_ordinato(self._indice_medie, (stato.media, id_studente))
+        if stato.fragilita > SOGLIA_FRAGILITA:
+            _rimuovi_ordinato(self._indice_fragili, (stato.media, id_studente))
+        if stato.chiave_warning is not None:
+            # Chiave salvata: classe e ordine possono essere già cambiati
+            _rimuovi_ordinato(self._indice_warning, stato.chiave_warning)
+            stato.chiave_warning = None
+
+    def _inserisci_in_indici(self, stato: StatoRischioStudente) -> None:
+        id_studente = stato.studente.id
+        bisect.insort(self._indice_medie, (stato.media, id_studente))
+        if stato.fragilita > SOGLIA_FRAGILITA:
+            bisect.insort(self._indice_fragili, (stato.media, id_studente))
+        if round(stato.rischio, 1) > SOGLIA_EARLY_WARNING:
+            stato.chiave_warning = self._chiave_warning(stato)
+            bisect.insort(self._indice_warning, stato.chiave_warning)
+
+    def _aggiorna_indici(self, ids: List[int]) -> None:
+        for id_studente in ids:
+            self._inserisci_in_indici(self._stati[id_studente])
+
+    def _ricostruisci_indici(self) -> None:
+        self._indice_medie = sorted((s.media, i) for i, s in self._stati.items())
+        self._indice_fragili = sorted((s.media, i) for i, s in self._stati.items() if s.fragilita > SOGLIA_FRAGILITA)
+        for stato in self._stati.values():
+            in_warning = round(stato.rischio, 1) > SOGLIA_EARLY_WARNING
+            stato.chiave_warning = self._chiave_warning(stato) if in_warning else None
+        self._indice_warning = sorted(s.chiave_warning for s in self._stati.values() if s.chiave_warning is not None)
+
+    # ============ LETTURE ============
+
+    def early_warning(self, limite: Optional[int] = None) -> List[Dict]:
+        """Studenti a rischio nel formato di PredictiveEngine.early_warning_system.
+
+        Args:
+            limite: Solo i primi N (lettura dell'indice ordinato)
+        """
+        self.sincronizza()
+        with self._lock:
+            chiavi = self._indice_warning if limite is None else self._indice_warning[:max(0, limite)]
+            return [{
+                'studente': stato.dati.get('nome_completo', 'Unknown'),
+                'classe': stato.studente.classe,
+                'rischio': round(stato.rischio, 1),
+                'voto_previsto': round(stato.voto_previsto, 1),
+                'raccomandazioni': self.motore.generate_raccomandazioni(stato.dati, stato.rischio)[:2]
+            } for stato in (self._stati[chiave[-1]] for chiave in chiavi)]
+
+    def totale_early_warning(self) -> int:
+        """Numero di studenti sopra la soglia di early warning."""
+        self.sincronizza()
+        with self._lock:
+            return len(self._indice_warning)
+
+    def candidati_rischio(self, soglia: float = 5.5) -> List[Tuple[object, float, int]]:
+        """Studenti che soddisfano i criteri di identifica_studenti_rischio.
+
+        Media sotto la soglia oppure fragilità alta con media sotto 6.5: due
+        prefissi degli indici ordinati per media.
+
+        Returns:
+            (studente, media, assenze) nell'ordine dell'anagrafica
+        """
+        self.sincronizza()
+        with self._lock:
+            ids = {i for _, i in self._indice_medie[:bisect.bisect_left(self._indice_medie, (soglia, -1))]}
+            ids.update(i for _, i in self._indice_fragili[
+                :bisect.bisect_left(self._indice_fragili, (MEDIA_MASSIMA_FRAGILI, -1))
+            ])
+            stati = sorted((self._stati[i] for i in ids), key=lambda s: s.ordine)
+        return [(s.studente, s.media, s.assenze) for s in stati]
+
+    def medie(self) -> Dict[int, float]:
+        """Media dei voti per ID studente (0.0 senza voti)."""
+        self.sincronizza()
+        with self._lock:
+            return {i: stato.media for i, stato in self._stati.items()}
+
+    def statistiche(self) -> Dict:
+        """Contatori dell'indice."""
+        return {
+            "studenti": len(self._stati),
+            "in_early_warning": len(self._indice_warning),
+            "sincronizzazioni": self.sincronizzazioni,
+            "ricalcolati_ultima": self.ricalcolati_ultima,
+            "ricalcoli_totali": self.ricalcoli_totali,
+            "ultima_sincronizzazione_ms": self.ultima_sincronizzazione_ms
+        }
+
+
+def _rimuovi_ordinato(lista: List, chiave) -> None:
+    """Rimuove una chiave da una lista ordinata (se presente)."""
+    posizione = bisect.bisect_left(lista, chiave)
+    if posizione < len(lista) and lista[posizione] == chiave:
+        del lista[posizione]
+
+
+if __name__ == "__main__":
+    from anagrafica import Anagrafica
+    from voti import GestioneVoti, Voto
+
+    print("🎯 TEST INDICE RISCHIO INCREMENTALE")
+    print("=" * 60 + "\n")
+
+    anagrafica = Anagrafica()
+    voti = GestioneVoti()
+    anagrafica.genera_studenti(10000)
+    voti.aggiungi_voti([
+        Voto(s.id, "Matematica", 3 + (s.id * 7 + i) % 8, "scritto", "2025-10-15")
+        for s in anagrafica.studenti for i in range(6)
+    ])
+    motore = PredictiveEngine()
+
+    inizio = time.perf_counter()
+    indice = IndiceRischio(anagrafica, voti, motore)
+    indice.sincronizza()
+    print(f"   Costruzione su {len(anagrafica)} studenti: {(time.perf_counter() - inizio) * 1000:.1f} ms")
+
+    studente = anagrafica.studenti[42]
+    voti.aggiungi_voto(studente.id, "Matematica", 3.0)
+    inizio = time.perf_counter()
+    primi = indice.early_warning(limite=10)
+    print(f"   Dopo un voto: {indice.ricalcolati_ultima} studente ricalcolato, "
+          f"top 10 in {(time.perf_counter() - inizio) * 1000:.2f} ms")
+
+    voti_per_studente: Dict[int, List[float]] = {}
+    for voto in voti.voti:
+        voti_per_studente.setdefault(voto.id_studente, []).append(voto.voto)
+    inizio = time.perf_counter()
+    motore.early_warning_system([{'classe': s.classe, 'studenti': [
+        {**dati_predittivi_studente(s), 'voti': voti_per_studente.get(s.id, [])}
+    ]} for s in anagrafica.studenti])
+    print(f"   (Ricalcolo completo: {(time.perf_counter() - inizio) * 1000:.1f} ms)")
+    for riga in primi[:3]:
+        print(f"   - {riga['studente']} ({riga['classe']}): rischio {riga['rischio']}")
@@ -0,0 +1,445 @@
+"""
+Rollup temporali precalcolati per i grafici della dashboard.
+Medie dei voti per giorno/settimana/mese, classe e materia e tassi di
+presenza giornalieri per classe, aggiornati in modo incrementale a ogni
+nuovo voto o presenza: gli endpoint dei grafici fanno solo lookup.
+"""
+
+import threading
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from amministrativa_school import TipoPresenza
+
+
+GRANULARITA = ("giorno", "settimana", "mese", "totale")
+TUTTE = "*"
+
+# Tipi che contano come presenza in aula (anche parziale)
+TIPI_PRESENTE = {TipoPresenza.PRESENTE, TipoPresenza.RITARDO, TipoPresenza.USCITA_ANTICIPATA}
+
+
+def _a_data(valore: Union[str, date, datetime, None]) -> Optional[date]:
+    """Converte stringa ISO o datetime in date (None se non interpretabile)."""
+    if isinstance(valore, datetime):
+        return valore.date()
+    if isinstance(valore, date):
+        return valore
+    try:
+        return date.fromisoformat(str(valore)[:10])
+    except ValueError:
+        return None
+
+
+def inizio_periodo(giorno: date, granularita: str) -> str:
+    """Chiave del periodo che contiene il giorno.
+
+    Args:
+        giorno: Data
+        granularita: "giorno", "settimana" (lunedì), "mese" o "totale"
+
+    Returns:
+        Chiave del periodo (es. "2025-10-27", "2025-10", "tutto")
+    """
+    if granularita == "giorno":
+        return giorno.isoformat()
+    if granularita == "settimana":
+        return (giorno - timedelta(days=giorno.weekday())).isoformat()
+    if granularita == "mese":
+        return giorno.strftime("%Y-%m")
+    if granularita == "totale":
+        return "tutto"
+    raise ValueError(f"Granularità non valida: {granularita}")
+
+
+def periodi_tra(inizio: date, fine: date, granularita: str) -> List[str]:
+    """Elenca in ordine le chiavi dei periodi tra due date (estremi inclusi)."""
+    if granularita == "totale":
+        return ["tutto"]
+
+    periodi = []
+    giorno = inizio
+    while giorno <= fine:
+        chiave = inizio_periodo(giorno, granularita)
+        if not periodi or periodi[-1] != chiave:
+            periodi.append(chiave)
+        if granularita == "giorno":
+            giorno += timedelta(days=1)
+        elif granularita == "settimana":
+            giorno += timedelta(days=7 - giorno.weekday())
+        else:
+            giorno = (giorno.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return periodi
+
+
+def periodo_precedente(fine: date, granularita: str, numero: int) -> date:
+    """Data di inizio di una finestra di `numero` periodi che termina in `fine`."""
+    if granularita == "giorno":
+        return fine - timedelta(days=numero - 1)
+    if granularita == "settimana":
+        return fine - timedelta(days=fine.weekday() + 7 * (numero - 1))
+    mese = fine.replace(day=1)
+    for _ in range(numero - 1):
+        mese = (mese - timedelta(days=1)).replace(day=1)
+    return mese
+
+
+class _MappaClassi:
+    """Risoluzione studente -> classe con cache ricostruita sui miss.
+
+    La cache contiene gli studenti, non le classi: un cambio di classe sul
+    posto è visto subito. Gli eventi dell'anagrafica (studenti sostituiti,
+    es. dallo store condiviso) svuotano la cache; su "modificato" viene
+    chiamato anche `al_cambio` con lo studente.
+    """
+
+    def __init__(self, anagrafica=None, al_cambio: Optional[Callable[[object], None]] = None):
+        self.anagrafica = anagrafica
+        self.al_cambio = al_cambio
+        self._studenti: Dict[int, object] = {}
+        if anagrafica is not None:
+            anagrafica.osservatori.append(self._su_evento_anagrafica)
+
+    def classe(self, id_studente: int) -> str:
+        studente = self._studenti.get(id_studente)
+        if studente is None and self.anagrafica is not None:
+            self._studenti = {s.id: s for s in self.anagrafica.studenti}
+            studente = self._studenti.get(id_studente)
+        return (studente.classe if studente is not None else None) or "N/D"
+
+    def _su_evento_anagrafica(self, evento: str, studente=None) -> None:
+        """Osservatore di Anagrafica: la prossima richiesta rilegge gli studenti."""
+        self.azzera()
+        if evento == "modificato" and studente is not None and self.al_cambio is not None:
+            self.al_cambio(studente)
+
+    def azzera(self) -> None:
+        self._studenti = {}
+
+    def scollega(self) -> None:
+        """Smette di osservare l'anagrafica (mappa sostituita da collega)."""
+        if self.anagrafica is not None and self._su_evento_anagrafica in self.anagrafica.osservatori:
+            self.anagrafica.osservatori.remove(self._su_evento_anagrafica)
+
+
+class RollupVoti:
+    """Somme e conteggi dei voti per (periodo, classe, materia).
+
+    Ogni voto aggiorna le combinazioni con classe e materia "*", così
+    anche le serie aggregate sono lookup diretti. Per ogni voto contato si
+    ricorda la classe usata: la rimozione sottrae da quella, e un evento
+    "modificato" dell'anagrafica sposta i voti dello studente nella sua
+    classe attuale (stesso risultato di ricostruisci).
+    """
+
+    def __init__(self, gestione_voti=None, anagrafica=None):
+        """Inizializza il rollup.
+
+        Args:
+            gestione_voti: GestioneVoti da osservare (opzionale, vedi collega)
+            anagrafica: Anagrafica per risalire alla classe dello studente
+        """
+        self._lock = threading.Lock()
+        self._lock_ricostruzione = threading.Lock()
+        self._aggregati: Dict[str, Dict[Tuple[str, str, str], List[float]]] = {g: {} for g in GRANULARITA}
+        # id_studente -> id(voto) -> (voto, classe in cui è stato contato)
+        self._contati: Dict[int, Dict[int, Tuple[object, str]]] = {}
+        self._classi = _MappaClassi()
+        # Modifiche arrivate durante una ricostruzione (None se non in corso);
+        # segno 0 indica uno studente da ricollocare
+        self._in_attesa: Optional[List[Tuple[object, int]]] = None
+        self.gestione_voti = None
+        self.voti_registrati = 0
+
+        if gestione_voti is not None:
+            self.collega(gestione_voti, anagrafica)
+
+    def collega(self, gestione_voti, anagrafica=None) -> None:
+        """Osserva una GestioneVoti (sostituisce quella precedente) e ricostruisce."""
+        if self.gestione_voti is not None and self.su_evento_voto in self.gestione_voti.osservatori:
+            self.gestione_voti.osservatori.remove(self.su_evento_voto)
+        self.gestione_voti = gestione_voti
+        self._classi.scollega()
+        self._classi = _MappaClassi(anagrafica, al_cambio=self.ricolloca_studente)
+        gestione_voti.osservatori.append(self.su_evento_voto)
+        self.ricostruisci()
+
+    def ricostruisci(self) -> None:
+        """Ricalcola tutti i rollup dai voti correnti.
+
+        I nuovi aggregati sono costruiti a parte e sostituiti sotto lock: i
+        lettori vedono sempre un rollup completo. Le modifiche arrivate nel
+        frattempo sono riapplicate solo se l'istantanea non le contiene già.
+        """
+        with self._lock_ricostruzione:
+            self._classi.azzera()
+            with self._lock:
+                voti = list(self.gestione_voti.voti) if self.gestione_voti is not None else []
+                self._in_attesa = []
+
+            aggregati = {g: {} for g in GRANULARITA}
+            per_studente: Dict[int, Dict[int, Tuple[object, str]]] = {}
+            registrati = sum(self._accumula(aggregati, per_studente, voto, 1) for voto in voti)
+
+            with self._lock:
+                contati = {id(voto) for voto in voti}
+                for voto, segno in self._in_attesa:
+                    if segno == 0:
+                        self._ricolloca(aggregati, per_studente, voto)
+                        continue
+                    # Aggiunto prima della copia o rimosso prima della copia: già considerato
+                    if (id(voto) in contati) == (segno > 0):
+                        continue
+                    registrati += self._accumula(aggregati, per_studente, voto, segno)
+                    if segno > 0:
+                        contati.add(id(voto))
+                    else:
+                        contati.discard(id(voto))
+                self._aggregati = aggregati
+                self._contati = per_studente
+                self.voti_registrati = registrati
+                self._in_attesa = None
+
+    def _accumula(self, aggregati: Dict, contati: Dict, voto, segno: int) -> int:
+        """Somma un voto negli aggregati indicati; restituisce il numero di voti contati.
+
+        In aggiunta usa la classe attuale dello studente, in rimozione quella
+        in cui il voto era stato contato (un voto mai contato è ignorato).
+        """
+        if segno > 0:
+            if _a_data(voto.data) is None:
+                return 0
+            classe = self._classi.classe(voto.id_studente)
+            contati.setdefault(voto.id_studente, {})[id(voto)] = (voto, classe)
+        else:
+            voci = contati.get(voto.id_studente, {})
+            voce = voci.pop(id(voto), None)
+            if voce is None:
+                return 0
+            classe = voce[1]
+        self._somma(aggregati, voto, classe, segno)
+        return segno
+
+    @staticmethod
+    def _somma(aggregati: Dict, voto, classe: str, segno: int) -> None:
+        """Aggiorna le celle di un voto per la classe indicata."""
+        giorno = _a_data(voto.data)
+        combinazioni = ((classe, voto.materia), (classe, TUTTE), (TUTTE, voto.materia), (TUTTE, TUTTE))
+        for granularita, celle in aggregati.items():
+            periodo = inizio_periodo(giorno, granularita)
+            for classe_chiave, materia_chiave in combinazioni:
+                cella = celle.setdefault((periodo, classe_chiave, materia_chiave), [0.0, 0])
+                cella[0] += segno * voto.voto
+                cella[1] += segno
+
+    def _ricolloca(self, aggregati: Dict, contati: Dict, studente) -> None:
+        """Sposta i voti contati di uno studente nella sua classe attuale."""
+        voci = contati.get(studente.id)
+        if not voci:
+            return
+        classe = self._classi.classe(studente.id)
+        for chiave, (voto, classe_contata) in list(voci.items()):
+            if classe_contata != classe:
+                self._somma(aggregati, voto, classe_contata, -1)
+                self._somma(aggregati, voto, classe, 1)
+                voci[chiave] = (voto, classe)
+
+    def registra(self, voto, segno: int = 1) -> None:
+        """Aggiunge (segno=1) o toglie (segno=-1) un voto dai rollup."""
+        with self._lock:
+            self.voti_registrati += self._accumula(self._aggregati, self._contati, voto, segno)
+            if self._in_attesa is not None:
+                self._in_attesa.append((voto, segno))
+
+    def ricolloca_studente(self, studente) -> None:
+        """Riporta i voti di uno studente modificato nella sua classe attuale."""
+        with self._lock:
+            self._ricolloca(self._aggregati, self._contati, studente)
+            if self._in_attesa is not None:
+                self._in_attesa.append((studente, 0))
+
+    def su_evento_voto(self, evento: str, voto=None) -> None:
+        """Osservatore di GestioneVoti."""
+        if evento == "aggiunto":
+            self.registra(voto)
+        elif evento == "aggiunti":
+            for singolo in voto:
+                self.registra(singolo)
+        elif evento == "rimosso":
+            self.registra(voto, segno=-1)
+        else:  # "azzerati", "ricaricati"
+            self.ricostruisci()
+
+    def media(self, granularita: str, periodo: str, classe: str = TUTTE,
+              materia: str = TUTTE) -> Optional[float]:
+        """Media dei voti di un periodo (None se non ci sono voti)."""
+        cella = self._aggregati[granularita].get((periodo, classe, materia))
+        if not cella or cella[1] <= 0:
+            return None
+        return cella[0] / cella[1]
+
+    def serie(self, granularita: str, inizio: date, fine: date,
+              classe: str = TUTTE, materia: str = TUTTE) -> Dict:
+        """Serie temporale delle medie tra due date.
+
+        Returns:
+            Dizionario con labels, medie (None dove mancano voti) e conteggi
+        """
+        periodi = periodi_tra(inizio, fine, granularita)
+        aggregati = self._aggregati[granularita]
+        medie, conteggi = [], []
+        for periodo in periodi:
+            cella = aggregati.get((periodo, classe, materia))
+            if cella and cella[1] > 0:
+                medie.append(round(cella[0] / cella[1], 2))
+                conteggi.append(cella[1])
+            else:
+                medie.append(None)
+                conteggi.append(0)
+        return {"labels": periodi, "medie": medie, "conteggi": conteggi}
+
+    def ultimi_periodi(self, granularita: str, numero: int, classe: str = TUTTE,
+                       materia: str = TUTTE, fino_a: Optional[date] = None) -> Dict:
+        """Serie degli ultimi `numero` periodi fino a `fino_a` (default oggi)."""
+        fine = fino_a or date.today()
+        return self.serie(granularita, periodo_precedente(fine, granularita, numero), fine, classe, materia)
+
+    def medie_per(self, dimensione: str) -> Dict[str, float]:
+        """Medie complessive per "classe" o "materia"."""
+        risultato = {}
+        for (_, classe, materia), (somma, conteggio) in self._aggregati["totale"].items():
+            if conteggio <= 0:
+                continue
+            if dimensione == "materia" and classe == TUTTE and materia != TUTTE:
+                risultato[materia] = somma / conteggio
+            elif dimensione == "classe" and materia == TUTTE and classe != TUTTE:
+                risultato[classe] = somma / conteggio
+        return dict(sorted(risultato.items()))
+
+
+class RollupPresenze:
+    """Conteggi giornalieri delle presenze per classe."""
+
+    def __init__(self, amministrativa=None, anagrafica=None):
+        """Inizializza il rollup.
+
+        Args:
+            amministrativa: AmministrativaSchool da osservare (opzionale)
+            anagrafica: Anagrafica per risalire alla classe dello studente
+        """
+        self._lock = threading.Lock()
+        self._lock_ricostruzione = threading.Lock()
+        self._giorni: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._classi = _MappaClassi()
+        self._in_attesa: Optional[List[object]] = None
+        self.amministrativa = None
+
+        if amministrativa is not None:
+            self.collega(amministrativa, anagrafica)
+
+    def collega(self, amministrativa, anagrafica=None) -> None:
+        """Osserva le presenze registrate e ricostruisce."""
+        if self.amministrativa is not None and self.registra in self.amministrativa.osservatori_presenze:
+            self.amministrativa.osservatori_presenze.remove(self.registra)
+        self.amministrativa = amministrativa
+        self._classi.scollega()
+        self._classi = _MappaClassi(anagrafica)
+        amministrativa.osservatori_presenze.append(self.registra)
+        self.ricostruisci()
+
+    def ricostruisci(self) -> None:
+        """Ricalcola i conteggi da tutte le presenze registrate (costruiti a parte, come RollupVoti)."""
+        with self._lock_ricostruzione:
+            self._classi.azzera()
+            with self._lock:
+                presenze = list(self.amministrativa.presenze) if self.amministrativa is not None else []
+                self._in_attesa = []
+
+            giorni: Dict[Tuple[str, str], Dict[str, int]] = {}
+            for presenza in presenze:
+                self._accumula(giorni, presenza)
+
+            with self._lock:
+                contate = {id(presenza) for presenza in presenze}
+                for presenza in self._in_attesa:
+                    if id(presenza) not in contate:
+                        self._accumula(giorni, presenza)
+                self._giorni = giorni
+                self._in_attesa = None
+
+    def _accumula(self, giorni: Dict, presenza) -> None:
+        """Somma una registrazione di presenza nei conteggi indicati."""
+        giorno = _a_data(presenza.data)
+        if giorno is None:
+            return
+        chiave_esito = "presenti" if presenza.tipo in TIPI_PRESENTE else "assenti"
+        ritardo = presenza.tipo == TipoPresenza.RITARDO
+        classe = self._classi.classe(presenza.studente_id)
+        for classe_chiave in (classe, TUTTE):
+            cella = giorni.setdefault(
+                (giorno.isoformat(), classe_chiave), {"presenti": 0, "assenti": 0, "ritardi": 0}
+            )
+            cella[chiave_esito] += 1
+            if ritardo:
+                cella["ritardi"] += 1
+
+    def registra(self, presenza) -> None:
+        """Aggiunge una registrazione di presenza ai conteggi."""
+        with self._lock:
+            self._accumula(self._giorni, presenza)
+            if self._in_attesa is not None:
+                self._in_attesa.append(presenza)
+
+    def serie_giornaliera(self, inizio: date, fine: date, classe: str = TUTTE) -> Dict:
+        """Tasso di presenza per giorno (None nei giorni senza registrazioni)."""
+        labels, tassi, presenti, assenti = [], [], [], []
+        for giorno in periodi_tra(inizio, fine, "giorno"):
+            cella = self._giorni.get((giorno, classe))
+            labels.append(giorno)
+            if cella:
+                totale = cella["presenti"] + cella["assenti"]
+                tassi.append(round(cella["presenti"] / totale * 100, 2))
+                presenti.append(cella["presenti"])
+                assenti.append(cella["assenti"])
+            else:
+                tassi.append(None)
+                presenti.append(0)
+                assenti.append(0)
+        return {"labels": labels, "tasso_presenza": tassi, "presenti": presenti, "assenti": assenti}
+
+    def totali_per_classe(self, inizio: date, fine: date) -> Dict[str, Dict[str, int]]:
+        """Presenze e assenze sommate per classe nella finestra."""
+        inizio_iso, fine_iso = inizio.isoformat(), fine.isoformat()
+        totali: Dict[str, Dict[str, int]] = {}
+        for (giorno, classe), cella in list(self._giorni.items()):
+            if classe == TUTTE or not (inizio_iso <= giorno <= fine_iso):
+                continue
+            voce = totali.setdefault(classe, {"presenti": 0, "assenti": 0, "ritardi": 0})
+            for chiave in voce:
+                voce[chiave] += cella[chiave]
+        return dict(sorted(totali.items()))
+
+
+if __name__ == "__main__":
+    from anagrafica import Anagrafica
+    from voti import GestioneVoti
+    from amministrativa_school import AmministrativaSchool
+
+    print("📉 TEST ROLLUP GRAFICI")
+    print("=" * 60 + "\n")
+
+    anagrafica, voti, amministrativa = Anagrafica(), GestioneVoti(), AmministrativaSchool()
+    anagrafica.genera_studenti(40)
+    rollup_voti = RollupVoti(voti, anagrafica)
+    rollup_presenze = RollupPresenze(amministrativa, anagrafica)
+
+    oggi = date.today()
+    for i, studente in enumerate(anagrafica.studenti):
+        for settimana in range(8):
+            giorno = (oggi - timedelta(weeks=settimana)).isoformat()
+            voti.aggiungi_voto(studente.id, "Matematica", 6.0 + (7 - settimana) * 0.25 + i % 3 * 0.5, data=giorno)
+            tipo = TipoPresenza.ASSENTE if (i + settimana) % 7 == 0 else TipoPresenza.PRESENTE
+            amministrativa.registra_presenza(studente.id, tipo, data=giorno)
+
+    print(f"   Andamento settimanale: {rollup_voti.ultimi_periodi('settimana', 8)['medie']}")
+    print(f"   Presenze per classe: {rollup_presenze.totali_per_classe(oggi - timedelta(days=60), oggi)}")
@@ -0,0 +1,642 @@
+"""
+Scheduler in-process per attività periodiche.
+Esegue backup, pulizie e analytics secondo specifiche in stile cron, con jitter,
+recupero delle esecuzioni mancate e lock su file validi tra più processi.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+
+
+class SpecificaCron:
+    """Specifica temporale in formato cron a 5 campi (min ora giorno mese dow)."""
+
+    ALIAS = {
+        "@hourly": "0 * * * *",
+        "@daily": "0 0 * * *",
+        "@weekly": "0 0 * * 0",
+        "@monthly": "0 0 1 * *",
+        "@yearly": "0 0 1 1 *"
+    }
+
+    # Range ammessi per ciascun campo
+    LIMITI = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    # Limite di ricerca per specifiche che non corrispondono mai (es. 31 febbraio)
+    MAX_GIORNI_RICERCA = 366 * 5
+
+    def __init__(self, espressione: str):
+        """Interpreta un'espressione cron.
+
+        Args:
+            espressione: Es. "30 2 * * *", "*/15 8-18 * * 1-5", "@daily"
+
+        Raises:
+            ValueError: Se l'espressione non è valida
+        """
+        self.espressione = espressione.strip()
+        testo = self.ALIAS.get(self.espressione, self.espressione)
+        campi = testo.split()
+
+        if len(campi) != 5:
+            raise ValueError(f"Espressione cron non valida: '{espressione}'")
+
+        insiemi = [self._interpreta_campo(c, *self.LIMITI[i]) for i, c in enumerate(campi)]
+        self.minuti, self.ore, self.giorni, self.mesi, giorni_settimana = insiemi
+
+        # 7 è un alias per domenica
+        if 7 in giorni_settimana:
+            giorni_settimana = (giorni_settimana - {7}) | {0}
+        self.giorni_settimana = giorni_settimana
+
+        # Semantica cron: se giorno e dow sono entrambi vincolati basta uno dei due
+        self._giorno_libero = campi[2] == "*"
+        self._dow_libero = campi[4] == "*"
+
+        self._minuti_ordinati = sorted(self.minuti)
+        self._ore_ordinate = sorted(self.ore)
+
+    @staticmethod
+    def _interpreta_campo(campo: str, minimo: int, massimo: int) -> Set[int]:
+        """Converte un campo cron in insieme di valori."""
+        valori: Set[int] = set()
+
+        for parte in campo.split(","):
+            passo = 1
+            if "/" in parte:
+                parte, passo_str = parte.split("/", 1)
+                passo = int(passo_str)
+                if passo <= 0:
+                    raise ValueError(f"Passo non valido nel campo cron '{campo}'")
+
+            if parte == "*":
+                inizio, fine = minimo, massimo
+            elif "-" in parte:
+                inizio_str, fine_str = parte.split("-", 1)
+                inizio, fine = int(inizio_str), int(fine_str)
+            else:
+                inizio = int(parte)
+                fine = massimo if passo > 1 else inizio
+
+            if inizio < minimo or fine > massimo or inizio > fine:
+                raise ValueError(f"Valore fuori range nel campo cron '{campo}'")
+
+            valori.update(range(inizio, fine + 1, passo))
+
+        return valori
+
+    def _giorno_valido(self, giorno: datetime) -> bool:
+        """Verifica se un giorno di calendario è ammesso."""
+        if giorno.month not in self.mesi:
+            return False
+
+        # datetime.weekday(): lunedì=0; cron: domenica=0
+        dow = (giorno.weekday() + 1) % 7
+        giorno_ok = giorno.day in self.giorni
+        dow_ok = dow in self.giorni_settimana
+
+        if self._giorno_libero and self._dow_libero:
+            return True
+        if self._giorno_libero:
+            return dow_ok
+        if self._dow_libero:
+            return giorno_ok
+        return giorno_ok or dow_ok
+
+    def corrisponde(self, istante: datetime) -> bool:
+        """Verifica se un istante (al minuto) corrisponde alla specifica."""
+        return (istante.minute in self.minuti and
+                istante.hour in self.ore and
+                self._giorno_valido(istante))
+
+    def prossima(self, dopo: datetime) -> datetime:
+        """Calcola il primo slot strettamente successivo a un istante.
+
+        Args:
+            dopo: Istante di riferimento
+
+        Returns:
+            Datetime del prossimo slot (secondi azzerati)
+        """
+        inizio = dopo.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        giorno = inizio.replace(hour=0, minute=0)
+
+        for _ in range(self.MAX_GIORNI_RICERCA):
+            if self._giorno_valido(giorno):
+                stesso_giorno = giorno.date() == inizio.date()
+                for ora in self._ore_ordinate:
+                    if stesso_giorno and ora < inizio.hour:
+                        continue
+                    for minuto in self._minuti_ordinati:
+                        if stesso_giorno and ora == inizio.hour and minuto < inizio.minute:
+                            continue
+                        return giorno.replace(hour=ora, minute=minuto)
+            giorno += timedelta(days=1)
+
+        raise ValueError(f"Nessuna esecuzione futura per '{self.espressione}'")
+
+    def precedente(self, entro: datetime) -> Optional[datetime]:
+        """Calcola l'ultimo slot minore o uguale a un istante.
+
+        Args:
+            entro: Istante di riferimento
+
+        Returns:
+            Datetime dell'ultimo slot o None se non trovato
+        """
+        fine = entro.replace(second=0, microsecond=0)
+        giorno = fine.replace(hour=0, minute=0)
+
+        for _ in range(self.MAX_GIORNI_RICERCA):
+            if self._giorno_valido(giorno):
+                stesso_giorno = giorno.date() == fine.date()
+                for ora in reversed(self._ore_ordinate):
+                    if stesso_giorno and ora > fine.hour:
+                        continue
+                    for minuto in reversed(self._minuti_ordinati):
+                        if stesso_giorno and ora == fine.hour and minuto > fine.minute:
+                            continue
+                        return giorno.replace(hour=ora, minute=minuto)
+            giorno -= timedelta(days=1)
+
+        return None
+
+    def __repr__(self) -> str:
+        """Rappresentazione stringa."""
+        return f"SpecificaCron('{self.espressione}')"
+
+
+class LockFile:
+    """Lock esclusivo su file, valido tra processi diversi."""
+
+    def __init__(self, percorso: str):
+        """Inizializza il lock.
+
+        Args:
+            percorso: Percorso del file di lock
+        """
+        self.percorso = str(percorso)
+        self._fd: Optional[int] = None
+
+    def acquisisci(self, bloccante: bool = False) -> bool:
+        """Tenta di acquisire il lock.
+
+        Args:
+            bloccante: Se True attende il rilascio da parte di altri processi
+
+        Returns:
+            True se il lock è stato acquisito
+        """
+        if self._fd is not None:
+            return True
+
+        fd = os.open(self.percorso, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                flag = fcntl.LOCK_EX if bloccante else fcntl.LOCK_EX | fcntl.LOCK_NB
+                fcntl.flock(fd, flag)
+            elif msvcrt is not None:
+                modo = msvcrt.LK_LOCK if bloccante else msvcrt.LK_NBLCK
+                msvcrt.locking(fd, modo, 1)
+        except OSError:
+            os.close(fd)
+            return False
+
+        self._fd = fd
+        try:
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode())
+        except OSError:
+            pass
+        return True
+
+    def rilascia(self) -> None:
+        """Rilascia il lock se posseduto."""
+        if self._fd is None:
+            return
+
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def posseduto(self) -> bool:
+        """True se il lock è posseduto da questa istanza."""
+        return self._fd is not None
+
+    def __enter__(self):
+        """Context manager (bloccante)."""
+        self.acquisisci(bloccante=True)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager cleanup."""
+        self.rilascia()
+
+
+@dataclass
+class AttivitaPianificata:
+    """Attività periodica registrata nello scheduler."""
+
+    nome: str
+    funzione: Callable[[], object]
+    cron: SpecificaCron
+    jitter_secondi: int = 0
+    recupera_mancate: bool = True
+    pesante: bool = False  # Le attività pesanti non si sovrappongono mai
+    tolleranza_secondi: int = 300
+    descrizione: str = ""
+
+    def __post_init__(self):
+        """Accetta la specifica cron anche come stringa."""
+        if isinstance(self.cron, str):
+            self.cron = SpecificaCron(self.cron)
+
+
+@dataclass
+class EsecuzioneAttivita:
+    """Registrazione di una singola esecuzione di un'attività."""
+
+    attivita: str
+    slot: str
+    inizio: str
+    durata_ms: float
+    esito: str  # "ok", "errore", "saltata"
+    errore: str = ""
+    pid: int = field(default_factory=os.getpid)
+
+    def to_dict(self) -> Dict:
+        """Converte in dizionario."""
+        return asdict(self)
+
+
+class SchedulerAttivita:
+    """Esegue attività periodiche con lock single-flight tra processi."""
+
+    NOME_LOCK_MANUTENZIONE = "_manutenzione"
+
+    def __init__(self, directory: str = "scheduler",
+                 orologio: Optional[Callable[[], datetime]] = None,
+                 max_storico: int = 50):
+        """Inizializza lo scheduler.
+
+        Args:
+            directory: Directory per lock e stato condiviso tra processi
+            orologio: Funzione che restituisce l'ora corrente (per i test)
+            max_storico: Numero massimo di esecuzioni memorizzate per attività
+        """
+        # La directory è creata al primo lock: costruire lo scheduler non tocca il disco
+        self.directory = Path(directory)
+        self.orologio = orologio or datetime.now
+        self.max_storico = max_storico
+        self.attivita: Dict[str, AttivitaPianificata] = {}
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ============ REGISTRAZIONE ============
+
+    def registra(self, nome: str, funzione: Callable[[], object], cron: str,
+                 jitter_secondi: int = 0, recupera_mancate: bool = True,
+                 pesante: bool = False, tolleranza_secondi: int = 300,
+                 descrizione: str = "") -> AttivitaPianificata:
+        """Registra un'attività periodica.
+
+        Args:
+            nome: Nome univoco dell'attività
+            funzione: Funzione senza argomenti da eseguire
+            cron: Specifica cron (es. "30 2 * * *")
+            jitter_secondi: Ritardo casuale massimo rispetto allo slot
+            recupera_mancate: Se True esegue una volta gli slot persi
+            pesante: Se True non si sovrappone ad altre attività pesanti
+            tolleranza_secondi: Ritardo massimo accettato se non si recupera
+            descrizione: Descrizione leggibile
+
+        Returns:
+            AttivitaPianificata registrata
+        """
+        if nome.startswith("_") or os.sep in nome:
+            raise ValueError(f"Nome attività non valido: '{nome}'")
+
+        attivita = AttivitaPianificata(
+            nome=nome,
+            funzione=funzione,
+            cron=SpecificaCron(cron),
+            jitter_secondi=jitter_secondi,
+            recupera_mancate=recupera_mancate,
+            pesante=pesante,
+            tolleranza_secondi=tolleranza_secondi,
+            descrizione=descrizione
+        )
+        self.attivita[nome] = attivita
+        return attivita
+
+    # ============ STATO CONDIVISO ============
+
+    def _percorso_stato(self, nome: str) -> Path:
+        """Percorso del file di stato di un'attività."""
+        return self.directory / f"{nome}.json"
+
+    def _lock(self, nome: str) -> LockFile:
+        """Crea il lock su file di un'attività."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return LockFile(str(self.directory / f"{nome}.lock"))
+
+    def _leggi_stato(self, nome: str) -> Dict:
+        """Legge lo stato persistito di un'attività."""
+        percorso = self._percorso_stato(nome)
+        if not percorso.exists():
+            return {}
+        try:
+            with open(percorso, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _scrivi_stato(self, nome: str, stato: Dict) -> None:
+        """Scrive lo stato in modo atomico."""
+        percorso = self._percorso_stato(nome)
+        temporaneo = percorso.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporaneo, 'w', encoding='utf-8') as f:
+            json.dump(stato, f, indent=2, ensure_ascii=False)
+        os.replace(temporaneo, percorso)
+
+    def _istante_previsto(self, attivita: AttivitaPianificata, slot: datetime) -> datetime:
+        """Applica il jitter allo slot.
+
+        Il jitter è deterministico per (attività, slot): tutti i processi
+        calcolano lo stesso istante di esecuzione.
+        """
+        if attivita.jitter_secondi <= 0:
+            return slot
+        generatore = random.Random(f"{attivita.nome}:{slot.isoformat()}")
+        return slot + timedelta(seconds=generatore.uniform(0, attivita.jitter_secondi))
+
+    # ============ ESECUZIONE ============
+
+    def esegui_pendenti(self, ora: Optional[datetime] = None) -> List[EsecuzioneAttivita]:
+        """Esegue tutte le attività il cui slot è scaduto.
+
+        Args:
+            ora: Istante di riferimento (default: orologio)
+
+        Returns:
+            Lista delle esecuzioni effettuate da questo processo
+        """
+        if ora is None:
+            ora = self.orologio()
+
+        esecuzioni = []
+        for attivita in list(self.attivita.values()):
+            esecuzione = self._valuta_attivita(attivita, ora)
+            if esecuzione:
+                esecuzioni.append(esecuzione)
+        return esecuzioni
+
+    def _valuta_attivita(self, attivita: AttivitaPianificata,
+                         ora: datetime) -> Optional[EsecuzioneAttivita]:
+        """Decide se eseguire un'attività e, nel caso, la esegue."""
+        slot = attivita.cron.precedente(ora)
+        if slot is None:
+            return None
+
+        # Controllo veloce senza lock
+        stato = self._leggi_stato(attivita.nome)
+        ultimo_slot = stato.get("ultimo_slot")
+        if ultimo_slot and ultimo_slot >= slot.isoformat():
+            return None
+
+        if self._istante_previsto(attivita, slot) > ora:
+            return None
+
+        lock = self._lock(attivita.nome)
+        if not lock.acquisisci():
+            return None  # In esecuzione in un altro processo
+
+        try:
+            # Ricontrolla sotto lock: un altro processo potrebbe aver appena finito
+            stato = self._leggi_stato(attivita.nome)
+            ultimo_slot = stato.get("ultimo_slot")
+            if ultimo_slot and ultimo_slot >= slot.isoformat():
+                return None
+
+            # Prima volta: registra lo slot corrente come riferimento senza eseguire
+            if not ultimo_slot:
+                stato["ultimo_slot"] = slot.isoformat()
+                stato.setdefault("storico", [])
+                self._scrivi_stato(attivita.nome, stato)
+                return None
+
+            ritardo = (ora - self._istante_previsto(attivita, slot)).total_seconds()
+            if not attivita.recupera_mancate and ritardo > attivita.tolleranza_secondi:
+                esecuzione = EsecuzioneAttivita(
+                    attivita=attivita.nome,
+                    slot=slot.isoformat(),
+                    inizio=ora.isoformat(),
+                    durata_ms=0.0,
+                    esito="saltata",
+                    errore=f"Ritardo {ritardo:.0f}s oltre la tolleranza"
+                )
+                self._registra_esecuzione(attivita.nome, stato, slot, esecuzione)
+                return esecuzione
+
+            return self._esegui_con_lock(attivita, stato, slot)
+        finally:
+            lock.rilascia()
+
+    def _esegui_con_lock(self, attivita: AttivitaPianificata, stato: Dict,
+                         slot: datetime) -> Optional[EsecuzioneAttivita]:
+        """Esegue l'attività (il lock dell'attività è già posseduto)."""
+        lock_manutenzione = None
+        if attivita.pesante:
+            lock_manutenzione = self._lock(self.NOME_LOCK_MANUTENZIONE)
+            if not lock_manutenzione.acquisisci():
+                return None  # Altra manutenzione in corso: si riprova al prossimo giro
+
+        try:
+            inizio = self.orologio()
+            t0 = time.perf_counter()
+            esito, errore = "ok", ""
+            try:
+                attivita.funzione()
+            except Exception as e:
+                esito, errore = "errore", f"{type(e).__name__}: {e}"
+            durata_ms = (time.perf_counter() - t0) * 1000
+
+            esecuzione = EsecuzioneAttivita(
+                attivita=attivita.nome,
+                slot=slot.isoformat(),
+                inizio=inizio.isoformat(),
+                durata_ms=round(durata_ms, 3),
+                esito=esito,
+                errore=errore
+            )
+            self._registra_esecuzione(attivita.nome, stato, slot, esecuzione)
+
+            if esito == "errore":
+                print(f"❌ Attività '{attivita.nome}' fallita: {errore}")
+            return esecuzione
+        finally:
+            if lock_manutenzione:
+                lock_manutenzione.rilascia()
+
+    def _registra_esecuzione(self, nome: str, stato: Dict, slot: datetime,
+                             esecuzione: EsecuzioneAttivita) -> None:
+        """Aggiorna ultimo slot e storico dell'attività."""
+        storico = stato.get("storico", [])
+        storico.append(esecuzione.to_dict())
+        stato["storico"] = storico[-self.max_storico:]
+        stato["ultimo_slot"] = slot.isoformat()
+        self._scrivi_stato(nome, stato)
+
+    def esegui_ora(self, nome: str) -> Optional[EsecuzioneAttivita]:
+        """Esegue subito un'attività, rispettando i lock.
+
+        Args:
+            nome: Nome dell'attività
+
+        Returns:
+            Esecuzione effettuata o None se già in corso altrove
+        """
+        if nome not in self.attivita:
+            raise KeyError(f"Attività non registrata: {nome}")
+
+        attivita = self.attivita[nome]
+        lock = self._lock(nome)
+        if not lock.acquisisci():
+            return None
+
+        try:
+            stato = self._leggi_stato(nome)
+            slot = self.orologio().replace(second=0, microsecond=0)
+            ultimo_slot = stato.get("ultimo_slot")
+            if ultimo_slot and ultimo_slot > slot.isoformat():
+                slot = datetime.fromisoformat(ultimo_slot)
+            return self._esegui_con_lock(attivita, stato, slot)
+        finally:
+            lock.rilascia()
+
+    # ============ THREAD IN BACKGROUND ============
+
+    def avvia(self, intervallo_secondi: float = 30.0) -> None:
+        """Avvia il ciclo dello scheduler in un thread daemon.
+
+        Args:
+            intervallo_secondi: Frequenza di controllo degli slot
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+
+        def ciclo():
+            while not self._stop.is_set():
+                try:
+                    self.esegui_pendenti()
+                except Exception as e:
+                    print(f"⚠️  Errore scheduler: {e}")
+                self._stop.wait(intervallo_secondi)
+
+        self._thread = threading.Thread(target=ciclo, name="scheduler-attivita", daemon=True)
+        self._thread.start()
+
+    def ferma(self, timeout: float = 5.0) -> None:
+        """Ferma il thread dello scheduler."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def attivo(self) -> bool:
+        """True se il thread dello scheduler è in esecuzione."""
+        return bool(self._thread and self._thread.is_alive())
+
+    # ============ STORICO E STATISTICHE ============
+
+    def storico(self, nome: str, limit: int = 20) -> List[Dict]:
+        """Restituisce le ultime esecuzioni di un'attività.
+
+        Args:
+            nome: Nome dell'attività
+            limit: Numero massimo di esecuzioni
+
+        Returns:
+            Lista di esecuzioni (dalla più recente)
+        """
+        storico = self._leggi_stato(nome).get("storico", [])
+        return list(reversed(storico[-limit:]))
+
+    def statistiche(self) -> Dict[str, Dict]:
+        """Statistiche per attività: durate, esiti e prossima esecuzione."""
+        ora = self.orologio()
+        risultato = {}
+
+        for nome, attivita in self.attivita.items():
+            storico = self._leggi_stato(nome).get("storico", [])
+            eseguite = [e for e in storico if e["esito"] != "saltata"]
+            durate = [e["durata_ms"] for e in eseguite]
+            prossimo_slot = attivita.cron.prossima(ora)
+
+            risultato[nome] = {
+                "cron": attivita.cron.espressione,
+                "descrizione": attivita.descrizione,
+                "pesante": attivita.pesante,
+                "esecuzioni": len(eseguite),
+                "errori": sum(1 for e in eseguite if e["esito"] == "errore"),
+                "saltate": len(storico) - len(eseguite),
+                "durata_media_ms": round(sum(durate) / len(durate), 3) if durate else 0.0,
+                "durata_max_ms": max(durate) if durate else 0.0,
+                "ultimo_esito": storico[-1]["esito"] if storico else None,
+                "ultima_esecuzione": storico[-1]["inizio"] if storico else None,
+                "prossima_esecuzione": self._istante_previsto(attivita, prossimo_slot).isoformat()
+            }
+
+        return risultato
+
+    def __len__(self) -> int:
+        """Restituisce il numero di attività registrate."""
+        return len(self.attivita)
+
+    def __repr__(self) -> str:
+        """Rappresentazione stringa."""
+        return f"SchedulerAttivita({len(self.attivita)} attività)"
+
+
+if __name__ == "__main__":
+    print("⏰ TEST SCHEDULER ATTIVITÀ")
+    print("=" * 60 + "\n")
+
+    scheduler = SchedulerAttivita("scheduler_test")
+    scheduler.registra("saluto", lambda: print("   👋 Esecuzione attività"), "* * * * *")
+
+    # Primo giro: registra lo slot di riferimento
+    scheduler.esegui_pendenti()
+    # Un minuto dopo l'attività viene eseguita
+    scheduler.esegui_pendenti(datetime.now() + timedelta(minutes=1))
+
+    for nome, stats in scheduler.statistiche().items():
+        print(f"   {nome}: {stats['esecuzioni']} esecuzioni, prossima {stats['prossima_esecuzione']}")
@@ -0,0 +1,400 @@
+"""
+Simulazione Monte Carlo degli interventi - ManagerSchool
+Campiona l'incertezza sull'effetto degli interventi (tabelle di
+SimulatoreInterventi) per migliaia di studenti alla volta con NumPy e
+distribuisce un budget tra studenti e tipi di intervento massimizzando
+il miglioramento atteso (zaino a scelta multipla, greedy sul guadagno
+marginale).
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import time
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from interventi import IntensitàIntervento, SimulatoreInterventi, TipoIntervento
+
+
+# Tutte le combinazioni tipo/intensità, nell'ordine delle colonne delle matrici
+OPZIONI: List[Tuple[TipoIntervento, IntensitàIntervento]] = [
+    (tipo, intensità) for tipo in TipoIntervento for intensità in IntensitàIntervento
+]
+OBIETTIVI = ("voti", "fragilita")
+
+
+@dataclass
+class MatriceGuadagni:
+    """Miglioramento atteso di ogni studente (righe) per ogni opzione (colonne)."""
+    id_studenti: List[int]
+    guadagni: "np.ndarray"
+    costi: "np.ndarray"
+    obiettivo: str
+    simulazioni: int
+
+
+@dataclass
+class PianoInterventi:
+    """Assegnazione del budget agli studenti."""
+    budget: float
+    obiettivo: str
+    costo_totale: float
+    miglioramento_atteso: float
+    assegnazioni: List[Dict] = field(default_factory=list)
+    studenti_considerati: int = 0
+    simulazioni: int = 0
+    tempo_ms: float = 0.0
+    data_calcolo: datetime = field(default_factory=datetime.now)
+
+    def to_dict(self) -> Dict:
+        return {
+            "budget": self.budget,
+            "obiettivo": self.obiettivo,
+            "costo_totale": round(self.costo_totale, 2),
+            "budget_residuo": round(self.budget - self.costo_totale, 2),
+            "miglioramento_atteso": round(self.miglioramento_atteso, 3),
+            "studenti_assegnati": len(self.assegnazioni),
+            "studenti_considerati": self.studenti_considerati,
+            "simulazioni": self.simulazioni,
+            "tempo_ms": round(self.tempo_ms, 1),
+            "data_calcolo": self.data_calcolo.isoformat(),
+            "assegnazioni": self.assegnazioni
+        }
+
+
+def _frontiera(costi: Sequence[float], guadagni: Sequence[float]) -> List[int]:
+    """Opzioni sull'inviluppo convesso superiore di (costo, guadagno), partendo da (0, 0).
+
+    Lungo la frontiera il guadagno marginale per euro è decrescente, quindi
+    ogni passo conviene meno del precedente.
+    """
+    ordine = sorted((c, -g, o) for o, (c, g) in enumerate(zip(costi, guadagni)) if g > 0)
+    frontiera: List[int] = []
+    migliore = 0.0
+    for costo, meno_guadagno, opzione in ordine:
+        guadagno = -meno_guadagno
+        if guadagno <= migliore:
+            continue  # dominata: costa di più e rende meno
+        migliore = guadagno
+        while frontiera:
+            c1, g1 = (costi[frontiera[-2]], guadagni[frontiera[-2]]) if len(frontiera) > 1 else (0.0, 0.0)
+            c2, g2 = costi[frontiera[-1]], guadagni[frontiera[-1]]
+            # Il punto intermedio è sotto la retta tra il precedente e il nuovo
+            if (g2 - g1) * (costo - c1) <= (guadagno - g1) * (c2 - c1):
+                frontiera.pop()
+            else:
+                break
+        frontiera.append(opzione)
+    return frontiera
+
+
+def alloca_budget(guadagni, costi, budget: float) -> List[int]:
+    """Sceglie al più un'opzione per studente entro il budget.
+
+    Greedy sul guadagno marginale per euro lungo la frontiera di ogni
+    studente (ottimo del rilassamento continuo a meno dell'ultimo passo),
+    poi un passaggio che spende il residuo sul miglior aumento possibile.
+
+    Args:
+        guadagni: Matrice studenti x opzioni dei miglioramenti attesi
+        costi: Costo di ogni opzione
+        budget: Budget disponibile
+
+    Returns:
+        Indice dell'opzione scelta per ogni studente (-1 = nessun intervento)
+    """
+    guadagni = np.asarray(guadagni, dtype=np.float64)
+    costi_lista = [float(c) for c in costi]
+    n = guadagni.shape[0]
+
+    passi = []
+    for studente in range(n):
+        riga = guadagni[studente].tolist()
+        costo_precedente, guadagno_precedente = 0.0, 0.0
+        for livello, opzione in enumerate(_frontiera(costi_lista, riga)):
+            delta_costo = costi_lista[opzione] - costo_precedente
+            delta_guadagno = riga[opzione] - guadagno_precedente
+            rapporto = delta_guadagno / delta_costo if delta_costo > 0 else float("inf")
+            passi.append((-rapporto, studente, livello, opzione, delta_costo))
+            costo_precedente, guadagno_precedente = costi_lista[opzione], riga[opzione]
+    passi.sort()
+
+    scelte = [-1] * n
+    livelli = [0] * n
+    bloccati = [False] * n
+    residuo = float(budget)
+    for _, studente, livello, opzione, delta_costo in passi:
+        if bloccati[studente] or livello != livelli[studente]:
+            continue
+        if delta_costo > residuo:
+            # I passi successivi di questo studente richiedono questo
+            bloccati[studente] = True
+            continue
+        residuo -= delta_costo
+        scelte[studente] = opzione
+        livelli[studente] += 1
+
+    # Residuo: miglior aumento di guadagno che ci sta, uno studente alla volta
+    if residuo > 0 and n > 0:
+        costi_array = np.asarray(costi_lista)
+        attuali = np.array([guadagni[s, o] if o >= 0 else 0.0 for s, o in enumerate(scelte)])
+        spesi = np.array([costi_lista[o] if o >= 0 else 0.0 for o in scelte])
+        while True:
+            possibili = costi_array[None, :] - spesi[:, None] <= residuo + 1e-9
+            aumenti = np.where(possibili, guadagni - attuali[:, None], 0.0)
+            studente, opzione = np.unravel_index(np.argmax(aumenti), aumenti.shape)
+            if aumenti[studente, opzione] <= 1e-12:
+                break
+            residuo -= costi_lista[opzione] - spesi[studente]
+            scelte[studente] = int(opzione)
+            attuali[studente] = guadagni[studente, opzione]
+            spesi[studente] = costi_lista[opzione]
+    return scelte
+
+
+class SimulatoreMonteCarlo:
+    """Simulazione Monte Carlo vettoriale degli interventi e ottimizzazione del budget.
+
+    L'effetto di un intervento sulla fragilità è quello tabellato da
+    SimulatoreInterventi moltiplicato per un fattore log-normale di media 1
+    (risposta individuale incerta); la conversione in punti di voto è la
+    stessa del simulatore deterministico. Tutte le opzioni usano gli stessi
+    campioni (numeri casuali comuni), così i confronti tra opzioni non
+    dipendono dal rumore.
+    """
+
+    def __init__(self, anagrafica, gestione_voti, simulazioni: int = 500,
+                 incertezza: float = 0.35, seed: Optional[int] = None, dimensione_blocco: int = 2048):
+        """Inizializza il simulatore.
+
+        Args:
+            anagrafica: Istanza di Anagrafica
+            gestione_voti: Istanza di GestioneVoti
+            simulazioni: Campioni per studente
+            incertezza: Deviazione standard (log) del fattore di risposta
+            seed: Seme del generatore casuale (riproducibilità)
+            dimensione_blocco: Studenti elaborati per volta (limita la memoria)
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy non disponibile: usare SimulatoreInterventi")
+
+        self.anagrafica = anagrafica
+        self.gestione_voti = gestione_voti
+        self.simulazioni = simulazioni
+        self.incertezza = incertezza
+        self.seed = seed
+        self.dimensione_blocco = dimensione_blocco
+
+        self.riduzioni = np.array([SimulatoreInterventi.RIDUZIONE_FRAGILITA[t][i] for t, i in OPZIONI], dtype=np.float64)
+        self.costi = np.array([SimulatoreInterventi.COSTI[t][i] for t, i in OPZIONI], dtype=np.float64)
+
+    # ============ CAMPIONAMENTO ============
+
+    def dati_studenti(self, studenti) -> Tuple[List[int], "np.ndarray", "np.ndarray"]:
+        """ID, fragilità e media dei voti degli studenti (un solo passaggio sui voti)."""
+        somme: Dict[int, float] = {}
+        conteggi: Dict[int, int] = {}
+        for voto in self.gestione_voti.voti:
+            somme[voto.id_studente] = somme.get(voto.id_studente, 0.0) + voto.voto
+            conteggi[voto.id_studente] = conteggi.get(voto.id_studente, 0) + 1
+        ids = [s.id for s in studenti]
+        fragilita = np.fromiter((s.fragilità_sociale for s in studenti), dtype=np.float64, count=len(ids))
+        medie = np.fromiter((somme[i] / conteggi[i] if i in conteggi else 0.0 for i in ids),
+                            dtype=np.float64, count=len(ids))
+        return ids, fragilita, medie
+
+    def _fattori(self, generatore, righe: int) -> "np.ndarray":
+        sigma = self.incertezza
+        return generatore.lognormal(-sigma * sigma / 2, sigma, size=(righe, self.simulazioni))
+
+    @staticmethod
+    def _effetti(fragilita, medie, riduzione: float, fattori) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Riduzione della fragilità e miglioramento dei voti (studenti x campioni)."""
+        riduzioni = np.minimum(fragilita[:, None], riduzione * fattori)
+        # Come SimulatoreInterventi: ogni 10 punti di fragilità = 0.5 punti di voto, media massima 10
+        miglioramenti = np.minimum(10.0, medie[:, None] + (riduzioni / 10) * 0.5) - medie[:, None]
+        return riduzioni, miglioramenti
+
+    def simula_intervento_studenti(self, studenti, tipo: TipoIntervento,
+                                   intensità: IntensitàIntervento) -> Dict:
+        """Distribuzione dell'effetto di un intervento su un gruppo di studenti.
+
+        Args:
+            studenti: Studenti a cui applicare l'intervento
+            tipo: Tipo di intervento
+            intensità: Intensità dell'intervento
+
+        Returns:
+            Dizionario con miglioramenti attesi, intervalli al 90% e costo
+        """
+        ids, fragilita, medie = self.dati_studenti(studenti)
+        if not ids:
+            raise ValueError("Nessuno studente da simulare")
+        riduzione = SimulatoreInterventi.RIDUZIONE_FRAGILITA[tipo][intensità]
+        generatore = np.random.default_rng(self.seed)
+
+        somma_voti = np.zeros(self.simulazioni)
+        somma_fragilita = np.zeros(self.simulazioni)
+        per_studente = []
+        for inizio in range(0, len(ids), self.dimensione_blocco):
+            blocco = slice(inizio, inizio + self.dimensione_blocco)
+            riduzioni, miglioramenti = self._effetti(
+                fragilita[blocco], medie[blocco], riduzione, self._fattori(generatore, len(ids[blocco]))
+            )
+            somma_voti += miglioramenti.sum(axis=0)
+            somma_fragilita += riduzioni.sum(axis=0)
+            basso, alto = np.percentile(miglioramenti, [5, 95], axis=1)
+            for posizione, id_studente in enumerate(ids[blocco]):
+                per_studente.append({
+                    "id_studente": id_studente,
+                    "miglioramento_voti_atteso": round(float(miglioramenti[posizione].mean()), 3),
+                    "intervallo_90": [round(float(basso[posizione]), 3), round(float(alto[posizione]), 3)],
+                    "miglioramento_fragilita_atteso": round(float(riduzioni[posizione].mean()), 2)
+                })
+
+        # Media del gruppo in ogni scenario simulato
+        media_voti = somma_voti / len(ids)
+        media_fragilita = somma_fragilita / len(ids)
+        return {
+            "tipo": tipo.value,
+            "intensità": intensità.value,
+            "numero_studenti": len(ids),
+            "simulazioni": self.simulazioni,
+            "miglioramento_voti_medio": round(float(media_voti.mean()), 3),
+            "intervallo_90_voti": [round(float(v), 3) for v in np.percentile(media_voti, [5, 95])],
+            "miglioramento_fragilita_medio": round(float(media_fragilita.mean()), 2),
+            "intervallo_90_fragilita": [round(float(v), 2) for v in np.percentile(media_fragilita, [5, 95])],
+            "fragilita_media_iniziale": round(float(fragilita.mean()), 1),
+            "media_voti_iniziale": round(float(medie.mean()), 2),
+            "costo_totale": float(SimulatoreInterventi.COSTI[tipo][intensità] * len(ids)),
+            "studenti": per_studente
+        }
+
+    def simula_intervento_classe(self, classe: str, tipo: TipoIntervento,
+                                 intensità: IntensitàIntervento) -> Dict:
+        """Come simula_intervento_studenti, per tutti gli studenti di una classe."""
+        studenti = self.anagrafica.studenti_per_classe(classe)
+        if not studenti:
+            raise ValueError(f"Classe {classe} non trovata")
+        risultato = self.simula_intervento_studenti(studenti, tipo, intensità)
+        risultato["classe"] = classe
+        return risultato
+
+    def guadagni_attesi(self, studenti, obiettivo: str = "voti") -> MatriceGuadagni:
+        """Miglioramento atteso per ogni studente e ogni opzione tipo/intensità.
+
+        Args:
+            studenti: Studenti candidati
+            obiettivo: "voti" (punti di media) o "fragilita" (punti di fragilità)
+
+        Returns:
+            MatriceGuadagni con colonne nell'ordine di OPZIONI
+        """
+        if obiettivo not in OBIETTIVI:
+            raise ValueError(f"Obiettivo non valido: {obiettivo}")
+        ids, fragilita, medie = self.dati_studenti(studenti)
+        generatore = np.random.default_rng(self.seed)
+        guadagni = np.zeros((len(ids), len(OPZIONI)))
+        for inizio in range(0, len(ids), self.dimensione_blocco):
+            blocco = slice(inizio, inizio + self.dimensione_blocco)
+            fattori = self._fattori(generatore, len(ids[blocco]))
+            for colonna, riduzione in enumerate(self.riduzioni):
+                riduzioni, miglioramenti = self._effetti(fragilita[blocco], medie[blocco], riduzione, fattori)
+                guadagni[blocco, colonna] = (miglioramenti if obiettivo == "voti" else riduzioni).mean(axis=1)
+        return MatriceGuadagni(ids, guadagni, self.costi.copy(), obiettivo, self.simulazioni)
+
+    # ============ OTTIMIZZAZIONE ============
+
+    def ottimizza_budget(self, budget: float, studenti=None, obiettivo: str = "voti",
+                         classe: Optional[str] = None, min_fragilita: float = 0) -> PianoInterventi:
+        """Distribuisce un budget (euro mensili, come COSTI) tra studenti e interventi.
+
+        Args:
+            budget: Budget disponibile
+            studenti: Studenti candidati (default: tutti o quelli della classe)
+            obiettivo: "voti" o "fragilita"
+            classe: Limita i candidati a una classe
+            min_fragilita: Fragilità minima dei candidati
+
+        Returns:
+            PianoInterventi con un intervento al più per studente
+        """
+        inizio = time.perf_counter()
+        if budget < 0:
+            raise ValueError("Il budget non può essere negativo")
+        if obiettivo not in OBIETTIVI:
+            raise ValueError(f"Obiettivo non valido: {obiettivo}")
+        if studenti is None:
+            studenti = self.anagrafica.studenti_per_classe(classe) if classe else self.anagrafica.studenti
+        studenti = [s for s in studenti if s.fragilità_sociale >= min_fragilita]
+        per_id = {s.id: s for s in studenti}
+        if not studenti:
+            return PianoInterventi(budget=budget, obiettivo=obiettivo, costo_totale=0.0, miglioramento_atteso=0.0,
+                                   simulazioni=self.simulazioni, tempo_ms=(time.perf_counter() - inizio) * 1000)
+
+        matrice = self.guadagni_attesi(studenti, obiettivo)
+        scelte = alloca_budget(matrice.guadagni, matrice.costi, budget)
+
+        assegnazioni = []
+        for riga, opzione in enumerate(scelte):
+            if opzione < 0:
+                continue
+            tipo, intensità = OPZIONI[opzione]
+            studente = per_id[matrice.id_studenti[riga]]
+            assegnazioni.append({
+                "id_studente": studente.id,
+                "nome": studente.nome_completo,
+                "classe": studente.classe,
+                "fragilita": studente.fragilità_sociale,
+                "tipo": tipo.value,
+                "intensità": intensità.value,
+                "costo": float(matrice.costi[opzione]),
+                "miglioramento_atteso": round(float(matrice.guadagni[riga, opzione]), 3)
+            })
+        assegnazioni.sort(key=lambda a: (-a["miglioramento_atteso"], a["id_studente"]))
+
+        return PianoInterventi(
+            budget=budget,
+            obiettivo=obiettivo,
+            costo_totale=float(sum(matrice.costi[o] for o in scelte if o >= 0)),
+            miglioramento_atteso=float(sum(matrice.guadagni[r, o] for r, o in enumerate(scelte) if o >= 0)),
+            assegnazioni=assegnazioni,
+            studenti_considerati=len(studenti),
+            simulazioni=self.simulazioni,
+            tempo_ms=(time.perf_counter() - inizio) * 1000
+        )
+
+
+if __name__ == "__main__":
+    from anagrafica import Anagrafica
+    from voti import GestioneVoti, Voto
+    import random
+
+    print("🎲 TEST SIMULAZIONE MONTE CARLO INTERVENTI")
+    print("=" * 60 + "\n")
+
+    anagrafica = Anagrafica()
+    voti = GestioneVoti()
+    anagrafica.genera_studenti(10000)
+    casuale = random.Random(1)
+    voti.aggiungi_voti([
+        Voto(s.id, "Matematica", round(casuale.uniform(3, 9), 1), "scritto", "2025-11-03")
+        for s in anagrafica.studenti for _ in range(5)
+    ])
+
+    simulatore = SimulatoreMonteCarlo(anagrafica, voti, seed=42)
+    classe = anagrafica.studenti[0].classe
+    scenario = simulatore.simula_intervento_classe(classe, TipoIntervento.SUPPORTO_FAMILIARE, IntensitàIntervento.MEDIA)
+    print(f"   Classe {classe}: +{scenario['miglioramento_voti_medio']} punti "
+          f"(90%: {scenario['intervallo_90_voti']})")
+
+    piano = simulatore.ottimizza_budget(50000)
+    print(f"   Budget 50.000 €: {len(piano.assegnazioni)} studenti, costo {piano.costo_totale:.0f} €")
+    print(f"   Miglioramento atteso totale: {piano.miglioramento_atteso:.1f} punti")
+    print(f"   Tempo ottimizzazione (10.000 studenti): {piano.tempo_ms:.0f} ms")
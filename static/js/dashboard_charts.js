@@ -254,13 +254,12 @@ function initPresenzeChart(data) {
 
 async function loadDashboardData() {
     try {
-        // Carica statistiche generali
-        const statsResponse = await fetch('/api/dashboard/stats');
-        const stats = await statsResponse.json();
-        
-        // Carica dati per grafici
-        const chartsResponse = await fetch('/api/dashboard/charts');
-        const charts = await chartsResponse.json();
+        // Statistiche e grafici in una sola richiesta (aggregati calcolati una volta)
+        const response = await fetch('/api/dashboard/widget?ids=stats,charts');
+        const risultato = await response.json();
+        const stats = risultato.widget.stats || {};
+        const charts = risultato.widget.charts || {};
+        console.log('⏱️ Tempi widget (ms):', risultato.tempi_ms);
         
         // Inizializza tutti i grafici
         initDistribuzioneVoti(charts.distribuzione || {});
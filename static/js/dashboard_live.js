@@ -0,0 +1,100 @@
+/**
+ * DASHBOARD LIVE - ManagerSchool
+ * Riceve dal server i delta della dashboard (KPI, medie di classe, allerte)
+ * via WebSocket se disponibile, altrimenti via Server-Sent Events.
+ */
+
+class DashboardLive {
+    constructor(url = '/api/dashboard/eventi') {
+        this.url = url;
+        this.source = null;
+        this.handlers = { delta: [], reset: [] };
+    }
+
+    connect() {
+        // WebSocket già connesso (websocket_client.js): nessuno stream aggiuntivo
+        if (window.wsClient && window.wsClient.isConnected()) {
+            window.wsClient.subscribe('dashboard_delta');
+            window.wsClient.on('dashboard_delta', (delta) => this.emit('delta', delta));
+            console.log('📡 Delta dashboard via WebSocket');
+            return true;
+        }
+
+        if (typeof EventSource === 'undefined') {
+            return false;
+        }
+
+        // Il browser si riconnette da solo e invia Last-Event-ID
+        this.source = new EventSource(this.url);
+        this.source.addEventListener('delta', (e) => this.emit('delta', JSON.parse(e.data)));
+        this.source.addEventListener('reset', () => this.emit('reset', {}));
+        console.log('📡 Delta dashboard via Server-Sent Events');
+        return true;
+    }
+
+    disconnect() {
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+    }
+
+    on(tipo, handler) {
+        this.handlers[tipo].push(handler);
+    }
+
+    emit(tipo, dati) {
+        this.handlers[tipo].forEach(handler => handler(dati));
+    }
+}
+
+
+// ========================================
+// HELPER FUNCTIONS
+// ========================================
+
+function applicaKpi(kpi) {
+    // Gli elementi con data-kpi="nome" mostrano il valore del KPI
+    Object.entries(kpi || {}).forEach(([nome, valore]) => {
+        document.querySelectorAll(`[data-kpi="${nome}"]`).forEach(el => {
+            el.textContent = valore === null ? '-' : valore;
+        });
+    });
+}
+
+/**
+ * Collega la pagina ai delta del server.
+ *
+ * @param {Function} onDelta - chiamata con ogni delta ({kpi, medie_classi, allerte})
+ * @param {Function} onReset - chiamata se i delta persi richiedono un ricaricamento completo
+ * @param {Function} fallback - eseguita solo se né WebSocket né SSE sono disponibili
+ */
+function initDashboardLive(onDelta, onReset, fallback) {
+    const live = new DashboardLive();
+    live.on('delta', (delta) => {
+        applicaKpi(delta.kpi);
+        if (onDelta) onDelta(delta);
+    });
+    live.on('reset', () => {
+        if (onReset) onReset();
+    });
+
+    if (!live.connect() && fallback) {
+        fallback();
+    }
+
+    window.dashboardLive = live;
+    return live;
+}
+
+
+// ========================================
+// EXPORTS
+// ========================================
+
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = {
+        DashboardLive,
+        initDashboardLive
+    };
+}
@@ -0,0 +1,663 @@
+"""
+Statistiche in streaming - ManagerSchool
+Accumulatori combinabili (media e varianza di Welford, covarianza e
+correlazione online, quantili approssimati con uno sketch KLL) e le
+statistiche dei voti per materia, classe e fascia di reddito tenute
+aggiornate a ogni voto: i moduli di analisi le leggono senza
+riscansionare i voti.
+"""
+
+import math
+import random
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class Welford:
+    """Numero, media, varianza, minimo e massimo in un solo passaggio.
+
+    Supporta la rimozione di un valore e l'unione con un altro
+    accumulatore (formula di Chan), quindi anche la sottrazione di un
+    gruppo già unito.
+    """
+
+    __slots__ = ("n", "media", "m2", "minimo", "massimo")
+
+    def __init__(self, valori: Iterable[float] = ()):
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.minimo = math.inf
+        self.massimo = -math.inf
+        for valore in valori:
+            self.aggiungi(valore)
+
+    def aggiungi(self, valore: float) -> None:
+        self.n += 1
+        delta = valore - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (valore - self.media)
+        if valore < self.minimo:
+            self.minimo = valore
+        if valore > self.massimo:
+            self.massimo = valore
+
+    def rimuovi(self, valore: float) -> None:
+        """Toglie un valore aggiunto in precedenza (minimo e massimo non vengono ristretti)."""
+        if self.n <= 1:
+            self.n, self.media, self.m2 = 0, 0.0, 0.0
+            return
+        media_precedente = (self.n * self.media - valore) / (self.n - 1)
+        self.m2 = max(0.0, self.m2 - (valore - media_precedente) * (valore - self.media))
+        self.media = media_precedente
+        self.n -= 1
+
+    def unisci(self, altro: "Welford") -> "Welford":
+        """Aggiunge i valori di un altro accumulatore (es. di un'altra partizione)."""
+        if altro.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.media, self.m2 = altro.n, altro.media, altro.m2
+        else:
+            n = self.n + altro.n
+            delta = altro.media - self.media
+            self.m2 += altro.m2 + delta * delta * self.n * altro.n / n
+            self.media += delta * altro.n / n
+            self.n = n
+        self.minimo = min(self.minimo, altro.minimo)
+        self.massimo = max(self.massimo, altro.massimo)
+        return self
+
+    def sottrai(self, altro: "Welford") -> "Welford":
+        """Toglie i valori di un accumulatore unito in precedenza."""
+        if altro.n == 0:
+            return self
+        n = self.n - altro.n
+        if n <= 0:
+            self.n, self.media, self.m2 = 0, 0.0, 0.0
+            return self
+        media = (self.n * self.media - altro.n * altro.media) / n
+        delta = altro.media - media
+        self.m2 = max(0.0, self.m2 - altro.m2 - delta * delta * n * altro.n / self.n)
+        self.media = media
+        self.n = n
+        return self
+
+    @property
+    def varianza(self) -> float:
+        """Varianza della popolazione (0 con meno di due valori)."""
+        return self.m2 / self.n if self.n > 1 else 0.0
+
+    @property
+    def varianza_campionaria(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def deviazione_standard(self) -> float:
+        return math.sqrt(self.varianza)
+
+    def copia(self) -> "Welford":
+        return Welford().unisci(self)
+
+    def to_dict(self) -> Dict:
+        return {"n": self.n, "media": self.media, "m2": self.m2,
+                "minimo": self.minimo if self.n else None, "massimo": self.massimo if self.n else None}
+
+    @classmethod
+    def from_dict(cls, dati: Dict) -> "Welford":
+        accumulatore = cls()
+        accumulatore.n, accumulatore.media, accumulatore.m2 = dati["n"], dati["media"], dati["m2"]
+        if dati.get("minimo") is not None:
+            accumulatore.minimo, accumulatore.massimo = dati["minimo"], dati["massimo"]
+        return accumulatore
+
+
+class Covarianza:
+    """Covarianza e correlazione di Pearson online tra due grandezze."""
+
+    __slots__ = ("n", "media_x", "media_y", "c_xy", "m2_x", "m2_y")
+
+    def __init__(self, coppie: Iterable[Tuple[float, float]] = ()):
+        self.n = 0
+        self.media_x = self.media_y = 0.0
+        self.c_xy = self.m2_x = self.m2_y = 0.0
+        for x, y in coppie:
+            self.aggiungi(x, y)
+
+    def aggiungi(self, x: float, y: float) -> None:
+        self.n += 1
+        delta_x = x - self.media_x
+        delta_y = y - self.media_y
+        self.media_x += delta_x / self.n
+        self.media_y += delta_y / self.n
+        self.c_xy += delta_x * (y - self.media_y)
+        self.m2_x += delta_x * (x - self.media_x)
+        self.m2_y += delta_y * (y - self.media_y)
+
+    def rimuovi(self, x: float, y: float) -> None:
+        if self.n <= 1:
+            self.__init__()
+            return
+        media_x = (self.n * self.media_x - x) / (self.n - 1)
+        media_y = (self.n * self.media_y - y) / (self.n - 1)
+        self.c_xy -= (x - media_x) * (y - self.media_y)
+        self.m2_x = max(0.0, self.m2_x - (x - media_x) * (x - self.media_x))
+        self.m2_y = max(0.0, self.m2_y - (y - media_y) * (y - self.media_y))
+        self.media_x, self.media_y = media_x, media_y
+        self.n -= 1
+
+    def unisci(self, altro: "Covarianza") -> "Covarianza":
+        if altro.n == 0:
+            return self
+        if self.n == 0:
+            for nome in self.__slots__:
+                setattr(self, nome, getattr(altro, nome))
+            return self
+        n = self.n + altro.n
+        delta_x = altro.media_x - self.media_x
+        delta_y = altro.media_y - self.media_y
+        peso = self.n * altro.n / n
+        self.c_xy += altro.c_xy + delta_x * delta_y * peso
+        self.m2_x += altro.m2_x + delta_x * delta_x * peso
+        self.m2_y += altro.m2_y + delta_y * delta_y * peso
+        self.media_x += delta_x * altro.n / n
+        self.media_y += delta_y * altro.n / n
+        self.n = n
+        return self
+
+    @property
+    def covarianza(self) -> float:
+        """Covarianza della popolazione."""
+        return self.c_xy / self.n if self.n > 1 else 0.0
+
+    @property
+    def correlazione(self) -> Optional[float]:
+        """Coefficiente di Pearson (None se una delle grandezze è costante)."""
+        if self.n < 2 or self.m2_x <= 0 or self.m2_y <= 0:
+            return None
+        return max(-1.0, min(1.0, self.c_xy / math.sqrt(self.m2_x * self.m2_y)))
+
+    def to_dict(self) -> Dict:
+        return {nome: getattr(self, nome) for nome in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, dati: Dict) -> "Covarianza":
+        accumulatore = cls()
+        for nome in cls.__slots__:
+            setattr(accumulatore, nome, dati[nome])
+        return accumulatore
+
+
+class SketchKLL:
+    """Quantili approssimati con uno sketch KLL (Karnin, Lang, Liberty).
+
+    Memoria O(k log n), errore di rango circa 1.7/k con alta probabilità;
+    esatto finché i valori sono meno di k. Due sketch si uniscono senza
+    perdere la garanzia.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = k
+        self.n = 0
+        self.livelli: List[List[float]] = [[]]
+        self._casuale = random.Random(seed)
+
+    def _capacita(self, livello: int) -> int:
+        profondita = len(self.livelli) - livello - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** profondita)))
+
+    def aggiungi(self, valore: float) -> None:
+        self.livelli[0].append(valore)
+        self.n += 1
+        if len(self.livelli[0]) >= self._capacita(0):
+            self._comprimi()
+
+    def _comprimi(self) -> None:
+        while sum(len(l) for l in self.livelli) > sum(self._capacita(h) for h in range(len(self.livelli))) or \
+                len(self.livelli[0]) >= self._capacita(0):
+            for livello, valori in enumerate(self.livelli):
+                if len(valori) >= self._capacita(livello):
+                    if livello + 1 == len(self.livelli):
+                        self.livelli.append([])
+                    valori.sort()
+                    resto = [valori.pop()] if len(valori) % 2 else []
+                    # Metà dei valori, scelti a caso tra pari e dispari, sale di livello (peso doppio)
+                    self.livelli[livello + 1].extend(valori[self._casuale.randint(0, 1)::2])
+                    self.livelli[livello] = resto
+                    break
+            else:
+                return
+
+    def unisci(self, altro: "SketchKLL") -> "SketchKLL":
+        while len(self.livelli) < len(altro.livelli):
+            self.livelli.append([])
+        for livello, valori in enumerate(altro.livelli):
+            self.livelli[livello].extend(valori)
+        self.n += altro.n
+        self._comprimi()
+        return self
+
+    def _pesati(self) -> List[Tuple[float, int]]:
+        return sorted((valore, 1 << livello) for livello, valori in enumerate(self.livelli) for valore in valori)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Valore approssimato al quantile q (0-1); None se lo sketch è vuoto."""
+        return self.quantili([q])[0]
+
+    def quantili(self, qs: Iterable[float]) -> List[Optional[float]]:
+        """Più quantili con un solo ordinamento dello sketch."""
+        qs = list(qs)
+        if self.n == 0:
+            return [None] * len(qs)
+        pesati = self._pesati()
+        totale = sum(peso for _, peso in pesati)
+        risultati = []
+        for q in qs:
+            obiettivo = q * totale
+            cumulato = 0
+            valore_q = pesati[-1][0]
+            for valore, peso in pesati:
+                cumulato += peso
+                if cumulato >= obiettivo:
+                    valore_q = valore
+                    break
+            risultati.append(valore_q)
+        return risultati
+
+    def rango(self, valore: float) -> float:
+        """Frazione approssimata dei valori minori o uguali a valore."""
+        pesati = self._pesati()
+        totale = sum(peso for _, peso in pesati)
+        return sum(peso for v, peso in pesati if v <= valore) / totale if totale else 0.0
+
+    def to_dict(self) -> Dict:
+        return {"k": self.k, "n": self.n, "livelli": [list(l) for l in self.livelli]}
+
+    @classmethod
+    def from_dict(cls, dati: Dict) -> "SketchKLL":
+        sketch = cls(dati["k"])
+        sketch.n = dati["n"]
+        sketch.livelli = [list(l) for l in dati["livelli"]]
+        return sketch
+
+
+# Etichette delle fasce di reddito (CategoriaReddito) nei risultati delle analisi
+ETICHETTE_FASCE = {
+    "MOLTO_BASSO": "Molto Basso",
+    "BASSO": "Basso",
+    "MEDIO": "Medio",
+    "ALTO": "Alto",
+    "MOLTO_ALTO": "Molto Alto"
+}
+QUARTILI = (0.25, 0.5, 0.75)
+
+
+def _riepilogo(accumulatore: Welford, sketch: Optional[SketchKLL] = None) -> Dict:
+    risultato = {
+        "numero": accumulatore.n,
+        "media": accumulatore.media,
+        "deviazione_standard": accumulatore.deviazione_standard,
+        "min": accumulatore.minimo if accumulatore.n else None,
+        "max": accumulatore.massimo if accumulatore.n else None
+    }
+    if sketch is not None:
+        risultato["quartili"] = sketch.quantili(QUARTILI)
+    return risultato
+
+
+class StatisticheVoti:
+    """Statistiche dei voti per materia, classe e fascia di reddito.
+
+    Osserva GestioneVoti: ogni voto aggiorna in O(1) gli accumulatori della
+    sua materia, della classe e dello studente. Le statistiche per
+    studente (medie per fascia di reddito, dispersione della fragilità,
+    correlazione reddito-rendimento) seguono gli osservatori di Anagrafica:
+    chi modifica uno studente sul posto (es. la classe) notifica
+    "modificato", come per rischio_incrementale e rollup_grafici.
+
+    Rimozioni e cambi di classe aggiornano medie e varianze in modo esatto;
+    minimi, massimi e quantili vengono ricostruiti alla lettura successiva.
+    """
+
+    def __init__(self, gestione_voti=None, anagrafica=None, k: int = 200):
+        """Inizializza le statistiche.
+
+        Args:
+            gestione_voti: GestioneVoti da osservare (opzionale, vedi collega)
+            anagrafica: Anagrafica degli studenti
+            k: Parametro di precisione degli sketch dei quantili
+        """
+        self._lock = threading.RLock()
+        self.k = k
+        self.gestione_voti = None
+        self.anagrafica = None
+        self._azzera()
+        if gestione_voti is not None:
+            self.collega(gestione_voti, anagrafica)
+
+    def _azzera(self) -> None:
+        self._materie: Dict[str, Welford] = {}
+        self._quantili_materie: Dict[str, SketchKLL] = {}
+        self._classi: Dict[str, Welford] = {}
+        self._quantili_classi: Dict[str, SketchKLL] = {}
+        self._studenti: Dict[int, Welford] = {}  # voti di ogni studente
+        # Dati anagrafici al momento della registrazione: (classe, fascia, reddito, fragilità)
+        self._anagrafe: Dict[int, Tuple[str, str, float, float]] = {}
+        self._fasce: Dict[str, Welford] = {}  # medie degli studenti (0 senza voti)
+        self._medie_studenti = Welford()  # medie > 0
+        self._fragilita = Welford()
+        self._reddito_rendimento = Covarianza()
+        self._sketch_da_ricostruire = False
+        self.ricostruzioni = 0
+
+    def collega(self, gestione_voti, anagrafica=None) -> None:
+        """Osserva una GestioneVoti (sostituisce la precedente) e ricostruisce.
+
+        GestioneVoti.statistiche punta a questo oggetto, così statistiche_materia
+        e i moduli di analisi leggono gli accumulatori.
+        """
+        with self._lock:
+            self._scollega()
+            self.gestione_voti = gestione_voti
+            self.anagrafica = anagrafica
+            gestione_voti.osservatori.append(self.su_evento_voto)
+            if anagrafica is not None:
+                anagrafica.osservatori.append(self.su_evento_anagrafica)
+            gestione_voti.statistiche = self
+            self.ricostruisci()
+
+    def _scollega(self) -> None:
+        """Smette di osservare voti e anagrafica correnti."""
+        if self.gestione_voti is not None:
+            if self.su_evento_voto in self.gestione_voti.osservatori:
+                self.gestione_voti.osservatori.remove(self.su_evento_voto)
+            if getattr(self.gestione_voti, "statistiche", None) is self:
+                self.gestione_voti.statistiche = None
+        if self.anagrafica is not None and self.su_evento_anagrafica in self.anagrafica.osservatori:
+            self.anagrafica.osservatori.remove(self.su_evento_anagrafica)
+
+    def ricostruisci(self) -> None:
+        """Ricalcola tutti gli accumulatori da voti e anagrafica correnti."""
+        with self._lock:
+            self._azzera()
+            self.ricostruzioni += 1
+            if self.gestione_voti is None:
+                return
+            if self.anagrafica is not None:
+                for studente in self.anagrafica.studenti:
+                    self._anagrafe[studente.id] = self._dati_anagrafici(studente)
+            for voto in list(self.gestione_voti.voti):
+                self._registra_voto(voto)
+            for id_studente, dati in self._anagrafe.items():
+                self._entra(id_studente, dati, self._studenti.get(id_studente, Welford()))
+
+    # ============ AGGIORNAMENTI ============
+
+    @staticmethod
+    def _dati_anagrafici(studente) -> Tuple[str, str, float, float]:
+        return (studente.classe, studente.categoria_reddito.name,
+                studente.reddito_familiare, studente.fragilità_sociale)
+
+    def _sketch(self, sketch: Dict[str, SketchKLL], chiave: str) -> SketchKLL:
+        esistente = sketch.get(chiave)
+        if esistente is None:
+            esistente = sketch[chiave] = SketchKLL(self.k, seed=len(sketch))
+        return esistente
+
+    def _registra_voto(self, voto) -> None:
+        """Voto nuovo: materia, studente e classe (le medie per studente a parte)."""
+        self._materie.setdefault(voto.materia, Welford()).aggiungi(voto.voto)
+        self._sketch(self._quantili_materie, voto.materia).aggiungi(voto.voto)
+        self._studenti.setdefault(voto.id_studente, Welford()).aggiungi(voto.voto)
+        dati = self._anagrafe.get(voto.id_studente)
+        if dati is not None:
+            self._classi.setdefault(dati[0], Welford()).aggiungi(voto.voto)
+            self._sketch(self._quantili_classi, dati[0]).aggiungi(voto.voto)
+
+    def _entra(self, id_studente: int, dati: Tuple, voti: Welford) -> None:
+        """Contributo di uno studente alle statistiche per studente."""
+        _, fascia, reddito, fragilita = dati
+        media = voti.media if voti.n else 0.0
+        self._fasce.setdefault(fascia, Welford()).aggiungi(media)
+        self._fragilita.aggiungi(fragilita)
+        if media > 0:
+            self._medie_studenti.aggiungi(media)
+            self._reddito_rendimento.aggiungi(reddito, media)
+
+    def _esce(self, id_studente: int, dati: Tuple, media: float) -> None:
+        _, fascia, reddito, fragilita = dati
+        self._fasce[fascia].rimuovi(media)
+        self._fragilita.rimuovi(fragilita)
+        if media > 0:
+            self._medie_studenti.rimuovi(media)
+            self._reddito_rendimento.rimuovi(reddito, media)
+
+    def _aggiorna_studente(self, id_studente: int, media_precedente: float) -> None:
+        dati = self._anagrafe.get(id_studente)
+        if dati is not None:
+            self._esce(id_studente, dati, media_precedente)
+            self._entra(id_studente, dati, self._studenti[id_studente])
+
+    def _media(self, id_studente: int) -> float:
+        voti = self._studenti.get(id_studente)
+        return voti.media if voti is not None and voti.n else 0.0
+
+    def su_evento_voto(self, evento: str, voto=None) -> None:
+        """Osservatore di GestioneVoti."""
+        with self._lock:
+            if evento in ("aggiunto", "aggiunti"):
+                voti = voto if evento == "aggiunti" else [voto]
+                precedenti = {}
+                for singolo in voti:
+                    precedenti.setdefault(singolo.id_studente, self._media(singolo.id_studente))
+                    self._registra_voto(singolo)
+                for id_studente, media in precedenti.items():
+                    self._aggiorna_studente(id_studente, media)
+            elif evento == "rimosso":
+                media = self._media(voto.id_studente)
+                self._materie[voto.materia].rimuovi(voto.voto)
+                self._studenti[voto.id_studente].rimuovi(voto.voto)
+                dati = self._anagrafe.get(voto.id_studente)
+                if dati is not None:
+                    self._classi[dati[0]].rimuovi(voto.voto)
+                self._aggiorna_studente(voto.id_studente, media)
+                self._sketch_da_ricostruire = True
+            else:  # "azzerati", "ricaricati"
+                self.ricostruisci()
+
+    def su_evento_anagrafica(self, evento: str, studente=None) -> None:
+        """Osservatore di Anagrafica: aggiorna solo lo studente interessato."""
+        with self._lock:
+            if studente is None or evento not in ("aggiunto", "rimosso", "modificato"):
+                self.sincronizza_anagrafica()  # "ricaricati"
+            elif evento == "rimosso":
+                self._studente_uscito(studente.id)
+            else:
+                self._studente_aggiornato(studente)
+
+    def sincronizza_anagrafica(self) -> None:
+        """Confronto completo con l'anagrafica (dopo "ricaricati")."""
+        if self.anagrafica is None:
+            return
+        with self._lock:
+            presenti = set()
+            for studente in self.anagrafica.studenti:
+                presenti.add(studente.id)
+                self._studente_aggiornato(studente)
+            for id_studente in [i for i in self._anagrafe if i not in presenti]:
+                self._studente_uscito(id_studente)
+
+    def _studente_aggiornato(self, studente) -> None:
+        """Studente nuovo o modificato (classe, reddito, fragilità)."""
+        dati = self._dati_anagrafici(studente)
+        precedenti = self._anagrafe.get(studente.id)
+        if precedenti == dati:
+            return
+        voti = self._studenti.get(studente.id, Welford())
+        if precedenti is not None:
+            self._esce(studente.id, precedenti, self._media(studente.id))
+        if voti.n and (precedenti is None or precedenti[0] != dati[0]):
+            # Solo un cambio di classe sposta i voti (e invalida gli sketch)
+            if precedenti is not None:
+                self._classi[precedenti[0]].sottrai(voti)
+            self._classi.setdefault(dati[0], Welford()).unisci(voti)
+            self._sketch_da_ricostruire = True
+        self._anagrafe[studente.id] = dati
+        self._entra(studente.id, dati, voti)
+
+    def _studente_uscito(self, id_studente: int) -> None:
+        dati = self._anagrafe.pop(id_studente, None)
+        if dati is None:
+            return
+        self._esce(id_studente, dati, self._media(id_studente))
+        voti = self._studenti.get(id_studente)
+        if voti is not None and voti.n:
+            self._classi[dati[0]].sottrai(voti)
+            self._sketch_da_ricostruire = True
+
+    def _ricostruisci_sketch(self) -> None:
+        """Minimi, massimi e quantili dopo rimozioni o cambi di classe."""
+        self._quantili_materie.clear()
+        self._quantili_classi.clear()
+        minimi_massimi = {}
+        for voto in list(self.gestione_voti.voti):
+            self._sketch(self._quantili_materie, voto.materia).aggiungi(voto.voto)
+            chiavi = [("materia", voto.materia)]
+            dati = self._anagrafe.get(voto.id_studente)
+            if dati is not None:
+                self._sketch(self._quantili_classi, dati[0]).aggiungi(voto.voto)
+                chiavi.append(("classe", dati[0]))
+            for chiave in chiavi:
+                estremi = minimi_massimi.setdefault(chiave, [voto.voto, voto.voto])
+                estremi[0] = min(estremi[0], voto.voto)
+                estremi[1] = max(estremi[1], voto.voto)
+        for (tipo, chiave), (minimo, massimo) in minimi_massimi.items():
+            accumulatore = (self._materie if tipo == "materia" else self._classi)[chiave]
+            accumulatore.minimo, accumulatore.massimo = minimo, massimo
+        self._sketch_da_ricostruire = False
+
+    # ============ LETTURE ============
+
+    def _pronte(self) -> None:
+        if self._sketch_da_ricostruire:
+            self._ricostruisci_sketch()
+
+    def statistiche_materia(self, materia: str) -> Optional[Dict]:
+        """Numero, media, deviazione, estremi e quartili dei voti di una materia."""
+        with self._lock:
+            self._pronte()
+            accumulatore = self._materie.get(materia)
+            if accumulatore is None or accumulatore.n == 0:
+                return None
+            return _riepilogo(accumulatore, self._quantili_materie.get(materia))
+
+    def statistiche_classe(self, classe: str) -> Optional[Dict]:
+        """Come statistiche_materia, per i voti degli studenti di una classe."""
+        with self._lock:
+            self._pronte()
+            accumulatore = self._classi.get(classe)
+            if accumulatore is None or accumulatore.n == 0:
+                return None
+            return _riepilogo(accumulatore, self._quantili_classi.get(classe))
+
+    def medie_per_fascia(self) -> Dict[str, Welford]:
+        """Medie degli studenti per fascia di reddito (nome di CategoriaReddito)."""
+        with self._lock:
+            self._pronte()
+            return {fascia: accumulatore.copia() for fascia, accumulatore in self._fasce.items()}
+
+    def medie_studenti(self) -> Welford:
+        """Distribuzione delle medie degli studenti con almeno un voto."""
+        with self._lock:
+            self._pronte()
+            return self._medie_studenti.copia()
+
+    def fragilita(self) -> Welford:
+        """Distribuzione della fragilità sociale degli studenti."""
+        with self._lock:
+            self._pronte()
+            return self._fragilita.copia()
+
+    def correlazione_reddito_rendimento(self) -> Optional[float]:
+        """Correlazione di Pearson tra reddito familiare e media (studenti con voti)."""
+        with self._lock:
+            self._pronte()
+            return self._reddito_rendimento.correlazione
+
+    def unisci(self, altra: "StatisticheVoti") -> "StatisticheVoti":
+        """Aggiunge le statistiche di un'altra partizione (es. un'altra sede).
+
+        Le partizioni devono contenere studenti diversi: le statistiche per
+        studente si sommano, non si ricalcolano.
+        """
+        with self._lock, altra._lock:
+            self._pronte()
+            altra._pronte()
+            for propri, altrui in ((self._materie, altra._materie), (self._classi, altra._classi),
+                                   (self._fasce, altra._fasce), (self._studenti, altra._studenti)):
+                for chiave, accumulatore in altrui.items():
+                    propri.setdefault(chiave, Welford()).unisci(accumulatore)
+            for propri, altrui in ((self._quantili_materie, altra._quantili_materie),
+                                   (self._quantili_classi, altra._quantili_classi)):
+                for chiave, sketch in altrui.items():
+                    self._sketch(propri, chiave).unisci(SketchKLL.from_dict(sketch.to_dict()))
+            self._anagrafe.update(altra._anagrafe)
+            self._medie_studenti.unisci(altra._medie_studenti)
+            self._fragilita.unisci(altra._fragilita)
+            self._reddito_rendimento.unisci(altra._reddito_rendimento)
+            # I dati uniti non corrispondono più ai soli voti osservati
+            self._scollega()
+            self.gestione_voti = None
+            self.anagrafica = None
+        return self
+
+    def riepilogo(self) -> Dict:
+        """Tutte le statistiche in forma serializzabile."""
+        with self._lock:
+            self._pronte()
+            return {
+                "materie": {m: _riepilogo(a, self._quantili_materie.get(m))
+                            for m, a in sorted(self._materie.items()) if a.n},
+                "classi": {c: _riepilogo(a, self._quantili_classi.get(c))
+                           for c, a in sorted(self._classi.items()) if a.n},
+                "fasce_reddito": {ETICHETTE_FASCE.get(f, f): _riepilogo(a)
+                                  for f, a in self._fasce.items() if a.n},
+                "medie_studenti": _riepilogo(self._medie_studenti),
+                "fragilita": _riepilogo(self._fragilita),
+                "correlazione_reddito_rendimento": self._reddito_rendimento.correlazione
+            }
+
+
+if __name__ == "__main__":
+    import time
+
+    from anagrafica import Anagrafica
+    from voti import GestioneVoti, Voto
+
+    print("📐 TEST STATISTICHE IN STREAMING")
+    print("=" * 60 + "\n")
+
+    anagrafica = Anagrafica()
+    voti = GestioneVoti()
+    anagrafica.genera_studenti(5000)
+    casuale = random.Random(1)
+    voti.aggiungi_voti([
+        Voto(s.id, casuale.choice(["Matematica", "Italiano", "Storia"]), round(casuale.uniform(3, 10), 1),
+             "scritto", "2025-11-03")
+        for s in anagrafica.studenti for _ in range(20)
+    ])
+    statistiche = StatisticheVoti(voti, anagrafica)
+
+    inizio = time.perf_counter()
+    voti.statistiche = None
+    completo = voti.statistiche_materia("Matematica")
+    scansione_ms = (time.perf_counter() - inizio) * 1000
+    voti.statistiche = statistiche
+    inizio = time.perf_counter()
+    streaming = voti.statistiche_materia("Matematica")
+    lettura_ms = (time.perf_counter() - inizio) * 1000
+
+    print(f"   Matematica: media {streaming['media']:.3f} (scansione {completo['media']:.3f})")
+    print(f"   Quartili approssimati: {streaming['quartili']}")
+    print(f"   Scansione {scansione_ms:.2f} ms, lettura accumulatori {lettura_ms:.3f} ms")
+    print(f"   Correlazione reddito-rendimento: {statistiche.correlazione_reddito_rendimento()}")
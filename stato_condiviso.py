@@ -0,0 +1,637 @@
+"""
+Stato condiviso tra più processi worker (gunicorn/uwsgi).
+Anagrafica, voti e pagelle sono salvati in un database SQLite in modalità WAL;
+ogni modifica è registrata in un log ordinato che gli altri worker applicano
+ai propri dati in memoria prima di servire una richiesta.
+"""
+
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from anagrafica import Studente
+from dati import CategoriaReddito, CondizioneSalute
+from voti import Voto, Pagella
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS studenti (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL,
+    cognome TEXT NOT NULL,
+    eta INTEGER NOT NULL,
+    classe TEXT NOT NULL,
+    reddito_familiare INTEGER,
+    categoria_reddito TEXT,
+    condizione_salute TEXT,
+    situazione_familiare TEXT,
+    note TEXT
+);
+CREATE TABLE IF NOT EXISTS voti (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_studente INTEGER NOT NULL,
+    materia TEXT NOT NULL,
+    voto REAL NOT NULL,
+    tipo TEXT NOT NULL,
+    data TEXT NOT NULL,
+    note TEXT
+);
+CREATE TABLE IF NOT EXISTS pagelle (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_studente INTEGER NOT NULL,
+    quadrimestre INTEGER NOT NULL,
+    voti_materie TEXT,
+    comportamento REAL,
+    assenze INTEGER,
+    note TEXT
+);
+CREATE TABLE IF NOT EXISTS modifiche (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entita TEXT NOT NULL,
+    operazione TEXT NOT NULL,
+    chiave INTEGER,
+    pid INTEGER,
+    istante REAL,
+    quantita INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS cache_condivisa (
+    chiave TEXT PRIMARY KEY,
+    versione INTEGER NOT NULL,
+    valore TEXT NOT NULL,
+    scadenza REAL
+);
+CREATE TABLE IF NOT EXISTS impostazioni (
+    chiave TEXT PRIMARY KEY,
+    valore TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_voti_studente ON voti(id_studente);
+"""
+
+
+def _riga_a_studente(riga: sqlite3.Row) -> Studente:
+    """Converte una riga della tabella studenti in Studente."""
+    return Studente(
+        id=riga["id"],
+        nome=riga["nome"],
+        cognome=riga["cognome"],
+        eta=riga["eta"],
+        classe=riga["classe"],
+        reddito_familiare=riga["reddito_familiare"],
+        categoria_reddito=CategoriaReddito[riga["categoria_reddito"]],
+        condizione_salute=CondizioneSalute[riga["condizione_salute"]],
+        situazione_familiare=riga["situazione_familiare"],
+        note=riga["note"] or ""
+    )
+
+
+def _riga_a_voto(riga: sqlite3.Row) -> Voto:
+    """Converte una riga della tabella voti in Voto."""
+    return Voto(
+        id_studente=riga["id_studente"],
+        materia=riga["materia"],
+        voto=riga["voto"],
+        tipo=riga["tipo"],
+        data=riga["data"],
+        note=riga["note"] or "",
+        id=riga["id"]
+    )
+
+
+def _riga_a_pagella(riga: sqlite3.Row) -> Pagella:
+    """Converte una riga della tabella pagelle in Pagella."""
+    return Pagella(
+        id_studente=riga["id_studente"],
+        quadrimestre=riga["quadrimestre"],
+        voti_materie=json.loads(riga["voti_materie"] or "{}"),
+        media_generale=0.0,
+        comportamento=riga["comportamento"],
+        assenze=riga["assenze"],
+        note=riga["note"] or ""
+    )
+
+
+class StatoCondiviso:
+    """Store SQLite condiviso tra worker con log delle modifiche e cache."""
+
+    def __init__(self, percorso: str = "managerschool_condiviso.db",
+                 timeout_lock: float = 30.0):
+        """Inizializza lo store.
+
+        Args:
+            percorso: File del database condiviso
+            timeout_lock: Attesa massima (secondi) sui lock di scrittura
+        """
+        self.percorso = percorso
+        self.timeout_lock = timeout_lock
+
+        self._locale = threading.local()
+        self._lock = threading.RLock()
+
+        # Dati in memoria del worker collegato
+        self.anagrafica = None
+        self.gestione_voti = None
+        self._versione = 0
+        self._proprie: set = set()
+
+        # Contatori
+        self._sincronizzazioni = 0
+        self._modifiche_applicate = 0
+        self._ricariche = 0
+        self._cache_hit = 0
+        self._cache_miss = 0
+
+        self._connessione().executescript(SCHEMA)
+        self._migra_schema()
+
+    def _migra_schema(self) -> None:
+        """Aggiunge le colonne introdotte dopo la creazione di store esistenti."""
+        conn = self._connessione()
+        colonne = {riga["name"] for riga in conn.execute("PRAGMA table_info(modifiche)")}
+        if "quantita" not in colonne:
+            conn.execute("ALTER TABLE modifiche ADD COLUMN quantita INTEGER NOT NULL DEFAULT 1")
+
+    # ============ CONNESSIONI ============
+
+    def _connessione(self) -> sqlite3.Connection:
+        """Connessione per thread e processo correnti."""
+        conn = getattr(self._locale, "conn", None)
+        # Dopo un fork (preload dell'app) la connessione del padre non è riutilizzabile
+        if conn is None or self._locale.pid != os.getpid():
+            conn = sqlite3.connect(self.percorso, timeout=self.timeout_lock,
+                                   isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._locale.conn = conn
+            self._locale.pid = os.getpid()
+            self._locale.profondita = 0
+            self._locale.in_sospeso = []
+        return conn
+
+    @contextmanager
+    def _transazione(self, scrittura: bool = True):
+        """Transazione (annidabile) sulla connessione del thread corrente.
+
+        Le scritture usano BEGIN IMMEDIATE per serializzarsi tra processi;
+        le letture vedono uno snapshot coerente grazie al WAL.
+        """
+        conn = self._connessione()
+        if self._locale.profondita > 0:
+            self._locale.profondita += 1
+            try:
+                yield conn
+            finally:
+                self._locale.profondita -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE" if scrittura else "BEGIN")
+        self._locale.profondita = 1
+        self._locale.in_sospeso = []
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            # Le voci del log diventano nostre solo a commit avvenuto
+            for id_modifica in self._locale.in_sospeso:
+                self._segna_propria(id_modifica)
+        finally:
+            self._locale.profondita = 0
+            self._locale.in_sospeso = []
+
+    @contextmanager
+    def blocco(self):
+        """Raggruppa più modifiche in un'unica transazione atomica.
+
+        Se il blocco fallisce lo store non cambia e i dati locali, già
+        modificati in parte, vengono ricaricati.
+        """
+        with self._lock:
+            try:
+                with self._transazione():
+                    yield
+            except BaseException:
+                if self.anagrafica is not None:
+                    self.ricarica()
+                raise
+
+    def chiudi(self) -> None:
+        """Chiude la connessione del thread corrente."""
+        conn = getattr(self._locale, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._locale.conn = None
+
+    # ============ VERSIONE E LOG ============
+
+    @staticmethod
+    def _versione_corrente(conn: sqlite3.Connection) -> int:
+        """Ultimo ID del log modifiche (monotono anche dopo la compattazione)."""
+        riga = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'modifiche'"
+        ).fetchone()
+        return riga[0] if riga else 0
+
+    def versione(self) -> int:
+        """Versione corrente dei dati condivisi."""
+        return self._versione_corrente(self._connessione())
+
+    def versione_sincronizzata(self) -> int:
+        """Allinea i dati locali e restituisce la versione che rispecchiano."""
+        with self._lock:
+            self.sincronizza()
+            return self._versione
+
+    def _registra_modifica(self, conn: sqlite3.Connection, entita: str,
+                           operazione: str, chiave: Optional[int] = None,
+                           quantita: int = 1) -> None:
+        """Aggiunge una voce al log della transazione in corso.
+
+        Con quantita > 1 la voce copre le righe con ID da chiave a chiave + quantita - 1.
+        """
+        cursore = conn.execute(
+            "INSERT INTO modifiche (entita, operazione, chiave, pid, istante, quantita) VALUES (?, ?, ?, ?, ?, ?)",
+            (entita, operazione, chiave, os.getpid(), time.time(), quantita)
+        )
+        self._locale.in_sospeso.append(cursore.lastrowid)
+
+    def _segna_propria(self, id_modifica: int) -> None:
+        """Segna una voce del log come già applicata ai dati locali."""
+        if id_modifica == self._versione + 1:
+            self._versione = id_modifica
+        else:
+            self._proprie.add(id_modifica)
+
+    def segreto_sessioni(self) -> str:
+        """Chiave di firma dei cookie di sessione, uguale per tutti i worker."""
+        with self._transazione() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO impostazioni (chiave, valore) VALUES ('segreto_sessioni', ?)",
+                (secrets.token_hex(32),)
+            )
+            riga = conn.execute(
+                "SELECT valore FROM impostazioni WHERE chiave = 'segreto_sessioni'"
+            ).fetchone()
+        return riga["valore"]
+
+    def vuoto(self) -> bool:
+        """True se lo store non contiene ancora studenti."""
+        riga = self._connessione().execute("SELECT COUNT(*) FROM studenti").fetchone()
+        return riga[0] == 0
+
+    # ============ COLLEGAMENTO AI MODULI ============
+
+    def collega(self, anagrafica, gestione_voti, importa_se_vuoto: bool = True) -> None:
+        """Collega i moduli in memoria del worker allo store.
+
+        Da questo momento ogni modifica passa dallo store e i dati locali
+        vengono allineati con sincronizza().
+
+        Args:
+            anagrafica: Istanza di Anagrafica
+            gestione_voti: Istanza di GestioneVoti
+            importa_se_vuoto: Se lo store è vuoto vi copia i dati già in memoria
+        """
+        with self._lock:
+            self.anagrafica = anagrafica
+            self.gestione_voti = gestione_voti
+
+            if importa_se_vuoto and anagrafica.studenti and self.vuoto():
+                self._importa_dati_locali()
+
+            self.ricarica()
+            anagrafica.persistenza = self
+            gestione_voti.persistenza = self
+
+    def _importa_dati_locali(self) -> None:
+        """Copia nello store i dati in memoria (store vuoto)."""
+        with self._transazione() as conn:
+            for studente in self.anagrafica.studenti:
+                self._inserisci_studente(conn, studente)
+            for voto in self.gestione_voti.voti:
+                voto.id = self._inserisci_voto(conn, voto)
+            for pagella in self.gestione_voti.pagelle:
+                self._inserisci_pagella(conn, pagella)
+            self._registra_modifica(conn, "stato", "ricaricato")
+
+    def ricarica(self) -> None:
+        """Ricarica tutti i dati dallo store (snapshot coerente)."""
+        with self._lock, self._transazione(scrittura=False) as conn:
+            versione = self._versione_corrente(conn)
+            studenti = [_riga_a_studente(r) for r in conn.execute("SELECT * FROM studenti ORDER BY id")]
+            voti = [_riga_a_voto(r) for r in conn.execute("SELECT * FROM voti ORDER BY id")]
+            pagelle = [_riga_a_pagella(r) for r in conn.execute("SELECT * FROM pagelle ORDER BY id")]
+
+            # Sostituzione sul posto: gli altri moduli mantengono i riferimenti alle liste
+            self.anagrafica.studenti[:] = studenti
+            self.anagrafica._prossimo_id = max((s.id for s in studenti), default=0) + 1
+            self.gestione_voti.voti[:] = voti
+            self.gestione_voti.pagelle[:] = pagelle
+
+            self._versione = versione
+            self._proprie.clear()
+            self._ricariche += 1
+
+        self.anagrafica.notifica_osservatori("ricaricati")
+        self.gestione_voti.notifica_osservatori("ricaricati")
+
+    def sincronizza(self) -> int:
+        """Applica ai dati locali le modifiche fatte dagli altri worker.
+
+        Returns:
+            Numero di modifiche applicate
+        """
+        if self.anagrafica is None:
+            return 0
+
+        with self._lock:
+            conn = self._connessione()
+            if self._versione_corrente(conn) == self._versione:
+                return 0
+
+            self._sincronizzazioni += 1
+            with self._transazione(scrittura=False):
+                versione = self._versione_corrente(conn)
+                minima = conn.execute("SELECT MIN(id) FROM modifiche").fetchone()[0]
+                if minima is not None and self._versione < minima - 1:
+                    # Log compattato oltre la nostra versione: serve una ricarica completa
+                    self.ricarica()
+                    return 0
+
+                voci = conn.execute(
+                    "SELECT * FROM modifiche WHERE id > ? AND id <= ? ORDER BY id",
+                    (self._versione, versione)
+                ).fetchall()
+
+                applicate = 0
+                for voce in voci:
+                    if voce["id"] in self._proprie:
+                        self._proprie.discard(voce["id"])
+                        continue
+                    if voce["entita"] == "stato" or (voce["entita"], voce["operazione"]) == ("voti", "azzerati"):
+                        self.ricarica()
+                        return applicate
+                    self._applica(conn, voce)
+                    applicate += 1
+
+                self._versione = versione
+                self._modifiche_applicate += applicate
+                return applicate
+
+    def _applica(self, conn: sqlite3.Connection, voce: sqlite3.Row) -> None:
+        """Applica una singola voce del log ai dati locali."""
+        entita, operazione, chiave = voce["entita"], voce["operazione"], voce["chiave"]
+
+        if entita == "studente":
+            precedente = next((s for s in self.anagrafica.studenti if s.id == chiave), None)
+            self.anagrafica.studenti[:] = [s for s in self.anagrafica.studenti if s.id != chiave]
+            studente = None
+            if operazione == "aggiunto":
+                riga = conn.execute("SELECT * FROM studenti WHERE id = ?", (chiave,)).fetchone()
+                if riga is not None:
+                    studente = _riga_a_studente(riga)
+                    self.anagrafica.studenti.append(studente)
+                    self.anagrafica._prossimo_id = max(self.anagrafica._prossimo_id, chiave + 1)
+            if studente is not None:
+                self.anagrafica.notifica_osservatori("modificato" if precedente else "aggiunto", studente)
+            elif precedente is not None:
+                self.anagrafica.notifica_osservatori("rimosso", precedente)
+
+        elif entita == "voto":
+            if operazione == "aggiunto":
+                riga = conn.execute("SELECT * FROM voti WHERE id = ?", (chiave,)).fetchone()
+                if riga is not None:
+                    voto = _riga_a_voto(riga)
+                    self.gestione_voti.voti.append(voto)
+                    self.gestione_voti.notifica_osservatori("aggiunto", voto)
+            else:
+                rimossi = [v for v in self.gestione_voti.voti if v.id == chiave]
+                self.gestione_voti.voti[:] = [v for v in self.gestione_voti.voti if v.id != chiave]
+                for voto in rimossi:
+                    self.gestione_voti.notifica_osservatori("rimosso", voto)
+
+        elif entita == "voti" and operazione == "aggiunti":
+            righe = conn.execute(
+                "SELECT * FROM voti WHERE id BETWEEN ? AND ? ORDER BY id",
+                (chiave, chiave + voce["quantita"] - 1)
+            ).fetchall()
+            voti = [_riga_a_voto(riga) for riga in righe]
+            self.gestione_voti.voti.extend(voti)
+            self.gestione_voti.notifica_osservatori("aggiunti", voti)
+
+        elif entita == "pagella":
+            riga = conn.execute("SELECT * FROM pagelle WHERE id = ?", (chiave,)).fetchone()
+            if riga is not None:
+                self.gestione_voti.pagelle.append(_riga_a_pagella(riga))
+
+    # ============ SCRITTURE (chiamate da Anagrafica e GestioneVoti) ============
+
+    @staticmethod
+    def _inserisci_studente(conn: sqlite3.Connection, studente: Studente) -> int:
+        """Inserisce o sostituisce uno studente; ID 0 = assegnato dallo store."""
+        valori = (
+            studente.nome, studente.cognome, studente.eta, studente.classe,
+            studente.reddito_familiare, studente.categoria_reddito.name,
+            studente.condizione_salute.name, studente.situazione_familiare, studente.note
+        )
+        colonne = ("nome, cognome, eta, classe, reddito_familiare, categoria_reddito, "
+                   "condizione_salute, situazione_familiare, note")
+        if studente.id:
+            conn.execute(f"INSERT OR REPLACE INTO studenti (id, {colonne}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (studente.id,) + valori)
+            return studente.id
+        cursore = conn.execute(f"INSERT INTO studenti ({colonne}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", valori)
+        return cursore.lastrowid
+
+    @staticmethod
+    def _inserisci_voto(conn: sqlite3.Connection, voto: Voto) -> int:
+        """Inserisce un voto e restituisce il suo ID."""
+        cursore = conn.execute(
+            "INSERT INTO voti (id_studente, materia, voto, tipo, data, note) VALUES (?, ?, ?, ?, ?, ?)",
+            (voto.id_studente, voto.materia, voto.voto, voto.tipo, voto.data, voto.note)
+        )
+        return cursore.lastrowid
+
+    @staticmethod
+    def _inserisci_pagella(conn: sqlite3.Connection, pagella: Pagella) -> int:
+        """Inserisce una pagella e restituisce il suo ID."""
+        cursore = conn.execute(
+            "INSERT INTO pagelle (id_studente, quadrimestre, voti_materie, comportamento, assenze, note) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (pagella.id_studente, pagella.quadrimestre, json.dumps(pagella.voti_materie),
+             pagella.comportamento, pagella.assenze, pagella.note)
+        )
+        return cursore.lastrowid
+
+    def studente_aggiunto(self, studente: Studente) -> int:
+        """Salva uno studente e restituisce l'ID definitivo."""
+        with self._lock, self._transazione() as conn:
+            id_studente = self._inserisci_studente(conn, studente)
+            self._registra_modifica(conn, "studente", "aggiunto", id_studente)
+        return id_studente
+
+    def studente_rimosso(self, id_studente: int) -> None:
+        """Rimuove uno studente dallo store."""
+        with self._lock, self._transazione() as conn:
+            conn.execute("DELETE FROM studenti WHERE id = ?", (id_studente,))
+            self._registra_modifica(conn, "studente", "rimosso", id_studente)
+
+    def voto_aggiunto(self, voto: Voto) -> None:
+        """Salva un voto assegnandogli l'ID."""
+        with self._lock, self._transazione() as conn:
+            voto.id = self._inserisci_voto(conn, voto)
+            self._registra_modifica(conn, "voto", "aggiunto", voto.id)
+
+    def voti_aggiunti(self, voti: List[Voto]) -> None:
+        """Salva un lotto di voti in una transazione con una sola voce di log.
+
+        Sotto BEGIN IMMEDIATE gli ID assegnati sono consecutivi, quindi la
+        voce (primo ID, quantità) basta agli altri worker per caricarli.
+        """
+        if not voti:
+            return
+        with self._lock, self._transazione() as conn:
+            for voto in voti:
+                voto.id = self._inserisci_voto(conn, voto)
+            self._registra_modifica(conn, "voti", "aggiunti", voti[0].id, quantita=len(voti))
+
+    def voto_rimosso(self, voto: Voto) -> None:
+        """Rimuove un voto dallo store.
+
+        Raises:
+            ValueError: Se il voto non ha un ID (mai salvato nello store)
+        """
+        if voto.id is None:
+            raise ValueError(f"Voto senza ID dello store: impossibile rimuoverlo ({voto})")
+        with self._lock, self._transazione() as conn:
+            conn.execute("DELETE FROM voti WHERE id = ?", (voto.id,))
+            self._registra_modifica(conn, "voto", "rimosso", voto.id)
+
+    def pagella_aggiunta(self, pagella: Pagella) -> None:
+        """Salva una pagella."""
+        with self._lock, self._transazione() as conn:
+            id_pagella = self._inserisci_pagella(conn, pagella)
+            self._registra_modifica(conn, "pagella", "aggiunta", id_pagella)
+
+    def voti_azzerati(self) -> None:
+        """Elimina tutti i voti e le pagelle."""
+        with self._lock, self._transazione() as conn:
+            conn.execute("DELETE FROM voti")
+            conn.execute("DELETE FROM pagelle")
+            self._registra_modifica(conn, "voti", "azzerati")
+
+    # ============ CACHE CONDIVISA ============
+
+    def cache_leggi(self, chiave: str) -> Optional[Any]:
+        """Legge un valore calcolato sulla versione corrente dei dati.
+
+        Returns:
+            Valore deserializzato, None se assente, scaduto o obsoleto
+        """
+        conn = self._connessione()
+        riga = conn.execute(
+            "SELECT versione, valore, scadenza FROM cache_condivisa WHERE chiave = ?", (chiave,)
+        ).fetchone()
+        if (riga is None or riga["versione"] != self._versione_corrente(conn)
+                or (riga["scadenza"] is not None and riga["scadenza"] < time.time())):
+            self._cache_miss += 1
+            return None
+        self._cache_hit += 1
+        return json.loads(riga["valore"])
+
+    def cache_scrivi(self, chiave: str, valore: Any, versione: int,
+                     ttl_secondi: Optional[float] = None) -> None:
+        """Salva un valore calcolato sui dati alla versione indicata."""
+        scadenza = time.time() + ttl_secondi if ttl_secondi else None
+        with self._transazione() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_condivisa (chiave, versione, valore, scadenza) VALUES (?, ?, ?, ?)",
+                (chiave, versione, json.dumps(valore, default=str), scadenza)
+            )
+
+    def calcola_con_cache(self, chiave: str, funzione: Callable[[], Any],
+                          ttl_secondi: Optional[float] = None) -> Any:
+        """Restituisce il valore in cache o lo calcola e lo condivide.
+
+        Args:
+            chiave: Chiave del calcolo
+            funzione: Calcolo da eseguire in caso di miss (risultato serializzabile JSON)
+            ttl_secondi: Durata massima della voce (None = fino alla prossima modifica)
+        """
+        valore = self.cache_leggi(chiave)
+        if valore is not None:
+            return valore
+        versione = self._versione
+        valore = funzione()
+        self.cache_scrivi(chiave, valore, versione, ttl_secondi)
+        return valore
+
+    # ============ MANUTENZIONE ============
+
+    def compatta(self, mantieni: int = 10000) -> int:
+        """Elimina le voci più vecchie del log modifiche e la cache obsoleta.
+
+        I worker rimasti indietro oltre le voci conservate ricaricano tutto.
+
+        Returns:
+            Numero di voci del log eliminate
+        """
+        with self._transazione() as conn:
+            versione = self._versione_corrente(conn)
+            eliminate = conn.execute("DELETE FROM modifiche WHERE id <= ?", (versione - mantieni,)).rowcount
+            conn.execute("DELETE FROM cache_condivisa WHERE versione < ?", (versione,))
+        return eliminate
+
+    def statistiche(self) -> Dict:
+        """Restituisce versioni, contatori di sincronizzazione e cache."""
+        conn = self._connessione()
+        richieste_cache = self._cache_hit + self._cache_miss
+        return {
+            "percorso": self.percorso,
+            "pid": os.getpid(),
+            "versione_condivisa": self._versione_corrente(conn),
+            "versione_locale": self._versione,
+            "voci_log": conn.execute("SELECT COUNT(*) FROM modifiche").fetchone()[0],
+            "sincronizzazioni": self._sincronizzazioni,
+            "modifiche_applicate": self._modifiche_applicate,
+            "ricariche": self._ricariche,
+            "cache_hit": self._cache_hit,
+            "cache_miss": self._cache_miss,
+            "cache_hit_rate": round(self._cache_hit / richieste_cache * 100, 2) if richieste_cache else 0.0
+        }
+
+
+if __name__ == "__main__":
+    import tempfile
+    from anagrafica import Anagrafica
+    from voti import GestioneVoti
+
+    print("🗄️  TEST STATO CONDIVISO")
+    print("=" * 60 + "\n")
+
+    percorso = os.path.join(tempfile.mkdtemp(), "condiviso.db")
+
+    # Due "worker" sullo stesso store
+    worker_a = StatoCondiviso(percorso)
+    anagrafica_a, voti_a = Anagrafica(), GestioneVoti()
+    worker_a.collega(anagrafica_a, voti_a)
+
+    worker_b = StatoCondiviso(percorso)
+    anagrafica_b, voti_b = Anagrafica(), GestioneVoti()
+    worker_b.collega(anagrafica_b, voti_b)
+
+    studente = anagrafica_a.crea_studente_casuale("3A")
+    voti_a.aggiungi_voto(studente.id, "Matematica", 7.5)
+
+    print(f"   Worker B prima della sincronizzazione: {len(anagrafica_b.studenti)} studenti")
+    worker_b.sincronizza()
+    print(f"   Worker B dopo la sincronizzazione: {len(anagrafica_b.studenti)} studenti, "
+          f"{len(voti_b.voti)} voti")
+    print(f"   Statistiche: {worker_b.statistiche()}")
@@ -0,0 +1,127 @@
+"""
+Test per l'API asincrona delle operazioni di I/O.
+"""
+
+import asyncio
+import os
+import threading
+
+import pytest
+
+from api_asincrona import ApiAsincrona, benchmark_concorrenza, chiama_asgi
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """API asincrona su un'ERP con qualche studente e voto."""
+    monkeypatch.chdir(tmp_path)
+    from interfaccia_erp import InterfacciaERP
+
+    erp = InterfacciaERP()
+    erp.anagrafica.genera_studenti(5, classe="3C")
+    for studente in erp.anagrafica.studenti:
+        erp.voti.aggiungi_voto(studente.id, "Matematica", 7.5)
+    api = ApiAsincrona(erp, cartella_pdf=str(tmp_path / "pdf"))
+    yield api
+    api.chiudi()
+
+
+def token(api, username="admin"):
+    """Intestazione Authorization per un utente."""
+    return {"Authorization": f"Bearer {api.erp._serializzatore_token().dumps(username)}"}
+
+
+class TestAutenticazione:
+    """Test per l'accesso alle route asincrone."""
+
+    @pytest.mark.api
+    def test_token_e_permessi(self, api):
+        """Senza credenziali 401, ruolo senza permesso 403, route pubblica libera."""
+        corpo = {"destinatario": "a@example.it", "oggetto": "x", "corpo": "y"}
+        assert asyncio.run(chiama_asgi(api, "POST", "/api/async/email", corpo))[0] == 401
+        assert asyncio.run(chiama_asgi(api, "POST", "/api/async/email", corpo,
+                                       {"Authorization": "Bearer falso"}))[0] == 401
+        assert asyncio.run(chiama_asgi(api, "POST", "/api/async/email", corpo, token(api, "studente")))[0] == 403
+        assert asyncio.run(chiama_asgi(api, "GET", "/api/async/salute"))[0] == 200
+
+    @pytest.mark.api
+    def test_cookie_di_sessione_flask(self, api):
+        """Il cookie del login Flask vale anche per l'API asincrona."""
+        client = api.erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        nome = api.erp.app.config["SESSION_COOKIE_NAME"]
+        cookie = client.get_cookie(nome).value
+
+        stato, _ = asyncio.run(chiama_asgi(api, "POST", "/api/async/database/backup",
+                                           intestazioni={"Cookie": f"{nome}={cookie}"}))
+        assert stato == 200
+
+    @pytest.mark.api
+    def test_route_e_metodi(self, api):
+        """Percorsi sconosciuti 404, metodo sbagliato 405, JSON invalido 400."""
+        assert asyncio.run(chiama_asgi(api, "GET", "/api/async/inesistente"))[0] == 404
+        assert asyncio.run(chiama_asgi(api, "GET", "/api/async/email", intestazioni=token(api)))[0] == 405
+        stato, dati = asyncio.run(chiama_asgi(api, "POST", "/api/async/email", {"oggetto": "x"}, token(api)))
+        assert stato == 400 and "destinatario" in dati["errore"]
+
+
+class TestOperazioniIO:
+    """Test per database, file e rete eseguiti fuori dall'event loop."""
+
+    @pytest.mark.database
+    def test_sync_e_backup_database(self, api):
+        """Sincronizzazione e backup girano nel thread del database, non nel loop."""
+        integrazione = api.erp.db_integration
+        originale = integrazione.sincronizza_dati_esistenti
+        thread = []
+
+        def sincronizza():
+            thread.append(threading.current_thread().name)
+            return originale()
+
+        integrazione.sincronizza_dati_esistenti = sincronizza
+        stato, _ = asyncio.run(chiama_asgi(api, "POST", "/api/async/database/sync", intestazioni=token(api)))
+        assert stato == 200
+        assert thread and thread[0].startswith("async-db")
+
+        stato, dati = asyncio.run(chiama_asgi(api, "POST", "/api/async/database/backup", intestazioni=token(api)))
+        assert stato == 200 and os.path.exists(dati["filepath"])
+
+    @pytest.mark.api
+    def test_pdf_pagella(self, api):
+        """Il PDF della pagella viene scritto nella cartella configurata."""
+        studente = api.erp.anagrafica.studenti[0]
+        stato, dati = asyncio.run(chiama_asgi(api, "POST", f"/api/async/pdf/pagella/{studente.id}",
+                                              intestazioni=token(api)))
+        assert stato == 200 and dati["byte"] > 0
+        with open(dati["filepath"], "rb") as f:
+            assert f.read(4) == b"%PDF"
+        assert asyncio.run(chiama_asgi(api, "POST", "/api/async/pdf/pagella/99999",
+                                       intestazioni=token(api)))[0] == 404
+
+    @pytest.mark.api
+    def test_richieste_sovrapposte(self, api):
+        """Con attesa di rete le richieste sono servite in contemporanea."""
+        api.latenza_rete_simulata = 0.2
+        corpo = {"destinatario": "a@example.it", "oggetto": "x", "corpo": "y"}
+
+        async def tutte():
+            return await asyncio.gather(*(
+                chiama_asgi(api, "POST", "/api/async/email", corpo, token(api)) for _ in range(20)
+            ))
+
+        risposte = asyncio.run(tutte())
+        assert all(stato == 200 for stato, _ in risposte)
+        assert api.massimo_in_corso == 20
+
+
+class TestBenchmarkConcorrenza:
+    """Test per la capacità per processo sotto I/O lento."""
+
+    @pytest.mark.slow
+    def test_capacita_superiore(self, tmp_path, monkeypatch):
+        """Con I/O lento l'API asincrona serve più richieste al secondo."""
+        monkeypatch.chdir(tmp_path)
+        risultato = benchmark_concorrenza(richieste=40, latenza=0.05)
+        assert risultato["async"]["concorrenza_massima"] == 40
+        assert risultato["async"]["richieste_al_secondo"] > 3 * risultato["sync"]["richieste_al_secondo"]
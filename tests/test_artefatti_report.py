@@ -0,0 +1,229 @@
+"""
+Test per la materializzazione versionata dei report.
+"""
+
+import random
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from artefatti_report import ArtefattiReport, MaterializzazioneFallita, confronta, in_json
+from interventi import IntensitàIntervento, RisultatoIntervento, TipoIntervento
+
+
+@pytest.fixture
+def archivio(tmp_path):
+    stato = {"versione": 0, "generazioni": 0, "dati": {"media": 6.5, "classi": ["1A", "2A"]}}
+
+    def genera():
+        stato["generazioni"] += 1
+        return {**stato["dati"], "data_generazione": datetime.now().isoformat()}
+
+    archivio = ArtefattiReport(str(tmp_path / "artefatti"), versione_dati=lambda: stato["versione"], conserva=3)
+    archivio.registra("riepilogo", genera, descrizione="Riepilogo")
+    return archivio, stato
+
+
+class TestMaterializzazione:
+    """Test per rigenerazione, deduplicazione e differenze."""
+
+    @pytest.mark.unit
+    def test_rigenera_solo_se_cambia(self, archivio):
+        archivio, stato = archivio
+        assert archivio.materializza()["riepilogo"]["esito"] == "nuova_versione"
+        assert archivio.materializza()["riepilogo"]["esito"] == "invariato"
+        assert stato["generazioni"] == 1
+
+        # Dati modificati ma stesso contenuto (la data di generazione è ignorata)
+        stato["versione"] += 1
+        esito = archivio.materializza()["riepilogo"]
+        assert esito["esito"] == "confermato" and esito["versione"] == 1
+        assert len(archivio.versioni("riepilogo")) == 1
+        assert archivio.materializza(forza=True)["riepilogo"]["esito"] == "confermato"
+        assert stato["generazioni"] == 3
+
+        stato["dati"] = {"media": 6.9, "classi": ["1A", "2A", "3A"]}
+        stato["versione"] += 1
+        esito = archivio.materializza()["riepilogo"]
+        assert esito["esito"] == "nuova_versione" and esito["versione"] == 2 and esito["differenze"] == 2
+
+        differenze = archivio.differenze("riepilogo")
+        assert (differenze["da"], differenze["a"]) == (1, 2)
+        assert {d["percorso"] for d in differenze["differenze"]} == {"media", "classi[2]"}
+
+    @pytest.mark.unit
+    def test_lettura_e_storico(self, archivio):
+        archivio, stato = archivio
+        primo = archivio.ottieni("riepilogo")
+        assert primo["report"]["media"] == 6.5 and primo["metadati"]["aggiornato"]
+        assert archivio.ottieni("riepilogo")["metadati"]["versione"] == 1 and stato["generazioni"] == 1
+
+        for media in (7.0, 7.5, 8.0, 8.5):
+            stato["dati"] = {**stato["dati"], "media": media}
+            stato["versione"] += 1
+            assert archivio.ottieni("riepilogo")["report"]["media"] == media
+
+        # Conservate solo le ultime 3 versioni
+        assert [v["versione"] for v in archivio.versioni("riepilogo")] == [5, 4, 3]
+        assert archivio.ottieni("riepilogo", versione=3)["report"]["media"] == 7.5
+        assert not archivio.ottieni("riepilogo", versione=3)["metadati"]["aggiornato"]
+        with pytest.raises(KeyError):
+            archivio.ottieni("riepilogo", versione=1)
+        with pytest.raises(KeyError):
+            archivio.ottieni("sconosciuto")
+
+        # Un nuovo processo legge gli artefatti dal disco
+        riaperto = ArtefattiReport(str(archivio.directory), versione_dati=lambda: stato["versione"])
+        riaperto.registra("riepilogo", lambda: pytest.fail("non deve rigenerare"))
+        assert riaperto.ottieni("riepilogo")["report"]["media"] == 8.5
+
+    @pytest.mark.unit
+    def test_errore_mantiene_ultima_versione(self, archivio):
+        archivio, stato = archivio
+        archivio.materializza()
+        archivio.registra("riepilogo", lambda: 1 / 0)
+        stato["versione"] += 1
+        assert archivio.materializza()["riepilogo"]["esito"] == "errore"
+        letto = archivio.ottieni("riepilogo")
+        assert letto["report"]["media"] == 6.5 and not letto["metadati"]["aggiornato"]
+
+    @pytest.mark.unit
+    def test_errore_senza_versioni_riporta_la_causa(self, tmp_path):
+        guasto = {"attivo": True}
+
+        def genera():
+            if guasto["attivo"]:
+                raise ValueError("dati incoerenti")
+            return {"valore": 1}
+
+        archivio = ArtefattiReport(str(tmp_path / "artefatti"), versione_dati=lambda: 1)
+        archivio.registra("riepilogo", genera)
+        with pytest.raises(MaterializzazioneFallita, match="dati incoerenti"):
+            archivio.ottieni("riepilogo")
+        assert archivio.stato()["report"]["riepilogo"]["errore"] == "dati incoerenti"
+
+        guasto["attivo"] = False
+        assert archivio.ottieni("riepilogo")["report"] == {"valore": 1}
+        assert archivio.stato()["report"]["riepilogo"]["errore"] is None
+
+    @pytest.mark.unit
+    def test_richieste_concorrenti_un_solo_calcolo(self, tmp_path):
+        generazioni = []
+
+        def lento():
+            generazioni.append(1)
+            time.sleep(0.05)
+            return {"valore": 1}
+
+        archivio = ArtefattiReport(str(tmp_path), versione_dati=lambda: "v1")
+        archivio.registra("lento", lento)
+        risultati = []
+        thread = [threading.Thread(target=lambda: risultati.append(archivio.ottieni("lento"))) for _ in range(5)]
+        for t in thread:
+            t.start()
+        for t in thread:
+            t.join()
+        assert len(generazioni) == 1 and len(risultati) == 5
+
+    @pytest.mark.unit
+    def test_pdf_e_serializzazione(self, tmp_path):
+        def pdf(report, percorso):
+            with open(percorso, "wb") as f:
+                f.write(b"%PDF-1.4 " + str(report["valore"]).encode())
+
+        def pdf_mancante(report, percorso):
+            raise ImportError("reportlab non installato")
+
+        archivio = ArtefattiReport(str(tmp_path))
+        archivio.registra("con_pdf", lambda: {"valore": 3}, esporta_pdf=pdf)
+        archivio.registra("senza_pdf", lambda: {"valore": 4}, esporta_pdf=pdf_mancante)
+        archivio.materializza()
+        with open(archivio.percorso_pdf("con_pdf"), "rb") as f:
+            assert f.read() == b"%PDF-1.4 3"
+        assert archivio.percorso_pdf("senza_pdf") is None
+        assert archivio.stato()["report"]["con_pdf"]["pdf"]
+
+        risultato = RisultatoIntervento(TipoIntervento.AUMENTO_REDDITO, IntensitàIntervento.BASSA,
+                                        60, 50, 10, 5, 5.5, 0.5, 300, 40, "6")
+        convertito = in_json({"r": risultato, "classi": {"1A"}})
+        assert convertito["r"]["tipo"] == TipoIntervento.AUMENTO_REDDITO.value and convertito["classi"] == ["1A"]
+        assert confronta({"a": [1, 2]}, {"a": [1]}) == ([{"percorso": "a[1]", "prima": 2, "dopo": None}], 1)
+
+
+class TestArtefattiERP:
+    """Test per i report serviti dagli artefatti."""
+
+    @pytest.mark.api
+    def test_endpoint(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        for studente in erp.anagrafica.genera_studenti(8, classe="3D"):
+            erp.voti.aggiungi_voto(studente.id, "Matematica", 6.0)
+
+        prima = client.get('/api/report/annuale')
+        assert prima.status_code == 200 and prima.headers['X-Report-Versione'] == "1"
+        assert client.get('/api/report/annuale').get_json() == prima.get_json()
+        assert erp.artefatti_report.contatori["generazioni"] == 1
+
+        erp.voti.aggiungi_voto(erp.anagrafica.studenti[0].id, "Matematica", 10.0)
+        assert client.get('/api/report/annuale').headers['X-Report-Versione'] == "2"
+        differenze = client.get('/api/report/artefatti/report_annuale/differenze').get_json()
+        assert differenze["numero_differenze"] > 0
+        assert len(client.get('/api/report/artefatti/report_annuale/versioni').get_json()) == 2
+
+        assert client.get('/api/interventi/prioritari').status_code == 200
+        esiti = client.post('/api/report/artefatti/materializza', json={}).get_json()
+        assert set(esiti) == set(erp.artefatti_report.specifiche)
+        ignoto = client.get('/api/report/artefatti/ignoto')
+        assert ignoto.status_code == 404 and ignoto.get_json()["errore"] == "Report 'ignoto' non registrato"
+
+        pdf = client.get('/api/report/artefatti/report_annuale/pdf')
+        if pdf.status_code == 200:
+            assert pdf.mimetype == 'application/pdf'
+        assert client.get('/api/report/artefatti/interventi_prioritari/pdf').status_code == 404
+
+        # Generazione fallita senza versioni precedenti: 500 con la causa
+        erp.artefatti_report.registra("guasto", lambda: 1 / 0)
+        guasto = client.get('/api/report/artefatti/guasto')
+        assert guasto.status_code == 500 and "division by zero" in guasto.get_json()["errore"]
+
+    @pytest.mark.api
+    def test_worker_condividono_gli_artefatti(self, tmp_path, monkeypatch):
+        """Due worker sulla stessa directory riusano i report materializzati dall'altro."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+        from wsgi import crea_app
+
+        # Senza store condiviso: stessa versione per lo stesso contenuto
+        worker = []
+        for _ in range(2):
+            erp = InterfacciaERP()
+            random.seed(11)
+            for studente in erp.anagrafica.genera_studenti(6, classe="4E"):
+                erp.voti.aggiungi_voto(studente.id, "Storia", 7.0, data="2025-11-03")
+            worker.append(erp)
+        primo, secondo = worker
+        assert primo.artefatti_report.materializza(["report_annuale"])["report_annuale"]["versione"] == 1
+        client = secondo.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        assert client.get('/api/report/annuale').headers['X-Report-Versione'] == "1"
+        assert secondo.artefatti_report.contatori["generazioni"] == 0
+
+        # Con lo store condiviso la versione è quella dello store
+        percorso = str(tmp_path / "condiviso.db")
+        erp_a = crea_app(percorso, dati_demo=False, avvia_scheduler=False)
+        erp_b = crea_app(percorso, dati_demo=False, avvia_scheduler=False)
+        for studente in erp_a.anagrafica.genera_studenti(3, classe="1F"):
+            erp_a.voti.aggiungi_voto(studente.id, "Storia", 6.0)
+        assert erp_a.artefatti_report.materializza(["report_annuale"])["report_annuale"]["esito"] == "nuova_versione"
+        client_b = erp_b.app.test_client()
+        client_b.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        risposta = client_b.get('/api/report/annuale')
+        assert risposta.status_code == 200 and risposta.headers['X-Report-Versione'] == "2"
+        assert erp_b.artefatti_report.contatori["generazioni"] == 0
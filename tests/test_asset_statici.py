@@ -0,0 +1,120 @@
+"""
+Test per i file statici con impronta del contenuto.
+"""
+
+import gzip
+
+import pytest
+from flask import Flask, render_template_string
+
+from asset_statici import ManifestoAsset, richieste_ripetute
+
+
+@pytest.fixture
+def app_asset(tmp_path):
+    """App Flask con una cartella static temporanea."""
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "app.js").write_text("console.log('ManagerSchool');\n" * 100)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" + bytes(range(256)))
+
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path="/static")
+    manifesto = ManifestoAsset(app, ricarica=True)
+
+    @app.route('/pagina')
+    def pagina():
+        return render_template_string(
+            '<script src="{{ url_for(\'static\', filename=\'js/app.js\') }}"></script>'
+            '<img src="{{ url_for(\'static\', filename=\'logo.png\') }}">'
+        )
+
+    return app, manifesto, tmp_path
+
+
+class TestManifesto:
+    """Test per il calcolo delle impronte e la riscrittura degli URL."""
+
+    @pytest.mark.unit
+    def test_url_for_con_impronta(self, app_asset):
+        """url_for('static') restituisce il nome con l'hash del contenuto."""
+        app, manifesto, _ = app_asset
+        html = app.test_client().get('/pagina').get_data(as_text=True)
+        nome = manifesto.manifesto()["js/app.js"]
+
+        assert nome.startswith("js/app.") and nome.endswith(".js") and nome != "js/app.js"
+        assert f'/static/{nome}' in html
+
+    @pytest.mark.unit
+    def test_impronta_cambia_col_contenuto(self, app_asset):
+        """Con ricarica attiva un file modificato riceve una nuova impronta."""
+        app, manifesto, cartella = app_asset
+        prima = manifesto.url("js/app.js")
+        (cartella / "js" / "app.js").write_text("console.log('v2');\n")
+        dopo = manifesto.url("js/app.js")
+
+        assert dopo != prima
+        client = app.test_client()
+        assert client.get(f'/static/{dopo}').data == b"console.log('v2');\n"
+        # Un'impronta non più valida serve il contenuto corrente senza cache immutabile
+        vecchia = client.get(f'/static/{prima}')
+        assert vecchia.status_code == 200
+        assert vecchia.headers['Cache-Control'] == 'no-cache'
+
+
+class TestServing:
+    """Test per cache immutabile, revalidazione e varianti compresse."""
+
+    @pytest.mark.unit
+    def test_cache_immutabile_e_304(self, app_asset):
+        """I nomi con impronta hanno cache di un anno ed ETag."""
+        app, manifesto, _ = app_asset
+        client = app.test_client()
+        risposta = client.get(f'/static/{manifesto.url("logo.png")}')
+
+        assert risposta.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+        assert risposta.mimetype == 'image/png'
+        assert 'Content-Encoding' not in risposta.headers
+
+        etag = risposta.headers['ETag']
+        ripetuta = client.get(f'/static/{manifesto.url("logo.png")}', headers={'If-None-Match': etag})
+        assert ripetuta.status_code == 304
+        assert manifesto.statistiche()["non_modificate"] == 1
+
+    @pytest.mark.unit
+    def test_variante_gzip_precompressa(self, app_asset):
+        """La variante gzip è calcolata una volta e riusata."""
+        app, manifesto, _ = app_asset
+        client = app.test_client()
+        url = f'/static/{manifesto.url("js/app.js")}'
+        prima = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        seconda = client.get(url, headers={'Accept-Encoding': 'gzip'})
+
+        assert prima.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(prima.data).startswith(b"console.log")
+        assert prima.data == seconda.data
+        assert manifesto.statistiche()["byte_risparmiati"] > 0
+
+    @pytest.mark.unit
+    def test_nome_originale_con_revalidazione(self, app_asset):
+        """Il nome senza impronta resta servito, ma senza cache immutabile."""
+        app, _, _ = app_asset
+        risposta = app.test_client().get('/static/js/app.js')
+        assert risposta.status_code == 200
+        assert risposta.headers['Cache-Control'] == 'no-cache'
+
+
+class TestAssetERP:
+    """Test per gli asset delle pagine dell'ERP."""
+
+    @pytest.mark.api
+    def test_visita_ripetuta_senza_richieste_asset(self, tmp_path, monkeypatch):
+        """Alla seconda visita della dashboard resta da scaricare solo l'HTML."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+        prima, ripetute = richieste_ripetute(erp.app, '/dashboard', client)
+        assert prima > 1
+        assert ripetute == 1
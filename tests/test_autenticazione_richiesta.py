@@ -0,0 +1,182 @@
+"""
+Test per l'autenticazione per singola richiesta.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import pytest
+
+from accesso import GestoreAccessi, Ruolo
+from interfaccia_erp import InterfacciaERP
+
+
+UTENTI_DEMO = {
+    "admin": ("admin123", "Amministratore"),
+    "dirigente": ("dirigente123", "Dirigente"),
+    "insegnante": ("insegnante123", "Insegnante"),
+    "studente": ("studente123", "Studente"),
+}
+
+
+@pytest.fixture
+def erp(tmp_path, monkeypatch):
+    """Interfaccia ERP con file di lavoro in una directory temporanea."""
+    monkeypatch.chdir(tmp_path)
+    return InterfacciaERP()
+
+
+def _client_autenticato(erp, username):
+    """Crea un client con login effettuato."""
+    client = erp.app.test_client()
+    client.post('/login', data={'username': username, 'password': UTENTI_DEMO[username][0]})
+    return client
+
+
+class TestPrincipale:
+    """Test per la risoluzione del principale."""
+
+    @pytest.mark.unit
+    def test_permessi_congelati_per_ruolo(self):
+        """Il principale porta un insieme immutabile di permessi."""
+        gestore = GestoreAccessi()
+        gestore.registra_utente("prof", "pwd", Ruolo.INSEGNANTE, "Prof")
+
+        principale = gestore.risolvi_principale("prof")
+
+        assert principale.ha_permesso("gestione_voti")
+        assert not principale.ha_permesso("modifica_configurazione")
+        assert isinstance(principale.permessi, frozenset)
+        assert gestore.risolvi_principale("prof") is principale
+        with pytest.raises(AttributeError):
+            principale.ruolo = Ruolo.AMMINISTRATORE
+
+    @pytest.mark.unit
+    def test_verifica_credenziali_non_tocca_sessione(self):
+        """La verifica per richiesta non modifica lo stato condiviso."""
+        gestore = GestoreAccessi()
+        gestore.registra_utente("prof", "pwd", Ruolo.INSEGNANTE, "Prof")
+
+        assert gestore.verifica_credenziali("prof", "pwd").username == "prof"
+        assert gestore.verifica_credenziali("prof", "errata") is None
+        assert gestore.get_utente_corrente() is None
+
+    @pytest.mark.unit
+    def test_modifica_utente_invalida_principale(self):
+        """Cambi di ruolo o disattivazione valgono dalla richiesta successiva."""
+        gestore = GestoreAccessi()
+        gestore.registra_utente("prof", "pwd", Ruolo.INSEGNANTE, "Prof")
+        gestore.risolvi_principale("prof")
+
+        gestore.modifica_utente("prof", ruolo=Ruolo.DIRIGENTE)
+        assert gestore.risolvi_principale("prof").ha_permesso("gestione_studenti")
+
+        gestore.modifica_utente("prof", attivo=False)
+        assert gestore.risolvi_principale("prof") is None
+
+
+class TestAutenticazioneWeb:
+    """Test per l'autenticazione nelle API."""
+
+    @pytest.mark.api
+    def test_utente_corrente(self, erp):
+        """Ogni client vede la propria identità."""
+        risposta = _client_autenticato(erp, "insegnante").get('/api/utente/corrente')
+
+        assert risposta.status_code == 200
+        assert risposta.get_json()["ruolo"] == "Insegnante"
+
+    @pytest.mark.api
+    def test_token_bearer(self, erp):
+        """Un token rilasciato da /api/token autentica senza cookie."""
+        client = erp.app.test_client()
+        token = client.post('/api/token', json={'username': 'dirigente', 'password': 'dirigente123'}).get_json()["token"]
+
+        risposta = client.get('/api/utente/corrente', headers={'Authorization': f'Bearer {token}'})
+        assert risposta.get_json()["username"] == "dirigente"
+
+        risposta = client.get('/api/utente/corrente', headers={'Authorization': 'Bearer contraffatto'})
+        assert risposta.status_code == 401
+        assert client.post('/api/token', json={'username': 'dirigente', 'password': 'x'}).status_code == 401
+
+    @pytest.mark.api
+    def test_token_docente_non_agisce_come_admin(self, erp):
+        """Un token docente non legge né invia comunicazioni come amministratore."""
+        riservata = erp.comunicazioni.crea_comunicazione(
+            mittente_id=1, mittente_tipo="dirigente",
+            destinatario_id=1, destinatario_tipo="segreteria",
+            oggetto="Riservata", messaggio="Solo per l'amministrazione"
+        )
+        per_docente = erp.comunicazioni.crea_comunicazione(
+            mittente_id=1, mittente_tipo="dirigente",
+            destinatario_id=1, destinatario_tipo="insegnante",
+            oggetto="Orario", messaggio="Nuovo orario del consiglio"
+        )
+        client = erp.app.test_client()
+        token = client.post('/api/token', json={'username': 'insegnante', 'password': 'insegnante123'}).get_json()["token"]
+        intestazioni = {'Authorization': f'Bearer {token}'}
+
+        elenco = client.get('/api/comunicazioni', headers=intestazioni).get_json()
+        assert [c["oggetto"] for c in elenco] == ["Orario"]
+
+        # Stesso ID ma tipo diverso: la comunicazione della segreteria resta non letta
+        assert not client.post(f'/api/comunicazioni/{riservata.id}/leggi', headers=intestazioni).get_json()["successo"]
+        assert client.post(f'/api/comunicazioni/{per_docente.id}/leggi', headers=intestazioni).get_json()["successo"]
+        assert not riservata.is_letta
+
+        risposta = client.post('/api/comunicazioni/invia', headers=intestazioni, json={
+            'destinatario_id': 1, 'destinatario_tipo': 'genitore',
+            'oggetto': 'Compiti', 'messaggio': 'Esercizi per domani'
+        })
+        inviata = erp.comunicazioni.comunicazioni[-1]
+        assert risposta.get_json()["comunicazione_id"] == inviata.id
+        assert (inviata.mittente_id, inviata.mittente_tipo) == (1, "insegnante")
+
+    @pytest.mark.api
+    def test_comunicazioni_senza_utente_associato(self, erp):
+        """Un utente senza ID associato riceve 403 invece di agire con ID nullo."""
+        erp.accesso.registra_utente("supplente", "supplente123", Ruolo.INSEGNANTE, "Supplente")
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'supplente', 'password': 'supplente123'})
+
+        assert client.get('/api/comunicazioni').status_code == 403
+        assert client.post('/api/comunicazioni/invia', json={
+            'destinatario_id': 1, 'destinatario_tipo': 'genitore', 'oggetto': 'x', 'messaggio': 'y'
+        }).status_code == 403
+        assert client.post('/api/comunicazioni/1/leggi').status_code == 403
+
+    @pytest.mark.api
+    def test_utente_disattivato_perde_accesso(self, erp):
+        """Una sessione di un utente disattivato non è più valida."""
+        client = _client_autenticato(erp, "insegnante")
+        erp.accesso.modifica_utente("insegnante", attivo=False)
+
+        assert client.get('/api/utente/corrente').status_code == 302
+
+    @pytest.mark.slow
+    def test_utenti_concorrenti_isolati(self, erp):
+        """Molti utenti in parallelo ricevono identità e autorizzazioni corrette."""
+        client_per_utente = {u: [_client_autenticato(erp, u) for _ in range(4)] for u in UTENTI_DEMO}
+        lavori = [(u, c) for u, clients in client_per_utente.items() for c in clients]
+        barriera = threading.Barrier(len(lavori))
+
+        def esegui(lavoro):
+            username, client = lavoro
+            barriera.wait()
+            errori = []
+            for _ in range(25):
+                identita = client.get('/api/utente/corrente').get_json()
+                if identita["username"] != username or identita["ruolo"] != UTENTI_DEMO[username][1]:
+                    errori.append(f"identità errata: {identita['username']} invece di {username}")
+                # Solo l'amministratore ha modifica_configurazione
+                stato = client.get('/api/coalescenza/statistiche').status_code
+                atteso = 200 if username == "admin" else 403
+                if stato != atteso:
+                    errori.append(f"{username}: stato {stato} invece di {atteso}")
+            return errori
+
+        with ThreadPoolExecutor(max_workers=len(lavori)) as pool:
+            errori = [e for risultato in pool.map(esegui, lavori) for e in risultato]
+
+        assert errori == []
+        assert erp.accesso.get_utente_corrente() is None
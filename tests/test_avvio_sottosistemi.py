@@ -0,0 +1,145 @@
+"""
+Test per l'avvio misurato e i sottosistemi pigri dell'interfaccia ERP.
+"""
+
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from avvio_sottosistemi import CronologiaAvvio, Pigro, stato_pigri
+
+
+RADICE = Path(__file__).resolve().parent.parent
+
+# Limite generoso: l'avvio misurato qui è circa 0,4 s (import compresi)
+LIMITE_AVVIO_SECONDI = 3.0
+
+
+class Contatore:
+    """Classe minima con un attributo pigro che conta le costruzioni."""
+
+    costruzioni = 0
+
+    def __init__(self):
+        self._lock_pigri = threading.RLock()
+        self.cronologia_avvio = CronologiaAvvio()
+
+    @Pigro
+    def risorsa(self):
+        """Risorsa lenta."""
+        Contatore.costruzioni += 1
+        time.sleep(0.02)
+        return object()
+
+
+class TestPigro:
+    """Test per il descrittore Pigro e la cronologia."""
+
+    @pytest.mark.unit
+    def test_costruito_una_volta_tra_thread(self):
+        """Accessi concorrenti costruiscono una sola istanza, registrata in cronologia."""
+        Contatore.costruzioni = 0
+        istanza = Contatore()
+        assert stato_pigri(istanza) == {"risorsa": False}
+
+        valori = []
+        thread = [threading.Thread(target=lambda: valori.append(istanza.risorsa)) for _ in range(8)]
+        for t in thread:
+            t.start()
+        for t in thread:
+            t.join()
+
+        assert Contatore.costruzioni == 1
+        assert len({id(v) for v in valori}) == 1
+        riepilogo = istanza.cronologia_avvio.riepilogo()
+        assert [f["nome"] for f in riepilogo["pigri"]] == ["risorsa"]
+        assert riepilogo["pigri"][0]["durata_ms"] >= 15
+
+    @pytest.mark.unit
+    def test_assegnabile(self):
+        """L'attributo si può sostituire senza costruire il valore pigro."""
+        Contatore.costruzioni = 0
+        istanza = Contatore()
+        istanza.risorsa = "sostituita"
+        assert istanza.risorsa == "sostituita"
+        assert Contatore.costruzioni == 0
+
+    @pytest.mark.unit
+    def test_fase_con_errore(self):
+        """Una fase fallita viene registrata con l'errore."""
+        cronologia = CronologiaAvvio()
+        with pytest.raises(ValueError):
+            with cronologia.fase("configurazione"):
+                raise ValueError("mancante")
+        assert cronologia.riepilogo()["fasi"][0]["errore"] == "ValueError: mancante"
+        assert not cronologia.pronto
+
+
+class TestAvvioERP:
+    """Test per l'avvio dell'interfaccia ERP."""
+
+    @pytest.mark.api
+    def test_avvio_non_tocca_il_disco(self, tmp_path, monkeypatch):
+        """Costruire l'ERP non crea database, backup o stato dello scheduler."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+
+        assert list(tmp_path.iterdir()) == []
+        assert not any(stato_pigri(erp).values())
+        assert erp.cronologia_avvio.pronto
+
+        erp.database.statistiche_database()
+        assert (tmp_path / "managerschool.db").exists()
+        assert stato_pigri(erp)["database"]
+
+    @pytest.mark.api
+    def test_endpoint_pronto_e_avvio(self, tmp_path, monkeypatch):
+        """Readiness pubblica, cronologia solo per gli amministratori."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        client = erp.app.test_client()
+
+        assert client.get('/api/health').status_code == 200
+        pronto = client.get('/api/pronto')
+        assert pronto.status_code == 200
+        assert pronto.get_json()["controlli"] == {"avvio": True}
+
+        client.post('/login', data={'username': 'insegnante', 'password': 'insegnante123'})
+        assert client.get('/api/avvio').status_code == 403
+
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        assert client.get('/api/calendario/statistiche').status_code == 200
+        avvio = client.get('/api/avvio').get_json()
+        assert "routes" in [f["nome"] for f in avvio["fasi"]]
+        assert [f["nome"] for f in avvio["pigri"]] == ["calendario"]
+        assert avvio["sottosistemi_pigri"]["calendario"] is True
+        assert avvio["sottosistemi_pigri"]["database"] is False
+
+        erp.cronologia_avvio.pronto_ms = None
+        assert client.get('/api/pronto').status_code == 503
+
+    @pytest.mark.slow
+    def test_tempo_avvio_a_freddo(self, tmp_path):
+        """Import e costruzione in un processo nuovo restano sotto il limite."""
+        codice = (
+            "import time; inizio = time.perf_counter()\n"
+            "from interfaccia_erp import InterfacciaERP\n"
+            "erp = InterfacciaERP()\n"
+            "print(time.perf_counter() - inizio)\n"
+        )
+        risultato = subprocess.run(
+            [sys.executable, "-c", codice], cwd=tmp_path, capture_output=True, text=True,
+            env={"PYTHONPATH": str(RADICE), "PATH": ""}, timeout=60
+        )
+        assert risultato.returncode == 0, risultato.stderr
+        secondi = float(risultato.stdout.strip().splitlines()[-1])
+        assert secondi < LIMITE_AVVIO_SECONDI
+        assert list(tmp_path.iterdir()) == []
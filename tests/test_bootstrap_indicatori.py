@@ -0,0 +1,139 @@
+"""
+Test per gli intervalli bootstrap e i test di permutazione degli indicatori.
+"""
+
+import random
+
+import pytest
+
+from analisi import AnalisiDidattica
+from anagrafica import Anagrafica
+from bootstrap_indicatori import BootstrapIndicatori
+from indicatori import CalcolatoreIndicatori
+from insegnanti import GestioneInsegnanti
+from statistiche_streaming import StatisticheVoti
+from voti import GestioneVoti, Voto
+
+
+def genera_scuola(numero, legame=1.0, seed=3, classe=None):
+    """Scuola con medie che calano con la fragilità (legame 0 = nessuna relazione)."""
+    casuale = random.Random(seed)
+    anagrafica, voti = Anagrafica(), GestioneVoti()
+    anagrafica.genera_studenti(numero, classe=classe)
+    voti.voti = [
+        Voto(s.id, "Matematica", round(min(10, max(3, casuale.gauss(8, 1) - legame * s.fragilità_sociale / 25)), 1),
+             "scritto", "2025-11-03")
+        for s in anagrafica.studenti[:-3] for _ in range(2)
+    ]
+    return anagrafica, voti
+
+
+@pytest.fixture(scope="module")
+def scuola():
+    return genera_scuola(400)
+
+
+class TestStimePuntuali:
+    """Sul campione originale le formule vettoriali coincidono con gli indicatori."""
+
+    @pytest.mark.unit
+    def test_valori_osservati(self, scuola):
+        anagrafica, voti = scuola
+        insegnanti = GestioneInsegnanti()
+        analisi = AnalisiDidattica(anagrafica, voti)
+        calcolatore = CalcolatoreIndicatori(anagrafica, voti, insegnanti, analisi)
+        stime = BootstrapIndicatori(anagrafica, voti, insegnanti, ricampionamenti=50, permutazioni=0).analizza()
+        indicatori = stime["indicatori"]
+
+        assert indicatori["indice_equita_educativa"]["valore"] == pytest.approx(
+            calcolatore.indice_equita_educativa().valore, abs=0.01)
+        assert indicatori["indice_qualita_scolastica"]["valore"] == pytest.approx(
+            calcolatore.indice_qualita_scolastica().valore, abs=0.01)
+        assert indicatori["gap_pedagogico"]["valore"] == pytest.approx(
+            analisi.impatto_didattico_fragili()["gap_pedagogico"], abs=0.005)
+        assert indicatori["correlazione_reddito_rendimento"]["valore"] == pytest.approx(
+            StatisticheVoti(voti, anagrafica).correlazione_reddito_rendimento(), abs=1e-4)
+        assert indicatori["media_generale"]["p_value"] is None
+
+
+class TestRicampionamento:
+    """Test per intervalli, p-value, riproducibilità e budget."""
+
+    @pytest.mark.unit
+    def test_intervalli_e_p_value(self, scuola):
+        anagrafica, voti = scuola
+        stime = BootstrapIndicatori(anagrafica, voti, ricampionamenti=400, permutazioni=400, seed=1,
+                                    elementi_per_blocco=20_000).analizza()
+        assert stime["ricampionamenti"] == 400 and stime["permutazioni"] == 400
+        for nome, stima in stime["indicatori"].items():
+            assert stima["intervallo"][0] <= stima["intervallo"][1], nome
+        gap = stime["indicatori"]["gap_pedagogico"]
+        assert gap["intervallo"][0] > 0 and gap["p_value"] == pytest.approx(1 / 401, abs=1e-4)
+
+        # Medie indipendenti dalla fragilità: nessuna evidenza di gap
+        indipendente = genera_scuola(400, legame=0.0, seed=8)
+        p_value = BootstrapIndicatori(*indipendente, ricampionamenti=0, permutazioni=400, seed=1).analizza()
+        assert p_value["indicatori"]["gap_pedagogico"]["p_value"] > 0.05
+
+    @pytest.mark.unit
+    def test_classi_piccole_intervalli_larghi(self, scuola):
+        anagrafica, voti = scuola
+        bootstrap = BootstrapIndicatori(anagrafica, voti, ricampionamenti=300, permutazioni=0, seed=2)
+        classe = anagrafica.studenti[0].classe
+        scuola_intera = bootstrap.analizza()["indicatori"]["media_generale"]
+        piccola = bootstrap.analizza(classe)
+        assert piccola["numero_studenti"] < 400
+        larghezza = lambda s: s["intervallo"][1] - s["intervallo"][0]
+        assert larghezza(piccola["indicatori"]["media_generale"]) > larghezza(scuola_intera)
+        with pytest.raises(ValueError):
+            bootstrap.analizza("ZZ")
+
+    @pytest.mark.unit
+    def test_riproducibile_anche_con_thread(self, scuola):
+        parametri = dict(ricampionamenti=200, permutazioni=200, seed=5, elementi_per_blocco=10_000)
+        seriale = BootstrapIndicatori(*scuola, **parametri).analizza()
+        parallelo = BootstrapIndicatori(*scuola, processi=3, **parametri).analizza()
+        assert seriale["indicatori"] == parallelo["indicatori"]
+        altro_seme = BootstrapIndicatori(*scuola, **{**parametri, "seed": 6}).analizza()
+        assert altro_seme["indicatori"] != seriale["indicatori"]
+
+    @pytest.mark.unit
+    def test_budget_di_tempo(self, scuola):
+        stime = BootstrapIndicatori(*scuola, budget_secondi=0.0).analizza()
+        assert stime["budget_esaurito"] and stime["ricampionamenti"] == 0
+        gap = stime["indicatori"]["gap_pedagogico"]
+        assert gap["intervallo"] == [gap["valore"], gap["valore"]] and gap["p_value"] is None
+
+    @pytest.mark.unit
+    def test_analisi_equita(self, scuola):
+        analisi = AnalisiDidattica(*scuola)
+        assert "incertezza" not in analisi.analisi_equita_completa()
+        incertezza = analisi.analisi_equita_completa(ricampionamenti=100)["incertezza"]
+        assert set(incertezza) == {"gap_pedagogico", "correlazione_reddito_rendimento", "divario_fasce_reddito"}
+
+    @pytest.mark.slow
+    def test_distretto_grande(self):
+        """1.000 ricampionamenti e 1.000 permutazioni su 50.000 studenti in pochi secondi."""
+        stime = BootstrapIndicatori(*genera_scuola(50000), seed=0).analizza()
+        assert stime["ricampionamenti"] == 1000 and stime["permutazioni"] == 1000
+        assert stime["tempo_ms"] < 30000
+
+
+class TestIncertezzaERP:
+    """Test per l'endpoint dell'incertezza degli indicatori."""
+
+    @pytest.mark.api
+    def test_endpoint(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        for studente in erp.anagrafica.genera_studenti(12, classe="1F"):
+            erp.voti.aggiungi_voto(studente.id, "Matematica", 6.0 + studente.id % 3)
+
+        risposta = client.get('/api/indicatori/incertezza?classe=1F&ricampionamenti=100&seed=3').get_json()
+        assert risposta["numero_studenti"] == 12 and risposta["ricampionamenti"] == 100
+        assert "indice_equita_educativa" in risposta["indicatori"]
+        assert client.get('/api/indicatori/incertezza?classe=ZZ').status_code == 404
@@ -0,0 +1,139 @@
+"""
+Test per la coalescenza delle richieste concorrenti.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from coalescenza_richieste import CoalescenzaRichieste, coalescente
+
+
+@pytest.fixture
+def gruppo():
+    """Fixture per un gruppo di coalescenza vuoto."""
+    return CoalescenzaRichieste()
+
+
+def _avvia_concorrenti(n, funzione):
+    """Esegue n chiamate concorrenti e restituisce risultati o eccezioni."""
+    barriera = threading.Barrier(n)
+
+    def chiamata(_):
+        barriera.wait()
+        try:
+            return funzione()
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(chiamata, range(n)))
+
+
+class TestCoalescenzaRichieste:
+    """Test per CoalescenzaRichieste."""
+
+    @pytest.mark.unit
+    def test_chiamate_concorrenti_eseguite_una_volta(self, gruppo):
+        """N richieste identiche producono una sola esecuzione."""
+        esecuzioni = []
+
+        def calcolo():
+            esecuzioni.append(1)
+            time.sleep(0.2)
+            return {"valore": 42}
+
+        risultati = _avvia_concorrenti(16, lambda: gruppo.esegui("quadro", calcolo))
+
+        assert len(esecuzioni) == 1
+        assert all(r == {"valore": 42} for r in risultati)
+        stats = gruppo.statistiche()
+        assert stats["esecuzioni"] == 1
+        assert stats["deduplicate"] == 15
+        assert stats["in_volo"] == 0
+
+    @pytest.mark.unit
+    def test_chiavi_diverse_non_condividono(self, gruppo):
+        """Chiavi diverse eseguono calcoli separati."""
+        assert gruppo.esegui("a", lambda: 1) == 1
+        assert gruppo.esegui("b", lambda: 2) == 2
+        assert gruppo.statistiche()["esecuzioni"] == 2
+
+    @pytest.mark.unit
+    def test_nuovo_calcolo_dopo_completamento(self, gruppo):
+        """Una richiesta successiva al completamento ricalcola."""
+        contatore = []
+        gruppo.esegui("k", lambda: contatore.append(1))
+        gruppo.esegui("k", lambda: contatore.append(1))
+        assert len(contatore) == 2
+
+    @pytest.mark.unit
+    def test_propagazione_errori(self, gruppo):
+        """L'eccezione dell'esecuzione arriva a tutti i chiamanti."""
+        def calcolo():
+            time.sleep(0.1)
+            raise ValueError("dati incoerenti")
+
+        risultati = _avvia_concorrenti(8, lambda: gruppo.esegui("k", calcolo))
+
+        assert all(isinstance(r, ValueError) for r in risultati)
+        # Ogni chiamante accodato riceve un'istanza propria, con l'originale come causa
+        assert len({id(r) for r in risultati}) == 8
+        originale = next(r for r in risultati if r.__cause__ is None)
+        assert all(r.__cause__ is originale for r in risultati if r is not originale)
+        assert gruppo.statistiche()["errori"] == 1
+        assert not gruppo.in_corso("k")
+
+    @pytest.mark.unit
+    def test_statistiche_per_chiave_limitate(self):
+        """Con chiavi sempre diverse i contatori per chiave restano limitati."""
+        gruppo = CoalescenzaRichieste(max_chiavi_statistiche=3)
+        for i in range(10):
+            gruppo.esegui(("pagina", i), lambda: None)
+        gruppo.esegui(("pagina", 7), lambda: None)
+        gruppo.esegui(("pagina", 10), lambda: None)
+
+        stats = gruppo.statistiche()
+        assert stats["esecuzioni"] == 12
+        assert list(stats["per_chiave"]) == [str(("pagina", 9)), str(("pagina", 7)), str(("pagina", 10))]
+        assert stats["per_chiave"][str(("pagina", 7))]["esecuzioni"] == 2
+
+    @pytest.mark.unit
+    def test_timeout_in_attesa(self, gruppo):
+        """Chi si accoda riceve TimeoutError se il calcolo è troppo lento."""
+        avviato = threading.Event()
+        rilascia = threading.Event()
+
+        def calcolo():
+            avviato.set()
+            rilascia.wait(5)
+            return "ok"
+
+        esecutore = threading.Thread(target=lambda: gruppo.esegui("lento", calcolo))
+        esecutore.start()
+        avviato.wait(5)
+
+        with pytest.raises(TimeoutError):
+            gruppo.esegui("lento", calcolo, timeout=0.05)
+
+        rilascia.set()
+        esecutore.join(5)
+        assert gruppo.statistiche()["timeout"] == 1
+
+    @pytest.mark.unit
+    def test_decorator(self, gruppo):
+        """Il decorator usa nome funzione e argomenti come chiave."""
+        chiamate = []
+
+        @coalescente(gruppo=gruppo)
+        def media_classe(classe):
+            chiamate.append(classe)
+            time.sleep(0.1)
+            return len(classe)
+
+        risultati = _avvia_concorrenti(6, lambda: media_classe("3A"))
+
+        assert risultati == [2] * 6
+        assert chiamate == ["3A"]
@@ -10,8 +10,10 @@ from voti import GestioneVoti
 
 
 @pytest.fixture
-def db():
+def db(tmp_path, monkeypatch):
     """Fixture per database di test."""
+    # Anche i backup con percorso predefinito finiscono nella directory temporanea
+    monkeypatch.chdir(tmp_path)
     db_path = "test_manager.db"
     db = DatabaseManager(db_path)
     
@@ -0,0 +1,272 @@
+"""
+Test per i delta della dashboard inviati dal server.
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from realtime.delta_dashboard import (
+    CalcolatoreDelta, CanaleDelta, misura_carico_iscritti, misura_carico_iscritti_async
+)
+from voti import GestioneVoti
+
+
+class TestCanaleDelta:
+    """Test per il buffer di eventi numerati."""
+
+    @pytest.mark.unit
+    def test_attesa_e_ripresa(self):
+        """Un iscritto riceve gli eventi successivi alla propria sequenza."""
+        canale = CanaleDelta()
+        canale.pubblica("delta", {"a": 1})
+        canale.pubblica("delta", {"a": 2})
+
+        assert [e["dati"]["a"] for e in canale.attendi(0, timeout=0)] == [1, 2]
+        assert [e["dati"]["a"] for e in canale.attendi(1, timeout=0)] == [2]
+        assert canale.attendi(2, timeout=0.01) == []
+
+    @pytest.mark.unit
+    def test_reset_se_eventi_persi(self):
+        """Se gli eventi richiesti sono usciti dal buffer il client deve ricaricare."""
+        canale = CanaleDelta(capacita=2)
+        for i in range(5):
+            canale.pubblica("delta", {"i": i})
+
+        assert canale.attendi(1, timeout=0) is None
+        assert len(canale.attendi(3, timeout=0)) == 2
+
+    @pytest.mark.unit
+    def test_risveglio_iscritto_in_attesa(self):
+        """La pubblicazione sveglia subito un iscritto bloccato."""
+        canale = CanaleDelta()
+        ricevuti = []
+        thread = threading.Thread(target=lambda: ricevuti.extend(canale.attendi(0, timeout=5)))
+        thread.start()
+        canale.pubblica("delta", {"kpi": {"voti_totali": 1}})
+        thread.join(timeout=5)
+
+        assert ricevuti[0]["seq"] == 1
+
+    @pytest.mark.unit
+    def test_formato_sse(self):
+        """Lo stream usa id/event/data e riprende da Last-Event-ID."""
+        canale = CanaleDelta(heartbeat_secondi=0.01)
+        canale.pubblica("delta", {"kpi": {"studenti_totali": 3}})
+        stream = canale.stream_sse(ultimo=0)
+
+        assert next(stream).startswith("retry: 3000\nid: 0\nevent: pronto")
+        evento = next(stream)
+        assert evento.startswith("id: 1\nevent: delta\n")
+        assert json.loads(evento.split("data: ")[1]) == {"kpi": {"studenti_totali": 3}}
+        assert next(stream) == ": heartbeat\n\n"
+        assert canale.iscritti == 1
+        stream.close()
+        assert canale.iscritti == 0
+
+    @pytest.mark.unit
+    def test_stream_asincrono(self):
+        """Lo stream asincrono è svegliato da una pubblicazione in un altro thread."""
+        canale = CanaleDelta(heartbeat_secondi=5)
+
+        async def leggi():
+            stream = canale.stream_sse_async(ultimo=0)
+            messaggi = [await stream.__anext__()]
+            assert canale.iscritti == 1
+            threading.Timer(0.05, canale.pubblica, args=("delta", {"a": 1})).start()
+            messaggi.append(await asyncio.wait_for(stream.__anext__(), timeout=5))
+            await stream.aclose()
+            return messaggi
+
+        pronto, evento = asyncio.run(leggi())
+        assert "event: pronto" in pronto and evento.startswith("id: 1\nevent: delta\n")
+        assert canale.iscritti == 0 and not canale._attese_async
+
+
+class TestCalcolatoreDelta:
+    """Test per il calcolo delle differenze."""
+
+    @pytest.mark.unit
+    def test_solo_valori_cambiati(self):
+        """Il delta contiene solo KPI, medie e allerte nuovi o modificati."""
+        stato = {"kpi": {"studenti_totali": 10, "media_generale": 6.5}, "medie": {"1A": 6.0, "2B": 7.0}, "allerte": []}
+        canale = CanaleDelta()
+        calcolatore = CalcolatoreDelta(canale, kpi=lambda: dict(stato["kpi"]),
+                                       medie_classi=lambda: dict(stato["medie"]),
+                                       allerte=lambda: list(stato["allerte"]))
+
+        assert calcolatore.aggiorna() is None
+        stato["kpi"]["media_generale"] = 6.6
+        stato["medie"]["1A"] = 6.25
+        stato["allerte"].append({"id": 1, "titolo": "Media bassa"})
+
+        assert calcolatore.aggiorna() == {
+            "kpi": {"media_generale": 6.6},
+            "medie_classi": {"1A": 6.25},
+            "allerte": [{"id": 1, "titolo": "Media bassa"}]
+        }
+        assert calcolatore.aggiorna() is None
+        assert canale.sequenza == 1
+
+    @pytest.mark.unit
+    def test_lotto_un_solo_delta(self):
+        """Migliaia di voti aggiunti uno alla volta in un lotto non saturano il buffer."""
+        voti = GestioneVoti()
+        canale = CanaleDelta(capacita=16)
+        calcolatore = CalcolatoreDelta(canale, kpi=lambda: {"voti_totali": len(voti.voti)}, medie_classi=dict)
+        calcolatore.osserva_voti(voti)
+
+        with calcolatore.lotto():
+            for i in range(1000):
+                voti.aggiungi_voto(i, "Matematica", 6.0)
+        assert canale.sequenza == 1 and canale.attendi(0, timeout=0)[0]["dati"]["kpi"]["voti_totali"] == 1000
+        with calcolatore.lotto():
+            pass
+        assert canale.sequenza == 1
+
+        # Fuori da un lotto ogni modifica produce il suo delta
+        voti.aggiungi_voto(1, "Storia", 7.0)
+        assert canale.sequenza == 2
+
+    @pytest.mark.api
+    def test_delta_dopo_scrittura_erp(self, tmp_path, monkeypatch):
+        """Un lotto di voti via API produce un solo delta con KPI e media di classe."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        studenti = [erp.anagrafica.crea_studente_casuale("8X") for _ in range(3)]
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        sequenza = erp.canale_dashboard.sequenza
+
+        client.post('/api/voti/classe', json={
+            "classe": "8X", "materia": "Arte", "data": "2025-11-05",
+            "voti": [{"id_studente": s.id, "voto": 8.0} for s in studenti]
+        })
+
+        eventi = erp.canale_dashboard.attendi(sequenza, timeout=0)
+        assert len(eventi) == 1
+        assert eventi[0]["dati"]["medie_classi"]["8X"] == 8.0
+        assert "voti_totali" in eventi[0]["dati"]["kpi"]
+
+    @pytest.mark.api
+    def test_endpoint_sse(self, tmp_path, monkeypatch):
+        """/api/dashboard/eventi risponde con uno stream text/event-stream."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        erp.canale_dashboard.pubblica("delta", {"kpi": {"studenti_totali": 1}})
+
+        risposta = client.get('/api/dashboard/eventi', headers={'Last-Event-ID': '0'}, buffered=False)
+        righe = risposta.response
+        assert risposta.mimetype == 'text/event-stream'
+        assert b"event: pronto" in next(righe)
+        assert b"event: delta" in next(righe)
+        risposta.close()
+
+    @pytest.mark.api
+    def test_generazione_pagelle_un_solo_delta(self, tmp_path, monkeypatch):
+        """Una richiesta che aggiunge migliaia di voti pubblica un solo delta."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        erp.anagrafica.genera_studenti(60)
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        sequenza = erp.canale_dashboard.sequenza
+
+        assert client.post('/api/pagelle/genera').status_code == 200
+        assert len(erp.voti.voti) > erp.canale_dashboard._eventi.maxlen
+        assert len(erp.canale_dashboard.attendi(sequenza, timeout=0)) == 1
+
+    @pytest.mark.api
+    def test_wsgi_serve_lo_stream_senza_configurazione(self, tmp_path, monkeypatch):
+        """Senza MANAGERSCHOOL_URL_EVENTI il worker WSGI non reindirizza."""
+        import importlib
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("MANAGERSCHOOL_URL_EVENTI", raising=False)
+        import wsgi
+        wsgi = importlib.reload(wsgi)
+
+        erp = wsgi.crea_app(str(tmp_path / "condiviso.db"), dati_demo=False, avvia_scheduler=False)
+        assert erp.url_eventi_asincroni is None
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        risposta = client.get('/api/dashboard/eventi?ultimo=0', buffered=False)
+        assert risposta.status_code == 200
+        assert risposta.mimetype == 'text/event-stream'
+        risposta.close()
+
+    @pytest.mark.api
+    def test_stream_su_api_asincrona(self, tmp_path, monkeypatch):
+        """Con l'API asincrona configurata il worker WSGI reindirizza e non tiene thread."""
+        monkeypatch.chdir(tmp_path)
+        from api_asincrona import ApiAsincrona
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        erp.url_eventi_asincroni = "/api/async/dashboard/eventi"
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        risposta = client.get('/api/dashboard/eventi?ultimo=0')
+        assert risposta.status_code == 307
+        assert risposta.headers['Location'].endswith('/api/async/dashboard/eventi?ultimo=0')
+
+        api = ApiAsincrona(erp)
+        token = erp._serializzatore_token().dumps("admin")
+        erp.canale_dashboard.pubblica("delta", {"kpi": {"studenti_totali": 2}})
+
+        async def scenario():
+            inviati, uscita = [], asyncio.Event()
+
+            async def receive():
+                if not inviati:
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await uscita.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(messaggio):
+                inviati.append(messaggio)
+                if sum(1 for m in inviati if m.get("more_body")) == 2:
+                    uscita.set()
+
+            scope = {"type": "http", "method": "GET", "path": "/api/async/dashboard/eventi",
+                     "query_string": b"ultimo=0",
+                     "headers": [(b"authorization", f"Bearer {token}".encode())]}
+            await asyncio.wait_for(api(scope, receive, send), timeout=5)
+            return inviati
+
+        inviati = asyncio.run(scenario())
+        api.chiudi()
+        assert inviati[0]["status"] == 200 and (b"content-type", b"text/event-stream") in inviati[0]["headers"]
+        assert b"event: pronto" in inviati[1]["body"] and b"event: delta" in inviati[2]["body"]
+        assert erp.canale_dashboard.iscritti == 0 and api.stream_aperti == 0
+
+
+class TestCarico:
+    """Costo degli iscritti inattivi."""
+
+    @pytest.mark.slow
+    def test_iscritti_inattivi(self):
+        """Mille iscritti fermi non consumano CPU e ricevono tutti un delta."""
+        risultato = misura_carico_iscritti(iscritti=1000, secondi_inattivi=0.5)
+        print(f"\n   {risultato}")
+
+        assert risultato["consegnati"] == 1000
+        # Soglia larga per CI rumorose; tipicamente < 1%
+        assert risultato["cpu_inattiva_percento"] < 10
+
+    @pytest.mark.slow
+    def test_iscritti_asincroni(self):
+        """Duemila iscritti su un solo event loop, senza un thread ciascuno."""
+        risultato = misura_carico_iscritti_async(iscritti=2000, secondi_inattivi=0.5)
+
+        assert risultato["consegnati"] == 2000
+        assert risultato["cpu_inattiva_percento"] < 10
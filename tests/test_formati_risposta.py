@@ -0,0 +1,109 @@
+"""
+Test per compressione e formati binari delle risposte.
+"""
+
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+import formati_risposta
+from formati_risposta import CompressioneRisposte, benchmark_formati, risposta_negoziata
+
+
+@pytest.fixture
+def app_formati():
+    """App Flask minima con compressione e negoziazione del formato."""
+    app = Flask(__name__)
+    compressione = CompressioneRisposte(app, soglia_byte=512)
+
+    @app.route('/voti')
+    def voti():
+        return risposta_negoziata([{"materia": "Matematica", "voto": 7.5, "indice": i} for i in range(200)])
+
+    @app.route('/piccola')
+    def piccola():
+        return risposta_negoziata({"ok": True})
+
+    return app, compressione
+
+
+class TestCompressione:
+    """Test per la negoziazione di Content-Encoding."""
+
+    @pytest.mark.unit
+    def test_gzip_sopra_soglia(self, app_formati, monkeypatch):
+        """Le risposte grandi sono compresse con gzip se accettato."""
+        monkeypatch.setattr(formati_risposta, "BROTLI_AVAILABLE", False)
+        app, compressione = app_formati
+        risposta = app.test_client().get('/voti', headers={'Accept-Encoding': 'gzip, br'})
+
+        assert risposta.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in risposta.headers['Vary']
+        assert len(json.loads(gzip.decompress(risposta.data))) == 200
+        assert compressione.statistiche()["rapporto"] < 0.5
+
+    @pytest.mark.unit
+    def test_brotli_preferito(self, app_formati):
+        """Con brotli disponibile e accettato si usa br."""
+        if not formati_risposta.BROTLI_AVAILABLE:
+            pytest.skip("brotli non installato")
+        app, _ = app_formati
+        risposta = app.test_client().get('/voti', headers={'Accept-Encoding': 'gzip;q=0.8, br'})
+
+        assert risposta.headers['Content-Encoding'] == 'br'
+        assert len(json.loads(formati_risposta.brotli.decompress(risposta.data))) == 200
+
+    @pytest.mark.unit
+    def test_nessuna_compressione(self, app_formati):
+        """Sotto soglia o senza Accept-Encoding il corpo resta invariato."""
+        app, _ = app_formati
+        client = app.test_client()
+
+        assert 'Content-Encoding' not in client.get('/piccola', headers={'Accept-Encoding': 'gzip'}).headers
+        assert 'Content-Encoding' not in client.get('/voti').headers
+        assert 'Content-Encoding' not in client.get('/voti', headers={'Accept-Encoding': 'gzip;q=0'}).headers
+
+
+class TestFormatiBinari:
+    """Test per la negoziazione di Content-Type."""
+
+    @pytest.mark.unit
+    def test_json_predefinito(self, app_formati):
+        """Accept generico produce JSON."""
+        app, _ = app_formati
+        risposta = app.test_client().get('/voti', headers={'Accept': '*/*'})
+        assert risposta.mimetype == 'application/json'
+
+    @pytest.mark.unit
+    def test_msgpack(self, app_formati):
+        """application/x-msgpack restituisce MessagePack equivalente."""
+        if not formati_risposta.MSGPACK_AVAILABLE:
+            pytest.skip("msgpack non installato")
+        app, _ = app_formati
+        client = app.test_client()
+        risposta = client.get('/voti', headers={'Accept': 'application/x-msgpack'})
+
+        assert risposta.mimetype == 'application/msgpack'
+        assert formati_risposta.msgpack.unpackb(risposta.data) == client.get('/voti').get_json()
+
+    @pytest.mark.unit
+    def test_cbor_da_parametro(self, app_formati):
+        """?formato=cbor forza la codifica CBOR."""
+        if not formati_risposta.CBOR_AVAILABLE:
+            pytest.skip("cbor2 non installato")
+        app, _ = app_formati
+        risposta = app.test_client().get('/voti?formato=cbor')
+
+        assert risposta.mimetype == 'application/cbor'
+        assert len(formati_risposta.cbor2.loads(risposta.data)) == 200
+
+    @pytest.mark.slow
+    def test_benchmark(self):
+        """Il benchmark produce righe coerenti e la compressione riduce il payload."""
+        righe = benchmark_formati(dimensioni=(1000, 10000), ripetizioni=1)
+        per_formato = {(r["record"], r["formato"]): r for r in righe}
+
+        assert per_formato[(1000, "json")]["rapporto_json"] == 1.0
+        assert per_formato[(10000, "json+gzip")]["rapporto_json"] < 0.2
@@ -0,0 +1,172 @@
+"""
+Test per il grafo di dipendenze degli indicatori sintetici.
+"""
+
+import random
+
+import pytest
+
+from analisi import AnalisiDidattica
+from anagrafica import Anagrafica
+from grafo_indicatori import INDICATORI, GrafoDipendenze, GrafoIndicatori
+from indicatori import CalcolatoreIndicatori
+from insegnanti import GestioneInsegnanti
+from voti import GestioneVoti, Voto
+
+
+@pytest.fixture
+def scuola():
+    casuale = random.Random(7)
+    anagrafica, voti, insegnanti = Anagrafica(), GestioneVoti(), GestioneInsegnanti()
+    for classe in ("1A", "2A", "3B"):
+        anagrafica.genera_studenti(15, classe=classe)
+    insegnanti.genera_insegnanti(4)
+    voti.aggiungi_voti([
+        Voto(s.id, materia, round(casuale.uniform(3, 10), 1), "scritto", "2025-11-03")
+        for s in anagrafica.studenti[:-2] for materia in ("Matematica", "Italiano", "Storia")
+    ])
+    calcolatore = CalcolatoreIndicatori(anagrafica, voti, insegnanti, AnalisiDidattica(anagrafica, voti))
+    return anagrafica, voti, insegnanti, calcolatore
+
+
+def confronta(grafo, calcolatore):
+    """Gli indici del grafo coincidono con quelli calcolati da zero.
+
+    Gap e medie per fascia sono arrotondati a 2 decimali: sommati in ordine
+    diverso possono cadere dall'altra parte di un ...5 (0.01 × 8 sull'indice).
+    """
+    for chiave, indice in calcolatore.quadro_indicatori_completo().items():
+        dal_grafo = grafo.indice(chiave)
+        assert dal_grafo.valore == pytest.approx(indice.valore, abs=0.15), chiave
+        assert dal_grafo.componenti == pytest.approx(indice.componenti, abs=0.09), chiave
+
+
+class TestGrafoDipendenze:
+    """Test per memoizzazione, invalidazione e tempi del motore generico."""
+
+    @pytest.mark.unit
+    def test_memoizzazione_e_propagazione(self):
+        grafo = GrafoDipendenze()
+        sorgente = {"a": 1, "b": 10}
+        grafo.aggiungi("a", lambda _: sorgente["a"])
+        grafo.aggiungi("b", lambda _: sorgente["b"])
+        grafo.aggiungi("doppio_a", lambda v: v["a"] * 2, ("a",))
+        grafo.aggiungi("somma", lambda v: v["doppio_a"] + v["b"], ("doppio_a", "b"))
+
+        assert grafo.valore("somma") == 12 and grafo.ricalcoli_totali == 4
+        assert grafo.valore("somma") == 12 and grafo.ricalcoli_totali == 4
+
+        sorgente["b"] = 20
+        assert grafo.invalida("b") == 2
+        assert set(grafo.sporchi()) == {"b", "somma"}
+        assert grafo.valore("somma") == 22 and grafo.ricalcoli_totali == 6
+
+        tempi = grafo.tempi()
+        assert tempi["somma"]["ricalcoli"] == 2 and tempi["doppio_a"]["ricalcoli"] == 1
+        assert tempi["somma"]["letture"] == 3 and tempi["somma"]["totale_ms"] >= 0
+
+    @pytest.mark.unit
+    def test_dipendenze_non_valide(self):
+        grafo = GrafoDipendenze()
+        grafo.aggiungi("a", lambda _: 1)
+        grafo.aggiungi("b", lambda v: v["a"], ("a",))
+        with pytest.raises(KeyError):
+            grafo.aggiungi("c", lambda v: 0, ("x",))
+        with pytest.raises(ValueError):
+            grafo.aggiungi("a", lambda v: v["b"], ("b",))
+        with pytest.raises(ValueError):
+            grafo.rimuovi("a")
+        grafo.rimuovi("b")
+        assert grafo.nodi() == ["a"]
+
+
+class TestGrafoIndicatori:
+    """Test per l'equivalenza con CalcolatoreIndicatori e il ricalcolo parziale."""
+
+    @pytest.mark.unit
+    def test_equivalente_al_calcolo_completo(self, scuola):
+        anagrafica, voti, insegnanti, calcolatore = scuola
+        grafo = GrafoIndicatori(anagrafica, voti, insegnanti)
+        confronta(grafo, calcolatore)
+
+        voti.rimuovi_voto(voti.voti[0])
+        voti.aggiungi_voto(anagrafica.studenti[-1].id, "Matematica", 4.0)
+        insegnanti.insegnanti[0].anni_esperienza += 5
+        insegnanti.insegnanti[1].aggiungi_materia("Storia", 3)
+        confronta(grafo, calcolatore)
+
+        calcolatore.grafo = grafo
+        assert calcolatore.quadro_indicatori_completo().keys() == set(INDICATORI)
+        assert calcolatore.indice_coesione_sociale() == grafo.indice("coesione_sociale")
+
+    @pytest.mark.unit
+    def test_voto_ricalcola_solo_la_sua_classe(self, scuola):
+        anagrafica, voti, insegnanti, _ = scuola
+        grafo = GrafoIndicatori(anagrafica, voti, insegnanti)
+        grafo.quadro()
+        prima = grafo.tempi()
+
+        voti.aggiungi_voto(anagrafica.studenti_per_classe("2A")[0].id, "Storia", 9.5)
+        grafo.quadro()
+        ricalcolati = {n for n, t in grafo.tempi().items() if t["ricalcoli"] > prima[n]["ricalcoli"]}
+
+        assert "rendimento:2A" in ricalcolati
+        assert not {"rendimento:1A", "rendimento:3B", "composizione:2A", "composizione_scuola",
+                    "indice_coesione_sociale"} & ricalcolati
+        assert {"rendimento_scuola", "medie_insegnanti", "indice_qualita_scolastica"} <= ricalcolati
+
+    @pytest.mark.unit
+    def test_cambi_di_anagrafica(self, scuola):
+        anagrafica, voti, insegnanti, calcolatore = scuola
+        grafo = GrafoIndicatori(anagrafica, voti, insegnanti)
+        grafo.quadro()
+        prima = grafo.tempi()
+
+        # Trasferimento: si ricalcolano le due classi coinvolte
+        studente = anagrafica.studenti_per_classe("1A")[0]
+        studente.classe = "3B"
+        confronta(grafo, calcolatore)
+        ricalcolati = {n for n, t in grafo.tempi().items() if t["ricalcoli"] > prima[n]["ricalcoli"]}
+        assert {"composizione:1A", "composizione:3B"} <= ricalcolati
+        assert "composizione:2A" not in ricalcolati
+
+        # Nuova classe e classe svuotata
+        anagrafica.genera_studenti(4, classe="5C")
+        for studente in anagrafica.studenti_per_classe("2A"):
+            studente.classe = "5C"
+        confronta(grafo, calcolatore)
+        assert "composizione:5C" in grafo.nodi() and "composizione:2A" not in grafo.nodi()
+
+    @pytest.mark.unit
+    def test_voti_ricaricati(self, scuola):
+        anagrafica, voti, insegnanti, calcolatore = scuola
+        grafo = GrafoIndicatori(anagrafica, voti, insegnanti)
+        grafo.quadro()
+        voti.voti = voti.voti[::2]
+        voti.notifica_osservatori("ricaricati")
+        confronta(grafo, calcolatore)
+        voti.azzera()
+        confronta(grafo, calcolatore)
+
+        profilo = grafo.profilo()
+        assert profilo["numero_nodi"] == len(grafo.nodi()) and not profilo["sporchi"]
+
+
+class TestProfiloERP:
+    """Test per l'endpoint di profiling del grafo."""
+
+    @pytest.mark.api
+    def test_endpoint(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        for studente in erp.anagrafica.genera_studenti(5, classe="1G"):
+            erp.voti.aggiungi_voto(studente.id, "Matematica", 7.0)
+
+        assert client.get('/api/indicatori/equita').status_code == 200
+        profilo = client.get('/api/indicatori/profilo').get_json()
+        assert profilo["nodi"]["indice_equita_educativa"]["ricalcoli"] >= 1
+        assert "composizione:1G" in profilo["nodi"]
@@ -0,0 +1,112 @@
+"""
+Test per le metriche per route.
+"""
+
+import os
+
+import pytest
+from flask import Flask
+
+from metriche_route import IstogrammaLatenze, MetricheRoute, misura_overhead
+
+
+@pytest.fixture
+def app_metriche():
+    """App Flask minima con middleware di metriche."""
+    app = Flask(__name__)
+    metriche = MetricheRoute(app)
+
+    @app.route('/studenti/<int:studente_id>')
+    def studente(studente_id):
+        return {"id": studente_id}
+
+    @app.route('/errore')
+    def errore():
+        raise RuntimeError("guasto")
+
+    return app, metriche
+
+
+class TestIstogrammaLatenze:
+    """Test per l'istogramma a bucket."""
+
+    @pytest.mark.unit
+    def test_quantili_interpolati(self):
+        """I quantili cadono nel bucket corretto."""
+        istogramma = IstogrammaLatenze((0.01, 0.1, 1.0))
+        for _ in range(90):
+            istogramma.registra(0.005)
+        for _ in range(10):
+            istogramma.registra(0.5)
+
+        assert 0 < istogramma.quantile(0.5) <= 0.01
+        assert 0.1 < istogramma.quantile(0.95) <= 1.0
+        assert istogramma.cumulativi() == [90, 90, 100, 100]
+
+    @pytest.mark.unit
+    def test_istogramma_vuoto(self):
+        """Un istogramma vuoto restituisce 0."""
+        assert IstogrammaLatenze().quantile(0.99) == 0.0
+
+
+class TestMetricheRoute:
+    """Test per il middleware."""
+
+    @pytest.mark.unit
+    def test_conteggi_per_template_di_rotta(self, app_metriche):
+        """Le richieste sono raggruppate per template, non per URL."""
+        app, metriche = app_metriche
+        client = app.test_client()
+        for i in range(5):
+            client.get(f'/studenti/{i}')
+        client.get('/inesistente')
+
+        rotte = metriche.riepilogo()["rotte"]
+        assert rotte["GET /studenti/<int:studente_id>"]["richieste"] == 5
+        assert rotte["GET /studenti/<int:studente_id>"]["in_corso"] == 0
+        assert rotte["GET <non_trovata>"]["per_classe_stato"] == {"4xx": 1}
+
+    @pytest.mark.unit
+    def test_errori_non_gestiti(self, app_metriche):
+        """Le eccezioni sono contate come errori 5xx."""
+        app, metriche = app_metriche
+        app.testing = False
+        app.test_client().get('/errore')
+
+        voce = metriche.riepilogo()["rotte"]["GET /errore"]
+        assert voce["errori"] == 1
+        assert voce["in_corso"] == 0
+
+    @pytest.mark.unit
+    def test_formato_prometheus(self, app_metriche):
+        """L'esportazione contiene contatori e bucket dell'istogramma."""
+        app, metriche = app_metriche
+        app.test_client().get('/studenti/1')
+
+        testo = metriche.formato_prometheus()
+        # Ogni worker gunicorn espone le proprie serie, distinte dal pid
+        etichette = f'worker="{os.getpid()}",metodo="GET",rotta="/studenti/<int:studente_id>"'
+        assert f'managerschool_richieste_http_total{{{etichette},classe_stato="2xx"}} 1' in testo
+        assert f'managerschool_durata_richiesta_http_seconds_bucket{{{etichette},le="+Inf"}} 1' in testo
+        assert "# TYPE managerschool_durata_richiesta_http_seconds histogram" in testo
+
+    @pytest.mark.api
+    def test_endpoint_erp(self, tmp_path, monkeypatch):
+        """L'ERP espone /metrics e il riepilogo JSON per l'amministratore."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        client = InterfacciaERP().app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        client.get('/api/studenti')
+
+        assert 'rotta="/api/studenti"' in client.get('/metrics').get_data(as_text=True)
+        assert client.get('/api/metriche').get_json()["rotte"]["GET /api/studenti"]["richieste"] == 1
+
+    @pytest.mark.slow
+    def test_overhead_microbenchmark(self):
+        """Il costo degli hook resta nell'ordine dei microsecondi."""
+        overhead = min(misura_overhead(5000) for _ in range(3))
+        print(f"\n   Overhead metriche: {overhead:.2f} µs/richiesta")
+        # Soglia larga per macchine di CI lente; tipicamente 2-4 µs
+        assert overhead < 25
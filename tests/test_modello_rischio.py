@@ -0,0 +1,242 @@
+"""
+Test per il modello di rischio addestrabile.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from ai.modello_rischio import (
+    ModelloRischio, auc, calibrazione, dataset_da_registro, genera_storico_sintetico, valuta_modello
+)
+from ai.predictive_engine import PredictiveEngine
+from anagrafica import Anagrafica
+from voti import GestioneVoti
+
+
+@pytest.fixture(scope="module")
+def storico():
+    """Storico sintetico diviso in addestramento e valutazione."""
+    studenti, voti, esiti = genera_storico_sintetico(6000, seed=3)
+    feature = PredictiveEngine().costruisci_feature(studenti, voti)
+    return {
+        "addestramento": (feature.valori[:4000], esiti[:4000]),
+        "valutazione": (studenti[4000:], voti[4000:], esiti[4000:])
+    }
+
+
+class TestMetriche:
+    """Test per AUC e calibrazione."""
+
+    @pytest.mark.unit
+    def test_auc(self):
+        """Ordine perfetto, inverso, pari merito."""
+        esiti = np.array([0, 0, 1, 1])
+        assert auc(np.array([0.1, 0.2, 0.8, 0.9]), esiti) == 1.0
+        assert auc(np.array([0.9, 0.8, 0.2, 0.1]), esiti) == 0.0
+        assert auc(np.array([0.5, 0.5, 0.5, 0.5]), esiti) == 0.5
+        assert auc(np.array([0.1, 0.4, 0.4, 0.9]), esiti) == 0.875
+
+    @pytest.mark.unit
+    def test_calibrazione(self):
+        """Probabilità uguali alle frequenze osservate: errore nullo."""
+        probabilita = np.array([0.25] * 4 + [0.75] * 4)
+        esiti = np.array([1, 0, 0, 0, 1, 1, 1, 0])
+        risultato = calibrazione(probabilita, esiti, fasce=4)
+        assert risultato["ece"] == pytest.approx(0.0)
+        assert [f["studenti"] for f in risultato["fasce"]] == [4, 4]
+
+
+class TestAddestramento:
+    """Test per addestramento offline, online e serializzazione."""
+
+    @pytest.mark.unit
+    def test_offline_batte_euristica(self, storico):
+        """Il modello addestrato separa gli esiti meglio dell'euristica ed è calibrato."""
+        modello = ModelloRischio()
+        modello.addestra(*storico["addestramento"])
+        risultato = valuta_modello(modello, *storico["valutazione"])
+
+        assert risultato["auc"] > 0.8
+        assert risultato["auc"] > risultato["auc_euristica"] + 0.05
+        assert risultato["calibrazione"]["ece"] < 0.05
+
+    @pytest.mark.unit
+    def test_aggiornamenti_online(self, storico):
+        """Gruppi successivi di esiti avvicinano il modello a quello offline."""
+        valori, esiti = storico["addestramento"]
+        online = ModelloRischio()
+        auc_iniziale = None
+        for inizio in range(0, len(esiti), 200):
+            online.aggiorna(valori[inizio:inizio + 200], esiti[inizio:inizio + 200], passi=5)
+            if auc_iniziale is None:
+                auc_iniziale = valuta_modello(online, *storico["valutazione"])["auc"]
+
+        offline = ModelloRischio()
+        offline.addestra(valori, esiti)
+        auc_online = valuta_modello(online, *storico["valutazione"])["auc"]
+        assert online.esempi_visti == len(esiti)
+        assert auc_online >= auc_iniziale
+        assert auc_online > valuta_modello(offline, *storico["valutazione"])["auc"] - 0.03
+
+    @pytest.mark.unit
+    def test_salva_e_carica(self, storico, tmp_path):
+        """Il modello ricaricato dà le stesse probabilità."""
+        valori, esiti = storico["addestramento"]
+        modello = ModelloRischio()
+        modello.addestra(valori, esiti)
+        percorso = modello.salva(str(tmp_path / "modelli" / "rischio.json"))
+
+        caricato = ModelloRischio.carica(percorso)
+        assert np.array_equal(caricato.probabilita(valori), modello.probabilita(valori))
+        assert caricato.versione == modello.versione
+
+        dati = json.loads(open(percorso).read())
+        dati["formato"] = 99
+        with pytest.raises(ValueError):
+            ModelloRischio.from_dict(dati)
+
+
+class TestMotoreConModello:
+    """Test per PredictiveEngine con un modello installato."""
+
+    @pytest.mark.unit
+    def test_batch_equivalente_con_modello(self, storico):
+        """Batch e calcolo per studente usano il modello con gli stessi risultati."""
+        modello = ModelloRischio()
+        modello.addestra(*storico["addestramento"])
+        motore = PredictiveEngine()
+        motore.imposta_modello_rischio(modello)
+
+        studenti, voti, _ = storico["valutazione"]
+        studenti, voti = studenti[:500], voti[:500]
+        attesi = [motore.predict_complete(s, v) for s, v in zip(studenti, voti)]
+        assert motore.predict_batch(studenti, voti) == attesi
+
+        feature = motore.costruisci_feature(studenti[:1], voti[:1])
+        assert attesi[0].rischio_insufficienza == round(float(modello.probabilita(feature.valori)[0]) * 100, 1)
+
+        motore.imposta_modello_rischio(None)
+        assert motore.predict_complete(studenti[0], voti[0]) == PredictiveEngine().predict_complete(studenti[0], voti[0])
+
+    @pytest.mark.unit
+    def test_feature_incompatibili(self):
+        with pytest.raises(ValueError):
+            PredictiveEngine().imposta_modello_rischio(ModelloRischio(feature=["media"]))
+
+
+class TestDatasetRegistro:
+    """Test per gli esempi di addestramento estratti dal registro."""
+
+    @pytest.mark.unit
+    def test_feature_senza_voti_successivi(self):
+        """L'esito finale si prevede dai voti del primo quadrimestre: i successivi non entrano nelle feature."""
+        anagrafica, voti = Anagrafica(), GestioneVoti()
+        studenti = anagrafica.genera_studenti(4)
+        for studente in studenti:
+            voti.aggiungi_voto(studente.id, "Storia", 6.5, data="2025-10-13")
+            voti.aggiungi_voto(studente.id, "Storia", 6.0, data="2026-01-20")
+            voti.crea_pagella(studente.id, 2)
+        valori, esiti, ids = dataset_da_registro(anagrafica, voti)
+
+        # Voti del secondo quadrimestre (che determinano la pagella): feature invariate
+        for studente in studenti[:2]:
+            voti.aggiungi_voto(studente.id, "Storia", 3.0, data="2026-04-15")
+        assert np.array_equal(dataset_da_registro(anagrafica, voti)[0], valori)
+
+        # Un voto del primo quadrimestre invece cambia le feature
+        voti.aggiungi_voto(studenti[0].id, "Storia", 9.0, data="2025-12-10")
+        assert not np.array_equal(dataset_da_registro(anagrafica, voti)[0], valori)
+
+        # Limite esplicito e pagella del primo quadrimestre (voti fino a novembre)
+        limitato = dataset_da_registro(anagrafica, voti, data_limite="2025-11-01")[0]
+        assert np.array_equal(limitato, dataset_da_registro(anagrafica, voti, data_limite="2025-10-14")[0])
+        for studente in studenti:
+            voti.crea_pagella(studente.id, 1)
+        assert np.array_equal(dataset_da_registro(anagrafica, voti, quadrimestre=1)[0], limitato)
+
+
+class TestModelloERP:
+    """Test per addestramento e aggiornamento dall'interfaccia."""
+
+    @staticmethod
+    def _popola(erp, numero, seed):
+        """Studenti con voti e pagella finale: metà in difficoltà."""
+        generatore = np.random.default_rng(seed)
+        studenti = erp.anagrafica.genera_studenti(numero, classe="4B")
+        for i, studente in enumerate(studenti):
+            base = 4.8 if i % 2 else 7.2
+            # Quattro voti nel primo quadrimestre, due nel secondo
+            for voto, data in zip(np.clip(base + generatore.normal(0, 0.8, 6), 3, 10),
+                                  ("2025-10-06", "2025-11-03", "2025-12-01", "2026-01-12", "2026-03-02", "2026-05-04")):
+                erp.voti.aggiungi_voto(studente.id, "Matematica", round(float(voto), 1), data=data)
+            erp.voti.crea_pagella(studente.id, 2)
+
+    @pytest.mark.api
+    def test_addestra_aggiorna_e_condividi(self, tmp_path, monkeypatch):
+        """Addestramento via API, uso nell'early warning, ricarica su un altro worker."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        assert client.get('/api/ai/modello-rischio').get_json()["euristica"] is True
+        assert client.post('/api/ai/modello-rischio/addestra').status_code == 400
+
+        self._popola(erp, 60, seed=1)
+        risposta = client.post('/api/ai/modello-rischio/addestra')
+        assert risposta.status_code == 200
+        assert risposta.get_json()["valutazione"]["auc"] > 0.9
+
+        stato = client.get('/api/ai/modello-rischio').get_json()
+        assert stato["euristica"] is False and stato["modello"]["esempi_visti"] == 60
+        warning = client.get('/api/ai/early-warning').get_json()
+        assert warning["totale_warning"] > 0
+
+        # Un altro worker nella stessa directory usa il modello salvato
+        altro = InterfacciaERP()
+        assert altro._motore_predittivo().models['rischio'].versione == stato["modello"]["versione"]
+
+        self._popola(erp, 10, seed=2)
+        aggiornamento = client.post('/api/ai/modello-rischio/aggiorna').get_json()
+        assert (aggiornamento["nuovi_esempi"], aggiornamento["esempi_visti"]) == (10, 70)
+        assert altro._motore_predittivo().models['rischio'].esempi_visti == 70
+
+    @pytest.mark.api
+    def test_aggiorna_dopo_riavvio_non_riusa_esiti(self, tmp_path, monkeypatch):
+        """Gli esiti già usati sono salvati con il modello e non tornano come nuovi esempi."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        self._popola(erp, 60, seed=1)
+        erp._addestra_modello_rischio()
+
+        # Riavvio: nuova istanza sugli stessi dati, modello riletto dal disco
+        riavviato = InterfacciaERP()
+        riavviato.anagrafica, riavviato.voti = erp.anagrafica, erp.voti
+        client = riavviato.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+        aggiornamento = client.post('/api/ai/modello-rischio/aggiorna').get_json()
+        assert (aggiornamento["nuovi_esempi"], aggiornamento["esempi_visti"]) == (0, 60)
+
+        self._popola(erp, 10, seed=2)
+        aggiornamento = client.post('/api/ai/modello-rischio/aggiorna').get_json()
+        assert (aggiornamento["nuovi_esempi"], aggiornamento["esempi_visti"]) == (10, 70)
+        assert len(ModelloRischio.carica(str(tmp_path / "modelli" / "modello_rischio.json")).esiti_usati) == 70
+
+
+class TestLatenza:
+    """Test per il tempo di predizione."""
+
+    @pytest.mark.slow
+    def test_latenza_10k(self, storico):
+        """10k predizioni (feature comprese) in meno di 100 ms."""
+        modello = ModelloRischio()
+        modello.addestra(*storico["addestramento"])
+        risultato = valuta_modello(modello, *storico["valutazione"])
+        assert risultato["latenza_10k_ms"] < 20
+        assert risultato["latenza_10k_con_feature_ms"] < 100
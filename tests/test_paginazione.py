@@ -0,0 +1,149 @@
+"""
+Test per la paginazione lato server e la cache dei frammenti HTML.
+"""
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from paginazione import CacheFrammenti, benchmark_pagine, pagina_di, parametri_paginazione
+
+
+@pytest.fixture
+def erp_con_studenti(tmp_path, monkeypatch):
+    """ERP con 60 studenti in due classi e client autenticato."""
+    monkeypatch.chdir(tmp_path)
+    from interfaccia_erp import InterfacciaERP
+
+    erp = InterfacciaERP()
+    erp.anagrafica.genera_studenti(40, classe="1A")
+    erp.anagrafica.genera_studenti(20, classe="2B")
+    client = erp.app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    return erp, client
+
+
+class TestPagina:
+    """Test per l'estrazione delle pagine e dei parametri."""
+
+    @pytest.mark.unit
+    def test_pagina_di(self):
+        """Ultima pagina parziale, numeri fuori intervallo riportati ai limiti."""
+        pagina = pagina_di(list(range(123)), 3, 50)
+        assert (pagina.primo, pagina.ultimo, pagina.pagine) == (101, 123, 3)
+        assert not pagina.ha_successiva and pagina.ha_precedente
+        assert pagina_di(list(range(123)), 99, 50).numero == 3
+        assert pagina_di([], 1, 50).to_dict() == {"pagina": 1, "per_pagina": 50, "totale": 0, "pagine": 1}
+
+    @pytest.mark.unit
+    def test_parametri_sicuri(self):
+        """Valori non validi o eccessivi sono corretti."""
+        assert parametri_paginazione(MultiDict()) == (1, 50)
+        assert parametri_paginazione(MultiDict({"pagina": "-3", "per_pagina": "100000"})) == (1, 200)
+        assert parametri_paginazione(MultiDict({"pagina": "abc", "per_pagina": "10"})) == (1, 10)
+
+
+class TestCacheFrammenti:
+    """Test per la cache legata alla versione dei dati."""
+
+    @pytest.mark.unit
+    def test_versione_e_lru(self):
+        """Stessa versione = riuso, nuova versione = ricalcolo, capacità rispettata."""
+        cache = CacheFrammenti(capacita=2)
+        calcoli = []
+
+        def calcola(valore):
+            calcoli.append(valore)
+            return valore
+
+        assert cache.ottieni("a", 1, lambda: calcola("a1")) == "a1"
+        assert cache.ottieni("a", 1, lambda: calcola("a1bis")) == "a1"
+        assert cache.ottieni("a", 2, lambda: calcola("a2")) == "a2"
+        cache.ottieni("b", 2, lambda: calcola("b2"))
+        cache.ottieni("c", 2, lambda: calcola("c2"))
+
+        assert calcoli == ["a1", "a2", "b2", "c2"]
+        assert cache.statistiche()["voci"] == 2
+        assert cache.ottieni("a", 2, lambda: calcola("a2bis")) == "a2bis"
+
+
+class TestPagineERP:
+    """Test per le pagine HTML paginate dell'ERP."""
+
+    @pytest.mark.api
+    def test_studenti_paginati_e_filtrati(self, erp_con_studenti):
+        """La pagina mostra solo per_pagina studenti, filtri per classe e nome."""
+        erp, client = erp_con_studenti
+        html = client.get('/studenti?per_pagina=25&pagina=3').get_data(as_text=True)
+        assert "51-60 di 60" in html
+        assert html.count("<tr>") == 10 + 1  # righe + intestazione della sola classe 2B
+
+        html = client.get('/studenti?classe=2B').get_data(as_text=True)
+        assert "1-20 di 20" in html and "Classe 1A" not in html
+
+        studente = erp.anagrafica.studenti[5]
+        html = client.get(f'/studenti?q={studente.cognome.lower()}').get_data(as_text=True)
+        assert studente.cognome in html
+
+    @pytest.mark.api
+    def test_frammenti_invalidati_dai_dati(self, erp_con_studenti):
+        """Nuovi studenti e voti aggiornano le pagine, senza scritture si riusa la cache."""
+        erp, client = erp_con_studenti
+        client.get('/studenti?classe=2B')
+        mancati = erp._cache_pagine.mancati
+        client.get('/studenti?classe=2B')
+        assert erp._cache_pagine.mancati == mancati
+
+        erp.anagrafica.crea_studente_casuale("2B")
+        assert "1-21 di 21" in client.get('/studenti?classe=2B').get_data(as_text=True)
+
+        primo = erp.anagrafica.studenti[0]
+        erp.voti.aggiungi_voto(primo.id, "Matematica", 10.0)
+        html = client.get('/analisi?classe=1A').get_data(as_text=True)
+        assert "10.00" in html
+        assert html.index("#1<") < html.index(primo.nome_completo) < html.index("#2<")
+
+    @pytest.mark.api
+    def test_modifica_da_altro_worker(self, tmp_path, monkeypatch):
+        """Uno studente modificato su un altro worker non resta in cache con i vecchi dati."""
+        monkeypatch.chdir(tmp_path)
+        from wsgi import crea_app
+
+        percorso = str(tmp_path / "condiviso.db")
+        erp_a = crea_app(percorso, dati_demo=False, avvia_scheduler=False)
+        erp_b = crea_app(percorso, dati_demo=False, avvia_scheduler=False)
+        studente = erp_a.anagrafica.crea_studente_casuale("3C")
+        client_b = erp_b.app.test_client()
+        client_b.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        assert studente.cognome in client_b.get('/studenti?classe=3C').get_data(as_text=True)
+
+        # Stesso numero di studenti e nessun voto: solo la versione dello store cambia
+        studente.cognome = "Rinominato"
+        erp_a.stato_condiviso.studente_aggiunto(studente)
+        assert "Rinominato" in client_b.get('/studenti?classe=3C').get_data(as_text=True)
+
+    @pytest.mark.api
+    def test_pagelle_paginate(self, erp_con_studenti):
+        """Pagina /pagelle e API /api/pagelle?pagina= con metadati."""
+        erp, client = erp_con_studenti
+        for studente in erp.anagrafica.studenti[:30]:
+            erp.voti.aggiungi_voto(studente.id, "Italiano", 7.0)
+            erp.voti.crea_pagella(studente.id, 1)
+
+        assert "1-20 di 30" in client.get('/pagelle').get_data(as_text=True)
+        risposta = client.get('/api/pagelle?pagina=2&per_pagina=25').get_json()
+        assert (risposta["totale"], risposta["pagine"], len(risposta["pagelle"])) == (30, 2, 5)
+        assert len(client.get('/api/pagelle').get_json()) == 30
+
+
+class TestBenchmarkPagine:
+    """Test per il tempo di risposta al crescere della scuola."""
+
+    @pytest.mark.slow
+    def test_latenza_costante(self, tmp_path, monkeypatch):
+        """Con la cache calda la pagina costa come con pochi studenti."""
+        monkeypatch.chdir(tmp_path)
+        righe = benchmark_pagine(dimensioni=(100, 5000), ripetizioni=15)
+        mediane = {(r["studenti"], r["pagina"]): r["mediana_ms"] for r in righe}
+        for pagina in {r["pagina"] for r in righe}:
+            piccola, grande = mediane[(100, pagina)], mediane[(5000, pagina)]
+            assert grande < max(3 * piccola, piccola + 10)
@@ -0,0 +1,132 @@
+"""
+Test per la predizione in batch del motore predittivo.
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from ai.predictive_engine import (
+    FEATURE_BATCH, PredictiveEngine, genera_classi_sintetiche
+)
+
+
+CASI_LIMITE = [
+    ({}, []),
+    ({'fragilita': 70}, [6.0]),
+    ({'fragilita': 71, 'assenze_rate': 0.1}, [6.5, 6.0]),
+    ({'fragilita': 49, 'assenze_rate': 0.16, 'interventi_count': 4}, [5.5, 5.0, 4.5]),
+    ({'fragilita': 100, 'assenze_rate': 0.3}, [3.0, 3.0, 3.5, 3.0]),
+    ({'fragilita': 0}, [10, 10, 9, 10]),
+    ({'fragilita': 80}, [4.2, 5.7, 3.1]),
+]
+
+
+@pytest.fixture
+def motore():
+    return PredictiveEngine()
+
+
+class TestEquivalenzaBatch:
+    """Il calcolo in batch restituisce gli stessi risultati del calcolo per studente."""
+
+    @pytest.mark.unit
+    def test_casi_limite(self, motore):
+        """Soglie esatte, nessun voto, un solo voto, voti interi."""
+        studenti = [dati for dati, _ in CASI_LIMITE]
+        voti = [v for _, v in CASI_LIMITE]
+        attesi = [motore.predict_complete(d, v) for d, v in CASI_LIMITE]
+        assert motore.predict_batch(studenti, voti) == attesi
+
+    @pytest.mark.unit
+    def test_dati_sintetici(self, motore):
+        """Stessi PredictionResult e stesso early warning su 2000 studenti."""
+        classi = genera_classi_sintetiche(2000, seed=7)
+        studenti = [s for c in classi for s in c['studenti']]
+        voti = [s['voti'] for s in studenti]
+
+        attesi = [motore.predict_complete(s, v) for s, v in zip(studenti, voti)]
+        assert motore.predict_batch(studenti, voti) == attesi
+
+        warning = motore.early_warning_system(classi)
+        assert warning == motore._early_warning_per_studente(classi)
+        assert warning  # il campione contiene studenti a rischio
+
+    @pytest.mark.unit
+    def test_early_warning_vuoto(self, motore):
+        assert motore.early_warning_system([]) == []
+        assert motore.early_warning_system([{'classe': '1A', 'studenti': []}]) == []
+
+
+class TestMatriceFeature:
+    """Test per le feature calcolate in un passaggio."""
+
+    @pytest.mark.unit
+    def test_pendenza_e_varianza(self, motore):
+        """Pendenza e varianza coincidono con polyfit e var di NumPy."""
+        voti = [[5.0, 6.0, 7.5, 7.0], [8.0, 6.0], [6.0], []]
+        feature = motore.costruisci_feature([{}] * len(voti), voti)
+
+        assert feature.nomi == FEATURE_BATCH
+        assert feature.valori.shape == (4, len(FEATURE_BATCH))
+        for riga, lista in enumerate(voti):
+            if len(lista) >= 2:
+                pendenza = np.polyfit(np.arange(len(lista)), lista, 1)[0]
+                assert feature.colonna("pendenza")[riga] == pytest.approx(pendenza)
+            if lista:
+                assert feature.colonna("varianza")[riga] == pytest.approx(np.var(lista))
+        assert feature.colonna("pendenza")[2] == 0.0
+        assert list(feature.colonna("num_voti")) == [4, 2, 1, 0]
+        assert feature.colonna("fragilita")[3] == 50
+
+
+class TestEarlyWarningERP:
+    """Test per l'early warning servito dall'interfaccia."""
+
+    @pytest.mark.api
+    def test_api_early_warning(self, tmp_path, monkeypatch):
+        """L'API usa il calcolo in batch con i voti raggruppati per studente."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        erp.anagrafica.genera_studenti(10, classe="2A")
+        for studente in erp.anagrafica.studenti[:3]:
+            for voto in (9.0, 3.0):  # crollo: rischio oltre 60
+                erp.voti.aggiungi_voto(studente.id, "Matematica", voto)
+
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        dati = client.get('/api/ai/early-warning').get_json()
+
+        attesi = PredictiveEngine()._early_warning_per_studente(erp._dati_early_warning())
+        assert dati['totale_warning'] == len(attesi) == 3
+        assert dati['warning_list'] == attesi
+
+
+class TestBenchmarkBatch:
+    """Test per il tempo del calcolo in batch."""
+
+    @pytest.mark.slow
+    def test_batch_piu_veloce(self, motore):
+        """Con 10k studenti il batch costa una frazione del calcolo per studente."""
+        classi = genera_classi_sintetiche(10000)
+        studenti = [s for c in classi for s in c['studenti']]
+        voti = [s['voti'] for s in studenti]
+
+        def migliore(funzione):
+            tempi = []
+            for _ in range(3):
+                inizio = time.perf_counter()
+                funzione()
+                tempi.append(time.perf_counter() - inizio)
+            return min(tempi)
+
+        per_studente = migliore(lambda: motore._early_warning_per_studente(classi))
+        batch = migliore(lambda: motore.early_warning_system(classi))
+        assert batch < per_studente / 2
+
+        punteggi = migliore(lambda: motore.punteggi_batch(motore.costruisci_feature(studenti, voti)))
+        completa = migliore(lambda: [motore.predict_complete(s, v) for s, v in zip(studenti, voti)])
+        assert punteggi < completa / 3
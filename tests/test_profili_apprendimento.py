@@ -0,0 +1,187 @@
+"""
+Test per i profili di apprendimento (k-means sulle feature per studente).
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from amministrativa_school import AmministrativaSchool, TipoPresenza
+from anagrafica import Anagrafica
+from dati import CategoriaReddito, CondizioneSalute
+from profili_apprendimento import (
+    FEATURE_FISSE, ProfiliApprendimento, estrai_feature, kmeans, kmeans_minibatch, silhouette
+)
+from voti import GestioneVoti, Voto
+
+
+def genera_scuola(numero, seed=1):
+    """Metà studenti forti e costanti, metà deboli e in calo."""
+    casuale = random.Random(seed)
+    anagrafica, voti = Anagrafica(), GestioneVoti()
+    anagrafica.genera_studenti(numero)
+    elenco = []
+    for i, s in enumerate(anagrafica.studenti):
+        forte = i % 2 == 0
+        for prova in range(6):
+            base = 8.5 if forte else 5.5 - 0.3 * prova
+            elenco.append(Voto(s.id, ("Matematica", "Italiano")[prova % 2],
+                               round(min(10, max(3, base + casuale.gauss(0, 0.3))), 1), "scritto", "2025-11-03"))
+    voti.voti = elenco
+    return anagrafica, voti
+
+
+def purezza(etichette, vere):
+    """Quota di punti nel gruppo maggioritario della propria etichetta."""
+    return sum(np.bincount(vere[etichette == e]).max() for e in np.unique(etichette)) / len(vere)
+
+
+class TestFeature:
+    """Test per la matrice delle feature."""
+
+    @pytest.mark.unit
+    def test_feature_per_studente(self):
+        anagrafica, voti = Anagrafica(), GestioneVoti()
+        primo, secondo, senza_voti = anagrafica.genera_studenti(3)
+        for valore, materia in ((5.0, "Matematica"), (6.0, "Storia"), (7.0, "Matematica"), (9.0, "Matematica")):
+            voti.aggiungi_voto(primo.id, materia, valore)
+        voti.aggiungi_voto(secondo.id, "Storia", 8.0)
+        amministrativa = AmministrativaSchool()
+        for tipo in (TipoPresenza.PRESENTE, TipoPresenza.ASSENTE, TipoPresenza.PRESENTE, TipoPresenza.RITARDO):
+            amministrativa.registra_presenza(primo.id, tipo, data="2025-11-03")
+
+        matrice = estrai_feature(anagrafica, voti, amministrativa)
+        assert matrice.materie == ["Matematica", "Storia"]
+        assert matrice.nomi == ["media_Matematica", "media_Storia"] + FEATURE_FISSE
+        riga = dict(zip(matrice.nomi, matrice.valori[0]))
+        serie = [5.0, 6.0, 7.0, 9.0]
+        assert riga["media_Matematica"] == pytest.approx(7.0) and riga["media_Storia"] == pytest.approx(6.0)
+        assert riga["varianza"] == pytest.approx(np.var(serie))
+        assert riga["pendenza"] == pytest.approx(np.polyfit(range(4), serie, 1)[0])
+        assert riga["assenze"] == pytest.approx(0.25) and riga["fragilita"] == primo.fragilità_sociale
+
+        # Materia mancante: media dello studente; studente senza voti: media della scuola
+        assert matrice.valori[1, 0] == pytest.approx(8.0)
+        assert matrice.valori[2, :2] == pytest.approx([np.mean(serie + [8.0])] * 2)
+        assert matrice.num_voti.tolist() == [4, 1, 0]
+
+
+class TestKMeans:
+    """Test per gli algoritmi di raggruppamento."""
+
+    @pytest.mark.unit
+    def test_gruppi_separati(self):
+        rng = np.random.default_rng(0)
+        centri = np.array([[0, 0, 0], [6, 0, 0], [0, 6, 0], [0, 0, 6]], dtype=float)
+        vere = np.repeat(np.arange(4), 500)
+        Z = centri[vere] + rng.normal(0, 0.5, (2000, 3))
+
+        for algoritmo in (kmeans, kmeans_minibatch):
+            centroidi, etichette, inerzia, iterazioni = algoritmo(Z, 4, np.random.default_rng(1))
+            assert purezza(etichette, vere) > 0.99, algoritmo.__name__
+            assert inerzia == pytest.approx(((Z - centroidi[etichette]) ** 2).sum())
+        assert silhouette(Z, etichette, rng) > 0.7
+        assert silhouette(Z, np.zeros(len(Z), dtype=int), rng) is None
+
+
+class TestProfili:
+    """Test per profili, suggerimenti e assegnazione incrementale."""
+
+    @pytest.mark.unit
+    def test_profili_e_assegnazione(self):
+        anagrafica, voti = genera_scuola(200)
+        profili = ProfiliApprendimento(anagrafica, voti, k=2, seed=3)
+        statistiche = profili.addestra()
+        assert statistiche["studenti"] == 200 and statistiche["metodo"] == "lloyd"
+
+        forte, debole = profili.profili()
+        assert forte["numero_studenti"] == debole["numero_studenti"] == 100
+        assert forte["media_generale"] > 8 > 6 > debole["media_generale"]
+        assert debole["pendenza"] < 0 and "in calo" in debole["etichetta"]
+        assert set(debole["materie_deboli"]) == {"Matematica", "Italiano"}
+        assert any(a.startswith("Corsi di recupero") for a in debole["azioni_consigliate"])
+        assert profili.studenti_profilo(0, limite=5)[0]["id"] == anagrafica.studenti[0].id
+
+        # Nuovo studente assegnato senza riaddestrare
+        nuovo = anagrafica.genera_studenti(1)[0]
+        for _ in range(4):
+            voti.aggiungi_voto(nuovo.id, "Matematica", 9.0)
+        profilo = profili.profilo_studente(nuovo.id)
+        assert profilo["profilo"] == 0 and profilo["nuovo"]
+        assert not profili.profilo_studente(nuovo.id)["nuovo"]
+        assert profili.profilo_studente(999999) is None
+
+        centroide = profili.centroidi[1].copy()
+        altro = anagrafica.genera_studenti(1)[0]
+        for valore in (5.5, 5.0, 4.5, 4.0):
+            voti.aggiungi_voto(altro.id, "Italiano", valore)
+        assert profili.assegna([altro], aggiorna_centroidi=True) == {altro.id: 1}
+        assert not np.allclose(profili.centroidi[1], centroide)
+        with pytest.raises(ValueError):
+            profili.studenti_profilo(5)
+
+    @pytest.mark.unit
+    def test_intervento_e_riproducibilita(self):
+        anagrafica, voti = genera_scuola(120, seed=4)
+        for s in anagrafica.studenti[1::2]:
+            s.categoria_reddito, s.reddito_familiare = CategoriaReddito.MOLTO_BASSO, 5000
+            s.condizione_salute, s.situazione_familiare = CondizioneSalute.BUONA, "Affidamento"
+        primi = ProfiliApprendimento(anagrafica, voti, k=3, seed=9, metodo="minibatch", dimensione_batch=32)
+        secondi = ProfiliApprendimento(anagrafica, voti, k=3, seed=9, metodo="minibatch", dimensione_batch=32)
+        assert primi.profili() == secondi.profili()
+        assert primi.addestra()["metodo"] == "minibatch"
+
+        # Fragilità economica e familiare insieme: intervento completo
+        fragili = [p for p in primi.profili() if p["fragilita"] >= 60]
+        assert fragili and all(p["intervento_suggerito"] == "INTERVENTO_COMPLETO" for p in fragili)
+        assert all(p["componenti_fragilita"]["familiare"] == 1.0 for p in fragili)
+
+    @pytest.mark.slow
+    def test_scuola_grande(self):
+        """50.000 studenti raggruppati in pochi secondi."""
+        anagrafica, voti = Anagrafica(), GestioneVoti()
+        anagrafica.genera_studenti(50000)
+        generatore = np.random.default_rng(0)
+        valori = generatore.uniform(3, 10, 50000 * 8).round(1)
+        voti.voti = [Voto(s.id, ("Matematica", "Italiano", "Inglese", "Storia")[j % 4], float(valori[i * 8 + j]),
+                          "scritto", "2025-11-03")
+                     for i, s in enumerate(anagrafica.studenti) for j in range(8)]
+        statistiche = ProfiliApprendimento(anagrafica, voti, k=6).addestra()
+        assert statistiche["metodo"] == "minibatch" and statistiche["studenti"] == 50000
+        assert statistiche["tempo_ms"] < 10000
+
+
+class TestProfiliERP:
+    """Test per gli endpoint dei profili di apprendimento."""
+
+    @pytest.mark.api
+    def test_endpoint(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        for i, studente in enumerate(erp.anagrafica.genera_studenti(20, classe="2C")):
+            erp.voti.aggiungi_voto(studente.id, "Matematica", 4.0 if i % 2 else 9.0)
+
+        # Le GET non addestrano
+        assert client.get('/api/profili-apprendimento').status_code == 409
+        assert not erp.profili_apprendimento.addestrato
+
+        assert client.post('/api/profili-apprendimento/addestra', json={"k": 3}).get_json()["profili"] == 3
+        riepilogo = client.get('/api/profili-apprendimento?k=2').get_json()
+        assert riepilogo["statistiche"]["profili"] == 3 and len(riepilogo["profili"]) == 3
+        studente = erp.anagrafica.studenti[0]
+        profilo = client.get(f'/api/profili-apprendimento/studente/{studente.id}').get_json()
+        membri = client.get(f'/api/profili-apprendimento/{profilo["profilo"]}/studenti').get_json()
+        assert studente.id in {m["id"] for m in membri}
+        url_membri = f'/api/profili-apprendimento/{profilo["profilo"]}/studenti'
+        assert len(client.get(f'{url_membri}?limite=1').get_json()) == 1
+        for limite in ("0", "-5", "1001", "tutti"):
+            assert client.get(f'{url_membri}?limite={limite}').status_code == 400
+
+        assert client.post('/api/profili-apprendimento/addestra', json={"k": 2}).get_json()["profili"] == 2
+        assert client.get('/api/profili-apprendimento/studente/999999').status_code == 404
+        assert client.get('/api/profili-apprendimento/7/studenti').status_code == 404
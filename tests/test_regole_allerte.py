@@ -0,0 +1,177 @@
+"""
+Test per il motore di regole delle allerte.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from analytics_predittive import AnaliticaPredittiva
+from anagrafica import Anagrafica
+from insegnanti import GestioneInsegnanti
+from regole_allerte import ArchivioAllerte, MotoreRegoleAllerte, RegolaAllerta, carica_regole
+from voti import GestioneVoti
+
+
+INIZIO = datetime(2025, 11, 3, 6, 0)
+
+
+def regola_media(**campi):
+    """Regola sulla media generale con isteresi 0.2 e cooldown di un'ora."""
+    return RegolaAllerta(**{
+        "nome": "media_bassa", "metrica": "media_generale", "soglia": 6.0, "isteresi": 0.2,
+        "cooldown_secondi": 3600, "soglia_escalation": 5.5, **campi
+    })
+
+
+class TestMotoreRegole:
+    """Test per deduplicazione, isteresi e cooldown."""
+
+    @pytest.mark.unit
+    def test_deduplicazione_e_isteresi(self):
+        """Una sola allerta per (regola, ambito), aggiornata finché non rientra oltre l'isteresi."""
+        motore = MotoreRegoleAllerte([regola_media()])
+        assert len(motore.valuta({"media_generale": {"scuola": 5.8}}, ora=INIZIO)) == 1
+        assert motore.valuta({"media_generale": {"scuola": 5.8}}, ora=INIZIO) == []
+        assert motore.valuta({"media_generale": {"scuola": 5.4}}, ora=INIZIO) == []
+
+        [allerta] = motore.archivio.attive()
+        assert allerta.priorita == "alta" and allerta.dati_correlati["valore"] == 5.4
+
+        motore.valuta({"media_generale": {"scuola": 6.1}}, ora=INIZIO)
+        assert motore.archivio.numero_attive() == 1 and allerta.priorita == "media"
+        motore.valuta({"media_generale": {"scuola": 6.2}}, ora=INIZIO)
+        assert motore.archivio.numero_attive() == 0
+        assert allerta.risolta and allerta.data_risoluzione == INIZIO
+
+    @pytest.mark.unit
+    def test_cooldown(self):
+        """Dopo la risoluzione l'allerta si riapre solo a cooldown scaduto, anche senza nuovi valori."""
+        motore = MotoreRegoleAllerte([regola_media()])
+        motore.valuta({"media_generale": {"scuola": 5.8}}, ora=INIZIO)
+        motore.valuta({"media_generale": {"scuola": 6.5}}, ora=INIZIO)
+        assert motore.valuta({"media_generale": {"scuola": 5.7}}, ora=INIZIO + timedelta(minutes=30)) == []
+        assert motore.valuta({"media_generale": {"scuola": 5.7}}, ora=INIZIO + timedelta(minutes=50)) == []
+
+        [riaperta] = motore.valuta({"media_generale": {"scuola": 5.7}}, ora=INIZIO + timedelta(minutes=61))
+        assert riaperta.id == 2 and not riaperta.risolta
+
+        # Risoluzione manuale: anche qui vale il cooldown
+        motore.archivio.risolvi(riaperta.id, "Corsi di recupero avviati", ora=INIZIO + timedelta(hours=2))
+        assert motore.valuta({"media_generale": {"scuola": 5.6}}, ora=INIZIO + timedelta(hours=2, minutes=5)) == []
+        assert motore.archivio.trova(riaperta.id).note_azione == "Corsi di recupero avviati"
+
+    @pytest.mark.unit
+    def test_riapertura_dopo_risoluzione_manuale(self):
+        """Chiusa a mano con la condizione ancora vera, l'allerta si riapre a cooldown scaduto
+        anche se il valore non cambia."""
+        motore = MotoreRegoleAllerte([regola_media()])
+        [allerta] = motore.valuta({"media_generale": {"scuola": 5.8}}, ora=INIZIO)
+        assert motore.risolvi(allerta.id, "Colloqui", ora=INIZIO + timedelta(minutes=10)) is allerta
+        assert motore.risolvi(allerta.id) is None
+
+        assert motore.valuta({"media_generale": {"scuola": 5.8}}, ora=INIZIO + timedelta(minutes=30)) == []
+        [riaperta] = motore.valuta({"media_generale": {"scuola": 5.8}}, ora=INIZIO + timedelta(minutes=71))
+        assert riaperta.id != allerta.id and motore.statistiche()["in_cooldown"] == 0
+
+    @pytest.mark.unit
+    def test_solo_aggregati_cambiati(self):
+        """Gli ambiti con valore invariato non vengono rivalutati."""
+        regola = RegolaAllerta(nome="sbilanciata", metrica="scostamento", soglia=0.8, operatore=">", ambito="classe")
+        motore = MotoreRegoleAllerte([regola])
+        valori = {f"{n}A": 0.1 * n for n in range(1, 31)}
+        nuove = motore.valuta({"scostamento": valori}, ora=INIZIO)
+        assert sorted(a.ambito for a in nuove) == sorted(c for c, v in valori.items() if v > 0.8)
+        assert motore.applicazioni == 30
+
+        valori["1A"] = 1.5
+        del valori["30A"]
+        [nuova] = motore.valuta({"scostamento": valori}, ora=INIZIO)
+        assert nuova.ambito == "1A" and motore.applicazioni == 31
+        # Classe sparita: la sua allerta viene chiusa
+        assert motore.archivio.aperta("sbilanciata", "30A") is None
+
+    @pytest.mark.unit
+    def test_regole_da_json(self, tmp_path):
+        percorso = tmp_path / "regole.json"
+        percorso.write_text(json.dumps([regola_media(soglia=5.0).to_dict()]))
+        [regola] = carica_regole(str(percorso))
+        assert regola == regola_media(soglia=5.0)
+        assert carica_regole(str(tmp_path / "assente.json")) is None
+        with pytest.raises(ValueError):
+            RegolaAllerta(nome="x", metrica="y", soglia=1, operatore="=")
+
+
+class TestArchivioAllerte:
+    """Test per lo storico limitato e indicizzato."""
+
+    @pytest.mark.unit
+    def test_storico_limitato(self):
+        archivio = ArchivioAllerte(capacita_storico=3)
+        motore = MotoreRegoleAllerte([regola_media(cooldown_secondi=0)], archivio)
+        for passo in range(10):
+            motore.valuta({"media_generale": {"scuola": 5.0}}, ora=INIZIO + timedelta(minutes=2 * passo))
+            motore.valuta({"media_generale": {"scuola": 7.0}}, ora=INIZIO + timedelta(minutes=2 * passo + 1))
+
+        assert [a.id for a in archivio.risolte()] == [8, 9, 10]
+        assert archivio.trova(1) is None and archivio.scartate == 7
+        assert len(archivio) == 3
+
+
+class TestAllerteAnalitica:
+    """Test per genera_allerte_automatiche con le regole predefinite."""
+
+    @pytest.mark.unit
+    def test_nessun_duplicato(self):
+        anagrafica, voti, insegnanti = Anagrafica(), GestioneVoti(), GestioneInsegnanti()
+        for studente in anagrafica.genera_studenti(10, classe="1A"):
+            voti.aggiungi_voto(studente.id, "Matematica", 4.0)
+        for studente in anagrafica.genera_studenti(10, classe="2A"):
+            voti.aggiungi_voto(studente.id, "Matematica", 7.0)
+        analitica = AnaliticaPredittiva(anagrafica, voti, insegnanti)
+
+        nuove = analitica.genera_allerte_automatiche()
+        regole = {a.regola for a in nuove}
+        assert {"rendimento_generale", "studenti_rischio_critico", "classe_sbilanciata"} <= regole
+        assert analitica.genera_allerte_automatiche() == []
+        assert len(analitica.get_allerte()) == len(nuove)
+
+        # Medie risalite: le allerte di rendimento si chiudono
+        for studente in anagrafica.studenti_per_classe("1A"):
+            for _ in range(5):
+                voti.aggiungi_voto(studente.id, "Matematica", 9.0)
+        analitica.genera_allerte_automatiche()
+        attive = {(a["regola"], a["ambito"]) for a in analitica.get_allerte()}
+        assert ("rendimento_generale", "scuola") not in attive
+        assert ("studenti_rischio_critico", "scuola") not in attive
+        assert len(analitica.get_allerte(solo_attive=False)) == len(nuove)
+
+
+class TestAllerteERP:
+    """Test per la chiusura delle allerte via API."""
+
+    @pytest.mark.api
+    def test_risolvi_allerta(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        for studente in erp.anagrafica.genera_studenti(5, classe="3B"):
+            erp.voti.aggiungi_voto(studente.id, "Matematica", 4.0)
+
+        generate = client.post('/api/analytics/genera-allerte').get_json()["allerte_generate"]
+        assert generate > 0
+        assert client.post('/api/analytics/genera-allerte').get_json()["allerte_generate"] == 0
+
+        id_allerta = client.get('/api/analytics/allerte').get_json()[0]["id"]
+        risposta = client.post(f'/api/analytics/allerte/{id_allerta}/risolvi', json={"note_azione": "Colloqui"})
+        assert risposta.get_json()["allerta"]["note_azione"] == "Colloqui"
+        assert client.post(f'/api/analytics/allerte/{id_allerta}/risolvi').status_code == 404
+        assert len(client.get('/api/analytics/allerte').get_json()) == generate - 1
+
+        # Il nuovo modulo analytics conserva le allerte aperte
+        erp._init_analytics()
+        assert client.post('/api/analytics/genera-allerte').get_json()["allerte_generate"] == 0
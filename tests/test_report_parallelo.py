@@ -0,0 +1,129 @@
+"""
+Test per i report per classe in parallelo.
+"""
+
+import math
+
+import pytest
+
+from analytics_predittive import AnaliticaPredittiva
+from report import GeneratoreReport
+from report_parallelo import (
+    ReportParallelo, benchmark_report_classi, dividi_in_lotti, fotografa_classi, genera_distretto
+)
+
+
+@pytest.fixture(scope="module")
+def distretto():
+    """Distretto piccolo con una classe senza voti."""
+    anagrafica, voti = genera_distretto(numero_classi=12, studenti_per_classe=6, voti_per_studente=5)
+    anagrafica.genera_studenti(3, classe="Z9")
+    return anagrafica, voti
+
+
+def generatore(anagrafica, voti, analizzatore=None):
+    return GeneratoreReport(anagrafica, voti, None, None, None, report_parallelo=analizzatore)
+
+
+class TestFotografia:
+    """Test per la fotografia dei dati e la divisione in lotti."""
+
+    @pytest.mark.unit
+    def test_lotti_contigui(self, distretto):
+        fotografie = fotografa_classi(*distretto)
+        assert [f.classe for f in fotografie][-1] == "Z9"
+        assert sum(len(f.valori) for f in fotografie) == len(distretto[1].voti)
+        for numero in (1, 3, 5, 50):
+            lotti = dividi_in_lotti(fotografie, numero)
+            assert [f for lotto in lotti for f in lotto] == fotografie
+            assert len(lotti) <= max(1, numero)
+
+
+class TestReportClasse:
+    """I report calcolati dalla fotografia coincidono con il calcolo per studente."""
+
+    @pytest.mark.unit
+    def test_report_classe(self, distretto):
+        anagrafica, voti = distretto
+        report = generatore(anagrafica, voti, ReportParallelo(1)).report_classe("C003")
+        medie = [voti.media_studente(s.id) for s in anagrafica.studenti_per_classe("C003")]
+
+        assert report["numero_studenti"] == len(medie)
+        assert report["media_classe"] == round(sum(medie) / len(medie), 2)
+        assert [s["media"] for s in report["top_3_studenti"]] == sorted(round(m, 2) for m in medie)[::-1][:3]
+        assert generatore(anagrafica, voti).report_classe("ZZ") == {"errore": "Classe ZZ non trovata"}
+        assert generatore(anagrafica, voti).report_classe("Z9")["top_3_studenti"] == []
+
+    @pytest.mark.unit
+    def test_distribuzione_classi(self, distretto):
+        """_analizza_distribuzione_classi conserva medie, deviazione e ordine delle classi."""
+        anagrafica, voti = distretto
+        distribuzione = AnaliticaPredittiva(anagrafica, voti, None)._analizza_distribuzione_classi()
+        assert list(distribuzione) == list(dict.fromkeys(s.classe for s in anagrafica.studenti))
+
+        medie = [voti.media_studente(s.id) for s in anagrafica.studenti_per_classe("C007")]
+        media = sum(medie) / len(medie)
+        assert distribuzione["C007"]["media"] == media
+        assert distribuzione["C007"]["deviazione_standard"] == pytest.approx(
+            math.sqrt(sum((m - media) ** 2 for m in medie) / len(medie))
+        )
+        assert distribuzione["Z9"] == {"numero_studenti": 3, "media": 0.0, "deviazione_standard": 0.0,
+                                       "min": 0.0, "max": 0.0}
+
+
+class TestPool:
+    """Test per l'analisi distribuita sui processi."""
+
+    @pytest.mark.slow
+    def test_parallelo_uguale_a_seriale(self, distretto):
+        """Stessi report (e stesso ordine) con e senza pool."""
+        anagrafica, voti = distretto
+        pool = ReportParallelo(2, classi_minime=1, peso_minimo=0)
+        try:
+            paralleli = generatore(anagrafica, voti, pool)
+            seriali = generatore(anagrafica, voti, ReportParallelo(1))
+            assert paralleli._classi_performance() == seriali._classi_performance()
+
+            report_paralleli, report_seriali = paralleli.report_classi(), seriali.report_classi()
+            for report in (*report_paralleli.values(), *report_seriali.values()):
+                report.pop("data_generazione")
+            assert report_paralleli == report_seriali
+            assert list(report_paralleli) == sorted(report_paralleli)
+            assert pool.analisi_parallele == 2
+        finally:
+            pool.chiudi()
+
+    @pytest.mark.unit
+    def test_soglia_lavoro(self, distretto):
+        """Sotto la soglia di lavoro l'analisi resta nel processo corrente (nessun pool)."""
+        analizzatore = ReportParallelo(4)
+        generatore(*distretto, analizzatore).report_classi()
+        assert analizzatore.analisi_seriali == 1 and analizzatore._pool is None
+
+    @pytest.mark.slow
+    def test_benchmark(self):
+        risultato = benchmark_report_classi(numero_classi=20, studenti_per_classe=10, voti_per_studente=10,
+                                            processi=(1, 2), ripetizioni=1)
+        assert set(risultato["tempi_ms"]) == {1, 2}
+        assert risultato["speedup"][1] == 1.0
+
+
+class TestReportClassiERP:
+    """Test per l'endpoint dei report per classe."""
+
+    @pytest.mark.api
+    def test_endpoint(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        for classe in ("2B", "1A"):
+            for studente in erp.anagrafica.genera_studenti(3, classe=classe):
+                erp.voti.aggiungi_voto(studente.id, "Matematica", 6.5)
+
+        report = client.get('/api/report/classi?classi=2B,1A').get_json()
+        assert list(report) == ["1A", "2B"]
+        assert report["2B"]["media_classe"] == 6.5 and report["2B"]["medie_materie"] == {"Matematica": 6.5}
+        assert erp.report_parallelo._pool is None
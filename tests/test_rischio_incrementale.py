@@ -0,0 +1,190 @@
+"""
+Test per l'indice incrementale del rischio studenti.
+"""
+
+import copy
+import random
+
+import pytest
+
+from ai.modello_rischio import ModelloRischio, dati_predittivi_studente, genera_storico_sintetico
+from ai.predictive_engine import PredictiveEngine
+from analytics_predittive import AnaliticaPredittiva
+from anagrafica import Anagrafica
+from dati import CategoriaReddito, CondizioneSalute
+import rischio_incrementale
+from rischio_incrementale import IndiceRischio
+from voti import GestioneVoti, Voto
+
+
+def early_warning_completo(motore, anagrafica, voti):
+    """Ricalcolo completo, come InterfacciaERP._dati_early_warning."""
+    classi = {}
+    for studente in anagrafica.studenti:
+        dati = dati_predittivi_studente(studente)
+        dati['voti'] = [v.voto for v in voti.voti_studente(studente.id)]
+        classi.setdefault(studente.classe, {'classe': studente.classe, 'studenti': []})['studenti'].append(dati)
+    return motore.early_warning_system(list(classi.values()))
+
+
+@pytest.fixture
+def registro():
+    """Anagrafica e voti con studenti di rendimento molto diverso."""
+    casuale = random.Random(5)
+    anagrafica = Anagrafica()
+    voti = GestioneVoti()
+    for classe in ("2A", "1B", "3C"):
+        anagrafica.genera_studenti(25, classe=classe)
+    voti.aggiungi_voti([
+        Voto(s.id, "Matematica", round(casuale.uniform(3, 10), 1), "scritto", "2025-10-15")
+        for s in anagrafica.studenti for _ in range(casuale.randint(0, 6))
+    ])
+    return anagrafica, voti
+
+
+class TestEquivalenza:
+    """L'indice dà sempre gli stessi risultati del ricalcolo completo."""
+
+    @staticmethod
+    def _verifica(indice, motore, anagrafica, voti):
+        assert indice.early_warning() == early_warning_completo(motore, anagrafica, voti)
+        completa = AnaliticaPredittiva(anagrafica, voti, None)
+        incrementale = AnaliticaPredittiva(anagrafica, voti, None, indice_rischio=indice)
+        for soglia in (5.5, 6.0):
+            assert incrementale.identifica_studenti_rischio(soglia) == completa.identifica_studenti_rischio(soglia)
+
+    @pytest.mark.unit
+    def test_modifiche_casuali(self, registro):
+        """Voti, pagelle, fragilità, studenti e modello cambiati a caso."""
+        anagrafica, voti = registro
+        motore = PredictiveEngine()
+        indice = IndiceRischio(anagrafica, voti, motore)
+        casuale = random.Random(11)
+        self._verifica(indice, motore, anagrafica, voti)
+
+        for passo in range(40):
+            studente = casuale.choice(anagrafica.studenti)
+            operazione = passo % 6
+            if operazione == 0:
+                voti.aggiungi_voto(studente.id, "Italiano", round(casuale.uniform(3, 10), 1))
+            elif operazione == 1 and voti.voti:
+                voti.rimuovi_voto(casuale.choice(voti.voti))
+            elif operazione == 2:
+                voti.crea_pagella(studente.id, 1, assenze=casuale.randint(0, 60))
+            elif operazione == 3:
+                studente.categoria_reddito = casuale.choice(list(CategoriaReddito))
+                studente.condizione_salute = casuale.choice(list(CondizioneSalute))
+                anagrafica.notifica_osservatori("modificato", studente)
+            elif operazione == 4:
+                if casuale.random() < 0.5:
+                    anagrafica.rimuovi_studente(studente.id)
+                else:
+                    nuovo = anagrafica.crea_studente_casuale(classe=casuale.choice(["1B", "4D"]))
+                    voti.aggiungi_voto(nuovo.id, "Matematica", 3.5)
+            elif casuale.random() < 0.5:
+                studente.classe = casuale.choice(["2A", "1B", "3C", "5E"])
+                anagrafica.notifica_osservatori("modificato", studente)
+            else:
+                # Sostituzione in coda, come nella sincronizzazione dello store condiviso
+                sostituto = copy.copy(studente)
+                sostituto.condizione_salute = casuale.choice(list(CondizioneSalute))
+                anagrafica.studenti.remove(studente)
+                anagrafica.studenti.append(sostituto)
+                anagrafica.notifica_osservatori("modificato", sostituto)
+            self._verifica(indice, motore, anagrafica, voti)
+
+        studenti, serie, esiti = genera_storico_sintetico(500, seed=2)
+        modello = ModelloRischio()
+        modello.addestra(motore.costruisci_feature(studenti, serie).valori, esiti)
+        motore.imposta_modello_rischio(modello)
+        self._verifica(indice, motore, anagrafica, voti)
+
+        voti.azzera()
+        self._verifica(indice, motore, anagrafica, voti)
+
+
+class TestIncrementale:
+    """Test per il ricalcolo dei soli studenti modificati."""
+
+    @pytest.mark.unit
+    def test_solo_studenti_modificati(self, registro):
+        anagrafica, voti = registro
+        indice = IndiceRischio(anagrafica, voti, PredictiveEngine())
+        assert indice.sincronizza() == len(anagrafica)
+        assert indice.sincronizza() == 0
+
+        primo, secondo = anagrafica.studenti[:2]
+        voti.aggiungi_voto(primo.id, "Storia", 4.0)
+        voti.aggiungi_voto(primo.id, "Storia", 5.0)
+        voti.crea_pagella(secondo.id, 1)
+        assert indice.sincronizza() == 2
+
+        # Valori sempre diversi da quelli generati a caso
+        studente = anagrafica.studenti[10]
+        studente.categoria_reddito = next(c for c in CategoriaReddito if c != studente.categoria_reddito)
+        studente.condizione_salute = next(c for c in CondizioneSalute if c != studente.condizione_salute)
+        anagrafica.notifica_osservatori("modificato", studente)
+        assert indice.sincronizza() == 1
+        assert indice.statistiche()["ricalcoli_totali"] == len(anagrafica) + 3
+
+    @pytest.mark.unit
+    def test_lettura_senza_modifiche_non_scorre_anagrafica(self, registro, monkeypatch):
+        """Le letture ripetute toccano solo gli indici; un evento riconcilia solo il suo studente."""
+        anagrafica, voti = registro
+        indice = IndiceRischio(anagrafica, voti, PredictiveEngine())
+        indice.early_warning(limite=10)
+        chiamate = []
+        originale = rischio_incrementale.impronta_studente
+        monkeypatch.setattr(rischio_incrementale, "impronta_studente",
+                            lambda studente: chiamate.append(studente.id) or originale(studente))
+
+        for _ in range(3):
+            indice.early_warning(limite=10)
+            indice.totale_early_warning()
+            indice.candidati_rischio()
+        assert chiamate == []
+
+        studente = anagrafica.studenti[5]
+        studente.condizione_salute = next(c for c in CondizioneSalute if c != studente.condizione_salute)
+        anagrafica.notifica_osservatori("modificato", studente)
+        nuovo = anagrafica.crea_studente_casuale(classe=studente.classe)
+        assert indice.sincronizza() == 2
+        assert sorted(chiamate) == sorted([studente.id, nuovo.id])
+
+    @pytest.mark.unit
+    def test_primi_n(self, registro):
+        """I primi N sono il prefisso della lista completa."""
+        anagrafica, voti = registro
+        for studente in anagrafica.genera_studenti(12, classe="4D"):
+            voti.aggiungi_voti([Voto(studente.id, "Fisica", voto, "scritto", "2025-11-02") for voto in (9.0, 3.0)])
+        indice = IndiceRischio(anagrafica, voti, PredictiveEngine())
+
+        tutti = indice.early_warning()
+        assert len(tutti) >= 12 and indice.totale_early_warning() == len(tutti)
+        assert indice.early_warning(limite=5) == tutti[:5]
+        assert indice.early_warning(limite=0) == []
+
+
+class TestEarlyWarningERP:
+    """Test per l'endpoint early warning basato sull'indice."""
+
+    @pytest.mark.api
+    def test_endpoint_con_limite(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        for studente in erp.anagrafica.genera_studenti(8, classe="2F"):
+            for voto in (9.0, 3.0):
+                erp.voti.aggiungi_voto(studente.id, "Matematica", voto)
+
+        dati = client.get('/api/ai/early-warning?limite=3').get_json()
+        assert dati["warning_list"] == early_warning_completo(erp.motore_predittivo, erp.anagrafica, erp.voti)[:3]
+        assert dati["totale_warning"] >= 8
+
+        ricalcoli = erp.indice_rischio.ricalcoli_totali
+        erp.voti.aggiungi_voto(erp.anagrafica.studenti[0].id, "Matematica", 10.0)
+        client.get('/api/ai/early-warning')
+        assert erp.indice_rischio.ricalcoli_totali == ricalcoli + 1
@@ -0,0 +1,219 @@
+"""
+Test per i rollup incrementali dei grafici della dashboard.
+"""
+
+import copy
+from datetime import date, timedelta
+
+import pytest
+
+from amministrativa_school import AmministrativaSchool, TipoPresenza
+from anagrafica import Anagrafica
+from rollup_grafici import RollupPresenze, RollupVoti, inizio_periodo, periodi_tra
+from voti import GestioneVoti
+
+
+OGGI = date(2025, 10, 29)  # mercoledì
+
+
+@pytest.fixture
+def registro():
+    """Anagrafica con due classi, voti e presenze vuoti."""
+    anagrafica = Anagrafica()
+    anagrafica.crea_studente_casuale("1A")
+    anagrafica.crea_studente_casuale("1A")
+    anagrafica.crea_studente_casuale("2B")
+    return anagrafica, GestioneVoti(), AmministrativaSchool()
+
+
+class TestPeriodi:
+    """Test per il calcolo dei bucket temporali."""
+
+    @pytest.mark.unit
+    def test_inizio_periodo(self):
+        """Settimane dal lunedì, mesi come AAAA-MM."""
+        assert inizio_periodo(OGGI, "giorno") == "2025-10-29"
+        assert inizio_periodo(OGGI, "settimana") == "2025-10-27"
+        assert inizio_periodo(OGGI, "mese") == "2025-10"
+
+    @pytest.mark.unit
+    def test_periodi_tra(self):
+        """I periodi sono consecutivi e senza duplicati."""
+        assert periodi_tra(date(2025, 11, 28), date(2026, 2, 2), "mese") == ["2025-11", "2025-12", "2026-01", "2026-02"]
+        assert periodi_tra(OGGI, OGGI + timedelta(days=7), "settimana") == ["2025-10-27", "2025-11-03"]
+        assert len(periodi_tra(OGGI - timedelta(days=29), OGGI, "giorno")) == 30
+
+
+class TestRollupVoti:
+    """Test per le medie per periodo, classe e materia."""
+
+    @pytest.mark.unit
+    def test_medie_coincidono_con_ricalcolo(self, registro):
+        """Le medie incrementali coincidono con il calcolo diretto."""
+        anagrafica, voti, _ = registro
+        rollup = RollupVoti(voti, anagrafica)
+        for i in range(30):
+            studente = anagrafica.studenti[i % 3]
+            giorno = (OGGI - timedelta(days=i)).isoformat()
+            voti.aggiungi_voto(studente.id, ["Matematica", "Storia"][i % 2], 4 + i % 7, data=giorno)
+
+        serie = rollup.ultimi_periodi("settimana", 6, fino_a=OGGI)
+        for periodo, media in zip(serie["labels"], serie["medie"]):
+            attesi = [v.voto for v in voti.voti if inizio_periodo(date.fromisoformat(v.data), "settimana") == periodo]
+            assert media == (round(sum(attesi) / len(attesi), 2) if attesi else None)
+
+        voti_1a = [v.voto for v in voti.voti if v.id_studente in (1, 2) and v.materia == "Storia"]
+        assert rollup.media("totale", "tutto", "1A", "Storia") == pytest.approx(sum(voti_1a) / len(voti_1a))
+
+    @pytest.mark.unit
+    def test_rimozione_e_azzeramento(self, registro):
+        """Rimozioni e azzeramenti si riflettono nei rollup."""
+        anagrafica, voti, _ = registro
+        rollup = RollupVoti(voti, anagrafica)
+        v1 = voti.aggiungi_voto(1, "Matematica", 4.0, data=OGGI.isoformat())
+        voti.aggiungi_voto(1, "Matematica", 8.0, data=OGGI.isoformat())
+        voti.rimuovi_voto(v1)
+
+        assert rollup.media("giorno", OGGI.isoformat()) == 8.0
+        voti.azzera()
+        assert rollup.media("giorno", OGGI.isoformat()) is None
+        assert rollup.voti_registrati == 0
+
+    @pytest.mark.unit
+    def test_collega_sostituisce_osservatore(self, registro):
+        """Ricollegando a un'altra GestioneVoti la precedente non è più osservata."""
+        anagrafica, voti, _ = registro
+        rollup = RollupVoti(voti, anagrafica)
+        nuovi = GestioneVoti()
+        nuovi.aggiungi_voto(3, "Inglese", 9.0, data=OGGI.isoformat())
+        rollup.collega(nuovi, anagrafica)
+        voti.aggiungi_voto(3, "Inglese", 3.0, data=OGGI.isoformat())
+
+        assert rollup.medie_per("classe") == {"2B": 9.0}
+        assert voti.osservatori == []
+
+    @pytest.mark.unit
+    def test_ricostruzione_con_modifiche_concorrenti(self, registro):
+        """Durante la ricostruzione i lettori vedono il rollup precedente e nessun voto è contato due volte."""
+        anagrafica, voti, _ = registro
+        giorno = OGGI.isoformat()
+        da_rimuovere = voti.aggiungi_voto(1, "Matematica", 4.0, data=giorno)
+        voti.aggiungi_voto(1, "Matematica", 6.0, data=giorno)
+        rollup = RollupVoti(voti, anagrafica)
+        classe_originale = rollup._classi.classe
+        letture = []
+
+        def classe_con_modifiche(id_studente):
+            if not letture:
+                letture.append(rollup.media("giorno", giorno))
+                voti.aggiungi_voto(2, "Matematica", 10.0, data=giorno)
+                voti.rimuovi_voto(da_rimuovere)
+            return classe_originale(id_studente)
+
+        rollup._classi.classe = classe_con_modifiche
+        rollup.ricostruisci()
+
+        assert letture == [5.0]
+        assert rollup.media("giorno", giorno) == 8.0
+        assert rollup.voti_registrati == 2
+        assert rollup._in_attesa is None
+
+    @pytest.mark.unit
+    def test_cambio_classe_studente(self, registro):
+        """I voti successivi a un cambio di classe finiscono nella nuova classe."""
+        anagrafica, voti, _ = registro
+        rollup = RollupVoti(voti, anagrafica)
+        voti.aggiungi_voto(1, "Storia", 6.0, data=OGGI.isoformat())
+
+        anagrafica.studenti[0].classe = "2B"
+        voti.aggiungi_voto(1, "Storia", 8.0, data=OGGI.isoformat())
+        assert rollup.medie_per("classe") == {"1A": 6.0, "2B": 8.0}
+
+        # Studente sostituito (es. dallo store condiviso): la cache viene invalidata
+        sostituto = copy.copy(anagrafica.studenti[1])
+        sostituto.classe = "3C"
+        anagrafica.studenti[1] = sostituto
+        anagrafica.notifica_osservatori("modificato", sostituto)
+        voti.aggiungi_voto(2, "Storia", 7.0, data=OGGI.isoformat())
+        assert rollup.medie_per("classe")["3C"] == 7.0
+
+        rollup.collega(voti, anagrafica)
+        assert len(anagrafica.osservatori) == 1
+
+    @pytest.mark.unit
+    def test_spostamento_poi_rimozione(self, registro):
+        """Dopo un cambio di classe notificato e una rimozione il rollup coincide con la ricostruzione."""
+        anagrafica, voti, _ = registro
+        rollup = RollupVoti(voti, anagrafica)
+        da_rimuovere = voti.aggiungi_voto(1, "Storia", 8.0, data=OGGI.isoformat())
+        voti.aggiungi_voto(3, "Storia", 4.0, data=OGGI.isoformat())
+        assert rollup.medie_per("classe") == {"1A": 8.0, "2B": 4.0}
+
+        anagrafica.studenti[0].classe = "2B"
+        anagrafica.notifica_osservatori("modificato", anagrafica.studenti[0])
+        assert rollup.medie_per("classe") == {"2B": 6.0}
+
+        voti.rimuovi_voto(da_rimuovere)
+        assert rollup.medie_per("classe") == {"2B": 4.0}
+        assert rollup.voti_registrati == 1
+
+        # Spostamento non notificato: la rimozione toglie dalla classe in cui il voto era contato
+        altro = voti.aggiungi_voto(2, "Storia", 10.0, data=OGGI.isoformat())
+        anagrafica.studenti[1].classe = "2B"
+        voti.rimuovi_voto(altro)
+        assert rollup.medie_per("classe") == {"2B": 4.0}
+        rollup.ricostruisci()
+        assert rollup.medie_per("classe") == {"2B": 4.0}
+
+
+class TestRollupPresenze:
+    """Test per i tassi di presenza giornalieri."""
+
+    @pytest.mark.unit
+    def test_tasso_presenza_per_classe(self, registro):
+        """Ritardi contano come presenze, assenze (anche giustificate) no."""
+        anagrafica, _, amministrativa = registro
+        rollup = RollupPresenze(amministrativa, anagrafica)
+        giorno = OGGI.isoformat()
+        amministrativa.registra_presenza(1, TipoPresenza.PRESENTE, data=giorno)
+        amministrativa.registra_presenza(2, TipoPresenza.RITARDO, data=giorno)
+        amministrativa.registra_presenza(3, TipoPresenza.ASSENTE, data=giorno)
+
+        serie = rollup.serie_giornaliera(OGGI - timedelta(days=1), OGGI)
+        assert serie["tasso_presenza"] == [None, pytest.approx(66.67)]
+        assert rollup.serie_giornaliera(OGGI, OGGI, classe="1A")["tasso_presenza"] == [100.0]
+        assert rollup.totali_per_classe(OGGI, OGGI) == {
+            "1A": {"presenti": 2, "assenti": 0, "ritardi": 1},
+            "2B": {"presenti": 0, "assenti": 1, "ritardi": 0}
+        }
+
+
+class TestEndpointGrafici:
+    """Test per gli endpoint dei grafici dell'ERP."""
+
+    @pytest.mark.api
+    def test_grafici_da_dati_reali(self, tmp_path, monkeypatch):
+        """Dashboard e /api/grafici riflettono voti e presenze inseriti."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        studente = erp.anagrafica.crea_studente_casuale("9Z")
+        oggi = date.today().isoformat()
+        erp.voti.aggiungi_voto(studente.id, "Fisica", 7.0, data=oggi)
+        erp.voti.aggiungi_voto(studente.id, "Fisica", 9.0, data=oggi)
+        erp.amministrativa.registra_presenza(studente.id, TipoPresenza.ASSENTE, data=oggi)
+
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+        andamento = client.get('/api/grafici/andamento?granularita=giorno&periodi=3&classe=9Z&materia=Fisica').get_json()
+        assert andamento["medie"] == [None, None, 8.0]
+
+        presenze = erp._calcola_presenze_chart()
+        indice = presenze["labels"].index("9Z")
+        assert presenze["assenze"][indice] == 1
+        assert presenze["tasso_presenza"][indice] == 0.0
+
+        assert client.get('/api/grafici/andamento?granularita=anno').status_code == 400
+        assert erp.analytics.get_trend_rendimento(7).valori[-1] == pytest.approx(8.0, abs=2)
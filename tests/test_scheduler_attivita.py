@@ -0,0 +1,264 @@
+"""
+Test per lo scheduler delle attività periodiche.
+"""
+
+import multiprocessing
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from backup_registro import GestoreBackup
+from scheduler_attivita import SchedulerAttivita, SpecificaCron, LockFile
+
+
+def _conta_esecuzione(percorso_contatore):
+    """Appende una riga al file contatore (usata tra processi)."""
+    with open(percorso_contatore, 'a') as f:
+        f.write(f"{os.getpid()}\n")
+
+
+def _processo_scheduler(directory, percorso_contatore, ora_iso):
+    """Esegue un giro di scheduler in un processo separato."""
+    scheduler = SchedulerAttivita(directory)
+    scheduler.registra("backup", lambda: _conta_esecuzione(percorso_contatore), "0 2 * * *")
+    scheduler.esegui_pendenti(datetime.fromisoformat(ora_iso))
+
+
+@pytest.fixture
+def orologio():
+    """Orologio controllabile dai test."""
+    class Orologio:
+        def __init__(self):
+            self.ora = datetime(2025, 10, 27, 1, 0)
+
+        def __call__(self):
+            return self.ora
+
+    return Orologio()
+
+
+class TestSpecificaCron:
+    """Test per l'interprete delle specifiche cron."""
+
+    @pytest.mark.unit
+    def test_prossima_giornaliera(self):
+        """Test slot giornaliero."""
+        cron = SpecificaCron("30 2 * * *")
+        assert cron.prossima(datetime(2025, 10, 27, 1, 0)) == datetime(2025, 10, 27, 2, 30)
+        assert cron.prossima(datetime(2025, 10, 27, 2, 30)) == datetime(2025, 10, 28, 2, 30)
+
+    @pytest.mark.unit
+    def test_giorni_settimana_e_passi(self):
+        """Test range di giorni e passi sui minuti."""
+        cron = SpecificaCron("*/15 8-9 * * 1-5")
+        # Sabato 1 novembre 2025 -> lunedì 3 novembre alle 8:00
+        assert cron.prossima(datetime(2025, 11, 1, 10, 0)) == datetime(2025, 11, 3, 8, 0)
+        assert cron.prossima(datetime(2025, 11, 3, 8, 0)) == datetime(2025, 11, 3, 8, 15)
+
+    @pytest.mark.unit
+    def test_precedente_e_alias(self):
+        """Test slot precedente con alias @monthly."""
+        cron = SpecificaCron("@monthly")
+        assert cron.precedente(datetime(2025, 10, 15, 12, 0)) == datetime(2025, 10, 1, 0, 0)
+        assert cron.precedente(datetime(2025, 10, 1, 0, 0)) == datetime(2025, 10, 1, 0, 0)
+
+    @pytest.mark.unit
+    def test_espressione_non_valida(self):
+        """Test validazione."""
+        with pytest.raises(ValueError):
+            SpecificaCron("61 * * * *")
+        with pytest.raises(ValueError):
+            SpecificaCron("* * *")
+
+
+class TestSchedulerAttivita:
+    """Test per SchedulerAttivita."""
+
+    @pytest.mark.unit
+    def test_primo_giro_non_esegue_e_poi_esegue(self, tmp_path, orologio):
+        """Il primo giro registra il riferimento, lo slot successivo esegue."""
+        chiamate = []
+        scheduler = SchedulerAttivita(str(tmp_path), orologio=orologio)
+        scheduler.registra("backup", lambda: chiamate.append(1), "0 2 * * *")
+
+        assert scheduler.esegui_pendenti() == []
+        orologio.ora = datetime(2025, 10, 27, 2, 0)
+        esecuzioni = scheduler.esegui_pendenti()
+
+        assert len(esecuzioni) == 1
+        assert esecuzioni[0].esito == "ok"
+        assert chiamate == [1]
+        # Stesso slot: nessuna nuova esecuzione
+        assert scheduler.esegui_pendenti() == []
+
+    @pytest.mark.unit
+    def test_recupero_esecuzioni_mancate(self, tmp_path, orologio):
+        """Più slot persi vengono recuperati con una sola esecuzione."""
+        chiamate = []
+        scheduler = SchedulerAttivita(str(tmp_path), orologio=orologio)
+        scheduler.registra("backup", lambda: chiamate.append(1), "0 2 * * *")
+        scheduler.esegui_pendenti()
+
+        # Processo spento per tre giorni
+        orologio.ora = datetime(2025, 10, 30, 9, 0)
+        scheduler.esegui_pendenti()
+        scheduler.esegui_pendenti()
+
+        assert chiamate == [1]
+        assert scheduler.storico("backup")[0]["slot"] == "2025-10-30T02:00:00"
+
+    @pytest.mark.unit
+    def test_slot_perso_senza_recupero(self, tmp_path, orologio):
+        """Senza recupero uno slot troppo vecchio viene saltato."""
+        chiamate = []
+        scheduler = SchedulerAttivita(str(tmp_path), orologio=orologio)
+        scheduler.registra("digest", lambda: chiamate.append(1), "0 2 * * *",
+                           recupera_mancate=False, tolleranza_secondi=60)
+        scheduler.esegui_pendenti()
+
+        orologio.ora = datetime(2025, 10, 27, 5, 0)
+        esecuzioni = scheduler.esegui_pendenti()
+
+        assert chiamate == []
+        assert esecuzioni[0].esito == "saltata"
+
+    @pytest.mark.unit
+    def test_jitter_deterministico(self, tmp_path, orologio):
+        """Il jitter ritarda l'esecuzione in modo identico tra istanze."""
+        scheduler = SchedulerAttivita(str(tmp_path), orologio=orologio)
+        attivita = scheduler.registra("backup", lambda: None, "0 2 * * *", jitter_secondi=600)
+        slot = datetime(2025, 10, 27, 2, 0)
+
+        previsto = scheduler._istante_previsto(attivita, slot)
+        assert slot <= previsto <= slot + timedelta(seconds=600)
+        assert previsto == SchedulerAttivita(str(tmp_path))._istante_previsto(attivita, slot)
+
+    @pytest.mark.unit
+    def test_errore_registrato_nello_storico(self, tmp_path, orologio):
+        """Gli errori non fermano lo scheduler e finiscono nello storico."""
+        def fallisce():
+            raise RuntimeError("disco pieno")
+
+        scheduler = SchedulerAttivita(str(tmp_path), orologio=orologio)
+        scheduler.registra("backup", fallisce, "0 2 * * *")
+        scheduler.esegui_pendenti()
+        orologio.ora = datetime(2025, 10, 27, 2, 0)
+        scheduler.esegui_pendenti()
+
+        stats = scheduler.statistiche()["backup"]
+        assert stats["errori"] == 1
+        assert stats["ultimo_esito"] == "errore"
+        assert "disco pieno" in scheduler.storico("backup")[0]["errore"]
+
+    @pytest.mark.unit
+    def test_lock_impedisce_esecuzione_concorrente(self, tmp_path, orologio):
+        """Se un altro processo possiede il lock l'attività non parte."""
+        chiamate = []
+        scheduler = SchedulerAttivita(str(tmp_path), orologio=orologio)
+        scheduler.registra("backup", lambda: chiamate.append(1), "0 2 * * *")
+        scheduler.esegui_pendenti()
+        orologio.ora = datetime(2025, 10, 27, 2, 0)
+
+        lock = LockFile(str(tmp_path / "backup.lock"))
+        assert lock.acquisisci()
+        try:
+            assert scheduler.esegui_pendenti() == []
+        finally:
+            lock.rilascia()
+
+        assert len(scheduler.esegui_pendenti()) == 1
+        assert chiamate == [1]
+
+    @pytest.mark.unit
+    def test_attivita_pesanti_non_si_sovrappongono(self, tmp_path, orologio):
+        """Un'attività pesante attende la fine della manutenzione in corso."""
+        chiamate = []
+        scheduler = SchedulerAttivita(str(tmp_path), orologio=orologio)
+        scheduler.registra("pulizia", lambda: chiamate.append(1), "0 2 * * *", pesante=True)
+        scheduler.esegui_pendenti()
+        orologio.ora = datetime(2025, 10, 27, 2, 0)
+
+        lock = LockFile(str(tmp_path / "_manutenzione.lock"))
+        lock.acquisisci()
+        try:
+            assert scheduler.esegui_pendenti() == []
+        finally:
+            lock.rilascia()
+
+        assert len(scheduler.esegui_pendenti()) == 1
+
+    @pytest.mark.slow
+    def test_single_flight_tra_processi(self, tmp_path):
+        """Più processi sullo stesso slot eseguono l'attività una sola volta."""
+        directory = str(tmp_path / "stato")
+        contatore = str(tmp_path / "contatore.txt")
+
+        # Riferimento iniziale
+        _processo_scheduler(directory, contatore, "2025-10-27T01:00:00")
+
+        processi = [
+            multiprocessing.Process(
+                target=_processo_scheduler,
+                args=(directory, contatore, "2025-10-27T02:05:00")
+            )
+            for _ in range(6)
+        ]
+        for p in processi:
+            p.start()
+        for p in processi:
+            p.join(30)
+
+        with open(contatore) as f:
+            righe = f.read().splitlines()
+        assert len(righe) == 1
+
+
+class TestPuliziaBackup:
+    """Test per la pulizia pianificata dei backup."""
+
+    @pytest.mark.unit
+    def test_conservazione_per_tipo(self, tmp_path):
+        """I backup settimanali e mensili sopravvivono ai 30 giorni dei giornalieri."""
+        gestore = GestoreBackup(str(tmp_path / "backup"))
+        adesso = datetime.now()
+
+        def crea(tipo, giorni_fa):
+            data = adesso - timedelta(days=giorni_fa)
+            percorso = gestore.directory_backup / tipo / f"backup_{data.strftime('%Y%m%d_%H%M%S')}.json"
+            percorso.write_text("{}")
+            os.utime(percorso, (data.timestamp(), data.timestamp()))
+            return percorso.name
+
+        giornalieri = [crea("giornalieri", g) for g in (1, 10, 29, 31, 60)]
+        settimanali = [crea("settimanali", 7 * s) for s in range(1, 11)]
+        mensili = [crea("mensili", 30 * m) for m in range(1, 15)]
+
+        assert gestore.pulizia_backup_vecchi() == 2 + 2 + 2
+
+        def rimasti(tipo):
+            return sorted(p.name for p in (gestore.directory_backup / tipo).glob("backup_*.json"))
+
+        assert rimasti("giornalieri") == sorted(giornalieri[:3])
+        assert rimasti("settimanali") == sorted(settimanali[:8])
+        assert rimasti("mensili") == sorted(mensili[:12])
+
+
+class TestDigestDirigenza:
+    """Test per il riepilogo giornaliero inviato dallo scheduler."""
+
+    @pytest.mark.api
+    def test_digest_leggibile_dal_dirigente(self, tmp_path, monkeypatch):
+        """Il digest è indirizzato al dirigente e compare nelle sue comunicazioni."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        erp._init_analytics()
+        inviati = erp._invia_digest_dirigenza()
+        assert [(c.destinatario_id, c.destinatario_tipo) for c in inviati] == [(1, "dirigente")]
+
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'dirigente', 'password': 'dirigente123'})
+        oggetti = [c["oggetto"] for c in client.get('/api/comunicazioni').get_json()]
+        assert inviati[0].oggetto in oggetti
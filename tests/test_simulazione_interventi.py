@@ -0,0 +1,165 @@
+"""
+Test per la simulazione Monte Carlo degli interventi e l'ottimizzazione del budget.
+"""
+
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from anagrafica import Anagrafica
+from interventi import IntensitàIntervento, SimulatoreInterventi, TipoIntervento
+from simulazione_interventi import OPZIONI, SimulatoreMonteCarlo, alloca_budget
+from voti import GestioneVoti, Voto
+
+
+@pytest.fixture
+def scuola():
+    casuale = random.Random(5)
+    anagrafica, voti = Anagrafica(), GestioneVoti()
+    anagrafica.genera_studenti(40, classe="2B")
+    voti.aggiungi_voti([
+        Voto(s.id, "Matematica", round(casuale.uniform(4, 8), 1), "scritto", "2025-11-03")
+        for s in anagrafica.studenti for _ in range(3)
+    ])
+    return anagrafica, voti
+
+
+def ottimo_esatto(guadagni, costi, budget):
+    """Zaino a scelta multipla per enumerazione (istanze piccole)."""
+    migliore = 0.0
+    for scelte in itertools.product(range(-1, len(costi)), repeat=len(guadagni)):
+        costo = sum(costi[o] for o in scelte if o >= 0)
+        if costo <= budget:
+            migliore = max(migliore, sum(guadagni[s][o] for s, o in enumerate(scelte) if o >= 0))
+    return migliore
+
+
+class TestAllocazione:
+    """Test per l'allocazione greedy del budget."""
+
+    @pytest.mark.unit
+    def test_vicino_all_ottimo(self):
+        casuale = random.Random(11)
+        costi = [100, 250, 400, 700]
+        for _ in range(30):
+            guadagni = [[casuale.uniform(0, 2) * c ** 0.5 for c in costi] for _ in range(4)]
+            budget = casuale.choice([0, 150, 500, 900, 1500, 5000])
+            scelte = alloca_budget(guadagni, costi, budget)
+
+            assert sum(costi[o] for o in scelte if o >= 0) <= budget
+            ottenuto = sum(guadagni[s][o] for s, o in enumerate(scelte) if o >= 0)
+            # Greedy sul rilassamento: al più un passo di distanza dall'ottimo
+            assert ottenuto >= ottimo_esatto(guadagni, costi, budget) - max(map(max, guadagni)) - 1e-9
+
+    @pytest.mark.unit
+    def test_opzioni_dominate_e_budget_nullo(self):
+        costi = [100, 200, 300]
+        assert alloca_budget([[1.0, 0.5, 3.0]], costi, 0) == [-1]
+        # L'opzione da 200 rende meno di quella da 100: mai scelta
+        assert alloca_budget([[1.0, 0.5, 3.0]], costi, 250) == [0]
+        assert alloca_budget([[1.0, 0.5, 3.0]], costi, 300) == [2]
+        assert alloca_budget([[0.0, 0.0, 0.0]], costi, 1000) == [-1]
+        assert alloca_budget(np.zeros((0, 3)), costi, 1000) == []
+
+
+class TestSimulazione:
+    """Test per il campionamento dell'effetto degli interventi."""
+
+    @pytest.mark.unit
+    def test_senza_incertezza_uguale_al_deterministico(self, scuola):
+        anagrafica, voti = scuola
+        studente = anagrafica.studenti[0]
+        simulatore = SimulatoreMonteCarlo(anagrafica, voti, simulazioni=20, incertezza=0.0, seed=1)
+        matrice = simulatore.guadagni_attesi([studente])
+        deterministico = SimulatoreInterventi(anagrafica, voti)
+        for colonna, (tipo, intensità) in enumerate(OPZIONI):
+            atteso = deterministico.simula_intervento_studente(studente, tipo, intensità)
+            assert round(matrice.guadagni[0, colonna], 2) == atteso.miglioramento_voti
+            assert matrice.costi[colonna] == atteso.costo_stimato
+
+    @pytest.mark.unit
+    def test_intervalli_e_riproducibilita(self, scuola):
+        anagrafica, voti = scuola
+        simulatore = SimulatoreMonteCarlo(anagrafica, voti, simulazioni=400, seed=3, dimensione_blocco=16)
+        scenario = simulatore.simula_intervento_classe("2B", TipoIntervento.SUPPORTO_FAMILIARE,
+                                                       IntensitàIntervento.ALTA)
+        basso, alto = scenario["intervallo_90_voti"]
+        assert basso < scenario["miglioramento_voti_medio"] < alto
+        assert len(scenario["studenti"]) == 40 and scenario["costo_totale"] == 800 * 40
+        for dettaglio in scenario["studenti"]:
+            # Con la fragilità esaurita l'effetto si concentra sul massimo: la media può stare sotto il 5° percentile
+            assert 0 <= dettaglio["intervallo_90"][0] <= dettaglio["intervallo_90"][1]
+            assert dettaglio["miglioramento_voti_atteso"] <= dettaglio["intervallo_90"][1]
+
+        # Stesso seme, stessi risultati
+        ripetuto = SimulatoreMonteCarlo(anagrafica, voti, simulazioni=400, seed=3, dimensione_blocco=16)
+        assert ripetuto.simula_intervento_classe("2B", TipoIntervento.SUPPORTO_FAMILIARE,
+                                                 IntensitàIntervento.ALTA) == scenario
+        with pytest.raises(ValueError):
+            simulatore.simula_intervento_classe("9Z", TipoIntervento.SUPPORTO_FAMILIARE, IntensitàIntervento.ALTA)
+
+    @pytest.mark.unit
+    def test_piano(self, scuola):
+        anagrafica, voti = scuola
+        simulatore = SimulatoreMonteCarlo(anagrafica, voti, simulazioni=100, seed=4)
+        piano = simulatore.ottimizza_budget(3000, obiettivo="fragilita", min_fragilita=20)
+        assert piano.costo_totale <= 3000
+        assert {a["id_studente"] for a in piano.assegnazioni} <= {s.id for s in anagrafica.studenti
+                                                                  if s.fragilità_sociale >= 20}
+        assert piano.miglioramento_atteso == pytest.approx(sum(a["miglioramento_atteso"] for a in piano.assegnazioni),
+                                                           abs=0.01)
+        assert piano.to_dict()["budget_residuo"] == 3000 - piano.costo_totale
+        with pytest.raises(ValueError):
+            simulatore.ottimizza_budget(1000, obiettivo="presenze")
+
+        # Nessun candidato: piano vuoto, budget intatto
+        vuoto = simulatore.ottimizza_budget(3000, min_fragilita=101)
+        assert vuoto.assegnazioni == [] and vuoto.studenti_considerati == 0
+        assert vuoto.to_dict()["budget_residuo"] == 3000
+
+    @pytest.mark.slow
+    def test_scuola_grande(self):
+        """10.000 studenti ottimizzati in pochi secondi."""
+        anagrafica, voti = Anagrafica(), GestioneVoti()
+        anagrafica.genera_studenti(10000)
+        generatore = np.random.default_rng(0)
+        voti.voti = [Voto(s.id, "Matematica", float(v), "scritto", "2025-11-03")
+                     for s, v in zip(anagrafica.studenti, generatore.uniform(3, 9, 10000))]
+        piano = SimulatoreMonteCarlo(anagrafica, voti, seed=0).ottimizza_budget(100000)
+        assert piano.studenti_considerati == 10000
+        assert 0 < piano.costo_totale <= 100000
+        assert piano.tempo_ms < 10000
+
+
+class TestOttimizzazioneERP:
+    """Test per gli endpoint della simulazione."""
+
+    @pytest.mark.api
+    def test_endpoint(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        for studente in erp.anagrafica.genera_studenti(6, classe="4E"):
+            erp.voti.aggiungi_voto(studente.id, "Matematica", 5.0)
+
+        piano = client.post('/api/interventi/ottimizza?limite=2', json={"budget": 2000, "classe": "4E"}).get_json()
+        assert piano["studenti_considerati"] == 6 and piano["costo_totale"] <= 2000
+        assert len(piano["assegnazioni"]) <= 2
+        assert client.post('/api/interventi/ottimizza', json={"budget": "molto"}).status_code == 400
+        for budget in ("nan", "inf", -1):
+            assert client.post('/api/interventi/ottimizza', json={"budget": budget}).status_code == 400
+        for limite in ("0", "-3", "1001", "x"):
+            assert client.post(f'/api/interventi/ottimizza?limite={limite}', json={"budget": 10}).status_code == 400
+        assert client.post('/api/interventi/ottimizza', json={"budget": 2000, "classe": "ZZ"}).status_code == 404
+        vuoto = client.post('/api/interventi/ottimizza', json={"budget": 2000, "min_fragilita": 101})
+        assert vuoto.status_code == 200 and vuoto.get_json()["studenti_assegnati"] == 0
+
+        scenario = client.get('/api/interventi/simula-classe?classe=4E&tipo=AUMENTO_REDDITO&intensita=BASSA')
+        assert scenario.get_json()["numero_studenti"] == 6
+        assert client.get('/api/interventi/simula-classe?classe=4E&tipo=X').status_code == 400
+        assert client.get('/api/interventi/simula-classe?classe=ZZ').status_code == 404
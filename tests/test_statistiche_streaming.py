@@ -0,0 +1,224 @@
+"""
+Test per le statistiche in streaming.
+"""
+
+import math
+import random
+
+import pytest
+
+from analisi import AnalisiDidattica
+from anagrafica import Anagrafica
+from indicatori import CalcolatoreIndicatori
+from statistiche_streaming import Covarianza, SketchKLL, StatisticheVoti, Welford
+from voti import GestioneVoti, Voto
+
+
+def deviazione(valori):
+    media = sum(valori) / len(valori)
+    return math.sqrt(sum((x - media) ** 2 for x in valori) / len(valori))
+
+
+def correlazione(coppie):
+    xs, ys = zip(*coppie)
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    cov = sum((x - mx) * (y - my) for x, y in coppie)
+    return cov / math.sqrt(sum((x - mx) ** 2 for x in xs) * sum((y - my) ** 2 for y in ys))
+
+
+@pytest.fixture
+def scuola():
+    casuale = random.Random(7)
+    anagrafica, voti = Anagrafica(), GestioneVoti()
+    for classe in ("1A", "2A", "3A"):
+        anagrafica.genera_studenti(15, classe=classe)
+    voti.aggiungi_voti([
+        Voto(s.id, casuale.choice(["Matematica", "Italiano"]), round(casuale.uniform(3, 10), 1), "scritto", "2025-11-03")
+        for s in anagrafica.studenti[:-5] for _ in range(casuale.randint(1, 6))
+    ])
+    return anagrafica, voti
+
+
+class TestAccumulatori:
+    """Welford, covarianza e sketch dei quantili contro il calcolo in due passaggi."""
+
+    @pytest.mark.unit
+    def test_welford_unione_e_rimozione(self):
+        casuale = random.Random(1)
+        valori = [casuale.gauss(6, 2) for _ in range(1000)]
+        intero = Welford(valori)
+        assert intero.media == pytest.approx(sum(valori) / len(valori))
+        assert intero.deviazione_standard == pytest.approx(deviazione(valori))
+        assert (intero.minimo, intero.massimo) == (min(valori), max(valori))
+
+        unito = Welford(valori[:300]).unisci(Welford(valori[300:]))
+        assert unito.varianza == pytest.approx(intero.varianza)
+        assert intero.copia().sottrai(Welford(valori[300:])).varianza == pytest.approx(deviazione(valori[:300]) ** 2)
+
+        for valore in valori[500:]:
+            intero.rimuovi(valore)
+        assert intero.n == 500 and intero.deviazione_standard == pytest.approx(deviazione(valori[:500]))
+        assert Welford.from_dict(intero.to_dict()).varianza == intero.varianza
+
+    @pytest.mark.unit
+    def test_covarianza(self):
+        casuale = random.Random(2)
+        coppie = [(x, 0.5 * x + casuale.gauss(0, 1)) for x in (casuale.uniform(0, 10) for _ in range(500))]
+        accumulatore = Covarianza(coppie[:200]).unisci(Covarianza(coppie[200:]))
+        assert accumulatore.correlazione == pytest.approx(correlazione(coppie))
+        for x, y in coppie[100:]:
+            accumulatore.rimuovi(x, y)
+        assert accumulatore.correlazione == pytest.approx(correlazione(coppie[:100]))
+        assert Covarianza([(1, 2), (1, 3)]).correlazione is None
+
+    @pytest.mark.unit
+    def test_quantili_kll(self):
+        casuale = random.Random(3)
+        valori = [casuale.random() for _ in range(20000)]
+        sketch = SketchKLL(k=200, seed=1)
+        for valore in valori[:12000]:
+            sketch.aggiungi(valore)
+        altro = SketchKLL(k=200, seed=2)
+        for valore in valori[12000:]:
+            altro.aggiungi(valore)
+        sketch.unisci(altro)
+
+        ordinati = sorted(valori)
+        assert sketch.n == 20000
+        assert sum(len(livello) for livello in sketch.livelli) < 1000
+        for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+            assert abs(ordinati.index(sketch.quantile(q)) / len(valori) - q) < 0.02
+        assert SketchKLL().quantile(0.5) is None
+        assert SketchKLL.from_dict(sketch.to_dict()).quantile(0.5) == sketch.quantile(0.5)
+
+
+class TestStatisticheVoti:
+    """Gli accumulatori seguono voti e anagrafica senza riscansioni."""
+
+    @pytest.mark.unit
+    def test_statistiche_materia(self, scuola):
+        anagrafica, voti = scuola
+        senza = voti.statistiche_materia("Matematica")
+        StatisticheVoti(voti, anagrafica)
+        con = voti.statistiche_materia("Matematica")
+        assert set(con) == set(senza)
+        for chiave in ("numero_voti", "min", "max"):
+            assert con[chiave] == senza[chiave]
+        for chiave in ("media", "deviazione_standard"):
+            assert con[chiave] == pytest.approx(senza[chiave])
+        assert len(con["quartili"]) == 3
+        # Sketch esatto finché i voti non superano la capacità
+        assert con["quartili"] == senza["quartili"]
+        assert "messaggio" in voti.statistiche_materia("Latino")
+
+        voti.aggiungi_voto(anagrafica.studenti[0].id, "Matematica", 10.0)
+        primo = voti.voti[0]
+        voti.rimuovi_voto(primo)
+        voti.statistiche, atteso = None, voti.statistiche_materia("Matematica")
+        voti.statistiche = StatisticheVoti(voti, anagrafica)
+        ricostruito = voti.statistiche_materia("Matematica")
+        assert ricostruito["media"] == pytest.approx(atteso["media"])
+        assert (ricostruito["min"], ricostruito["max"]) == (atteso["min"], atteso["max"])
+
+    @pytest.mark.unit
+    def test_fasce_e_indicatori_uguali_al_calcolo_completo(self, scuola):
+        anagrafica, voti = scuola
+        analisi = AnalisiDidattica(anagrafica, voti)
+        calcolatore = CalcolatoreIndicatori(anagrafica, voti, None, analisi)
+        atteso_fasce = analisi.correlazione_reddito_rendimento()
+        atteso_equita = calcolatore.indice_equita_educativa()
+
+        statistiche = StatisticheVoti(voti, anagrafica)
+        assert analisi.correlazione_reddito_rendimento() == atteso_fasce
+        assert calcolatore.indice_equita_educativa() == atteso_equita
+        assert list(atteso_fasce) == ["Molto Basso", "Basso", "Medio", "Alto", "Molto Alto"]
+        assert sum(f["numero_studenti"] for f in atteso_fasce.values()) == len(anagrafica.studenti)
+
+        coppie = [(s.reddito_familiare, voti.media_studente(s.id)) for s in anagrafica.studenti
+                  if voti.media_studente(s.id) > 0]
+        assert statistiche.correlazione_reddito_rendimento() == pytest.approx(correlazione(coppie))
+
+        # Cambio di classe e nuovo studente: seguiti senza ricostruzione
+        spostato = anagrafica.studenti[0]
+        spostato.classe = "3A"
+        anagrafica.notifica_osservatori("modificato", spostato)
+        nuovo = anagrafica.genera_studenti(1, classe="1A")[0]
+        voti.aggiungi_voto(nuovo.id, "Italiano", 9.5)
+        classe = [v.voto for s in anagrafica.studenti_per_classe("3A") for v in voti.voti_studente(s.id)]
+        riepilogo = statistiche.statistiche_classe("3A")
+        assert riepilogo["numero"] == len(classe)
+        assert riepilogo["deviazione_standard"] == pytest.approx(deviazione(classe))
+        assert (riepilogo["min"], riepilogo["max"]) == (min(classe), max(classe))
+
+        voti.statistiche = None
+        atteso_fasce = analisi.correlazione_reddito_rendimento()
+        voti.statistiche = statistiche
+        assert analisi.correlazione_reddito_rendimento() == atteso_fasce
+        assert statistiche.ricostruzioni == 1
+
+    @pytest.mark.unit
+    def test_letture_senza_scansione_anagrafica(self, scuola):
+        """Le letture non rileggono l'anagrafica: contano solo gli eventi."""
+        anagrafica, voti = scuola
+        statistiche = StatisticheVoti(voti, anagrafica)
+        prima = statistiche.fragilita().n
+
+        studente = anagrafica.studenti[0]
+        studente.classe = "5E"  # modifica sul posto non notificata
+        assert statistiche.statistiche_classe("5E") is None
+
+        anagrafica.notifica_osservatori("modificato", studente)
+        assert statistiche.statistiche_classe("5E")["numero"] == len(voti.voti_studente(studente.id))
+        anagrafica.rimuovi_studente(studente.id)
+        assert statistiche.statistiche_classe("5E") is None
+        assert statistiche.fragilita().n == prima - 1
+
+        anagrafica.studenti.append(studente)
+        anagrafica.notifica_osservatori("ricaricati")
+        assert statistiche.fragilita().n == prima
+        assert statistiche.ricostruzioni == 1
+
+    @pytest.mark.unit
+    def test_unione_partizioni(self, scuola):
+        """Due sedi con studenti diversi: l'unione coincide con le statistiche dell'insieme."""
+        anagrafica, voti = scuola
+        completo = StatisticheVoti(voti, anagrafica).riepilogo()
+
+        sedi = []
+        for classi in (("1A",), ("2A", "3A")):
+            parziale_anagrafica, parziale_voti = Anagrafica(), GestioneVoti()
+            parziale_anagrafica.studenti = [s for s in anagrafica.studenti if s.classe in classi]
+            ids = {s.id for s in parziale_anagrafica.studenti}
+            parziale_voti.voti = [v for v in voti.voti if v.id_studente in ids]
+            sedi.append(StatisticheVoti(parziale_voti, parziale_anagrafica))
+        unito = sedi[0].unisci(sedi[1]).riepilogo()
+
+        assert unito["classi"] == completo["classi"]
+        for sezione in ("fasce_reddito", "medie_studenti", "fragilita"):
+            for chiave, valore in (unito[sezione].items() if sezione == "fasce_reddito" else [(None, unito[sezione])]):
+                atteso = completo[sezione][chiave] if chiave else completo[sezione]
+                assert valore["numero"] == atteso["numero"]
+                assert valore["media"] == pytest.approx(atteso["media"])
+                assert valore["deviazione_standard"] == pytest.approx(atteso["deviazione_standard"])
+        assert unito["correlazione_reddito_rendimento"] == pytest.approx(completo["correlazione_reddito_rendimento"])
+        assert unito["materie"]["Matematica"]["numero"] == completo["materie"]["Matematica"]["numero"]
+
+
+class TestStatisticheERP:
+    """Test per l'endpoint delle statistiche."""
+
+    @pytest.mark.api
+    def test_endpoint(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        for studente in erp.anagrafica.genera_studenti(4, classe="5C"):
+            erp.voti.aggiungi_voto(studente.id, "Storia", 7.0)
+
+        riepilogo = client.get('/api/analisi/statistiche').get_json()
+        assert riepilogo["classi"]["5C"]["numero"] == 4
+        assert riepilogo["classi"]["5C"]["media"] == 7.0
+        assert erp.voti.statistiche is erp.statistiche_voti
@@ -0,0 +1,243 @@
+"""
+Test per lo stato condiviso tra worker.
+"""
+
+import multiprocessing
+
+import pytest
+
+from anagrafica import Anagrafica
+from stato_condiviso import StatoCondiviso
+from voti import GestioneVoti
+
+
+def _worker(percorso):
+    """Crea un worker (store + moduli in memoria) collegato allo store."""
+    stato = StatoCondiviso(percorso)
+    anagrafica, voti = Anagrafica(), GestioneVoti()
+    stato.collega(anagrafica, voti)
+    return stato, anagrafica, voti
+
+
+def _login(client, username="admin", password="admin123"):
+    """Effettua il login sul client di test."""
+    return client.post('/login', data={'username': username, 'password': password})
+
+
+def _processo_lettore(percorso, scritto, risultati):
+    """Worker lettore: attende la scrittura dell'altro worker e legge via HTTP."""
+    from wsgi import crea_app
+
+    client = crea_app(percorso, dati_demo=False, avvia_scheduler=False).app.test_client()
+    _login(client)
+    risultati.put(("pronto", None))
+
+    id_studente = scritto.get(timeout=60)
+    risposta = client.get(f'/api/studenti/{id_studente}')
+    risultati.put(("letto", (risposta.status_code, risposta.get_json())))
+
+
+def _processo_scrittore(percorso, scritto):
+    """Worker scrittore: crea uno studente con un voto via HTTP."""
+    from wsgi import crea_app
+
+    erp = crea_app(percorso, dati_demo=False, avvia_scheduler=False)
+    client = erp.app.test_client()
+    _login(client)
+    studente = client.post('/api/studenti').get_json()["studente"]
+    erp.voti.aggiungi_voto(studente["id"], "Matematica", 8.5)
+    scritto.put(studente["id"])
+
+
+@pytest.fixture
+def percorso(tmp_path, monkeypatch):
+    """Store condiviso in una directory temporanea."""
+    # InterfacciaERP crea file di lavoro nella directory corrente
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / "condiviso.db")
+
+
+class TestStatoCondiviso:
+    """Test per StatoCondiviso."""
+
+    @pytest.mark.database
+    def test_scrittura_visibile_dopo_sincronizzazione(self, percorso):
+        """Studenti e voti scritti da un worker arrivano all'altro."""
+        stato_a, anagrafica_a, voti_a = _worker(percorso)
+        stato_b, anagrafica_b, voti_b = _worker(percorso)
+
+        studente = anagrafica_a.crea_studente_casuale("3A")
+        voti_a.aggiungi_voto(studente.id, "Matematica", 7.5)
+        assert anagrafica_b.studenti == []
+
+        assert stato_b.sincronizza() == 2
+        assert anagrafica_b.trova_studente(studente.id).nome == studente.nome
+        assert voti_b.media_studente(studente.id) == 7.5
+        # Il worker che scrive non riapplica le proprie modifiche
+        assert stato_a.sincronizza() == 0
+        assert len(voti_a.voti) == 1
+
+    @pytest.mark.database
+    def test_lotto_voti_una_voce_di_log(self, percorso):
+        """Un lotto di voti è una sola modifica, applicata per intero dagli altri worker."""
+        from voti import Voto
+
+        stato_a, anagrafica_a, voti_a = _worker(percorso)
+        stato_b, _, voti_b = _worker(percorso)
+        studenti = [anagrafica_a.crea_studente_casuale("2C") for _ in range(4)]
+        stato_b.sincronizza()
+
+        voti_a.aggiungi_voti([Voto(s.id, "Chimica", 6.0 + i, "Prova scritta", "2025-11-03")
+                              for i, s in enumerate(studenti)])
+
+        assert stato_b.sincronizza() == 1
+        assert sorted(v.voto for v in voti_b.voti) == [6.0, 7.0, 8.0, 9.0]
+        assert [v.id for v in voti_b.voti] == [v.id for v in voti_a.voti]
+
+    @pytest.mark.database
+    def test_id_studenti_unici_tra_worker(self, percorso):
+        """Gli ID sono assegnati dallo store, senza collisioni."""
+        _, anagrafica_a, _ = _worker(percorso)
+        _, anagrafica_b, _ = _worker(percorso)
+
+        id_a = {anagrafica_a.crea_studente_casuale().id for _ in range(5)}
+        id_b = {anagrafica_b.crea_studente_casuale().id for _ in range(5)}
+
+        assert len(id_a | id_b) == 10
+
+    @pytest.mark.database
+    def test_rimozioni_e_azzeramento(self, percorso):
+        """Rimozioni e azzeramento dei voti si propagano."""
+        _, anagrafica_a, voti_a = _worker(percorso)
+        stato_b, anagrafica_b, voti_b = _worker(percorso)
+
+        s1 = anagrafica_a.crea_studente_casuale()
+        s2 = anagrafica_a.crea_studente_casuale()
+        voto = voti_a.aggiungi_voto(s1.id, "Storia", 6.0)
+        voti_a.aggiungi_voto(s2.id, "Storia", 9.0)
+        voti_a.rimuovi_voto(voto)
+        anagrafica_a.rimuovi_studente(s1.id)
+        stato_b.sincronizza()
+
+        assert [s.id for s in anagrafica_b.studenti] == [s2.id]
+        assert [v.voto for v in voti_b.voti] == [9.0]
+
+        voti_a.azzera()
+        stato_b.sincronizza()
+        assert voti_b.voti == []
+
+    @pytest.mark.database
+    def test_rimozione_voto_per_id(self, percorso):
+        """Tra voti uguali nei campi si rimuove quello indicato, in locale e nello store."""
+        from voti import Voto
+
+        _, anagrafica_a, voti_a = _worker(percorso)
+        stato_b, _, voti_b = _worker(percorso)
+        studente = anagrafica_a.crea_studente_casuale()
+        primo = voti_a.aggiungi_voto(studente.id, "Storia", 6.0, data="2025-11-03")
+        secondo = voti_a.aggiungi_voto(studente.id, "Storia", 6.0, data="2025-11-03")
+        stato_b.sincronizza()
+
+        # Copia distinta con l'ID del secondo voto (es. ricostruita da una richiesta)
+        copia = Voto(studente.id, "Storia", 6.0, secondo.tipo, "2025-11-03")
+        copia.id = secondo.id
+        assert voti_a.rimuovi_voto(copia)
+        assert voti_a.voti == [primo] and voti_a.voti[0] is primo
+        stato_b.sincronizza()
+        assert [v.id for v in voti_b.voti] == [primo.id]
+
+        with pytest.raises(ValueError):
+            stato_b.voto_rimosso(Voto(studente.id, "Storia", 6.0, secondo.tipo, "2025-11-03"))
+
+    @pytest.mark.database
+    def test_blocco_atomico(self, percorso):
+        """Un blocco fallito non lascia modifiche parziali."""
+        stato_a, anagrafica_a, voti_a = _worker(percorso)
+        stato_b, _, voti_b = _worker(percorso)
+        studente = anagrafica_a.crea_studente_casuale()
+
+        with pytest.raises(ValueError):
+            with stato_a.blocco():
+                voti_a.aggiungi_voto(studente.id, "Inglese", 8.0)
+                voti_a.aggiungi_voto(studente.id, "Inglese", 11.0)
+
+        stato_b.sincronizza()
+        assert voti_a.voti == []
+        assert voti_b.voti == []
+
+    @pytest.mark.database
+    def test_cache_invalidata_dalle_modifiche(self, percorso):
+        """La cache condivisa vale solo per la versione dei dati su cui è calcolata."""
+        stato_a, anagrafica_a, _ = _worker(percorso)
+        stato_b, anagrafica_b, _ = _worker(percorso)
+        anagrafica_a.crea_studente_casuale()
+        stato_b.sincronizza()
+
+        calcoli = []
+
+        def conta_studenti(anagrafica):
+            calcoli.append(1)
+            return len(anagrafica.studenti)
+
+        assert stato_a.calcola_con_cache("totale", lambda: conta_studenti(anagrafica_a)) == 1
+        assert stato_b.calcola_con_cache("totale", lambda: conta_studenti(anagrafica_b)) == 1
+        assert len(calcoli) == 1
+
+        anagrafica_a.crea_studente_casuale()
+        stato_b.sincronizza()
+        assert stato_b.calcola_con_cache("totale", lambda: conta_studenti(anagrafica_b)) == 2
+        assert len(calcoli) == 2
+
+    @pytest.mark.database
+    def test_ricarica_dopo_compattazione(self, percorso):
+        """Un worker rimasto indietro oltre il log compattato ricarica tutto."""
+        stato_a, anagrafica_a, _ = _worker(percorso)
+        stato_b, anagrafica_b, _ = _worker(percorso)
+
+        anagrafica_a.genera_studenti(5)
+        assert stato_a.compatta(mantieni=1) == 4
+        stato_b.sincronizza()
+
+        assert len(anagrafica_b.studenti) == 5
+        assert stato_b.statistiche()["ricariche"] == 2
+
+    @pytest.mark.api
+    def test_sessione_e_dati_condivisi_tra_app(self, percorso):
+        """Login e dati valgono su due istanze dell'app sullo stesso store."""
+        from wsgi import crea_app
+
+        erp_a = crea_app(percorso, dati_demo=False, avvia_scheduler=False)
+        erp_b = crea_app(percorso, dati_demo=False, avvia_scheduler=False)
+        client_a = erp_a.app.test_client()
+        client_b = erp_b.app.test_client()
+
+        _login(client_a)
+        # Stesso cookie presentato all'altro worker
+        client_b.set_cookie('session', client_a.get_cookie('session').value)
+
+        studente = client_a.post('/api/studenti').get_json()["studente"]
+        risposta = client_b.get(f'/api/studenti/{studente["id"]}')
+
+        assert risposta.status_code == 200
+        assert risposta.get_json()["studente"]["nome"] == studente["nome"]
+
+    @pytest.mark.slow
+    def test_consistenza_tra_processi(self, percorso):
+        """Una scrittura in un processo worker è visibile alle letture di un altro."""
+        scritto = multiprocessing.Queue()
+        risultati = multiprocessing.Queue()
+
+        lettore = multiprocessing.Process(target=_processo_lettore, args=(percorso, scritto, risultati))
+        lettore.start()
+        assert risultati.get(timeout=60) == ("pronto", None)
+
+        scrittore = multiprocessing.Process(target=_processo_scrittore, args=(percorso, scritto))
+        scrittore.start()
+        scrittore.join(60)
+
+        fase, (stato_http, corpo) = risultati.get(timeout=60)
+        lettore.join(60)
+
+        assert fase == "letto"
+        assert stato_http == 200
+        assert corpo["media"] == 8.5
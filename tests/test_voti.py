@@ -106,6 +106,17 @@ class TestGestioneVoti:
         assert len(voti_2) == 1
         assert voti_1[0].id_studente == 1
         assert voti_2[0].id_studente == 2
+    
+    @pytest.mark.unit
+    def test_rimuovi_voto_per_identita(self, gestione_voti):
+        """Test rimozione del voto indicato tra voti uguali."""
+        primo = gestione_voti.aggiungi_voto(1, "Storia", 6.0, "Verifica", "2025-11-03")
+        secondo = gestione_voti.aggiungi_voto(1, "Storia", 6.0, "Verifica", "2025-11-03")
+        
+        assert gestione_voti.rimuovi_voto(secondo)
+        assert len(gestione_voti.voti) == 1 and gestione_voti.voti[0] is primo
+        # Uguale ma distinto e senza ID: non corrisponde a nessun voto
+        assert not gestione_voti.rimuovi_voto(Voto(1, "Storia", 6.0, "Verifica", "2025-11-03"))
 
 
 class TestVoto:
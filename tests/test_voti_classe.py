@@ -0,0 +1,94 @@
+"""
+Test per l'inserimento dei voti di un'intera classe in un unico lotto.
+"""
+
+import pytest
+
+from anagrafica import Anagrafica
+from inserimento_rapido import GestoreInserimentoVeloce
+from voti import GestioneVoti
+
+
+@pytest.fixture
+def gestore():
+    """Gestore con una classe di tre studenti e uno studente di un'altra classe."""
+    anagrafica = Anagrafica()
+    for _ in range(3):
+        anagrafica.crea_studente_casuale("4B")
+    anagrafica.crea_studente_casuale("5A")
+    return GestoreInserimentoVeloce(anagrafica, GestioneVoti())
+
+
+class TestInserimentoClasse:
+    """Test per GestoreInserimentoVeloce.inserisci_voti_classe."""
+
+    @pytest.mark.unit
+    def test_lotto_valido_una_notifica(self, gestore):
+        """Un lotto valido è aggiunto per intero con una sola notifica."""
+        eventi = []
+        gestore.gestione_voti.osservatori.append(lambda evento, voto: eventi.append(evento))
+        righe = [{"id_studente": i, "voto": 5.5 + i} for i in (1, 2, 3)]
+
+        risultato = gestore.inserisci_voti_classe("4B", "Latino", righe, data="2025-11-05", docente="Prof. Neri")
+
+        assert risultato["successo"] and risultato["inseriti"] == 3
+        assert [v.voto for v in gestore.gestione_voti.voti] == [6.5, 7.5, 8.5]
+        assert {v.data for v in gestore.gestione_voti.voti} == {"2025-11-05"}
+        assert eventi == ["aggiunti"]
+
+    @pytest.mark.unit
+    def test_errori_per_riga_nessuna_scrittura(self, gestore):
+        """Con una riga errata nulla viene inserito e ogni errore indica la riga."""
+        righe = [
+            {"id_studente": 1, "voto": 7},
+            {"id_studente": 4, "voto": 6},      # altra classe
+            {"id_studente": 2, "voto": 11},     # fuori range
+            {"id_studente": 1, "voto": 8},      # ripetuto
+            {"id_studente": 3},                 # voto mancante
+        ]
+
+        risultato = gestore.inserisci_voti_classe("4B", "Latino", righe)
+
+        assert not risultato["successo"]
+        assert [e["riga"] for e in risultato["errori"]] == [1, 2, 3, 4]
+        assert "classe 4B" in risultato["errori"][0]["errore"]
+        assert gestore.gestione_voti.voti == []
+
+    @pytest.mark.unit
+    def test_errori_di_lotto(self, gestore):
+        """Data non valida e materia mancante sono errori dell'intero lotto."""
+        risultato = gestore.inserisci_voti_classe("4B", "", [{"id_studente": 1, "voto": 7}], data="05/11/2025")
+        assert {e["riga"] for e in risultato["errori"]} == {None}
+        assert len(risultato["errori"]) == 2
+        assert gestore.inserisci_voti_classe("4B", "Latino", "7,8")["errori"][0]["errore"] == \
+            "I voti devono essere una lista"
+
+    @pytest.mark.api
+    def test_endpoint(self, tmp_path, monkeypatch):
+        """POST /api/voti/classe risponde 200 o 422 con gli errori."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        studenti = [erp.anagrafica.crea_studente_casuale("9Y") for _ in range(2)]
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        corpo = {"classe": "9Y", "materia": "Fisica", "data": "2025-11-05", "tipo": "Prova orale",
+                 "voti": [{"id_studente": s.id, "voto": 7.0} for s in studenti]}
+
+        risposta = client.post('/api/voti/classe', json=corpo)
+        assert risposta.status_code == 200
+        assert risposta.get_json()["inseriti"] == 2
+
+        corpo["voti"][0]["voto"] = 2
+        risposta = client.post('/api/voti/classe', json=corpo)
+        assert risposta.status_code == 422
+        assert risposta.get_json()["errori"][0]["riga"] == 0
+        assert len([v for v in erp.voti.voti if v.materia == "Fisica"]) == 2
+
+        # Corpo malformato: 400 senza scritture
+        for voti in (5, "7,8", {"id_studente": studenti[0].id, "voto": 7.0}, [{"id_studente": studenti[0].id}, 7]):
+            assert client.post('/api/voti/classe', json={**corpo, "voti": voti}).status_code == 400
+        assert client.post('/api/voti/classe', json=[corpo]).status_code == 400
+        assert client.post('/api/voti/classe', json={**corpo, "voti": []}).status_code == 422
+        assert len([v for v in erp.voti.voti if v.materia == "Fisica"]) == 2
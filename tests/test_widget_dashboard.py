@@ -0,0 +1,93 @@
+"""
+Test per il calcolo in lotto dei widget della dashboard.
+"""
+
+import pytest
+
+from anagrafica import Anagrafica
+from voti import GestioneVoti
+from widget_dashboard import ContestoDashboard, RegistroWidget
+
+
+@pytest.fixture
+def contesto():
+    """Contesto con pochi studenti e voti noti."""
+    anagrafica, voti = Anagrafica(), GestioneVoti()
+    s1 = anagrafica.crea_studente_casuale("1A")
+    s2 = anagrafica.crea_studente_casuale("1B")
+    voti.aggiungi_voto(s1.id, "Matematica", 4.0)
+    voti.aggiungi_voto(s1.id, "Italiano", 6.0)
+    voti.aggiungi_voto(s2.id, "Matematica", 9.5)
+    return ContestoDashboard(anagrafica, voti)
+
+
+class TestContestoDashboard:
+    """Test per gli aggregati condivisi."""
+
+    @pytest.mark.unit
+    def test_aggregati(self, contesto):
+        """Medie, distribuzione e classi coincidono con il calcolo diretto."""
+        assert contesto.medie_studenti == {1: 5.0, 2: 9.5}
+        assert contesto.distribuzione_voti["4-5"] == 1
+        assert contesto.distribuzione_voti["9-10"] == 1
+        assert contesto.classi == {"1A": 1, "1B": 1}
+
+    @pytest.mark.unit
+    def test_una_passata_per_aggregato(self, contesto, monkeypatch):
+        """Più widget che usano gli stessi aggregati non ripetono la passata."""
+        passate = []
+        originale = ContestoDashboard._passata_voti
+        monkeypatch.setattr(ContestoDashboard, "_passata_voti",
+                            lambda self: passate.append(1) or originale(self))
+        registro = RegistroWidget()
+        registro.registra("medie", lambda c, p: c.medie_studenti)
+        registro.registra("distribuzione", lambda c, p: c.distribuzione_voti)
+
+        risposta = registro.calcola(["medie", "distribuzione"], contesto)
+
+        assert len(passate) == 1
+        assert set(risposta["tempi_ms"]) == {"medie", "distribuzione"}
+        assert "voti" in risposta["aggregati_ms"]
+
+
+class TestRegistroWidget:
+    """Test per errori e permessi."""
+
+    @pytest.mark.unit
+    def test_errori_isolati(self, contesto):
+        """Widget sconosciuti o in errore non bloccano gli altri."""
+        registro = RegistroWidget()
+        registro.registra("ok", lambda c, p: p["x"])
+        registro.registra("guasto", lambda c, p: 1 / 0)
+
+        risposta = registro.calcola(["ok", "guasto", "boh"], contesto, parametri={"x": 3})
+
+        assert risposta["widget"] == {"ok": 3}
+        assert set(risposta["errori"]) == {"guasto", "boh"}
+
+    @pytest.mark.api
+    def test_endpoint_erp(self, tmp_path, monkeypatch):
+        """Una richiesta restituisce tutti i widget, con i permessi del ruolo."""
+        monkeypatch.chdir(tmp_path)
+        from interfaccia_erp import InterfacciaERP
+
+        erp = InterfacciaERP()
+        for _ in range(5):
+            studente = erp.anagrafica.crea_studente_casuale("3B")
+            erp.voti.aggiungi_voto(studente.id, "Storia", 4.5)
+        client = erp.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+        ids = "stats,charts,indicatori,allerte,studenti_rischio"
+        risposta = client.get(f'/api/dashboard/widget?ids={ids}').get_json()
+
+        assert set(risposta["widget"]) == set(ids.split(","))
+        assert risposta["widget"]["stats"] == client.get('/api/dashboard/stats').get_json()
+        assert risposta["widget"]["studenti_rischio"] == client.get('/api/analytics/studenti-rischio').get_json()
+        assert all(ms >= 0 for ms in risposta["tempi_ms"].values())
+
+        client.get('/logout')
+        client.post('/login', data={'username': 'studente', 'password': 'studente123'})
+        risposta = client.get('/api/dashboard/widget?ids=stats,indicatori').get_json()
+        assert "indicatori" in risposta["errori"]
+        assert "stats" in risposta["widget"]
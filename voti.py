@@ -3,10 +3,12 @@ Modulo per la gestione dei voti.
 Gestisce voti provvisori, pagelle e calcolo medie.
 """
 
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+from typing import Callable, List, Dict, Optional, Union
+from dataclasses import dataclass, field
 from datetime import datetime
+import math
 import dati
+from statistiche_streaming import QUARTILI, Welford
 
 
 @dataclass
@@ -19,6 +21,7 @@ class Voto:
     tipo: str  # 'Prova scritta', 'Prova orale', 'Comportamento', ecc.
     data: str
     note: str = ""
+    id: Optional[int] = field(default=None, compare=False, repr=False)  # Assegnato dallo store condiviso
     
     def __post_init__(self):
         """Valida che il voto sia in un range valido."""
@@ -54,6 +57,15 @@ class GestioneVoti:
         """Inizializza la gestione voti."""
         self.voti: List[Voto] = []
         self.pagelle: List[Pagella] = []
+        
+        # Backend opzionale notificato a ogni modifica (es. StatoCondiviso)
+        self.persistenza = None
+        
+        # Callback (evento, voto) chiamate dopo ogni modifica (es. rollup dei grafici)
+        self.osservatori: List[Callable[[str, Union[Voto, List[Voto], None]], None]] = []
+        
+        # Accumulatori aggiornati dagli osservatori (statistiche_streaming.StatisticheVoti)
+        self.statistiche = None
     
     def aggiungi_voto(self, id_studente: int, materia: str, voto: float, 
                      tipo: str = "Prova scritta", data: str = None, 
@@ -83,9 +95,35 @@ class GestioneVoti:
             note=note
         )
         
+        if self.persistenza is not None:
+            self.persistenza.voto_aggiunto(voto_obj)
+        
         self.voti.append(voto_obj)
+        self.notifica_osservatori("aggiunto", voto_obj)
         return voto_obj
     
+    def aggiungi_voti(self, voti: List[Voto]) -> List[Voto]:
+        """Aggiunge un lotto di voti già validati in un'unica operazione.
+        
+        La persistenza riceve un solo salvataggio e gli osservatori una sola
+        notifica ("aggiunti"), invece di una per voto.
+        
+        Args:
+            voti: Voti da aggiungere
+            
+        Returns:
+            Voti aggiunti
+        """
+        if not voti:
+            return []
+        
+        if self.persistenza is not None:
+            self.persistenza.voti_aggiunti(voti)
+        
+        self.voti.extend(voti)
+        self.notifica_osservatori("aggiunti", voti)
+        return voti
+    
     def aggiungi_voto_casuale(self, id_studente: int, materia: str, 
                               base: float = 6.0) -> Voto:
         """Aggiunge un voto casuale per uno studente.
@@ -174,6 +212,9 @@ class GestioneVoti:
             note=note
         )
         
+        if self.persistenza is not None:
+            self.persistenza.pagella_aggiunta(pagella)
+        
         self.pagelle.append(pagella)
         return pagella
     
@@ -195,16 +236,46 @@ class GestioneVoti:
     def rimuovi_voto(self, voto: Voto) -> bool:
         """Rimuove un voto.
         
+        Il voto è cercato per identità e, se non presente, per ID dello
+        store: due voti uguali nei campi restano distinti.
+        
         Args:
             voto: Voto da rimuovere
             
         Returns:
             True se rimosso, False se non trovato
         """
-        if voto in self.voti:
-            self.voti.remove(voto)
-            return True
-        return False
+        posizione = next((i for i, v in enumerate(self.voti) if v is voto), None)
+        if posizione is None and voto.id is not None:
+            posizione = next((i for i, v in enumerate(self.voti) if v.id == voto.id), None)
+        if posizione is None:
+            return False
+        
+        trovato = self.voti[posizione]
+        if self.persistenza is not None:
+            self.persistenza.voto_rimosso(trovato)
+        del self.voti[posizione]
+        self.notifica_osservatori("rimosso", trovato)
+        return True
+    
+    def azzera(self) -> None:
+        """Elimina tutti i voti e tutte le pagelle."""
+        if self.persistenza is not None:
+            self.persistenza.voti_azzerati()
+        self.voti.clear()
+        self.pagelle.clear()
+        self.notifica_osservatori("azzerati")
+    
+    def notifica_osservatori(self, evento: str, voto: Union[Voto, List[Voto], None] = None) -> None:
+        """Notifica una modifica ai voti agli osservatori registrati.
+        
+        Args:
+            evento: "aggiunto", "aggiunti", "rimosso", "azzerati" o "ricaricati"
+            voto: Voto interessato, lista di voti per "aggiunti",
+                None per gli eventi sull'intero insieme
+        """
+        for osservatore in self.osservatori:
+            osservatore(evento, voto)
     
     def statistiche_materia(self, materia: str) -> Dict:
         """Calcola statistiche per una materia.
@@ -215,17 +286,34 @@ class GestioneVoti:
         Returns:
             Dizionario con statistiche
         """
-        voti_materia = [v.voto for v in self.voti if v.materia == materia]
+        if self.statistiche is not None:
+            riepilogo = self.statistiche.statistiche_materia(materia)
+            if riepilogo is None:
+                return {"messaggio": f"Nessun voto per {materia}"}
+            return {
+                "materia": materia,
+                "numero_voti": riepilogo["numero"],
+                "media": riepilogo["media"],
+                "min": riepilogo["min"],
+                "max": riepilogo["max"],
+                "deviazione_standard": riepilogo["deviazione_standard"],
+                "quartili": riepilogo.get("quartili")
+            }
         
-        if not voti_materia:
+        # Senza accumulatori: stesse chiavi, quartili esatti sui voti ordinati
+        valori = sorted(v.voto for v in self.voti if v.materia == materia)
+        if not valori:
             return {"messaggio": f"Nessun voto per {materia}"}
         
+        accumulatore = Welford(valori)
         return {
             "materia": materia,
-            "numero_voti": len(voti_materia),
-            "media": sum(voti_materia) / len(voti_materia),
-            "min": min(voti_materia),
-            "max": max(voti_materia)
+            "numero_voti": accumulatore.n,
+            "media": accumulatore.media,
+            "min": valori[0],
+            "max": valori[-1],
+            "deviazione_standard": accumulatore.deviazione_standard,
+            "quartili": [valori[max(0, math.ceil(q * len(valori)) - 1)] for q in QUARTILI]
         }
     
     def statistiche_generali(self) -> Dict:
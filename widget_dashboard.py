@@ -0,0 +1,216 @@
+"""
+Widget della dashboard calcolati in un'unica richiesta.
+Gli aggregati comuni (medie per studente, distribuzione dei voti,
+fragilità, assenze) sono calcolati una sola volta per richiesta e
+condivisi da tutti i widget richiesti.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ContestoDashboard:
+    """Aggregati condivisi tra i widget, calcolati al primo uso.
+
+    Ogni aggregato richiede al più una passata sui dati di origine e
+    viene riusato da tutti i widget della stessa richiesta.
+    """
+
+    def __init__(self, anagrafica, gestione_voti):
+        """Inizializza il contesto.
+
+        Args:
+            anagrafica: Istanza di Anagrafica
+            gestione_voti: Istanza di GestioneVoti
+        """
+        self.anagrafica = anagrafica
+        self.gestione_voti = gestione_voti
+        self._aggregati: Dict[str, Any] = {}
+        self.tempi_ms: Dict[str, float] = {}
+
+    def _aggregato(self, nome: str, funzione: Callable[[], Any]) -> Any:
+        """Calcola (una volta) e cronometra un aggregato."""
+        if nome not in self._aggregati:
+            inizio = time.perf_counter()
+            self._aggregati[nome] = funzione()
+            self.tempi_ms[nome] = round((time.perf_counter() - inizio) * 1000, 3)
+        return self._aggregati[nome]
+
+    # ============ PASSATA SUI VOTI ============
+
+    def _passata_voti(self) -> Dict:
+        """Somme e conteggi per studente e istogramma dei voti in una sola passata."""
+        somme: Dict[int, float] = {}
+        conteggi: Dict[int, int] = {}
+        distribuzione = {f"{i}-{i+1}": 0 for i in range(0, 10)}
+        for voto in self.gestione_voti.voti:
+            somme[voto.id_studente] = somme.get(voto.id_studente, 0.0) + voto.voto
+            conteggi[voto.id_studente] = conteggi.get(voto.id_studente, 0) + 1
+            fascia = min(int(voto.voto), 9)
+            distribuzione[f"{fascia}-{fascia+1}"] += 1
+        return {
+            "medie": {s: somme[s] / conteggi[s] for s in somme},
+            "distribuzione": distribuzione
+        }
+
+    @property
+    def medie_studenti(self) -> Dict[int, float]:
+        """Media generale per ID studente (solo studenti con voti)."""
+        return self._aggregato("voti", self._passata_voti)["medie"]
+
+    @property
+    def distribuzione_voti(self) -> Dict[str, int]:
+        """Numero di voti per fascia intera (es. "6-7")."""
+        return self._aggregato("voti", self._passata_voti)["distribuzione"]
+
+    # ============ PASSATA SUGLI STUDENTI ============
+
+    def _passata_studenti(self) -> Dict:
+        """Fragilità, classi e redditi in una sola passata sull'anagrafica."""
+        fragilita: Dict[int, float] = {}
+        classi: Dict[str, int] = {}
+        reddito_totale = 0
+        for studente in self.anagrafica.studenti:
+            fragilita[studente.id] = studente.fragilità_sociale
+            classi[studente.classe] = classi.get(studente.classe, 0) + 1
+            reddito_totale += studente.reddito_familiare
+        numero = len(self.anagrafica.studenti)
+        return {
+            "fragilita": fragilita,
+            "classi": classi,
+            "reddito_medio": int(reddito_totale / numero) if numero else 0
+        }
+
+    @property
+    def fragilita(self) -> Dict[int, float]:
+        """Indice di fragilità sociale per ID studente."""
+        return self._aggregato("studenti", self._passata_studenti)["fragilita"]
+
+    @property
+    def classi(self) -> Dict[str, int]:
+        """Numero di studenti per classe."""
+        return self._aggregato("studenti", self._passata_studenti)["classi"]
+
+    @property
+    def reddito_medio(self) -> int:
+        """Reddito familiare medio."""
+        return self._aggregato("studenti", self._passata_studenti)["reddito_medio"]
+
+    # ============ PASSATA SULLE PAGELLE ============
+
+    @property
+    def assenze_per_studente(self) -> Dict[int, int]:
+        """Assenze totali dalle pagelle per ID studente."""
+        def calcola():
+            assenze: Dict[int, int] = {}
+            for pagella in self.gestione_voti.pagelle:
+                assenze[pagella.id_studente] = assenze.get(pagella.id_studente, 0) + pagella.assenze
+            return assenze
+        return self._aggregato("pagelle", calcola)
+
+
+@dataclass
+class Widget:
+    """Un widget calcolabile dalla dashboard."""
+
+    id: str
+    funzione: Callable[[ContestoDashboard, Dict], Any]
+    permesso: Optional[str] = None
+    descrizione: str = ""
+
+
+class RegistroWidget:
+    """Registro dei widget e calcolo in lotto con tempi per widget."""
+
+    def __init__(self):
+        """Inizializza il registro."""
+        self.widget: Dict[str, Widget] = {}
+
+    def registra(self, id_widget: str, funzione: Callable[[ContestoDashboard, Dict], Any],
+                 permesso: Optional[str] = None, descrizione: str = "") -> None:
+        """Registra un widget.
+
+        Args:
+            id_widget: Identificativo usato dal client
+            funzione: funzione(contesto, parametri) -> dati serializzabili
+            permesso: Permesso richiesto (None = qualsiasi utente autenticato)
+            descrizione: Descrizione breve
+        """
+        self.widget[id_widget] = Widget(id_widget, funzione, permesso, descrizione)
+
+    def disponibili(self, principale=None) -> List[Dict]:
+        """Elenco dei widget accessibili al principale."""
+        return [
+            {"id": w.id, "descrizione": w.descrizione, "permesso": w.permesso}
+            for w in self.widget.values()
+            if w.permesso is None or principale is None or principale.ha_permesso(w.permesso)
+        ]
+
+    def calcola(self, id_widget: List[str], contesto: ContestoDashboard,
+                principale=None, parametri: Optional[Dict] = None) -> Dict:
+        """Calcola più widget condividendo lo stesso contesto.
+
+        Un widget sconosciuto, non consentito o in errore non blocca gli altri.
+
+        Args:
+            id_widget: Widget richiesti, nell'ordine
+            contesto: Aggregati condivisi della richiesta
+            principale: Utente per il controllo dei permessi (None = nessun controllo)
+            parametri: Parametri passati a tutti i widget (es. soglia)
+
+        Returns:
+            Dizionario con dati, errori e tempi in millisecondi per widget
+        """
+        parametri = parametri or {}
+        risultati, errori, tempi = {}, {}, {}
+        inizio_totale = time.perf_counter()
+
+        for id_corrente in dict.fromkeys(id_widget):
+            widget = self.widget.get(id_corrente)
+            if widget is None:
+                errori[id_corrente] = "Widget sconosciuto"
+                continue
+            if widget.permesso and principale is not None and not principale.ha_permesso(widget.permesso):
+                errori[id_corrente] = f"Permesso '{widget.permesso}' richiesto"
+                continue
+
+            inizio = time.perf_counter()
+            try:
+                risultati[id_corrente] = widget.funzione(contesto, parametri)
+            except Exception as e:
+                errori[id_corrente] = str(e)
+            tempi[id_corrente] = round((time.perf_counter() - inizio) * 1000, 3)
+
+        return {
+            "widget": risultati,
+            "errori": errori,
+            "tempi_ms": tempi,
+            "aggregati_ms": dict(contesto.tempi_ms),
+            "totale_ms": round((time.perf_counter() - inizio_totale) * 1000, 3)
+        }
+
+
+if __name__ == "__main__":
+    from anagrafica import Anagrafica
+    from voti import GestioneVoti
+
+    print("🧩 TEST WIDGET DASHBOARD")
+    print("=" * 60 + "\n")
+
+    anagrafica, voti = Anagrafica(), GestioneVoti()
+    for studente in anagrafica.genera_studenti(300):
+        for materia in ("Matematica", "Italiano", "Storia"):
+            voti.aggiungi_voto_casuale(studente.id, materia)
+
+    registro = RegistroWidget()
+    registro.registra("distribuzione", lambda c, p: c.distribuzione_voti)
+    registro.registra("medie", lambda c, p: round(sum(c.medie_studenti.values()) / len(c.medie_studenti), 2))
+    registro.registra("fragili", lambda c, p: sum(1 for f in c.fragilita.values() if f >= 60))
+
+    risposta = registro.calcola(["distribuzione", "medie", "fragili", "inesistente"],
+                                ContestoDashboard(anagrafica, voti))
+    print(f"   Widget: {list(risposta['widget'])}")
+    print(f"   Tempi per widget (ms): {risposta['tempi_ms']}")
+    print(f"   Aggregati condivisi (ms): {risposta['aggregati_ms']}")
+    print(f"   Errori: {risposta['errori']}")
@@ -0,0 +1,91 @@
+"""
+Entry point WSGI per il serving multi-processo.
+
+Ogni worker costruisce la propria InterfacciaERP e la allinea allo store
+condiviso (SQLite WAL), così una scrittura su un worker è visibile a tutti.
+
+Esempi:
+    gunicorn -c gunicorn.conf.py wsgi:app
+    uwsgi --http :5000 --module wsgi:app --processes 4 --master
+"""
+
+import os
+import random
+
+from interfaccia_erp import InterfacciaERP
+from scheduler_attivita import LockFile
+from stato_condiviso import StatoCondiviso
+
+
+PERCORSO_STATO = os.environ.get("MANAGERSCHOOL_DB_CONDIVISO", "managerschool_condiviso.db")
+# Stream SSE della dashboard: vuoto (default) = servito dal worker WSGI; es.
+# "/api/async/dashboard/eventi" solo se il proxy inoltra /api/async/ a uvicorn (asgi.py)
+URL_EVENTI = os.environ.get("MANAGERSCHOOL_URL_EVENTI", "")
+MATERIE_DEMO = ["Matematica", "Italiano", "Inglese", "Storia", "Educazione Fisica", "Religione"]
+
+
+def _popola_dati_demo(erp: InterfacciaERP, numero_studenti: int = 120):
+    """Genera studenti e voti demo nello store (una sola volta)."""
+    print(f"📊 Store condiviso vuoto: genero {numero_studenti} studenti demo...")
+    with erp.stato_condiviso.blocco():
+        erp.anagrafica.genera_studenti(numero_studenti)
+        for studente in erp.anagrafica.studenti:
+            for materia in MATERIE_DEMO:
+                base = 6.5 - (studente.fragilità_sociale / 100)
+                for _ in range(random.randint(2, 6)):
+                    erp.voti.aggiungi_voto_casuale(studente.id, materia, base)
+
+
+def crea_app(percorso: str = PERCORSO_STATO, dati_demo: bool = True,
+             avvia_scheduler: bool = True) -> InterfacciaERP:
+    """Costruisce l'interfaccia di un worker collegata allo store condiviso.
+
+    Args:
+        percorso: File del database condiviso
+        dati_demo: Popola lo store con dati demo se vuoto
+        avvia_scheduler: Avvia lo scheduler (single-flight tra worker via lock)
+
+    Returns:
+        InterfacciaERP pronta a servire richieste
+    """
+    erp = InterfacciaERP()
+    erp.url_eventi_asincroni = URL_EVENTI or None
+
+    # Gli insegnanti non sono nello store: stesso seed = stesso organico su ogni worker
+    stato_random = random.getstate()
+    random.seed("managerschool-insegnanti")
+    erp.insegnanti.genera_insegnanti_per_materia()
+    random.setstate(stato_random)
+
+    # Il lock evita che due worker popolino lo store vuoto in contemporanea
+    lock = LockFile(percorso + ".lock")
+    lock.acquisisci(bloccante=True)
+    try:
+        erp.abilita_stato_condiviso(StatoCondiviso(percorso))
+        if dati_demo and erp.stato_condiviso.vuoto():
+            _popola_dati_demo(erp)
+    finally:
+        lock.rilascia()
+
+    erp._init_analytics()
+    if avvia_scheduler:
+        erp.scheduler.avvia()
+    return erp
+
+
+_erp = None
+
+
+def __getattr__(nome):
+    """Crea l'app alla prima richiesta di `wsgi:app` (import senza effetti collaterali)."""
+    global _erp
+    if nome == "app":
+        if _erp is None:
+            _erp = crea_app()
+        return _erp.app
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+
+if __name__ == "__main__":
+    # Singolo processo, utile per verificare la configurazione
+    crea_app().app.run(host="127.0.0.1", port=5000)